@@ -1198,7 +1198,13 @@ CREATE TRIGGER IF NOT EXISTS "find_cells_mult_insert"
         DELETE FROM "mult_cells" WHERE area_fid = NEW."fid";
         INSERT INTO "mult_cells" (area_fid, grid_fid, wdr, dm, nodchns, xnmult)
             SELECT NEW.fid, g.fid, NEW.wdr, NEW.dm, NEW.nodchns, NEW. xnmult  FROM grid as g
-            WHERE ST_Intersects(CastAutomagic(g.geom), CastAutomagic(NEW.geom));
+            WHERE g.fid IN (
+                SELECT id FROM rtree_grid_geom
+                WHERE minx <= ST_MaxX(NEW.geom) AND maxx >= ST_MinX(NEW.geom)
+                AND miny <= ST_MaxY(NEW.geom) AND maxy >= ST_MinY(NEW.geom)
+                UNION ALL
+                SELECT fid FROM grid WHERE NOT EXISTS (SELECT 1 FROM rtree_grid_geom))
+            AND ST_Intersects(CastAutomagic(g.geom), CastAutomagic(NEW.geom));
     END;
 
 INSERT INTO trigger_control (name, enabled) VALUES ('find_cells_mult_update', 1);
@@ -1209,7 +1215,13 @@ CREATE TRIGGER IF NOT EXISTS "find_cells_mult_update"
         DELETE FROM "mult_cells" WHERE area_fid = OLD."fid";
         INSERT INTO "mult_cells" (area_fid, grid_fid, wdr, dm, nodchns, xnmult)
         SELECT NEW.fid, g.fid, NEW.wdr, NEW.dm, NEW.nodchns, NEW.xnmult  FROM grid as g
-        WHERE ST_Intersects(CastAutomagic(g.geom), CastAutomagic(NEW.geom));
+        WHERE g.fid IN (
+            SELECT id FROM rtree_grid_geom
+            WHERE minx <= ST_MaxX(NEW.geom) AND maxx >= ST_MinX(NEW.geom)
+            AND miny <= ST_MaxY(NEW.geom) AND maxy >= ST_MinY(NEW.geom)
+            UNION ALL
+            SELECT fid FROM grid WHERE NOT EXISTS (SELECT 1 FROM rtree_grid_geom))
+        AND ST_Intersects(CastAutomagic(g.geom), CastAutomagic(NEW.geom));
     END;
 
 INSERT INTO trigger_control (name, enabled) VALUES ('find_cells_mult_delete', 1);
@@ -1229,7 +1241,13 @@ CREATE TRIGGER IF NOT EXISTS "find_cells_mult_line_insert"
         DELETE FROM "mult_cells" WHERE line_fid = NEW."fid";
         INSERT INTO "mult_cells" (line_fid, grid_fid, wdr, dm, nodchns, xnmult)
             SELECT NEW.fid, g.fid, NEW.wdr, NEW.dm, NEW.nodchns, NEW.xnmult  FROM grid as g
-            WHERE ST_Crosses(CastAutomagic(g.geom), CastAutomagic(NEW.geom));
+            WHERE g.fid IN (
+                SELECT id FROM rtree_grid_geom
+                WHERE minx <= ST_MaxX(NEW.geom) AND maxx >= ST_MinX(NEW.geom)
+                AND miny <= ST_MaxY(NEW.geom) AND maxy >= ST_MinY(NEW.geom)
+                UNION ALL
+                SELECT fid FROM grid WHERE NOT EXISTS (SELECT 1 FROM rtree_grid_geom))
+            AND ST_Crosses(CastAutomagic(g.geom), CastAutomagic(NEW.geom));
     END;
 
 
@@ -1241,7 +1259,13 @@ CREATE TRIGGER IF NOT EXISTS "find_cells_mult_line_update"
         DELETE FROM "mult_cells" WHERE line_fid = OLD."fid";
         INSERT INTO "mult_cells" (line_fid, grid_fid, wdr, dm, nodchns, xnmult)
         SELECT NEW.fid, g.fid, NEW.wdr, NEW.dm, NEW.nodchns, NEW.xnmult FROM grid as g
-        WHERE ST_Crosses(CastAutomagic(g.geom), CastAutomagic(NEW.geom));
+        WHERE g.fid IN (
+            SELECT id FROM rtree_grid_geom
+            WHERE minx <= ST_MaxX(NEW.geom) AND maxx >= ST_MinX(NEW.geom)
+            AND miny <= ST_MaxY(NEW.geom) AND maxy >= ST_MinY(NEW.geom)
+            UNION ALL
+            SELECT fid FROM grid WHERE NOT EXISTS (SELECT 1 FROM rtree_grid_geom))
+        AND ST_Crosses(CastAutomagic(g.geom), CastAutomagic(NEW.geom));
     END;
 
 
@@ -1281,7 +1305,13 @@ CREATE TRIGGER IF NOT EXISTS "find_cells_simple_mult_line_insert"
         DELETE FROM "simple_mult_cells" WHERE line_fid = NEW."fid";
         INSERT INTO "simple_mult_cells" (line_fid, grid_fid)
             SELECT NEW.fid, g.fid FROM grid as g
-            WHERE ST_Crosses(CastAutomagic(g.geom), CastAutomagic(NEW.geom));
+            WHERE g.fid IN (
+                SELECT id FROM rtree_grid_geom
+                WHERE minx <= ST_MaxX(NEW.geom) AND maxx >= ST_MinX(NEW.geom)
+                AND miny <= ST_MaxY(NEW.geom) AND maxy >= ST_MinY(NEW.geom)
+                UNION ALL
+                SELECT fid FROM grid WHERE NOT EXISTS (SELECT 1 FROM rtree_grid_geom))
+            AND ST_Crosses(CastAutomagic(g.geom), CastAutomagic(NEW.geom));
     END;
 
 INSERT INTO trigger_control (name, enabled) VALUES ('find_cells_simple_mult_line_update', 1);
@@ -1292,7 +1322,13 @@ CREATE TRIGGER IF NOT EXISTS "find_cells_simple_mult_line_update"
         DELETE FROM "simple_mult_cells" WHERE line_fid = OLD."fid";
         INSERT INTO "simple_mult_cells" (line_fid, grid_fid)
         SELECT NEW.fid, g.fid FROM grid as g
-        WHERE ST_Crosses(CastAutomagic(g.geom), CastAutomagic(NEW.geom));
+        WHERE g.fid IN (
+            SELECT id FROM rtree_grid_geom
+            WHERE minx <= ST_MaxX(NEW.geom) AND maxx >= ST_MinX(NEW.geom)
+            AND miny <= ST_MaxY(NEW.geom) AND maxy >= ST_MinY(NEW.geom)
+            UNION ALL
+            SELECT fid FROM grid WHERE NOT EXISTS (SELECT 1 FROM rtree_grid_geom))
+        AND ST_Crosses(CastAutomagic(g.geom), CastAutomagic(NEW.geom));
     END;
 
   
@@ -2122,7 +2158,13 @@ CREATE TRIGGER IF NOT EXISTS "find_breach_cells_insert"
     BEGIN
         DELETE FROM "breach_cells" WHERE breach_fid = NEW."fid";
         INSERT INTO "breach_cells" (breach_fid, grid_fid) SELECT NEW.fid, g.fid FROM grid as g
-        WHERE ST_Intersects(CastAutomagic(g.geom), CastAutomagic(NEW.geom));
+        WHERE g.fid IN (
+            SELECT id FROM rtree_grid_geom
+            WHERE minx <= ST_MaxX(NEW.geom) AND maxx >= ST_MinX(NEW.geom)
+            AND miny <= ST_MaxY(NEW.geom) AND maxy >= ST_MinY(NEW.geom)
+            UNION ALL
+            SELECT fid FROM grid WHERE NOT EXISTS (SELECT 1 FROM rtree_grid_geom))
+        AND ST_Intersects(CastAutomagic(g.geom), CastAutomagic(NEW.geom));
     END;
 
 
@@ -2133,7 +2175,13 @@ CREATE TRIGGER IF NOT EXISTS "find_breach_cells_update"
         DELETE FROM "breach_cells" WHERE breach_fid = NEW."fid";
         INSERT INTO "breach_cells" (breach_fid, grid_fid)
         SELECT NEW.fid, g.fid FROM grid as g
-        WHERE ST_Intersects(CastAutomagic(g.geom), CastAutomagic(NEW.geom));
+        WHERE g.fid IN (
+            SELECT id FROM rtree_grid_geom
+            WHERE minx <= ST_MaxX(NEW.geom) AND maxx >= ST_MinX(NEW.geom)
+            AND miny <= ST_MaxY(NEW.geom) AND maxy >= ST_MinY(NEW.geom)
+            UNION ALL
+            SELECT fid FROM grid WHERE NOT EXISTS (SELECT 1 FROM rtree_grid_geom))
+        AND ST_Intersects(CastAutomagic(g.geom), CastAutomagic(NEW.geom));
     END;
 
 CREATE TRIGGER IF NOT EXISTS "find_breach_cells_delete"
@@ -2284,7 +2332,13 @@ CREATE TRIGGER IF NOT EXISTS "find_cells_sed_areas_insert"
         DELETE FROM "sed_group_cells" WHERE area_fid = NEW."fid";
         INSERT INTO "sed_group_cells" (area_fid, grid_fid)
             SELECT NEW.fid, g.fid FROM grid as g
-            WHERE ST_Intersects(CastAutomagic(g.geom), CastAutomagic(NEW.geom));
+            WHERE g.fid IN (
+                SELECT id FROM rtree_grid_geom
+                WHERE minx <= ST_MaxX(NEW.geom) AND maxx >= ST_MinX(NEW.geom)
+                AND miny <= ST_MaxY(NEW.geom) AND maxy >= ST_MinY(NEW.geom)
+                UNION ALL
+                SELECT fid FROM grid WHERE NOT EXISTS (SELECT 1 FROM rtree_grid_geom))
+            AND ST_Intersects(CastAutomagic(g.geom), CastAutomagic(NEW.geom));
     END;
     
 INSERT INTO trigger_control (name, enabled) VALUES ('find_cells_sed_areas_update', 1);
@@ -2295,7 +2349,13 @@ CREATE TRIGGER IF NOT EXISTS "find_cells_sed_areas_update"
         DELETE FROM "sed_group_cells" WHERE area_fid = OLD."fid";
         INSERT INTO "sed_group_cells" (area_fid, grid_fid)
         SELECT NEW.fid, g.fid FROM grid as g
-        WHERE ST_Intersects(CastAutomagic(g.geom), CastAutomagic(NEW.geom));
+        WHERE g.fid IN (
+            SELECT id FROM rtree_grid_geom
+            WHERE minx <= ST_MaxX(NEW.geom) AND maxx >= ST_MinX(NEW.geom)
+            AND miny <= ST_MaxY(NEW.geom) AND maxy >= ST_MinY(NEW.geom)
+            UNION ALL
+            SELECT fid FROM grid WHERE NOT EXISTS (SELECT 1 FROM rtree_grid_geom))
+        AND ST_Intersects(CastAutomagic(g.geom), CastAutomagic(NEW.geom));
     END;
 
 INSERT INTO trigger_control (name, enabled) VALUES ('find_cells_sed_areas_delete', 1);
@@ -2314,7 +2374,13 @@ CREATE TRIGGER IF NOT EXISTS "find_sed_rigid_cells_insert"
     BEGIN
         DELETE FROM "sed_rigid_cells" WHERE area_fid = NEW."fid";
         INSERT INTO "sed_rigid_cells" (area_fid, grid_fid) SELECT NEW.fid, g.fid FROM grid as g
-        WHERE ST_Intersects(CastAutomagic(g.geom), CastAutomagic(NEW.geom));
+        WHERE g.fid IN (
+            SELECT id FROM rtree_grid_geom
+            WHERE minx <= ST_MaxX(NEW.geom) AND maxx >= ST_MinX(NEW.geom)
+            AND miny <= ST_MaxY(NEW.geom) AND maxy >= ST_MinY(NEW.geom)
+            UNION ALL
+            SELECT fid FROM grid WHERE NOT EXISTS (SELECT 1 FROM rtree_grid_geom))
+        AND ST_Intersects(CastAutomagic(g.geom), CastAutomagic(NEW.geom));
     END;
 
 INSERT INTO trigger_control (name, enabled) VALUES ('find_sed_rigid_cell_delete', 1);
@@ -2334,7 +2400,13 @@ CREATE TRIGGER IF NOT EXISTS "find_cells_sed_supply_areas_insert"
         DELETE FROM "sed_supply_cells" WHERE area_fid = NEW."fid";
         INSERT INTO "sed_supply_cells" (area_fid, grid_fid)
             SELECT NEW.fid, g.fid FROM grid as g
-            WHERE ST_Intersects(CastAutomagic(g.geom), CastAutomagic(NEW.geom));
+            WHERE g.fid IN (
+                SELECT id FROM rtree_grid_geom
+                WHERE minx <= ST_MaxX(NEW.geom) AND maxx >= ST_MinX(NEW.geom)
+                AND miny <= ST_MaxY(NEW.geom) AND maxy >= ST_MinY(NEW.geom)
+                UNION ALL
+                SELECT fid FROM grid WHERE NOT EXISTS (SELECT 1 FROM rtree_grid_geom))
+            AND ST_Intersects(CastAutomagic(g.geom), CastAutomagic(NEW.geom));
     END;
 
 INSERT INTO trigger_control (name, enabled) VALUES ('find_cells_sed_supply_areas_update', 1);
@@ -2345,7 +2417,13 @@ CREATE TRIGGER IF NOT EXISTS "find_cells_sed_supply_areas_update"
         DELETE FROM "sed_supply_cells" WHERE area_fid = OLD."fid";
         INSERT INTO "sed_supply_cells" (area_fid, grid_fid)
         SELECT NEW.fid, g.fid FROM grid as g
-        WHERE ST_Intersects(CastAutomagic(g.geom), CastAutomagic(NEW.geom));
+        WHERE g.fid IN (
+            SELECT id FROM rtree_grid_geom
+            WHERE minx <= ST_MaxX(NEW.geom) AND maxx >= ST_MinX(NEW.geom)
+            AND miny <= ST_MaxY(NEW.geom) AND maxy >= ST_MinY(NEW.geom)
+            UNION ALL
+            SELECT fid FROM grid WHERE NOT EXISTS (SELECT 1 FROM rtree_grid_geom))
+        AND ST_Intersects(CastAutomagic(g.geom), CastAutomagic(NEW.geom));
     END;
 
 INSERT INTO trigger_control (name, enabled) VALUES ('find_cells_sed_supply_areas_delete', 1);
@@ -8,7 +8,13 @@ CREATE TRIGGER IF NOT EXISTS "find_inflow_cells_insert"
     BEGIN
         DELETE FROM "inflow_cells" WHERE inflow_fid = NEW."fid";
         INSERT INTO "inflow_cells" (inflow_fid, grid_fid) SELECT NEW.fid, g.fid FROM grid as g
-        WHERE ST_Intersects(CastAutomagic(g.geom), CastAutomagic(NEW.geom));
+        WHERE g.fid IN (
+            SELECT id FROM rtree_grid_geom
+            WHERE minx <= ST_MaxX(NEW.geom) AND maxx >= ST_MinX(NEW.geom)
+            AND miny <= ST_MaxY(NEW.geom) AND maxy >= ST_MinY(NEW.geom)
+            UNION ALL
+            SELECT fid FROM grid WHERE NOT EXISTS (SELECT 1 FROM rtree_grid_geom))
+        AND ST_Intersects(CastAutomagic(g.geom), CastAutomagic(NEW.geom));
     END;
 
 CREATE TRIGGER IF NOT EXISTS "find_inflow_cells_update"
@@ -17,7 +23,13 @@ CREATE TRIGGER IF NOT EXISTS "find_inflow_cells_update"
     BEGIN
         DELETE FROM "inflow_cells" WHERE inflow_fid = OLD."fid";
         INSERT INTO "inflow_cells" (inflow_fid, grid_fid) SELECT OLD.fid, g.fid FROM grid as g
-        WHERE ST_Intersects(CastAutomagic(g.geom), CastAutomagic(NEW.geom));
+        WHERE g.fid IN (
+            SELECT id FROM rtree_grid_geom
+            WHERE minx <= ST_MaxX(NEW.geom) AND maxx >= ST_MinX(NEW.geom)
+            AND miny <= ST_MaxY(NEW.geom) AND maxy >= ST_MinY(NEW.geom)
+            UNION ALL
+            SELECT fid FROM grid WHERE NOT EXISTS (SELECT 1 FROM rtree_grid_geom))
+        AND ST_Intersects(CastAutomagic(g.geom), CastAutomagic(NEW.geom));
     END;
 
 CREATE TRIGGER IF NOT EXISTS "find_inflow_cells_delete"
@@ -37,7 +49,13 @@ CREATE TRIGGER IF NOT EXISTS "find_outflow_cells_insert"
         DELETE FROM "outflow_cells" WHERE outflow_fid = NEW."fid";
         INSERT INTO "outflow_cells" (outflow_fid, grid_fid, area_factor)
         SELECT NEW.fid, g.fid, ST_Area(ST_Intersection(CastAutomagic(g.geom), CastAutomagic(NEW.geom)))/ST_Area(NEW.geom) FROM grid as g
-        WHERE ST_Intersects(CastAutomagic(g.geom), CastAutomagic(NEW.geom));
+        WHERE g.fid IN (
+            SELECT id FROM rtree_grid_geom
+            WHERE minx <= ST_MaxX(NEW.geom) AND maxx >= ST_MinX(NEW.geom)
+            AND miny <= ST_MaxY(NEW.geom) AND maxy >= ST_MinY(NEW.geom)
+            UNION ALL
+            SELECT fid FROM grid WHERE NOT EXISTS (SELECT 1 FROM rtree_grid_geom))
+        AND ST_Intersects(CastAutomagic(g.geom), CastAutomagic(NEW.geom));
     END;
 
 CREATE TRIGGER IF NOT EXISTS "find_outflow_chan_elems_insert"
@@ -46,7 +64,13 @@ CREATE TRIGGER IF NOT EXISTS "find_outflow_chan_elems_insert"
     BEGIN
         DELETE FROM "outflow_chan_elems" WHERE outflow_fid = NEW."fid";
         INSERT INTO "outflow_chan_elems" (outflow_fid, elem_fid) SELECT NEW.fid, g.fid FROM grid as g
-        WHERE ST_Intersects(CastAutomagic(g.geom), CastAutomagic(NEW.geom));
+        WHERE g.fid IN (
+            SELECT id FROM rtree_grid_geom
+            WHERE minx <= ST_MaxX(NEW.geom) AND maxx >= ST_MinX(NEW.geom)
+            AND miny <= ST_MaxY(NEW.geom) AND maxy >= ST_MinY(NEW.geom)
+            UNION ALL
+            SELECT fid FROM grid WHERE NOT EXISTS (SELECT 1 FROM rtree_grid_geom))
+        AND ST_Intersects(CastAutomagic(g.geom), CastAutomagic(NEW.geom));
     END;
 
 CREATE TRIGGER IF NOT EXISTS "find_outflow_cells_update"
@@ -55,7 +79,13 @@ CREATE TRIGGER IF NOT EXISTS "find_outflow_cells_update"
     BEGIN
         DELETE FROM "outflow_cells" WHERE outflow_fid = OLD."fid" AND NEW."ident" = 'N';
         INSERT INTO "outflow_cells" (outflow_fid, grid_fid) SELECT OLD.fid, g.fid FROM grid as g
-        WHERE ST_Intersects(CastAutomagic(g.geom), CastAutomagic(NEW.geom)) AND NEW."ident" = 'N';
+        WHERE g.fid IN (
+            SELECT id FROM rtree_grid_geom
+            WHERE minx <= ST_MaxX(NEW.geom) AND maxx >= ST_MinX(NEW.geom)
+            AND miny <= ST_MaxY(NEW.geom) AND maxy >= ST_MinY(NEW.geom)
+            UNION ALL
+            SELECT fid FROM grid WHERE NOT EXISTS (SELECT 1 FROM rtree_grid_geom))
+        AND ST_Intersects(CastAutomagic(g.geom), CastAutomagic(NEW.geom)) AND NEW."ident" = 'N';
     END;
 
 CREATE TRIGGER IF NOT EXISTS "find_outflow_chan_elems_update"
@@ -64,7 +94,13 @@ CREATE TRIGGER IF NOT EXISTS "find_outflow_chan_elems_update"
     BEGIN
         DELETE FROM "outflow_chan_elems" WHERE outflow_fid = OLD."fid" AND NEW."ident" = 'K';
         INSERT INTO "outflow_chan_elems" (outflow_fid, elem_fid) SELECT OLD.fid, g.fid FROM grid as g
-        WHERE ST_Intersects(CastAutomagic(g.geom), CastAutomagic(NEW.geom)) AND NEW."ident" = 'K';
+        WHERE g.fid IN (
+            SELECT id FROM rtree_grid_geom
+            WHERE minx <= ST_MaxX(NEW.geom) AND maxx >= ST_MinX(NEW.geom)
+            AND miny <= ST_MaxY(NEW.geom) AND maxy >= ST_MinY(NEW.geom)
+            UNION ALL
+            SELECT fid FROM grid WHERE NOT EXISTS (SELECT 1 FROM rtree_grid_geom))
+        AND ST_Intersects(CastAutomagic(g.geom), CastAutomagic(NEW.geom)) AND NEW."ident" = 'K';
     END;
 
 CREATE TRIGGER IF NOT EXISTS "find_outflow_cells_delete"
@@ -197,7 +233,13 @@ CREATE TRIGGER IF NOT EXISTS "find_noexchange_cells_insert"
         DELETE FROM "noexchange_chan_cells" WHERE noex_fid = NEW."fid";
         INSERT INTO "noexchange_chan_cells" (noex_fid, grid_fid)
         SELECT NEW.fid, g.fid FROM grid as g
-        WHERE ST_Intersects(CastAutomagic(g.geom), CastAutomagic(NEW.geom));
+        WHERE g.fid IN (
+            SELECT id FROM rtree_grid_geom
+            WHERE minx <= ST_MaxX(NEW.geom) AND maxx >= ST_MinX(NEW.geom)
+            AND miny <= ST_MaxY(NEW.geom) AND maxy >= ST_MinY(NEW.geom)
+            UNION ALL
+            SELECT fid FROM grid WHERE NOT EXISTS (SELECT 1 FROM rtree_grid_geom))
+        AND ST_Intersects(CastAutomagic(g.geom), CastAutomagic(NEW.geom));
     END;
 
 CREATE TRIGGER IF NOT EXISTS "find_noexchange_cells_update"
@@ -207,7 +249,13 @@ CREATE TRIGGER IF NOT EXISTS "find_noexchange_cells_update"
         DELETE FROM "noexchange_chan_cells" WHERE noex_fid = NEW."fid";
         INSERT INTO "noexchange_chan_cells" (noex_fid, grid_fid)
         SELECT NEW.fid, g.fid FROM grid as g
-        WHERE ST_Intersects(CastAutomagic(g.geom), CastAutomagic(NEW.geom));
+        WHERE g.fid IN (
+            SELECT id FROM rtree_grid_geom
+            WHERE minx <= ST_MaxX(NEW.geom) AND maxx >= ST_MinX(NEW.geom)
+            AND miny <= ST_MaxY(NEW.geom) AND maxy >= ST_MinY(NEW.geom)
+            UNION ALL
+            SELECT fid FROM grid WHERE NOT EXISTS (SELECT 1 FROM rtree_grid_geom))
+        AND ST_Intersects(CastAutomagic(g.geom), CastAutomagic(NEW.geom));
     END;
 
 CREATE TRIGGER IF NOT EXISTS "find_noexchange_cells_delete"
@@ -352,7 +400,13 @@ CREATE TRIGGER IF NOT EXISTS "find_cells_arf_tot_insert"
         DELETE FROM "blocked_cells_tot" WHERE area_fid = NEW."fid";
         INSERT INTO "blocked_cells_tot" (area_fid, grid_fid)
             SELECT NEW.fid, g.fid FROM grid as g
-            WHERE ST_Intersects(CastAutomagic(g.geom), CastAutomagic(NEW.geom));
+            WHERE g.fid IN (
+                SELECT id FROM rtree_grid_geom
+                WHERE minx <= ST_MaxX(NEW.geom) AND maxx >= ST_MinX(NEW.geom)
+                AND miny <= ST_MaxY(NEW.geom) AND maxy >= ST_MinY(NEW.geom)
+                UNION ALL
+                SELECT fid FROM grid WHERE NOT EXISTS (SELECT 1 FROM rtree_grid_geom))
+            AND ST_Intersects(CastAutomagic(g.geom), CastAutomagic(NEW.geom));
     END;
 
 CREATE TRIGGER IF NOT EXISTS "find_cells_arf_tot_update"
@@ -362,7 +416,13 @@ CREATE TRIGGER IF NOT EXISTS "find_cells_arf_tot_update"
         DELETE FROM "blocked_cells_tot" WHERE area_fid = NEW."fid";
         INSERT INTO "blocked_cells_tot" (area_fid, grid_fid)
         SELECT NEW.fid, g.fid FROM grid as g
-        WHERE ST_Intersects(CastAutomagic(g.geom), CastAutomagic(NEW.geom));
+        WHERE g.fid IN (
+            SELECT id FROM rtree_grid_geom
+            WHERE minx <= ST_MaxX(NEW.geom) AND maxx >= ST_MinX(NEW.geom)
+            AND miny <= ST_MaxY(NEW.geom) AND maxy >= ST_MinY(NEW.geom)
+            UNION ALL
+            SELECT fid FROM grid WHERE NOT EXISTS (SELECT 1 FROM rtree_grid_geom))
+        AND ST_Intersects(CastAutomagic(g.geom), CastAutomagic(NEW.geom));
     END;
 
 CREATE TRIGGER IF NOT EXISTS "find_cells_arf_tot_delete"
@@ -379,7 +439,13 @@ CREATE TRIGGER IF NOT EXISTS "find_cells_arf_insert"
         DELETE FROM "blocked_cells" WHERE area_fid = NEW."fid";
         INSERT INTO "blocked_cells" (area_fid, grid_fid)
             SELECT NEW.fid, g.fid FROM grid as g
-            WHERE ST_Intersects(CastAutomagic(g.geom), CastAutomagic(NEW.geom));
+            WHERE g.fid IN (
+                SELECT id FROM rtree_grid_geom
+                WHERE minx <= ST_MaxX(NEW.geom) AND maxx >= ST_MinX(NEW.geom)
+                AND miny <= ST_MaxY(NEW.geom) AND maxy >= ST_MinY(NEW.geom)
+                UNION ALL
+                SELECT fid FROM grid WHERE NOT EXISTS (SELECT 1 FROM rtree_grid_geom))
+            AND ST_Intersects(CastAutomagic(g.geom), CastAutomagic(NEW.geom));
     END;
 
 CREATE TRIGGER IF NOT EXISTS "find_cells_arf_update"
@@ -389,7 +455,13 @@ CREATE TRIGGER IF NOT EXISTS "find_cells_arf_update"
         DELETE FROM "blocked_cells" WHERE area_fid = NEW."fid";
         INSERT INTO "blocked_cells" (area_fid, grid_fid)
         SELECT NEW.fid, g.fid FROM grid as g
-        WHERE ST_Intersects(CastAutomagic(g.geom), CastAutomagic(NEW.geom));
+        WHERE g.fid IN (
+            SELECT id FROM rtree_grid_geom
+            WHERE minx <= ST_MaxX(NEW.geom) AND maxx >= ST_MinX(NEW.geom)
+            AND miny <= ST_MaxY(NEW.geom) AND maxy >= ST_MinY(NEW.geom)
+            UNION ALL
+            SELECT fid FROM grid WHERE NOT EXISTS (SELECT 1 FROM rtree_grid_geom))
+        AND ST_Intersects(CastAutomagic(g.geom), CastAutomagic(NEW.geom));
     END;
 
 CREATE TRIGGER IF NOT EXISTS "find_cells_arf_delete"
@@ -40,6 +40,7 @@ from qgis.PyQt.QtWidgets import (
     QDockWidget
 )
 from qgis.utils import plugins, iface
+from .flo2d_ie.export_scheduler import ExportScheduler, WRITING_EXPORTS
 from .flo2d_ie.flo2dgeopackage import Flo2dGeoPackage
 from .flo2d_tools.flopro_tools import (
     ProgramExecutor,
@@ -1471,6 +1472,11 @@ class Flo2D(object):
             self.uc.log_info(msg)
             return
 
+        # Older projects keep cell lookup triggers scanning the whole grid
+        self.gutils.update_cell_lookup_triggers()
+        # Older projects have no secondary indexes on grid and foreign key columns, migrated once per project
+        self.gutils.ensure_indexes()
+
         # Geopackage associated with the project
         if old_gpkg:
             # Check if opening gpkg (new_gpkg) is the same as the project gpkg (old_gpkg)
@@ -1651,8 +1657,16 @@ class Flo2D(object):
         if calls[0] == "export_cont_toler":
             self.files_used = "CONT.DAT\n"
 
+        # Exporters only reading the GeoPackage run on a thread pool while the others run here
+        scheduler = None
+        n_calls = len(calls)
+        if calls[0].startswith("export") and self.f2g.parsed_format == Flo2dGeoPackage.FORMAT_DAT:
+            self.con.commit()
+            scheduler = ExportScheduler(self.gutils.get_gpkg_path(), self.f2g)
+            calls = scheduler.order(calls)
+
         parent = iface.mainWindow() if iface and iface.mainWindow() else None
-        progDialog = QProgressDialog("Exporting to DATA...", "Cancel", 0, len(calls), parent)
+        progDialog = QProgressDialog("Exporting to DATA...", "Cancel", 0, n_calls, parent)
         progDialog.setModal(True)
         progDialog.setValue(0)
         progDialog.show()
@@ -1661,6 +1675,9 @@ class Flo2D(object):
         QApplication.setOverrideCursor(qt_cursor_shape("WaitCursor"))
         for call in calls:
 
+            if scheduler is not None and call not in WRITING_EXPORTS:
+                scheduler.start(*args)
+
             i += 1
             progDialog.setValue(i)
             progDialog.setLabelText(call)
@@ -1668,6 +1685,8 @@ class Flo2D(object):
 
             if progDialog.wasCanceled():
 
+                if scheduler is not None:
+                    scheduler.shutdown(cancel=True)
                 progDialog.close()
                 QApplication.processEvents()
                 progDialog.deleteLater()
@@ -1679,35 +1698,7 @@ class Flo2D(object):
 
                 return False
 
-            if call == "export_bridge_xsec":
-                dat = "BRIDGE_XSEC.DAT"
-            elif call == "export_bridge_coeff_data":
-                dat = "BRIDGE_COEFF_DATA.DAT"
-            elif call == "import_hystruc_bridge_xs":
-                dat = "BRIDGE_XSEC.DAT"
-            elif call == "import_swmminp":
-                dat = "SWMM.INP"
-            elif call == 'export_steep_slopen':
-                dat = "STEEP_SLOPEN.DAT"
-            elif call == 'import_steep_slopen':
-                dat = "STEEP_SLOPEN.DAT"
-            elif call == 'export_lid_volume':
-                dat = "LID_VOLUME.DAT"
-            elif call == 'import_lid_volume':
-                dat = "LID_VOLUME.DAT"
-            elif call == 'import_shallowNSpatial':
-                dat = "SHALLOWN_SPATIAL.DAT"
-            elif call == 'import_chan_interior_nodes':
-                dat = "CHAN_INTERIOR_NODES.OUT"
-            elif call == "import_tailings":
-                if self.f2g.parser.dat_files["TAILINGS.DAT"] is not None:
-                    dat = "TAILINGS.DAT"
-                if self.f2g.parser.dat_files["TAILINGS_CV.DAT"] is not None:
-                    dat = "TAILINGS_CV.DAT"
-                if self.f2g.parser.dat_files["TAILINGS_STACK_DEPTH.DAT"] is not None:
-                    dat = "TAILINGS_STACK_DEPTH.DAT"
-            else:
-                dat = call.split("_")[-1].upper() + ".DAT"
+            dat = self.io_call_dat(call)
             if call.startswith("import"):
                 if self.f2g.parser.dat_files[dat] is None:
                     if dat == "MULT.DAT":
@@ -1746,16 +1737,7 @@ class Flo2D(object):
 
                 if method(*args):
                     if call.startswith("export"):
-                        self.files_used += dat + "\n"
-                        if dat == "CHAN.DAT":
-                            self.files_used += "CHANBANK.DAT" + "\n"
-                        if dat == "SWMMFLO.DAT":
-                            self.files_used += "SWMM.INP" + "\n"
-                        if dat == "TOPO.DAT":
-                            self.files_used += "MANNINGS_N.DAT" + "\n"
-                        if dat == "MULT.DAT":
-                            self.files_used += "SIMPLE_MULT.DAT" + "\n"
-                        pass
+                        self.add_exported_files(dat)
 
                 self.uc.log_info('{0:.3f} seconds => "{1}"'.format(time.time() - start_time, call))
 
@@ -1763,13 +1745,104 @@ class Flo2D(object):
                 if debug is True:
                     self.uc.log_info(traceback.format_exc())
                 else:
+                    if scheduler is not None:
+                        scheduler.shutdown(cancel=True)
                     raise
 
+        if scheduler is not None:
+
+            def export_canceled():
+                QApplication.processEvents()
+                return progDialog.wasCanceled()
+
+            scheduler.start(*args)
+            try:
+                for call, result, seconds, messages, error in scheduler.results(export_canceled):
+                    i += 1
+                    progDialog.setValue(i)
+                    progDialog.setLabelText(call)
+                    messages.replay(self.uc)
+                    if error is not None:
+                        if debug is True:
+                            self.uc.log_info(
+                                "".join(traceback.format_exception(type(error), error, error.__traceback__))
+                            )
+                        else:
+                            raise error
+                    elif result:
+                        self.add_exported_files(self.io_call_dat(call))
+                    self.uc.log_info('{0:.3f} seconds => "{1}" (parallel)'.format(seconds, call))
+            except Exception:
+                scheduler.shutdown(cancel=True)
+                progDialog.close()
+                progDialog.deleteLater()
+                QApplication.restoreOverrideCursor()
+                raise
+
+            if progDialog.wasCanceled():
+                progDialog.close()
+                QApplication.processEvents()
+                progDialog.deleteLater()
+
+                self.uc.log_info("Export to DATA canceled!")
+                self.uc.bar_warn("Export to DATA canceled!")
+
+                QApplication.restoreOverrideCursor()
+
+                return False
+
         progDialog.close()
         progDialog.deleteLater()
 
         QApplication.restoreOverrideCursor()
 
+    def io_call_dat(self, call):
+        """
+        Return name of the DAT file imported or exported by the call.
+        """
+        dat = None
+        if call == "export_bridge_xsec":
+            dat = "BRIDGE_XSEC.DAT"
+        elif call == "export_bridge_coeff_data":
+            dat = "BRIDGE_COEFF_DATA.DAT"
+        elif call == "import_hystruc_bridge_xs":
+            dat = "BRIDGE_XSEC.DAT"
+        elif call == "import_swmminp":
+            dat = "SWMM.INP"
+        elif call == 'export_steep_slopen':
+            dat = "STEEP_SLOPEN.DAT"
+        elif call == 'import_steep_slopen':
+            dat = "STEEP_SLOPEN.DAT"
+        elif call == 'export_lid_volume':
+            dat = "LID_VOLUME.DAT"
+        elif call == 'import_lid_volume':
+            dat = "LID_VOLUME.DAT"
+        elif call == 'import_shallowNSpatial':
+            dat = "SHALLOWN_SPATIAL.DAT"
+        elif call == 'import_chan_interior_nodes':
+            dat = "CHAN_INTERIOR_NODES.OUT"
+        elif call == "import_tailings":
+            if self.f2g.parser.dat_files["TAILINGS.DAT"] is not None:
+                dat = "TAILINGS.DAT"
+            if self.f2g.parser.dat_files["TAILINGS_CV.DAT"] is not None:
+                dat = "TAILINGS_CV.DAT"
+            if self.f2g.parser.dat_files["TAILINGS_STACK_DEPTH.DAT"] is not None:
+                dat = "TAILINGS_STACK_DEPTH.DAT"
+        else:
+            dat = call.split("_")[-1].upper() + ".DAT"
+        return dat
+
+    def add_exported_files(self, dat):
+        self.files_used += dat + "\n"
+        if dat == "CHAN.DAT":
+            self.files_used += "CHANBANK.DAT" + "\n"
+        if dat == "SWMMFLO.DAT":
+            self.files_used += "SWMM.INP" + "\n"
+        if dat == "TOPO.DAT":
+            self.files_used += "MANNINGS_N.DAT" + "\n"
+        if dat == "MULT.DAT":
+            self.files_used += "SIMPLE_MULT.DAT" + "\n"
+
     @connection_required
     def import_gds(self):
         """
@@ -1956,9 +2029,11 @@ class Flo2D(object):
 
                     self.f2g.clear_gpkg_tables()
 
-                    self.call_IO_methods(import_calls, True)  # The strings list 'export_calls', contains the names of
-                    # the methods in the class Flo2dGeoPackage to import (read) the
-                    # FLO-2D .DAT files
+                    # Import everything in a single transaction instead of committing every statement
+                    with self.gutils.bulk_session(defer_spatial_index=True):
+                        self.call_IO_methods(import_calls, True)  # The strings list 'export_calls', contains the names of
+                        # the methods in the class Flo2dGeoPackage to import (read) the
+                        # FLO-2D .DAT files
 
                     # Save CRS to table cont
                     self.gutils.set_cont_par("PROJ", self.crs.toProj())
@@ -2149,7 +2224,8 @@ class Flo2D(object):
 
         self.f2g.clear_gpkg_tables()
 
-        self.call_IO_methods(import_calls, True)
+        with self.gutils.bulk_session(defer_spatial_index=True):
+            self.call_IO_methods(import_calls, True)
 
         # save CRS to table cont
         self.gutils.set_cont_par("PROJ", self.crs.toProj())
@@ -2417,11 +2493,12 @@ class Flo2D(object):
 
                     if import_calls:
 
-                        self.call_IO_methods(
-                            import_calls, True
-                        )  # The strings list 'import_calls', contains the names of
-                        # the methods in the class Flo2dGeoPackage to import (read) the
-                        # FLO-2D .DAT files
+                        with self.gutils.bulk_session(defer_spatial_index=True):
+                            self.call_IO_methods(
+                                import_calls, True
+                            )  # The strings list 'import_calls', contains the names of
+                            # the methods in the class Flo2dGeoPackage to import (read) the
+                            # FLO-2D .DAT files
 
                         # save CRS to table cont
                         self.gutils.set_cont_par("PROJ", self.crs.toProj())
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+
+# FLO-2D Preprocessor tools for QGIS
+
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from ..geopackage_utils import database_disconnect, spatialite_connect
+from .flo2dgeopackage import Flo2dGeoPackage
+
+# DAT exporters that only read the GeoPackage, write their own file, show no dialogs and change the override cursor
+# only through 'Flo2dGeoPackage.app'
+PARALLEL_EXPORTS = frozenset(
+    [
+        "export_breach",
+        "export_bridge_coeff_data",
+        "export_bridge_xsec",
+        "export_evapor",
+        "export_fpfroude",
+        "export_fpxsec",
+        "export_infil",
+        "export_lid_volume",
+        "export_outrc",
+        "export_rain",
+        "export_sdclogging",
+        "export_shallowNSpatial",
+        "export_steep_slopen",
+        "export_swmmflo",
+        "export_swmmflodropbox",
+        "export_swmmoutf",
+        "export_tailings",
+        "export_tolspatial",
+        "export_wstime",
+        "export_wsurf",
+        "export_xsec",
+    ]
+)
+
+# DAT exporters updating the GeoPackage (CONT parameters and tables, e.g. default MULT globals), run in order before
+# any other exporter
+WRITING_EXPORTS = frozenset(
+    [
+        "export_arf",
+        "export_chan",
+        "export_cont_toler",
+        "export_gutter",
+        "export_hystruc",
+        "export_levee",
+        "export_mult",
+        "export_sed",
+        "export_street",
+        "export_swmminp",
+    ]
+)
+
+
+class RecordedMessages(object):
+    """
+    Stand-in for UserCommunication of exporters running in the pool. Messages are replayed on the main thread.
+    """
+
+    def __init__(self):
+        self.calls = []
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        def record(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+
+        return record
+
+    def replay(self, uc):
+        for name, args, kwargs in self.calls:
+            getattr(uc, name)(*args, **kwargs)
+
+
+class WorkerApplication(object):
+    """
+    Stand-in for QApplication of exporters running in the pool. Override cursor changes are ignored, the main
+    thread keeps the wait cursor for the whole export.
+    """
+
+    @staticmethod
+    def setOverrideCursor(cursor):
+        pass
+
+    @staticmethod
+    def restoreOverrideCursor():
+        pass
+
+
+class ExportScheduler(object):
+    """
+    Run DAT exporters of the PARALLEL_EXPORTS on a thread pool. Every exporter gets its own read only connection
+    to the GeoPackage. The other exporters run on the main thread: the ones of WRITING_EXPORTS first (the pool
+    is started after them), then the rest while the pool is working.
+    """
+
+    def __init__(self, gpkg_path, f2g, max_workers=None):
+        self.gpkg_path = gpkg_path
+        self.f2g = f2g
+        self.max_workers = max_workers
+        self.parallel = []
+        self.pool = None
+        self.futures = {}
+
+    @property
+    def started(self):
+        return self.pool is not None
+
+    def order(self, calls):
+        """
+        Take the parallel exporters out of calls and return the main thread calls, writing exporters first.
+        """
+        self.parallel = [call for call in calls if call in PARALLEL_EXPORTS]
+        writing = [call for call in calls if call in WRITING_EXPORTS]
+        other = [call for call in calls if call not in PARALLEL_EXPORTS and call not in WRITING_EXPORTS]
+        return writing + other
+
+    def exporter(self, messages):
+        con = spatialite_connect(self.gpkg_path, check_same_thread=False)
+        con.execute("PRAGMA query_only = ON;")
+        f2g = Flo2dGeoPackage(con, None, self.f2g.parsed_format)
+        f2g.parser = self.f2g.parser
+        f2g.cell_size = self.f2g.cell_size
+        f2g.uc = messages
+        f2g.gutils.uc = messages
+        f2g.app = WorkerApplication
+        return f2g
+
+    @staticmethod
+    def run(f2g, call, args):
+        start_time = time.time()
+        try:
+            result = getattr(f2g, call)(*args)
+            error = None
+        except Exception as e:
+            result = False
+            error = e
+        finally:
+            database_disconnect(f2g.con)
+        return result, time.time() - start_time, error
+
+    def start(self, *args):
+        if self.started:
+            return
+        self.pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        for call in self.parallel:
+            messages = RecordedMessages()
+            f2g = self.exporter(messages)
+            future = self.pool.submit(self.run, f2g, call, args)
+            self.futures[future] = (call, messages, f2g)
+
+    def results(self, callback=None, interval=0.1):
+        """
+        Yield (call, result, seconds, messages, error) of the parallel exporters as they finish, calling
+        callback (e.g. processing GUI events) while waiting. When callback returns True (export canceled) the
+        exporters not started yet are cancelled and the running ones are waited for without yielding them.
+        """
+        pending = set(self.futures)
+        while pending:
+            done, pending = wait(pending, timeout=interval, return_when=FIRST_COMPLETED)
+            for future in done:
+                call, messages, f2g = self.futures[future]
+                result, seconds, error = future.result()
+                yield call, result, seconds, messages, error
+            if callback is not None and callback():
+                self.shutdown(cancel=True)
+                return
+        self.shutdown()
+
+    def shutdown(self, cancel=False):
+        if self.pool is None:
+            return
+        self.pool.shutdown(wait=True, cancel_futures=cancel)
+        for future, (call, messages, f2g) in self.futures.items():
+            if future.cancelled():
+                database_disconnect(f2g.con)
@@ -10,7 +10,8 @@
 import os
 import re
 from collections import OrderedDict, defaultdict
-from itertools import chain, repeat, zip_longest
+from contextlib import contextmanager
+from itertools import chain, islice, repeat, zip_longest
 from operator import attrgetter
 from typing import Any
 
@@ -24,6 +25,76 @@ from ..flo2d_hdf5.hdf5_descriptions import CONTROL, GRID, NEIGHBORS, STORMDRAIN,
 from ..utils import Msge
 
 from ..deps import safe_h5py as h5py
+from . import text_parsers
+
+# Dataset descriptions written as attributes, later dictionaries take precedence
+HDF5_ATTRIBUTES = {}
+for _descriptions in (CONTROL, GRID, NEIGHBORS, STORMDRAIN, BC, CHANNEL, HYSTRUCT, INFIL, RAIN, REDUCTION_FACTORS,
+                      LEVEE, EVAPOR, FLOODPLAIN, GUTTER, TAILINGS, SPATIALLY_VARIABLE, MULT, SD, SEDIMENT, STREET,
+                      MULTIDOMAIN, QGIS):
+    HDF5_ATTRIBUTES.update(_descriptions)
+
+
+class HDF5WriterProfile:
+    """
+    Storage layout settings for HDF5 datasets.
+    Chunks span whole rows and hold about 'chunk_bytes' of data unless 'chunk_rows' is given. With 'columns'
+    layout chunks span whole columns instead, for reading the series of single columns (e.g. one grid cell).
+    Compression is 'gzip' (level from 'compression_opts'), 'lzf' or None.
+    """
+
+    def __init__(self, compression="gzip", compression_opts=4, shuffle=True, chunk_rows=None, chunk_bytes=1 << 20):
+        self.compression = compression
+        self.compression_opts = compression_opts if compression == "gzip" else None
+        self.shuffle = shuffle
+        self.chunk_rows = chunk_rows
+        self.chunk_bytes = chunk_bytes
+
+    def chunk_shape(self, shape, dtype, resizable=False):
+        row_shape = tuple(shape[1:])
+        row_bytes = max(int(np.prod(row_shape, dtype=np.int64)) * np.dtype(dtype).itemsize, 1)
+        rows = self.chunk_rows or max(self.chunk_bytes // row_bytes, 1)
+        if not resizable:
+            rows = min(rows, max(shape[0], 1))
+        return (rows,) + row_shape
+
+    def column_chunk_shape(self, shape, dtype):
+        rows = max(shape[0], 1)
+        column_bytes = rows * np.dtype(dtype).itemsize
+        columns = max(self.chunk_bytes // column_bytes, 1)
+        return (rows, min(columns, max(shape[1], 1))) + tuple(shape[2:])
+
+    def dataset_kwargs(self, shape, dtype, resizable=False, layout="rows"):
+        """
+        Return keyword arguments for h5py 'create_dataset'.
+        """
+        kwargs = {}
+        if not shape or (np.prod(shape) == 0 and not resizable):
+            # Scalars and empty datasets can't be chunked
+            return kwargs
+        if self.compression is None and not resizable and layout == "rows":
+            return kwargs
+        if layout == "columns" and len(shape) > 1 and not resizable:
+            kwargs["chunks"] = self.column_chunk_shape(shape, dtype)
+        else:
+            kwargs["chunks"] = self.chunk_shape(shape, dtype, resizable)
+        if resizable:
+            kwargs["maxshape"] = (None,) + tuple(shape[1:])
+        if self.compression is not None:
+            kwargs["compression"] = self.compression
+            if self.compression_opts is not None:
+                kwargs["compression_opts"] = self.compression_opts
+            kwargs["shuffle"] = self.shuffle
+        return kwargs
+
+
+HDF5_PROFILES = {
+    "default": HDF5WriterProfile(),
+    "fast": HDF5WriterProfile(compression="lzf"),
+    "compact": HDF5WriterProfile(compression_opts=9),
+    "uncompressed": HDF5WriterProfile(compression=None),
+}
+
 
 class HDF5Group:
     def __init__(self, name: str):
@@ -47,6 +118,72 @@ class HDF5Dataset:
         self.data = data
         self.group = group
 
+    @property
+    def data(self):
+        if self._buffer is not None:
+            return self._buffer[: self._size]
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        self._data = value
+        self._buffer = None
+        self._size = 0
+
+    def allocate(self, columns: int = 1, dtype: Any = np.float64, capacity: int = 1024):
+        """
+        Replace dataset data with empty typed buffer of given number of columns (1D for single column).
+        Buffer capacity is doubled whenever rows added with 'extend' do not fit.
+        """
+        shape = (capacity,) if columns == 1 else (capacity, columns)
+        self._data = None
+        self._buffer = np.empty(shape, dtype=dtype)
+        self._size = 0
+
+    def extend(self, rows: Any):
+        """
+        Add rows to the typed buffer.
+        """
+        if self._buffer is None:
+            raise ValueError("Dataset '{}' has no buffer allocated.".format(self.name))
+        rows = np.asarray(rows, dtype=self._buffer.dtype).reshape((-1,) + self._buffer.shape[1:])
+        size = self._size + rows.shape[0]
+        capacity = self._buffer.shape[0]
+        if size > capacity:
+            while capacity < size:
+                capacity *= 2
+            buffer = np.empty((capacity,) + self._buffer.shape[1:], dtype=self._buffer.dtype)
+            buffer[: self._size] = self._buffer[: self._size]
+            self._buffer = buffer
+        self._buffer[self._size : size] = rows
+        self._size = size
+
+    def from_query(self, cursor: Any, dtype: Any = np.float64, decimals: int = None, null: Any = None,
+                   fetch_size: int = 100000):
+        """
+        Fill dataset with numeric rows fetched in chunks from SQL cursor (or any iterable of row tuples).
+        NULL values are replaced with 'null' (NaN when not given) and values are rounded to 'decimals' if set.
+        Single column rows give 1D dataset.
+        """
+        rows = iter(cursor)
+        self.data = None
+        while True:
+            chunk = list(islice(rows, fetch_size))
+            if not chunk:
+                break
+            values = np.array(chunk, dtype=np.float64)
+            if null is not None:
+                values[np.isnan(values)] = null
+            if decimals is not None:
+                values = np.round(values, decimals)
+            if self._buffer is None:
+                columns = values.shape[1] if values.ndim > 1 else 1
+                self.allocate(columns, dtype, max(len(chunk), 1024))
+            self.extend(values)
+        if self._buffer is None:
+            self.data = np.empty(0, dtype=dtype)
+        return self
+
 
 class ParseHDF5:
     """
@@ -58,6 +195,9 @@ class ParseHDF5:
         self.hdf5_filepath = None
         self.read_mode = "r"
         self.write_mode = "w"
+        self.profile = HDF5_PROFILES["default"]
+        # Dataset name -> HDF5WriterProfile overriding the default one
+        self.dataset_profiles = {}
 
     @property
     def control_group(self):
@@ -208,20 +348,19 @@ class ParseHDF5:
         groups_template_dict = {group.name: group for group in self.groups}
         return groups_template_dict
 
-    @staticmethod
-    def write_group_datasets(hdf5_file, group):
+    def dataset_profile(self, dataset_name):
+        return self.dataset_profiles.get(dataset_name, self.profile)
+
+    def write_group_datasets(self, hdf5_file, group):
         if group.name not in hdf5_file:
             hdf5_file.create_group(group.name)
+        hdf5_group = hdf5_file[group.name]
         for dataset in sorted(group.datasets.values(), key=attrgetter("name")):
-            hdf5_group = hdf5_file[group.name]
-            ds = hdf5_group.create_dataset(dataset.name, data=dataset.data, compression="gzip")
-            attributes_dicts = [CONTROL, GRID, NEIGHBORS, STORMDRAIN, BC, CHANNEL, HYSTRUCT, INFIL, RAIN,
-                                REDUCTION_FACTORS, LEVEE, EVAPOR, FLOODPLAIN, GUTTER, TAILINGS, SPATIALLY_VARIABLE,
-                                MULT, SD, SEDIMENT, STREET, MULTIDOMAIN, QGIS]
-
-            for attributes_dict in attributes_dicts:
-                if dataset.name in attributes_dict:
-                    ds.attrs[dataset.name] = attributes_dict[dataset.name]
+            data = np.asarray(dataset.data)
+            kwargs = self.dataset_profile(dataset.name).dataset_kwargs(data.shape, data.dtype)
+            ds = hdf5_group.create_dataset(dataset.name, data=data, **kwargs)
+            if dataset.name in HDF5_ATTRIBUTES:
+                ds.attrs[dataset.name] = HDF5_ATTRIBUTES[dataset.name]
 
     def write_groups(self, *groups):
         with h5py.File(self.hdf5_filepath, self.write_mode) as f:
@@ -241,6 +380,31 @@ class ParseHDF5:
                 root = f
             root.create_dataset(dataset.name, data=dataset.data)
 
+    @contextmanager
+    def stream_dataset(self, group_name, dataset_name, columns=1, dtype=np.float64):
+        """
+        Context manager creating resizable chunked dataset and yielding function which appends row chunks to it.
+        Rows may be streamed straight from SQL without holding the whole dataset in memory.
+        Dataset is added to the existing file, so groups written before with 'write_groups' are kept.
+        """
+        with h5py.File(self.hdf5_filepath, "a") as f:
+            hdf5_group = f.require_group(group_name)
+            if dataset_name in hdf5_group:
+                del hdf5_group[dataset_name]
+            shape = (0,) if columns == 1 else (0, columns)
+            kwargs = self.dataset_profile(dataset_name).dataset_kwargs(shape, dtype, resizable=True)
+            ds = hdf5_group.create_dataset(dataset_name, shape=shape, dtype=dtype, **kwargs)
+            if dataset_name in HDF5_ATTRIBUTES:
+                ds.attrs[dataset_name] = HDF5_ATTRIBUTES[dataset_name]
+
+            def append(rows):
+                rows = np.asarray(rows, dtype=dtype).reshape((-1,) + shape[1:])
+                start = ds.shape[0]
+                ds.resize(start + rows.shape[0], axis=0)
+                ds[start:] = rows
+
+            yield append
+
     def read_groups(self, *group_names):
         groups_list = []
         with h5py.File(self.hdf5_filepath, self.read_mode) as f:
@@ -323,6 +487,9 @@ class ParseDAT(object):
     Parser object for handling FLO-2D "DAT" files.
     """
 
+    cellsize_sample_rows = 100000
+    _cellsize_cache = {}
+
     def __init__(self):
         self.project_dir = None
         self.dat_files = {
@@ -426,36 +593,36 @@ class ParseDAT(object):
         return cell_size
 
     def calculate_cellsize(self):
-        cell_size = 0
+        """
+        Detect cell size from a bounded window of TOPO.DAT rows.
+        Cell size is the smallest non-zero x or y distance to the first cell within the first
+        'cellsize_sample_rows' rows. Results are cached per file path, modification time and size.
+        """
         topo = self.dat_files["TOPO.DAT"]
         if topo is None:
             return 0
         if not os.path.isfile(topo):
             return 0
-        if not os.path.getsize(topo) > 0:
+        stat = os.stat(topo)
+        if not stat.st_size > 0:
             return 0
-        with open(topo) as top:
-            first_coord = top.readline().split()[:2]
-            first_x = float(first_coord[0])
-            first_y = float(first_coord[1])
-            top.seek(0)
-            dx_coords = (abs(first_x - float(row.split()[0])) for row in top)
-            try:
-                size = min(dx for dx in dx_coords if dx > 0)
-            except ValueError:
-                top.seek(0)
-                dy_coords = (abs(first_y - float(row.split()[1])) for row in top)
-                size = min(dy for dy in dy_coords if dy > 0)
-            cell_size += size
+        key = (os.path.abspath(topo), stat.st_mtime_ns, stat.st_size)
+        if key in self._cellsize_cache:
+            return self._cellsize_cache[key]
+
+        x, y = next(self.array_parser(topo, 2, self.cellsize_sample_rows))
+        dx = np.abs(x - x[0])
+        dy = np.abs(y - y[0])
+        deltas = np.concatenate((dx[dx > 0], dy[dy > 0]))
+        if not deltas.size:
+            raise ValueError("Cannot detect cell size from TOPO.DAT coordinates.")
+        cell_size = float(deltas.min())
+        self._cellsize_cache[key] = cell_size
         return cell_size
 
     @staticmethod
     def single_parser(file1):
-        with open(file1, "r") as f1:
-            for line in f1:
-                row = line.split()
-                if row:
-                    yield row
+        return text_parsers.single_parser(file1)
 
     @staticmethod
     def pandas_single_parser(file1, chunksize=10000):
@@ -465,6 +632,30 @@ class ParseDAT(object):
                 for row in chunk.itertuples(index=False, name=None):
                     yield list(row)
 
+    @staticmethod
+    def array_parser(file1, ncols, chunksize=500000, skiprows=0):
+        """
+        Parse whitespace delimited numeric file into chunks of float64 NumPy arrays, one array per column.
+        Only first 'ncols' columns are read, after 'skiprows' header lines. Values are parsed with round trip
+        precision.
+        """
+        try:
+            f_iter = pd.read_csv(
+                file1,
+                sep=r"\s+",
+                header=None,
+                usecols=range(ncols),
+                dtype=np.float64,
+                float_precision="round_trip",
+                chunksize=chunksize,
+                skiprows=skiprows,
+            )
+        except pd.errors.EmptyDataError:
+            return
+        with f_iter:
+            for chunk in f_iter:
+                yield tuple(chunk.to_numpy().T)
+
     @staticmethod
     def double_parser(file1, file2):
         with open(file1, "r") as f1, open(file2, "r") as f2:
@@ -569,6 +760,29 @@ class ParseDAT(object):
         results = self.double_parser(mannings_n, topo)
         return results
 
+    def parse_mannings_n_topo_arrays(self, chunksize=500000):
+        """
+        Yield (fid, n, x, y, elevation) NumPy arrays read from MANNINGS_N.DAT and TOPO.DAT in chunks.
+        """
+        mannings_n = self.array_parser(self.dat_files["MANNINGS_N.DAT"], 2, chunksize)
+        topo = self.array_parser(self.dat_files["TOPO.DAT"], 3, chunksize)
+        for (fid, n), (x, y, elev) in zip(mannings_n, topo):
+            size = min(fid.size, x.size)
+            yield fid[:size].astype(np.int64), n[:size], x[:size], y[:size], elev[:size]
+
+    def parse_topo_arrays(self, chunksize=500000):
+        """
+        Yield (x, y, elevation) NumPy arrays read from TOPO.DAT in chunks.
+        """
+        return self.array_parser(self.dat_files["TOPO.DAT"], 3, chunksize)
+
+    def parse_mannings_n_arrays(self, chunksize=500000):
+        """
+        Yield (fid, n) NumPy arrays read from MANNINGS_N.DAT in chunks.
+        """
+        for fid, n in self.array_parser(self.dat_files["MANNINGS_N.DAT"], 2, chunksize):
+            yield fid.astype(np.int64), n
+
     def parse_topo(self):
         topo = self.dat_files["TOPO.DAT"]
         results = self.single_parser(topo)
@@ -730,6 +944,21 @@ class ParseDAT(object):
         data = [row for row in par]
         return head, data
 
+    def parse_raincell_arrays(self, chunksize=500000):
+        """
+        Return RAINCELL.DAT header and generator of (cell, rainfall) NumPy arrays read in chunks.
+        """
+        rain = self.dat_files["RAINCELL.DAT"]
+        if not rain:
+            return None, None
+        par = self.single_parser(rain)
+        line1 = next(par)
+        par.close()
+        head = line1[:2]
+        head.append(" ".join(line1[2:]))
+        data = ((cells.astype(np.int64), values) for cells, values in self.array_parser(rain, 2, chunksize, 1))
+        return head, data
+
     def parse_raincellraw(self):
         rain = self.dat_files["RAINCELLRAW.DAT"]
         par = self.single_parser(rain)
@@ -1233,142 +1462,4 @@ class ParseDAT(object):
             - "peaks": Returns peak values (peaks_dict, peaks_list).
             - "time_series": Returns time series data (ts_dict, ts_list).
         """
-        result_dict = {}
-        result_list = []
-
-        def parse_data_line(line, max_sed_con, lists):
-            """Helper function to parse a single data line."""
-            line = line.split()
-            lists["time"].append(float(line[0]))
-            lists["elevation"].append(float(line[1]))
-            lists["depth"].append(float(line[2]))
-            lists["velocity"].append(float(line[3]))
-            lists["discharge"].append(float(line[4]))
-            lists["froude"].append(float(line[5]))
-            if max_sed_con is not None:
-                lists["con"].append(float(line[6]))
-            else:
-                lists["flow_area"].append(float(line[6]))
-                lists["w_perimeter"].append(float(line[7]))
-                lists["hyd_radius"].append(float(line[8]))
-                lists["top_width"].append(float(line[9]))
-                lists["width_depth"].append(float(line[10]))
-                lists["energy_slope"].append(float(line[11]))
-                lists["shear_stress"].append(float(line[12]))
-                lists["surf_area"].append(float(line[13]))
-
-        with open(HYCHAN_file, "r") as myfile:
-            while True:
-                try:
-                    # Initialize lists for data
-                    lists = {
-                        "time": [],
-                        "elevation": [],
-                        "depth": [],
-                        "velocity": [],
-                        "discharge": [],
-                        "froude": [],
-                        "flow_area": [],
-                        "con": [],
-                        "w_perimeter": [],
-                        "hyd_radius": [],
-                        "top_width": [],
-                        "width_depth": [],
-                        "energy_slope": [],
-                        "shear_stress": [],
-                        "surf_area": [],
-                    }
-                    line = next(myfile)
-                    if "CHANNEL HYDROGRAPH FOR ELEMENT NO:" in line:
-                        grid = line.split()[-1]
-                        peak_discharge = max_water_elev = max_sed_con = None
-
-                        # Parse header lines
-                        for _ in range(3):
-                            line = next(myfile)
-                            if "DISCHARGE" in line:
-                                peak_discharge = float(line.split("=")[1].split()[0])
-                            elif "STAGE" in line:
-                                max_water_elev = float(line.split("=")[1].split()[0])
-                            elif "SEDIMENT" in line:
-                                max_sed_con = float(line.split("=")[1].split()[0])
-
-                        # Skip fixed 4 lines of table headers
-                        for _ in range(4):
-                            line = next(myfile)
-
-                        # Parse data rows
-                        while True:
-                            try:
-                                line = next(myfile)
-                                if not line.strip():  # If the line is empty, exit the loop
-                                    break
-                                parse_data_line(line, max_sed_con, lists)
-                            except StopIteration:
-                                # Handle the end of the file gracefully
-                                break
-
-                        # Handle results based on mode
-                        if mode == "peaks":
-                            if max_sed_con is not None:
-                                result_dict[grid] = [
-                                    max_water_elev,
-                                    peak_discharge,
-                                    max_sed_con,
-                                    max(lists["velocity"]),
-                                    max(lists["froude"]),
-                                    max(lists["con"]),
-                                ]
-                                result_list.append((grid, *result_dict[grid]))
-                            else:
-                                result_dict[grid] = [
-                                    max_water_elev,
-                                    peak_discharge,
-                                    max(lists["velocity"]),
-                                    max(lists["froude"]),
-                                    max(lists["flow_area"]),
-                                    max(lists["w_perimeter"]),
-                                    max(lists["hyd_radius"]),
-                                    max(lists["top_width"]),
-                                    max(lists["width_depth"]),
-                                    max(lists["energy_slope"]),
-                                    max(lists["shear_stress"]),
-                                    max(lists["surf_area"]),
-                                ]
-                                result_list.append((grid, *result_dict[grid]))
-                        elif mode == "time_series":
-                            if max_sed_con is not None:
-                                result_dict[grid] = [
-                                    lists["time"],
-                                    lists["elevation"],
-                                    lists["depth"],
-                                    lists["velocity"],
-                                    lists["discharge"],
-                                    lists["froude"],
-                                    lists["con"],
-                                ]
-                                result_list.append((grid, *result_dict[grid]))
-                            else:
-                                result_dict[grid] = [
-                                    lists["time"],
-                                    lists["elevation"],
-                                    lists["depth"],
-                                    lists["velocity"],
-                                    lists["discharge"],
-                                    lists["froude"],
-                                    lists["flow_area"],
-                                    lists["w_perimeter"],
-                                    lists["hyd_radius"],
-                                    lists["top_width"],
-                                    lists["width_depth"],
-                                    lists["energy_slope"],
-                                    lists["shear_stress"],
-                                    lists["surf_area"],
-                                ]
-                                result_list.append((grid, *result_dict[grid]))
-                    else:
-                        pass
-                except StopIteration:
-                    break
-
-        return result_dict, result_list
\ No newline at end of file
+        return text_parsers.parse_hychan(HYCHAN_file, mode)
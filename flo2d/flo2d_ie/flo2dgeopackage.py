@@ -29,10 +29,11 @@ from qgis.core import NULL
 from qgis.PyQt.QtCore import Qt
 from qgis.PyQt.QtWidgets import QApplication, QProgressDialog
 
-from ..flo2d_tools.grid_tools import grid_compas_neighbors, number_of_elements, cell_centroid
+from ..flo2d_tools.grid_tools import grid_neighbors_array, number_of_elements, cell_centroid
 from ..geopackage_utils import GeoPackageUtils
 from ..gui.dlg_settings import SettingsDialog
 from ..layers import Layers
+from ..misc import gpkg_binary
 from ..utils import float_or_zero, get_BC_Border, get_flo2dpro_release_date, qt_cursor_shape
 from .flo2d_parser import ParseDAT, ParseHDF5
 
@@ -46,6 +47,62 @@ def create_array(line_format, max_columns, array_type, *args):
     return array
 
 
+def format_raincell_block(cells, values):
+    """
+    Format RAINCELL.DAT data lines "cell value" for arrays of cells and rainfall values (NaN for NULL, written as 0).
+    """
+    nulls = np.isnan(values)
+    size = cells.size
+    if not size:
+        return ""
+    line_formats = np.where(nulls, "%d 0\n", "%d %.4f\n")
+    # Every line takes the cell and, unless NULL, the value from the flat arguments sequence
+    positions = np.arange(size) + np.concatenate(([0], np.cumsum(~nulls)[:-1]))
+    args = np.empty(size + int(np.count_nonzero(~nulls)), dtype=object)
+    args[positions] = cells.tolist()
+    args[positions[~nulls] + 1] = values[~nulls].tolist()
+    return "".join(line_formats) % tuple(args)
+
+
+def raincell_steps(chunks, ngrid, irinters):
+    """
+    Split RAINCELL.DAT (cells, values) array chunks into exactly 'irinters' time steps of (cells, values) arrays.
+    A time step ends after cell 'ngrid' (full steps or the (ngrid, 0) sentinel) or when the cell number does
+    not increase (steps ending early). Missing time steps at the end of the file are empty.
+    """
+    empty_cells, empty_values = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+    steps = 0
+    cells_parts, values_parts = [], []
+    last = 0
+    for cells, values in chunks:
+        if not cells.size:
+            continue
+        previous = np.concatenate(([last], cells[:-1]))
+        breaks = np.flatnonzero((previous >= ngrid) | (cells <= previous)).tolist()
+        start = 0
+        for end in breaks + [cells.size]:
+            if end > start:
+                cells_parts.append(cells[start:end])
+                values_parts.append(values[start:end])
+            if end < cells.size:
+                if cells_parts:
+                    yield np.concatenate(cells_parts), np.concatenate(values_parts)
+                else:
+                    yield empty_cells, empty_values
+                cells_parts, values_parts = [], []
+                steps += 1
+                if steps == irinters:
+                    return
+            start = end
+        last = cells[-1]
+    if cells_parts:
+        yield np.concatenate(cells_parts), np.concatenate(values_parts)
+        steps += 1
+    while steps < irinters:
+        yield empty_cells, empty_values
+        steps += 1
+
+
 def check_outflow_condition(variables):
     return all(val == 0 for val in variables)
 
@@ -69,6 +126,8 @@ class Flo2dGeoPackage(GeoPackageUtils):
         self.gutils = GeoPackageUtils(con, iface)
         self.lyrs = Layers(iface)
         self.export_messages = ""
+        # Override cursor control of the DAT exporters, replaced for exporters running off the main thread
+        self.app = QApplication
 
     def set_parser(self, fpath, get_cell_size=True):
         if self.parsed_format == self.FORMAT_DAT:
@@ -362,13 +421,11 @@ class Flo2dGeoPackage(GeoPackageUtils):
             # Clear the elevation
             self.execute("UPDATE grid SET elevation = '-9999';")
 
-            data = self.parser.parse_topo()
             fid = 1
-            cell_elev = []
-            for row in data:
-                cell_elev.append((row[2], fid))
-                fid += 1
-            self.gutils.execute_many(qry, cell_elev)
+            for x, y, elev in self.parser.parse_topo_arrays():
+                fids = range(fid, fid + elev.size)
+                self.gutils.execute_many(qry, zip(elev.tolist(), fids))
+                fid += elev.size
 
             QApplication.restoreOverrideCursor()
 
@@ -395,11 +452,8 @@ class Flo2dGeoPackage(GeoPackageUtils):
             # Clear the elevation
             self.execute("UPDATE grid SET n_value = '0.04';")
 
-            data = self.parser.parse_mannings_n()
-            cell_mannings_n = []
-            for row in data:
-                cell_mannings_n.append((row[1], row[0]))
-            self.gutils.execute_many(qry, cell_mannings_n)
+            for fid, n in self.parser.parse_mannings_n_arrays():
+                self.gutils.execute_many(qry, zip(n.tolist(), fid.tolist()))
 
             QApplication.restoreOverrideCursor()
 
@@ -409,28 +463,12 @@ class Flo2dGeoPackage(GeoPackageUtils):
 
     def import_mannings_n_topo_dat(self):
         try:
-            sql = ["""INSERT INTO grid (fid, n_value, elevation, geom) VALUES""", 4]
+            qry = """INSERT INTO grid (fid, n_value, elevation, geom) VALUES (?,?,?,?);"""
 
             self.clear_tables("grid")
-            data = self.parser.parse_mannings_n_topo()
-
-            c = 0
-            man = slice(0, 2)
-            coords = slice(2, 4)
-            elev = slice(4, None)
-            for row in data:
-                if c < self.chunksize:
-                    geom = " ".join(row[coords])
-                    g = self.build_square(geom, self.cell_size)
-                    sql += [tuple(row[man] + row[elev] + [g])]
-                    c += 1
-                else:
-                    self.batch_execute(sql)
-                    c = 0
-            if len(sql) > 2:
-                self.batch_execute(sql)
-            else:
-                pass
+            for fid, n, x, y, elev in self.parser.parse_mannings_n_topo_arrays():
+                squares = gpkg_binary.encode_squares(x, y, self.cell_size)
+                self.execute_many(qry, zip(fid.tolist(), n.tolist(), elev.tolist(), squares))
 
         except Exception as e:
             QApplication.restoreOverrideCursor()
@@ -2090,121 +2128,27 @@ class Flo2dGeoPackage(GeoPackageUtils):
         elif self.parsed_format == self.FORMAT_HDF5:
             return self.import_raincell_hdf5(grid_to_domain, raincell_hdf5_path)
 
-    def import_raincell_dat(self, grid_to_domain):
-        head_sql = [
-            """INSERT INTO raincell (rainintime, irinters, timestamp) VALUES""",
-            3,
-        ]
-        data_sql = [
-            """INSERT OR IGNORE INTO raincell_data (time_interval, rrgrid, iraindum) VALUES""",
-            3,
-        ]
-
-        header, data = self.parser.parse_raincell()
+    def import_raincell_dat(self, grid_to_domain, flush_size=500000):
+        """
+        Import RAINCELL.DAT streaming time steps. Every time step is expanded to all grid elements (zeros for
+        missing cells) and rows are written in chunks of about 'flush_size', so memory does not grow with the
+        number of time intervals.
+        """
+        header, data = self.parser.parse_raincell_arrays()
         if not header:
             return
 
-        def iter_series_streaming(data_rows, ngrid, irinters):
-            """
-            Yield exactly `irinters` time steps as lists of (rrgrid, iraindum).
-            Robust to:
-              - old format (full ngrid lines per step)
-              - new format with sentinel (ngrid, 0.0)
-              - new format without sentinel (early end), detected by rrgrid reset
-            """
-            steps_emitted = 0
-            cur = []
-            j = 1  # next expected grid in this time step
-
-            def close_step():
-                nonlocal cur, j
-                if cur:
-                    yield list(cur)
-                    cur.clear()
-                else:
-                    # empty step, still emit an empty list to keep count consistent
-                    yield []
-                j = 1
-
-            for rrgrid, iraindum in data_rows:
-                rg = int(float(rrgrid))
-                val = float(iraindum)
-
-                # If we detect a reset (rg < j), the previous time step ended
-                if rg < j:
-                    # Emit the previous step
-                    for emitted in close_step():
-                        yield emitted
-                        steps_emitted += 1
-                        if steps_emitted == irinters:
-                            return
-                    # fall through to handle this record in the new step
-                    # j was reset to 1
-
-                # Fill gaps with zeros up to rg - 1
-                # We only store the user record here; zeros will be inserted later
-                cur.append((rg, val))
-                j = rg + 1
-
-                # If we naturally walked past ngrid, close the step
-                if j > ngrid:
-                    for emitted in close_step():
-                        yield emitted
-                        steps_emitted += 1
-                        if steps_emitted == irinters:
-                            return
-
-            # End of file: if current step is incomplete, still emit it
-            if steps_emitted < irinters:
-                for emitted in close_step():
-                    yield emitted
-                    steps_emitted += 1
-                    if steps_emitted == irinters:
-                        return
-
-            # If there are still fewer than irinters, pad with empty steps
-            while steps_emitted < irinters:
-                yield []
-                steps_emitted += 1
+        time_step = float(header[0])
+        irinters = int(header[1])
 
         if not grid_to_domain:
             self.clear_tables("raincell", "raincell_data")
-            head_sql += [tuple(header)]
-            time_step = float(header[0])
-            irinters = int(header[1])
+            insert_header = True
             grid_lyr = self.lyrs.data["grid"]["qlyr"]
-            grid_count = number_of_elements(self.gutils, grid_lyr)
-            data_gen = iter_series_streaming(data, grid_count, irinters)
-
-            seen = set()
-            time_interval = 0
-
-            for data_series in data_gen:
-                # We will write zeros for all missing grids by walking j forward
-                j = 1
-
-                # To speed up membership checks, collect present grids in a dict
-                # There can be duplicates; last one wins
-                present = {}
-                for rg, val in data_series:
-                    present[int(rg)] = float(val)
-
-                # Walk 1..ngrid and fill from `present`, zero otherwise
-                # This guarantees both formats behave identically on output
-                for g in range(1, grid_count + 1):
-                    rrdom = g
-                    if rrdom is None:
-                        continue
-                    val = present.get(g, 0.0)
-
-                    key = (time_interval, rrdom, val)
-                    if key in seen:
-                        continue
-                    seen.add(key)
-                    data_sql += [(time_interval, rrdom, val)]
-
-                time_interval += time_step
-
+            ngrid = number_of_elements(self.gutils, grid_lyr)
+            grids = np.arange(1, ngrid + 1)
+            rrgrid = grids
+            qry = """INSERT INTO raincell_data (time_interval, rrgrid, iraindum) VALUES (?,?,?);"""
         else:
             self.execute("""
                     CREATE UNIQUE INDEX IF NOT EXISTS idx_raincell_data_unique
@@ -2213,48 +2157,55 @@ class Flo2dGeoPackage(GeoPackageUtils):
 
             # Header insert only once
             raincell_check = self.execute("SELECT COUNT(*) FROM raincell;").fetchone()
-            if raincell_check and raincell_check[0] == 0:
-                head_sql += [tuple(header)]
-
-            time_step = float(header[0])
-            irinters = int(header[1])
+            insert_header = bool(raincell_check) and raincell_check[0] == 0
 
             # Highest grid id we care about
             ngrid = max(grid_to_domain.keys())
-
-            # Build streaming generator
-            data_gen = iter_series_streaming(data, ngrid, irinters)
-
-            seen = set()
-            time_interval = 0.0
-
-            for data_series in data_gen:
-                # We will write zeros for all missing grids by walking j forward
-                j = 1
-
-                # To speed up membership checks, collect present grids in a dict
-                # There can be duplicates; last one wins
-                present = {}
-                for rg, val in data_series:
-                    present[int(rg)] = float(val)
-
-                # Walk 1..ngrid and fill from `present`, zero otherwise
-                # This guarantees both formats behave identically on output
-                for g in range(1, ngrid + 1):
-                    rrdom = grid_to_domain.get(g)
-                    if rrdom is None:
-                        continue
-                    val = present.get(g, 0.0)
-
-                    key = (time_interval, rrdom, val)
-                    if key in seen:
-                        continue
-                    seen.add(key)
-                    data_sql += [(time_interval, rrdom, val)]
-
-                time_interval += time_step
-
-        self.batch_execute(head_sql, data_sql)
+            grids = np.fromiter(grid_to_domain.keys(), dtype=np.int64, count=len(grid_to_domain))
+            rrgrid = np.fromiter(grid_to_domain.values(), dtype=np.int64, count=len(grid_to_domain))
+            order = np.argsort(grids, kind="stable")
+            grids, rrgrid = grids[order], rrgrid[order]
+            valid = grids >= 1
+            grids, rrgrid = grids[valid], rrgrid[valid]
+            qry = """INSERT OR IGNORE INTO raincell_data (time_interval, rrgrid, iraindum) VALUES (?,?,?);"""
+
+        if insert_header:
+            self.execute("""INSERT INTO raincell (rainintime, irinters, timestamp) VALUES (?,?,?);""", tuple(header))
+
+        def flush(pending):
+            rows = (
+                (time_interval, cell, value)
+                for time_interval, cells, values in pending
+                for cell, value in zip(cells.tolist(), values.tolist())
+            )
+            self.execute_many(qry, rows)
+
+        pending = []
+        pending_size = 0
+        time_interval = 0.0
+        rain = np.zeros(ngrid + 1, dtype=np.float64)
+        for cells, values in raincell_steps(data, ngrid, irinters):
+            # Missing cells are zero, for repeated cells the last value wins
+            rain[:] = 0.0
+            inside = (cells >= 1) & (cells <= ngrid)
+            rain[cells[inside]] = values[inside]
+            step_cells, step_values = rrgrid, rain[grids]
+            if grid_to_domain:
+                # Drop repeated (rrgrid, iraindum) pairs within the time step
+                order = np.lexsort((step_values, step_cells))
+                step_cells, step_values = step_cells[order], step_values[order]
+                keep = np.ones(step_cells.size, dtype=bool)
+                keep[1:] = (np.diff(step_cells) != 0) | (np.diff(step_values) != 0)
+                step_cells, step_values = step_cells[keep], step_values[keep]
+            pending.append((time_interval, step_cells, step_values))
+            pending_size += step_cells.size
+            if pending_size >= flush_size:
+                flush(pending)
+                pending = []
+                pending_size = 0
+            time_interval += time_step
+        if pending:
+            flush(pending)
 
     def import_raincell_hdf5(self, grid_to_domain, raincell_hdf5_path):
         # try:
@@ -8819,10 +8770,10 @@ class Flo2dGeoPackage(GeoPackageUtils):
             return True
 
         except Exception as e:
-            QApplication.restoreOverrideCursor()
+            self.app.restoreOverrideCursor()
             self.uc.bar_error("ERROR: exporting STEEP_SLOPEN.DAT failed!")
             self.uc.log_info("ERROR: exporting STEEP_SLOPEN.DAT failed!\n")
-            QApplication.setOverrideCursor(qt_cursor_shape("WaitCursor"))
+            self.app.setOverrideCursor(qt_cursor_shape("WaitCursor"))
             return False
 
     def export_steep_slopen_hdf5(self, subdomain):
@@ -8920,10 +8871,10 @@ class Flo2dGeoPackage(GeoPackageUtils):
             return True
 
         except Exception as e:
-            QApplication.restoreOverrideCursor()
+            self.app.restoreOverrideCursor()
             self.uc.bar_error("ERROR: exporting LID_VOLUME.DAT failed!")
             self.uc.log_info("ERROR: exporting LID_VOLUME.DAT failed!\n", e)
-            QApplication.setOverrideCursor(qt_cursor_shape("WaitCursor"))
+            self.app.setOverrideCursor(qt_cursor_shape("WaitCursor"))
             return False
 
     def export_lid_volume_hdf5(self, subdomain):
@@ -8975,15 +8926,15 @@ class Flo2dGeoPackage(GeoPackageUtils):
         try:
             if not subdomain:
                 sql = (
-                    """SELECT fid, n_value, elevation, ST_AsText(ST_Centroid(GeomFromGPB(geom))) FROM grid ORDER BY fid;"""
+                    """SELECT fid, n_value, elevation, geom FROM grid ORDER BY fid;"""
                 )
-                records = self.execute(sql)
+                records = self.execute(sql).fetchall()
             else:
                 sub_grid_cells = self.gutils.execute(f"""SELECT DISTINCT 
                                                             md.domain_cell, 
                                                             g.n_value, 
                                                             g.elevation,
-                                                            ST_AsText(ST_Centroid(GeomFromGPB(g.geom)))
+                                                            g.geom
                                                          FROM 
                                                             grid g
                                                          JOIN 
@@ -8993,28 +8944,22 @@ class Flo2dGeoPackage(GeoPackageUtils):
 
                 records = sorted(sub_grid_cells, key=lambda x: x[0])
 
-            nulls = 0
             grid_group = self.parser.grid_group
-            coordinates_line = "{0} {1}"
-            for row in records:
-                fid, man, elev, geom = row
-                if man is None or elev is None:
-                    nulls += 1
-                    if man is None:
-                        man = 0.04
-                    if elev is None:
-                        elev = -9999
-                x, y = [float(coord) for coord in geom.strip("POINT()").split()]
-                grid_group.datasets["GRIDCODE"].data.append(fid)
-                grid_group.datasets["MANNING"].data.append(man)
-                grid_group.datasets["ELEVATION"].data.append(elev)
-                grid_group.datasets["COORDINATES"].data.append(
-                    create_array(coordinates_line, 2, np.float64, tuple([x, y])))
-                # grid_group.datasets["X"].data.append(x)
-                # grid_group.datasets["Y"].data.append(y)
-            neighbors_line = "{0} {1} {2} {3} {4} {5} {6} {7}"
-            for row in grid_compas_neighbors(self.gutils):
-                grid_group.datasets["NEIGHBORS"].data.append(create_array(neighbors_line, 8, np.int_, tuple(row)))
+            grid_group.datasets["GRIDCODE"].data = np.array([row[0] for row in records], dtype=np.int64)
+            # NULLs become NaN in float arrays
+            man = np.array([row[1] for row in records], dtype=np.float64)
+            elev = np.array([row[2] for row in records], dtype=np.float64)
+            man_nulls, elev_nulls = np.isnan(man), np.isnan(elev)
+            nulls = int(np.count_nonzero(man_nulls | elev_nulls))
+            man[man_nulls] = 0.04
+            elev[elev_nulls] = -9999
+            grid_group.datasets["MANNING"].data = man
+            grid_group.datasets["ELEVATION"].data = elev
+            grid_group.datasets["COORDINATES"].data = gpkg_binary.decode_centroids([row[3] for row in records])
+            # Neighbours are always calculated for the whole grid
+            cell_size = float(self.get_cont_par("CELLSIZE"))
+            fids, xs, ys = self.gutils.grid_centroids_array()
+            grid_group.datasets["NEIGHBORS"].data = grid_neighbors_array(fids, xs, ys, cell_size)
             self.parser.write_groups(grid_group)
             if nulls > 0:
                 QApplication.restoreOverrideCursor()
@@ -9045,15 +8990,15 @@ class Flo2dGeoPackage(GeoPackageUtils):
         try:
             if not subdomain:
                 sql = (
-                    """SELECT fid, n_value, elevation, ST_AsText(ST_Centroid(GeomFromGPB(geom))) FROM grid ORDER BY fid;"""
+                    """SELECT fid, n_value, elevation, geom FROM grid ORDER BY fid;"""
                 )
-                records = self.execute(sql)
+                records = self.execute(sql).fetchall()
             else:
                 sub_grid_cells = self.gutils.execute(f"""SELECT DISTINCT 
                                                             md.domain_cell, 
                                                             g.n_value, 
                                                             g.elevation,
-                                                            ST_AsText(ST_Centroid(GeomFromGPB(g.geom)))
+                                                            g.geom
                                                          FROM 
                                                             grid g
                                                          JOIN 
@@ -9070,9 +9015,10 @@ class Flo2dGeoPackage(GeoPackageUtils):
             tline = "{0: >15} {1: >15} {2: >10}\n"
 
             nulls = 0
+            centroids = gpkg_binary.decode_centroids([row[3] for row in records]).tolist()
 
             with open(mannings, "w") as m, open(topo, "w") as t:
-                for row in records:
+                for row, (x, y) in zip(records, centroids):
                     fid, man, elev, geom = row
                     if man == None or elev == None:
                         nulls += 1
@@ -9080,12 +9026,11 @@ class Flo2dGeoPackage(GeoPackageUtils):
                             man = 0.04
                         if elev == None:
                             elev = -9999
-                    x, y = geom.strip("POINT()").split()
                     m.write(mline.format(fid, "{0:.3f}".format(man)))
                     t.write(
                         tline.format(
-                            "{0:.4f}".format(float(x)),
-                            "{0:.4f}".format(float(y)),
+                            "{0:.4f}".format(x),
+                            "{0:.4f}".format(y),
                             "{0:.4f}".format(elev),
                         )
                     )
@@ -9694,7 +9639,7 @@ class Flo2dGeoPackage(GeoPackageUtils):
             return True
 
         except Exception as e:
-            QApplication.restoreOverrideCursor()
+            self.app.restoreOverrideCursor()
             self.uc.show_error("ERROR 040822.0442: exporting OUTRC.DAT failed!.\n", e)
             return False
 
@@ -9835,7 +9780,7 @@ class Flo2dGeoPackage(GeoPackageUtils):
             return True
 
         except Exception as e:
-            QApplication.restoreOverrideCursor()
+            self.app.restoreOverrideCursor()
             self.uc.show_error("ERROR 040822.0442: exporting TAILINGS.DAT failed!.\n", e)
             return False
 
@@ -10641,8 +10586,6 @@ class Flo2dGeoPackage(GeoPackageUtils):
         rain_global = "{0}  {1}   {2}   {3}   {4}   {5}\n"
         tsd_line = "{0}   {1}\n"  # Rainfall Time series distribution
 
-        cell_line = "{0: <10} {1}\n"
-
         rain_row = self.execute(
             rain_sql
         ).fetchone()  # Returns a single feature with all the singlevalues of the rain table:
@@ -10691,19 +10634,15 @@ class Flo2dGeoPackage(GeoPackageUtils):
         # else:
         #     pass
 
-        if rain_row[5] == 1:  # if irainarf from rain = 0, omit this line.
-            rain_group.create_dataset('RAIN_ARF', [])
-            for row in self.execute(rain_cells_sql):
-                rain_group.datasets["RAIN_ARF"].data.append(create_array(
-                    cell_line,
-                    2,
-                    np.float64,
-                    row[0],
-                    "{0:.3f}".format(row[1])
-                ))
-
         self.parser.write_groups(rain_group)
 
+        if rain_row[5] == 1:  # if irainarf from rain = 0, omit this line.
+            # ARF cells are streamed from the query into resizable dataset
+            cursor = self.execute(rain_cells_sql)
+            with self.parser.stream_dataset(rain_group.name, "RAIN_ARF", columns=2) as append:
+                for rows in iter(lambda: cursor.fetchmany(100000), []):
+                    append(np.round(np.array(rows, dtype=np.float64), 3))
+
         if repeated_value:
             self.uc.bar_warn("Rainfall data had repeated values that were removed. Check log for details.")
 
@@ -10813,7 +10752,7 @@ class Flo2dGeoPackage(GeoPackageUtils):
             return True
 
         except Exception as e:
-            QApplication.restoreOverrideCursor()
+            self.app.restoreOverrideCursor()
             self.uc.show_error("ERROR 101218.1543: exporting RAIN.DAT failed!.\n", e)
             self.uc.log_info("ERROR 101218.1543: exporting RAIN.DAT failed!.\n")
             return False
@@ -10824,6 +10763,42 @@ class Flo2dGeoPackage(GeoPackageUtils):
         elif self.parsed_format == self.FORMAT_HDF5:
             return self.export_raincell_hdf5(subdomain)
 
+    def write_raincell_rows(self, raincell_file, raincell_rows, raincell_size, last_cell=None, block_size=100000):
+        """
+        Write (time_interval, cell, iraindum) rows to RAINCELL.DAT in blocks.
+        With 'last_cell' given, rows without rainfall are omitted except for the last cell.
+        Returns False if the export was canceled.
+        """
+        progDialog = QProgressDialog("Exporting RealTime Rainfall (.DAT)...", "Cancel", 0, int(raincell_size))
+        progDialog.setModal(True)
+        progDialog.setValue(0)
+        progDialog.show()
+        written = 0
+        while True:
+            block = raincell_rows.fetchmany(block_size)
+            if not block:
+                break
+            if progDialog.wasCanceled():
+                progDialog.close()
+                QApplication.processEvents()
+                progDialog.deleteLater()
+                self.uc.log_info("Exporting RealTime Rainfall (.DAT) canceled!")
+                self.uc.bar_warn("Exporting RealTime Rainfall (.DAT) canceled!")
+                QApplication.restoreOverrideCursor()
+                return False
+            cells = np.array([row[1] for row in block], dtype=np.int64)
+            values = np.array([row[2] for row in block], dtype=np.float64)
+            if last_cell is not None:
+                keep = (cells == int(last_cell)) | ((values != 0) & ~np.isnan(values))
+                cells, values = cells[keep], values[keep]
+            raincell_file.write(format_raincell_block(cells, values))
+            written += len(block)
+            progDialog.setValue(written)
+            QApplication.processEvents()
+        progDialog.close()
+        progDialog.deleteLater()
+        return True
+
     def export_raincell_dat(self, outdir, subdomain):
         try:
             if self.is_table_empty("raincell_data"):
@@ -10919,7 +10894,6 @@ class Flo2dGeoPackage(GeoPackageUtils):
                     n_cells = self.execute("SELECT COUNT() FROM schema_md_cells WHERE domain_fid = ? AND geom IS NULL", (subdomain,)).fetchone()[0]
                 size_sql = """SELECT COUNT(iraindum) FROM raincell_data"""
                 line1 = "{0} {1} {2}\n"
-                line2 = "{0} {1}\n"
 
                 raincell_head = self.execute(head_sql).fetchone()
                 raincell_rows = self.execute(data_sql)
@@ -10927,39 +10901,9 @@ class Flo2dGeoPackage(GeoPackageUtils):
 
                 with open(raincell, "w") as r:
                     r.write(line1.format(*raincell_head))
-                    progDialog = QProgressDialog("Exporting RealTime Rainfall (.DAT)...", "Cancel", 0, int(raincell_size))
-                    progDialog.setModal(True)
-                    progDialog.setValue(0)
-                    progDialog.show()
-                    i = 0
-
-                    for row in raincell_rows:
-
-                        if progDialog.wasCanceled():
-
-                            progDialog.close()
-                            QApplication.processEvents()
-                            progDialog.deleteLater()
-
-                            self.uc.log_info("Exporting RealTime Rainfall (.DAT) canceled!")
-                            self.uc.bar_warn("Exporting RealTime Rainfall (.DAT) canceled!")
-
-                            QApplication.restoreOverrideCursor()
-
-                            return False
-
-                        # Check if it is the last grid element -> Needs to be printed every single interval
-                        if int(row[1]) == int(n_cells):
-                            if row[2] is None:
-                                r.write(line2.format(row[1], "0"))
-                            else:
-                                r.write(line2.format(row[1], "{0:.4f}".format(float(row[2]))))
-                        elif row[2] is None or row[2] == 0:
-                            pass
-                        else:
-                            r.write(line2.format(row[1], "{0:.4f}".format(float(row[2]))))
-                        progDialog.setValue(i)
-                        i += 1
+                    # Cells without rainfall are skipped, except the last grid element needed for every interval
+                    if not self.write_raincell_rows(r, raincell_rows, raincell_size, last_cell=n_cells):
+                        return False
                 return True
 
             # Old RAINCELL.DAT
@@ -10984,7 +10928,6 @@ class Flo2dGeoPackage(GeoPackageUtils):
                     """
                 size_sql = """SELECT COUNT(iraindum) FROM raincell_data"""
                 line1 = "{0} {1} {2}\n"
-                line2 = "{0} {1}\n"
 
                 raincell_head = self.execute(head_sql).fetchone()
                 raincell_rows = self.execute(data_sql)
@@ -10992,33 +10935,8 @@ class Flo2dGeoPackage(GeoPackageUtils):
 
                 with open(raincell, "w") as r:
                     r.write(line1.format(*raincell_head))
-                    progDialog = QProgressDialog("Exporting RealTime Rainfall (.DAT)...", "Cancel", 0, int(raincell_size))
-                    progDialog.setModal(True)
-                    progDialog.setValue(0)
-                    progDialog.show()
-                    i = 0
-                    for row in raincell_rows:
-
-                        if progDialog.wasCanceled():
-
-                            progDialog.close()
-                            QApplication.processEvents()
-                            progDialog.deleteLater()
-
-                            self.uc.log_info("Exporting RealTime Rainfall (.DAT) canceled!")
-                            self.uc.bar_warn("Exporting RealTime Rainfall (.DAT) canceled!")
-
-                            QApplication.restoreOverrideCursor()
-
-                            return False
-
-                        if row[2] is None:
-                            r.write(line2.format(row[1], "0"))
-                        else:
-                            r.write(line2.format(row[1], "{0:.4f}".format(float(row[2]))))
-                        progDialog.setValue(i)
-                        i += 1
-
+                    if not self.write_raincell_rows(r, raincell_rows, raincell_size):
+                        return False
                 return True
 
             # Close button
@@ -11070,15 +10988,13 @@ class Flo2dGeoPackage(GeoPackageUtils):
                 rainintime, irinters, timestamp = header
                 header_data = [rainintime, irinters, timestamp]
                 if not subdomain:
-                    qry_data = "SELECT iraindum FROM raincell_data"
+                    qry_data = "SELECT iraindum FROM raincell_data ORDER BY time_interval, rrgrid"
                     qry_size = "SELECT COUNT(iraindum) FROM raincell_data"
                 else:
-                    qry_data = "SELECT iraindum FROM raincell_data AS rd JOIN schema_md_cells md ON rd.rrgrid = md.grid_fid"
+                    qry_data = f"SELECT rd.iraindum FROM raincell_data AS rd JOIN schema_md_cells md ON rd.rrgrid = md.grid_fid WHERE md.domain_fid = {subdomain} ORDER BY rd.time_interval, md.domain_cell"
                     qry_size = f"SELECT COUNT(iraindum) FROM raincell_data AS rd JOIN schema_md_cells md ON rd.rrgrid = md.grid_fid WHERE md.domain_fid = {subdomain}"
-                qry_timeinterval = "SELECT DISTINCT time_interval FROM raincell_data"
-                hdf_processor = HDFProcessor(raincell, self.iface)
-                hdf_processor.export_rainfall_to_binary_hdf5(header_data, qry_data, qry_size, qry_timeinterval,
-                                                             subdomain)
+                hdf_processor = HDFProcessor(raincell, self.iface, self.parser.profile)
+                hdf_processor.export_rainfall_to_binary_hdf5(header_data, qry_data, qry_size)
 
                 return True
 
@@ -11249,7 +11165,7 @@ class Flo2dGeoPackage(GeoPackageUtils):
                     WHERE 
                         md.domain_fid = {subdomain};
                         """
-                hdf_processor = HDFProcessor(raincellraw, self.iface)
+                hdf_processor = HDFProcessor(raincellraw, self.iface, self.parser.profile)
                 hdf_processor.export_rainfallraw_to_binary_hdf5(header_data, raincellraw_qry_data, raincellraw_size,
                                                                 flo2draincell_qry_data, flo2draincell_size)
 
@@ -11398,7 +11314,7 @@ class Flo2dGeoPackage(GeoPackageUtils):
             return True
 
         except Exception as e:
-            QApplication.restoreOverrideCursor()
+            self.app.restoreOverrideCursor()
             self.uc.show_error("ERROR 101218.1559: exporting INFIL.DAT failed!.\n", e)
             return False
 
@@ -11475,11 +11391,7 @@ class Flo2dGeoPackage(GeoPackageUtils):
         # line4 = "\n{0}"
         line4ab = "\n{0}  {1}  {2}"
         # line5 = "\n{0}  {1}"
-        line6 = "\n{0:<8} {1:<7.4f} {2:<7.4f} {3:<7.4f} {4:<7.4f} {5:<7.4f} {6:<7.4f}"
-        line7 = "\n{0}  {1}"
-        line8 = "\n{0}  {1}"
         # line9 = "\nI {0:<7.4f} {1:<7.4f} {2:<7.4f}"
-        line10 = "\n{0:<8} {1:<7.4f} {2:<7.4f} {3:<7.4f}"
 
         infil_row = self.execute(infil_sql).fetchone()
         if infil_row is None:
@@ -11516,8 +11428,7 @@ class Flo2dGeoPackage(GeoPackageUtils):
             ga_cells_row = self.execute(green_sql).fetchone()
             if ga_cells_row is not None:
                 infil_group.create_dataset('INFIL_GA_CELLS', [])
-                for row in self.execute(green_sql):
-                    infil_group.datasets["INFIL_GA_CELLS"].data.append(create_array(line6, 7, np.float64, row))
+                infil_group.datasets["INFIL_GA_CELLS"].from_query(self.execute(green_sql), decimals=4)
 
             # v2[5]: INFCHAN
             if v2[5] == 1:
@@ -11535,8 +11446,7 @@ class Flo2dGeoPackage(GeoPackageUtils):
                 infil_chan_elems = self.execute(chan_sql).fetchone()
                 if infil_chan_elems is not None:
                     infil_group.create_dataset('INFIL_CHAN_ELEMS', [])
-                    for row in self.execute(chan_sql):
-                        infil_group.datasets["INFIL_CHAN_ELEMS"].data.append(create_array(line8, 2, np.float64, row))
+                    infil_group.datasets["INFIL_CHAN_ELEMS"].from_query(self.execute(chan_sql))
 
         if v1 == 2:
             infil_group.create_dataset('INFIL_SCS_GLOBAL', [])
@@ -11547,8 +11457,7 @@ class Flo2dGeoPackage(GeoPackageUtils):
             scs_cells_row = self.execute(scs_sql).fetchone()
             if scs_cells_row is not None:
                 infil_group.create_dataset('INFIL_SCS_CELLS', [])
-                for row in self.execute(scs_sql):
-                    infil_group.datasets["INFIL_SCS_CELLS"].data.append(create_array(line7, 2, np.float64, row))
+                infil_group.datasets["INFIL_SCS_CELLS"].from_query(self.execute(scs_sql))
 
         if v1 == 3:
             infil_group.create_dataset('INFIL_GA_GLOBAL', [])
@@ -11562,8 +11471,7 @@ class Flo2dGeoPackage(GeoPackageUtils):
             ga_cells_row = self.execute(green_sql).fetchone()
             if ga_cells_row is not None:
                 infil_group.create_dataset('INFIL_GA_CELLS', [])
-                for row in self.execute(green_sql):
-                    infil_group.datasets["INFIL_GA_CELLS"].data.append(create_array(line6, 7, np.float64, row))
+                infil_group.datasets["INFIL_GA_CELLS"].from_query(self.execute(green_sql), decimals=4)
 
             infil_group.create_dataset('INFIL_SCS_GLOBAL', [])
             # v5: SCSNALL ABSTR1
@@ -11573,8 +11481,7 @@ class Flo2dGeoPackage(GeoPackageUtils):
             scs_cells_row = self.execute(scs_sql).fetchone()
             if scs_cells_row is not None:
                 infil_group.create_dataset('INFIL_SCS_CELLS', [])
-                for row in self.execute(scs_sql):
-                    infil_group.datasets["INFIL_SCS_CELLS"].data.append(create_array(line7, 2, np.float64, row))
+                infil_group.datasets["INFIL_SCS_CELLS"].from_query(self.execute(scs_sql))
 
             # v2[5]: INFCHAN
             if v2[5] == 1:
@@ -11592,8 +11499,7 @@ class Flo2dGeoPackage(GeoPackageUtils):
                 infil_chan_elems = self.execute(chan_sql).fetchone()
                 if infil_chan_elems is not None:
                     infil_group.create_dataset('INFIL_CHAN_ELEMS', [])
-                    for row in self.execute(chan_sql):
-                        infil_group.datasets["INFIL_CHAN_ELEMS"].data.append(create_array(line8, 2, np.float64, row))
+                    infil_group.datasets["INFIL_CHAN_ELEMS"].from_query(self.execute(chan_sql))
 
         if v1 == 4:
             infil_group.create_dataset('INFIL_HORTON_GLOBAL', [])
@@ -11603,8 +11509,7 @@ class Flo2dGeoPackage(GeoPackageUtils):
             horton_cells_row = self.execute(horton_sql).fetchone()
             if horton_cells_row is not None:
                 infil_group.create_dataset('INFIL_HORTON_CELLS', [])
-                for row in self.execute(horton_sql):
-                    infil_group.datasets["INFIL_HORTON_CELLS"].data.append(create_array(line10, 4, np.float64, row))
+                infil_group.datasets["INFIL_HORTON_CELLS"].from_query(self.execute(horton_sql), decimals=4)
 
         self.parser.write_groups(infil_group)
         return True
@@ -11693,7 +11598,7 @@ class Flo2dGeoPackage(GeoPackageUtils):
             return True
 
         except Exception as e:
-            QApplication.restoreOverrideCursor()
+            self.app.restoreOverrideCursor()
             self.uc.show_error("ERROR 101218.1544: exporting EVAPOR.DAT failed!.\n", e)
             return False
 
@@ -12442,7 +12347,7 @@ class Flo2dGeoPackage(GeoPackageUtils):
             return True
 
         except Exception as e:
-            QApplication.restoreOverrideCursor()
+            self.app.restoreOverrideCursor()
             self.uc.show_error("ERROR 101218.1607:  exporting XSEC.DAT  failed!.\n", e)
             return False
 
@@ -12988,7 +12893,7 @@ class Flo2dGeoPackage(GeoPackageUtils):
             return True
 
         except Exception as e:
-            QApplication.restoreOverrideCursor()
+            self.app.restoreOverrideCursor()
             self.uc.show_error("ERROR 101122.0753: exporting BRIDGE_XSEC.DAT failed!.\n", e)
             return False
 
@@ -13033,7 +12938,7 @@ class Flo2dGeoPackage(GeoPackageUtils):
             return True
 
         except Exception as e:
-            QApplication.restoreOverrideCursor()
+            self.app.restoreOverrideCursor()
             self.uc.show_error("ERROR 101122.0754: exporting BRIDGE_COEFF_DATA.DAT failed!.\n", e)
             return False
 
@@ -13285,7 +13190,6 @@ class Flo2dGeoPackage(GeoPackageUtils):
                 return False
             # Otherwise refer to user's decision as dictated in flo2d.py
 
-            line3 = "{0:<8} {1:<5.2f} {2:<5.2f} {3:<5.2f} {4:<5.2f} {5:<5.2f} {6:<5.2f} {7:<5.2f} {8:5.2f} {9:<5.2f}\n"
             option = self.execute(cont_sql).fetchone()
             if option is None:
                 option = ("IARFBLOCKMOD", 0)
@@ -13318,20 +13222,9 @@ class Flo2dGeoPackage(GeoPackageUtils):
             partially_blocked_grid = self.execute(pbc_sql).fetchone()
             if partially_blocked_grid is not None:
                 arfwrf_group.create_dataset('ARF_PARTIALLY_BLOCKED', [])
-                for row in self.execute(pbc_sql):
-                    row = [x if x is not None else "" for x in row]
-                    # Is there any side blocked? If not omit it:
-                    # any_blocked = sum(row) - row[0] - row[1]
-                    # if any_blocked > 0:
-                    cell = row[0]
-                    arf_value = round(row[2], 2)
-                    # collapse = self.execute(collapse_sql, (row[1],)).fetchone()
-                    # if collapse:
-                    #     arfwrf_group.datasets["COLLAPSE_CELLS"].data.append([int(cell), int(collapse[0]), int(collapse[1]), int(collapse[2])])
-                    #     if int(collapse[0]) == 1:
-                    #         arf_value = -arf_value
-                    arfwrf_group.datasets["ARF_PARTIALLY_BLOCKED"].data.append(
-                        create_array(line3, 10, np.float64, cell, arf_value, *row[3:]))
+                # Rows without area_fid: cell, arf, wrf1, ..., wrf8
+                rows = ((row[0],) + tuple(row[2:]) for row in self.execute(pbc_sql))
+                arfwrf_group.datasets["ARF_PARTIALLY_BLOCKED"].from_query(rows, decimals=2)
 
             self.parser.write_groups(arfwrf_group)
             return True
@@ -13533,7 +13426,7 @@ class Flo2dGeoPackage(GeoPackageUtils):
                         m.write(line2.format(*vals))
 
             except Exception as e:
-                QApplication.restoreOverrideCursor()
+                self.app.restoreOverrideCursor()
                 self.uc.show_error("ERROR 101218.1611: exporting MULT.DAT failed!.\n", e)
                 return False
 
@@ -13578,7 +13471,7 @@ class Flo2dGeoPackage(GeoPackageUtils):
                         self.uc.log_info("Cells repeated in simple mult cells: " + repeats)
 
             except Exception as e:
-                QApplication.restoreOverrideCursor()
+                self.app.restoreOverrideCursor()
                 self.uc.show_error("ERROR 101218.1611: exporting SIMPLE_MULT.DAT failed!.\n", e)
                 return False
 
@@ -13671,7 +13564,7 @@ class Flo2dGeoPackage(GeoPackageUtils):
             return True
 
         except Exception as e:
-            QApplication.restoreOverrideCursor()
+            self.app.restoreOverrideCursor()
             self.uc.show_error("Error while exporting TOLSPATIAL.DAT!", e)
             self.uc.log_info("Error while exporting TOLSPATIAL.DAT!")
             return False
@@ -14617,7 +14510,7 @@ class Flo2dGeoPackage(GeoPackageUtils):
             return True
 
         except Exception as e:
-            QApplication.restoreOverrideCursor()
+            self.app.restoreOverrideCursor()
             self.uc.show_error("ERROR 101218.1613: exporting FPXSEC.DAT failed!.\n", e)
             return False
 
@@ -14829,7 +14722,7 @@ class Flo2dGeoPackage(GeoPackageUtils):
             return True
 
         except Exception as e:
-            QApplication.restoreOverrideCursor()
+            self.app.restoreOverrideCursor()
             self.uc.show_error("ERROR 101218.1616: exporting BREACH.DAT failed!.\n", e)
             return False
 
@@ -14931,7 +14824,7 @@ class Flo2dGeoPackage(GeoPackageUtils):
             return True
 
         except Exception as e:
-            QApplication.restoreOverrideCursor()
+            self.app.restoreOverrideCursor()
             self.uc.show_error("Error while exporting FPFROUDE.DAT!", e)
             self.uc.log_info("Error while exporting FPFROUDE.DAT!")
             return False
@@ -15022,7 +14915,7 @@ class Flo2dGeoPackage(GeoPackageUtils):
             return True
 
         except Exception as e:
-            QApplication.restoreOverrideCursor()
+            self.app.restoreOverrideCursor()
             self.uc.show_error("Error while exporting SHALLOWN_SPATIAL.DAT!", e)
             self.uc.log_info("Error while exporting SHALLOWN_SPATIAL.DAT!")
             return False
@@ -16837,7 +16730,7 @@ class Flo2dGeoPackage(GeoPackageUtils):
             return True
 
         except Exception as e:
-            QApplication.restoreOverrideCursor()
+            self.app.restoreOverrideCursor()
             self.uc.show_error("ERROR 101218.1618: exporting SWMMFLO.DAT failed!.\n", e)
             return False
 
@@ -16925,7 +16818,7 @@ class Flo2dGeoPackage(GeoPackageUtils):
                 return False
 
         except Exception as e:
-            QApplication.restoreOverrideCursor()
+            self.app.restoreOverrideCursor()
             self.uc.show_error("ERROR 120424.0449: exporting SWMMFLODROPBOX.DAT failed!.\n", e)
             return False
 
@@ -17028,7 +16921,7 @@ class Flo2dGeoPackage(GeoPackageUtils):
                 return False
 
         except Exception as e:
-            QApplication.restoreOverrideCursor()
+            self.app.restoreOverrideCursor()
             self.uc.show_error("ERROR 140424.1828: exporting SDCLOGGING.DAT failed!.\n", e)
             return False
 
@@ -17412,7 +17305,7 @@ class Flo2dGeoPackage(GeoPackageUtils):
             return True
 
         except Exception as e:
-            QApplication.restoreOverrideCursor()
+            self.app.restoreOverrideCursor()
             self.uc.show_error("ERROR 101218.1620: exporting SWMMOUTF.DAT failed!.\n", e)
             return False
 
@@ -17442,7 +17335,7 @@ class Flo2dGeoPackage(GeoPackageUtils):
             return True
 
         except Exception as e:
-            QApplication.restoreOverrideCursor()
+            self.app.restoreOverrideCursor()
             self.uc.show_error("ERROR 101218.1621: exporting WSURF.DAT failed!.\n", e)
             return False
 
@@ -17472,6 +17365,6 @@ class Flo2dGeoPackage(GeoPackageUtils):
             return True
 
         except Exception as e:
-            QApplication.restoreOverrideCursor()
+            self.app.restoreOverrideCursor()
             self.uc.show_error("ERROR 101218.1622: exporting WSTIME.DAT failed!.\n", e)
             return False
@@ -17,6 +17,7 @@ from ..deps import safe_netcdf4 as netCDF4
 from qgis._core import QgsCoordinateTransform, QgsProject, QgsCoordinateReferenceSystem, QgsPointXY
 
 from ..flo2d_tools.grid_tools import rasters2centroids
+from .flo2d_parser import HDF5_PROFILES
 from ..geopackage_utils import GeoPackageUtils
 from ..user_communication import UserCommunication
 from qgis.PyQt.QtWidgets import QProgressDialog, QApplication
@@ -219,14 +220,46 @@ class TIFProcessor(object):
             yield raster_values
 
 class HDFProcessor(object):
-    def __init__(self, hdf_path, iface):
+    # Memory used by a block of rainfall values written at once
+    slab_bytes = 64 << 20
+
+    def __init__(self, hdf_path, iface, profile=None):
         self.uc = UserCommunication(iface, "FLO-2D")
         self.iface = iface
         self.con = None
         self.gutils = None
         self.hdf_path = hdf_path
+        self.profile = profile or HDF5_PROFILES["default"]
+
+    @staticmethod
+    def fetch_block(cursor, size, columns):
+        """
+        Fetch up to 'size' rows from cursor as float64 array of shape (rows, columns), NULL values as NaN.
+        """
+        rows = cursor.fetchmany(size)
+        if not rows:
+            return np.empty((0, columns), dtype=np.float64)
+        return np.array(rows, dtype=np.float64).reshape(len(rows), columns)
+
+    def create_rows_dataset(self, grp, name, n_lines, columns, description):
+        shape = (n_lines, columns)
+        dts = grp.create_dataset(name, shape, dtype=np.float32, **self.profile.dataset_kwargs(shape, np.float32))
+        dts.attrs["description"] = np.array([description], dtype=np.bytes_)
+        return dts
+
+    def block_rows(self, dts):
+        """
+        Number of rows written at once, a multiple of the dataset chunk rows.
+        """
+        chunk_rows = dts.chunks[0] if dts.chunks else 1
+        row_bytes = max(dts.shape[1] * 8, 1)
+        return max(self.slab_bytes // row_bytes // chunk_rows, 1) * chunk_rows
 
-    def export_rainfall_to_binary_hdf5(self, header, qry_data, qry_size, qry_timeinterval, subdomain):
+    def export_rainfall_to_binary_hdf5(self, header, qry_data, qry_size):
+        """
+        Write rainfall values into IRAINDUM dataset (cells x intervals) from a single query ordered by time interval
+        and cell. Values are buffered for blocks of intervals and written as slabs aligned with the dataset chunks.
+        """
 
         con = self.iface.f2d["con"]
         if con is None:
@@ -237,6 +270,7 @@ class HDFProcessor(object):
         with h5py.File(self.hdf_path, "w") as hdf_file:
 
             rainintime, irinters, timestamp = header
+            irinters = int(irinters)
             hdf_file.attrs["hdf5_version"] = np.array([h5py.version.hdf5_version], dtype=np.bytes_)
             hdf_file.attrs["plugin"] = np.array(["FLO-2D"], dtype=np.bytes_)
             grp = hdf_file.create_group("raincell")
@@ -252,7 +286,7 @@ class HDFProcessor(object):
 
                 (
                     "IRINTERS",
-                    int(irinters),
+                    irinters,
                     "Number of intervals in the dataset."),
 
                 (
@@ -266,19 +300,24 @@ class HDFProcessor(object):
                 dts.attrs["description"] = np.array([description], dtype=np.bytes_)
 
             # Scalar dataset
-            n_cells = self.gutils.execute(qry_size).fetchone()[0] / irinters
-            dts = grp.create_dataset("IRAINDUM", (n_cells, int(irinters)), compression="gzip")
+            n_cells = self.gutils.execute(qry_size).fetchone()[0] // irinters
+            shape = (n_cells, irinters)
+            # Intervals per written slab, chunks span whole slab columns
+            block = int(min(max(self.slab_bytes // max(n_cells * 8, 1), 1), max(irinters, 1)))
+            kwargs = self.profile.dataset_kwargs(shape, np.float32)
+            if "chunks" in kwargs:
+                chunk_cells = max(self.profile.chunk_bytes // (block * 4), 1)
+                kwargs["chunks"] = (min(chunk_cells, max(n_cells, 1)), block)
+            dts = grp.create_dataset("IRAINDUM", shape, dtype=np.float32, **kwargs)
             dts.attrs["description"] = np.array(["Rainfall data in the grid cells"], dtype=np.bytes_)
 
-            progDialog = QProgressDialog("Exporting RealTime Rainfall (.HDF5)...", "Cancel", 0, int(irinters))
+            progDialog = QProgressDialog("Exporting RealTime Rainfall (.HDF5)...", "Cancel", 0, irinters)
             progDialog.setModal(True)
             progDialog.setValue(0)
             progDialog.show()
 
-            timeinterval = self.gutils.execute(qry_timeinterval).fetchall()
-
-            i = 0
-            for interval in timeinterval:
+            cursor = self.gutils.execute(qry_data)
+            for start in range(0, irinters if n_cells else 0, block):
 
                 if progDialog.wasCanceled():
                     progDialog.close()
@@ -290,17 +329,20 @@ class HDFProcessor(object):
 
                     return
 
-                progDialog.setValue(i)
-                if not subdomain:
-                    batch_query = qry_data + f" WHERE time_interval = {interval[0]} ORDER BY rrgrid, time_interval"
-                else:
-                    batch_query = qry_data + f" WHERE time_interval = {interval[0]} AND md.domain_fid = '{subdomain}' ORDER BY md.domain_cell, rd.time_interval"
-                data = self.gutils.execute(batch_query).fetchall()
-                data = np.array(data)
-                dts[:, i] = data.flatten()
-                i += 1
+                progDialog.setValue(start)
+                width = min(block, irinters - start)
+                values = self.fetch_block(cursor, n_cells * width, 1).ravel()
+                if not values.size:
+                    break
+                slab = np.zeros(n_cells * width, dtype=np.float64)
+                slab[: values.size] = values
+                # Rows come interval after interval
+                dts[:, start : start + width] = slab.reshape(width, n_cells).T
 
     def export_rainfallraw_to_binary_hdf5(self, header, raincellraw_qry_data, raincellraw_size, flo2draincell_qry_data, flo2draincell_size):
+        """
+        Write RAINCELLRAW and FLO2DRAINCELL datasets in blocks of rows aligned with the dataset chunks.
+        """
 
         con = self.iface.f2d["con"]
         if con is None:
@@ -332,25 +374,28 @@ class HDFProcessor(object):
                 dts = grp.create_dataset(name, data=value)
                 dts.attrs["description"] = np.array([description], dtype=np.bytes_)
 
-            # Scalar dataset
-            n_lines = self.gutils.execute(raincellraw_size).fetchone()[0]
-            dts = grp.create_dataset("RAINCELLRAW", (n_lines, 3), compression="gzip")
-            dts.attrs["description"] = np.array(["Cumulative realtime rainfall data"], dtype=np.bytes_)
-
             # Export the RAINCELLRAW data
-            for i, row in enumerate(self.gutils.execute(raincellraw_qry_data).fetchall()):
-                dts[i, :] = np.array([row[0], row[1], row[2]])
+            n_lines = self.gutils.execute(raincellraw_size).fetchone()[0]
+            dts = self.create_rows_dataset(grp, "RAINCELLRAW", n_lines, 3, "Cumulative realtime rainfall data")
+            size = self.block_rows(dts)
+            cursor = self.gutils.execute(raincellraw_qry_data)
+            for start in range(0, n_lines, size):
+                rows = self.fetch_block(cursor, size, 3)
+                if not rows.size:
+                    break
+                dts[start : start + len(rows)] = rows
 
             # Export the FLO2DRAINCELL data
             n_lines2 = self.gutils.execute(flo2draincell_size).fetchone()[0]
-            dts = grp.create_dataset("FLO2DRAINCELL", (n_lines2, 2), compression="gzip")
-            dts.attrs["description"] = np.array(["Intersected realtime rainfall data"], dtype=np.bytes_)
+            dts = self.create_rows_dataset(grp, "FLO2DRAINCELL", n_lines2, 2, "Intersected realtime rainfall data")
             progDialog = QProgressDialog("Exporting FLO2DRAINCELL (.HDF5)...", "Cancel", 0, int(n_lines2))
             progDialog.setModal(True)
             progDialog.setValue(0)
             progDialog.show()
 
-            for i, row in enumerate(self.gutils.execute(flo2draincell_qry_data).fetchall()):
+            size = self.block_rows(dts)
+            cursor = self.gutils.execute(flo2draincell_qry_data)
+            for start in range(0, n_lines2, size):
 
                 if progDialog.wasCanceled():
                     progDialog.close()
@@ -362,6 +407,9 @@ class HDFProcessor(object):
 
                     return
 
-                progDialog.setValue(i)
-                dts[i, :] = np.array([row[0], row[1]])
+                progDialog.setValue(start)
+                rows = self.fetch_block(cursor, size, 2)
+                if not rows.size:
+                    break
+                dts[start : start + len(rows)] = rows
 
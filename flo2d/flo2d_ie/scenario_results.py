@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+
+# FLO-2D Preprocessor tools for QGIS
+
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version
+import os
+import re
+from collections import OrderedDict
+
+import numpy as np
+
+from ..misc.process_pool import spawn_process_pool
+from . import text_parsers
+from .swmm_rpt import SwmmRptIndex
+
+# Output files of a scenario parsed for the Project Review
+RESULT_FILES = OrderedDict(
+    [
+        ("swmm.RPT", "swmm.RPT"),
+        ("SWMMQIN", "SWMMQIN.OUT"),
+        ("SWMMOUTFIN", "SWMMOUTFIN.OUT"),
+        ("HYDROSTRUCT", "HYDROSTRUCT.OUT"),
+        ("HYCROSS", "HYCROSS.OUT"),
+        ("CROSSQ", "CROSSQ.OUT"),
+        ("HYCHAN", "HYCHAN.OUT"),
+    ]
+)
+
+# Groups created for a scenario even when its output file is missing
+EMPTY_GROUPS = {
+    "HYDROSTRUCT": ["Hydraulic Structures"],
+    "HYCROSS": ["Floodplain Cross Sections"],
+    "CROSSQ": ["Floodplain Cross Sections/Cells"],
+    "HYCHAN": ["Channels/Profiles", "Channels/Cross Sections"],
+}
+
+STRUCTURE_PATTERN = re.compile(
+    r"THE\s+MAXIMUM\s+DISCHARGE\s+FOR:\s+(.+?)\s+STRUCTURE\s+NO\.\s+(\d+)\s+IS:", re.IGNORECASE
+)
+
+
+def parse_swmmrpt(path):
+    nodes_group = OrderedDict()
+    links_group = OrderedDict()
+    dates, times = [], []
+    rpt_index = SwmmRptIndex(path)
+    for node_name, node_dates, node_times, values in rpt_index.iter_series("Node"):
+        if not dates:
+            dates, times = node_dates, node_times
+        if len(values) > 0:
+            nodes_group[node_name] = values
+    for link_name, link_dates, link_times, values in rpt_index.iter_series("Link"):
+        if len(values) > 0:
+            links_group[link_name] = values
+    time_series = np.array(list(zip(dates, times)), dtype="S")
+    return [
+        ("Storm Drain", OrderedDict([("Time Series", time_series)])),
+        ("Storm Drain/Nodes", nodes_group),
+        ("Storm Drain/Links", links_group),
+    ]
+
+
+def parse_swmmqin(path):
+    data = OrderedDict()
+    par = text_parsers.single_parser(path)
+    for row in par:
+        if "INLET" in row:
+            inlet = row[11]
+            next(par)
+            data[inlet] = []
+            for row2 in par:
+                if len(row2) == 3:
+                    data[inlet].append(row2)
+                elif "INLET" in row2:
+                    inlet = row2[11]
+                    next(par)
+                    data[inlet] = []
+    return [("Storm Drain/SWMMQIN", data)]
+
+
+def parse_swmmoutfin(path):
+    data = OrderedDict()
+    par = text_parsers.single_parser(path)
+    for row in par:
+        if "GRID" in row:
+            cell = row[2]
+            next(par)
+            data[cell] = []
+            for row2 in par:
+                if len(row2) == 2:
+                    data[cell].append(row2)
+                elif "GRID" in row2:
+                    cell = row2[2]
+                    next(par)
+                    data[cell] = []
+    return [("Storm Drain/SWMMOUTFIN", data)]
+
+
+def parse_hydrostruct(path):
+    group = OrderedDict()
+    with open(path, "r") as myfile:
+        for line in myfile:
+            match = STRUCTURE_PATTERN.search(line)
+            if not match:
+                continue
+            next(myfile, None)
+            time_list = []
+            discharge_list = []
+            for line in myfile:
+                row = line.split()
+                if not row:
+                    break
+                time_list.append(float(row[0]))
+                discharge_list.append((float(row[1]), float(row[2])))
+            if "Time Series" not in group:
+                group["Time Series"] = time_list
+            group[match.group(1)] = discharge_list
+    return [("Hydraulic Structures", group)]
+
+
+def parse_hycross(path):
+    group = OrderedDict()
+    with open(path, "r") as myfile:
+        while True:
+            try:
+                line = next(myfile)
+            except StopIteration:
+                break
+            if "THE MAXIMUM DISCHARGE FROM CROSS SECTION" in line:
+                fpxs_name = f"Floodplain XS {line.split()[6]}"
+                for _ in range(9):
+                    line = next(myfile)
+                time_list = []
+                data_list = []
+                while True:
+                    try:
+                        line = next(myfile)
+                    except StopIteration:
+                        break
+                    if not line.strip():
+                        break
+                    line = line.split()
+                    if line[0] == "VELOCITY":
+                        for _ in range(5):
+                            line = next(myfile)
+                            line = line.split()
+                    time_list.append(float(line[0]))
+                    data_list.append(
+                        (float(line[1]), float(line[2]), float(line[3]), float(line[4]), float(line[5]))
+                    )
+                if "Time Series" not in group:
+                    group["Time Series"] = time_list
+                group[fpxs_name] = data_list
+    return [("Floodplain Cross Sections", group)]
+
+
+def parse_crossq(path):
+    group = OrderedDict()
+    with open(path, "r", encoding="utf-8", errors="replace") as myfile:
+        pushback = None  # holds a header line for the next iteration
+        while True:
+            try:
+                line = pushback if pushback is not None else next(myfile)
+                pushback = None
+            except StopIteration:
+                break
+            parts = line.split()
+            if len(parts) == 3 and parts[0].isdigit():
+                grid = str(int(parts[0]))
+                discharge_list = [float(parts[2])]
+                # gather rows until the next header or a blank line
+                while True:
+                    line = next(myfile, "")
+                    if not line.strip():
+                        break
+                    sp = line.split()
+                    if len(sp) == 3 and sp[0].isdigit():
+                        pushback = line
+                        break
+                    discharge_list.append(float(sp[1]))
+                # Repeated cells keep their last series
+                group.pop(grid, None)
+                group[grid] = discharge_list
+    return [("Floodplain Cross Sections/Cells", group)]
+
+
+def parse_hychan(path):
+    peaks_dict, _ = text_parsers.parse_hychan(path, mode="peaks")
+    ts_dict, _ = text_parsers.parse_hychan(path, mode="time_series")
+    profiles = OrderedDict((key, np.array(values).T) for key, values in peaks_dict.items())
+    cross_sections = OrderedDict((key, np.array(values).T) for key, values in ts_dict.items())
+    return [("Channels/Profiles", profiles), ("Channels/Cross Sections", cross_sections)]
+
+
+PARSERS = {
+    "swmm.RPT": parse_swmmrpt,
+    "SWMMQIN": parse_swmmqin,
+    "SWMMOUTFIN": parse_swmmoutfin,
+    "HYDROSTRUCT": parse_hydrostruct,
+    "HYCROSS": parse_hycross,
+    "CROSSQ": parse_crossq,
+    "HYCHAN": parse_hychan,
+}
+
+
+def ingest_scenario_output(output, scenario):
+    """
+    Parse one output file of a scenario folder. Returns (path, groups) where groups is a list of
+    (group path, {dataset name: data}) relative to the scenario group, or (path, None) if the file is missing.
+    """
+    path = os.path.join(scenario, RESULT_FILES[output])
+    if not os.path.exists(path):
+        return path, None
+    return path, PARSERS[output](path)
+
+
+def scenario_process_pool(max_workers=None):
+    """
+    Return process pool for the scenario outputs parsing. This module imports no QGIS modules, so workers started
+    with the bare Python interpreter can import it.
+    """
+    return spawn_process_pool(max_workers)
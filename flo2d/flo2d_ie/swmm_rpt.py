@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+
+# FLO-2D Preprocessor tools for QGIS
+
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version
+import json
+import os
+import re
+
+import numpy as np
+
+HEADER_PATTERN = re.compile(rb"^\s*<<< (Node|Link) (.*?) >>>")
+END_PATTERN = re.compile(rb"^\s*Analysis begun")
+UNITS_PATTERN = re.compile(rb"Flow Units[\s.]*(\w+)")
+
+
+class SwmmRptIndex(object):
+    """
+    Byte offsets index of node and link time series blocks ('<<< Node X >>>', '<<< Link X >>>') in swmm.RPT.
+
+    The index is built in one pass over the file and saved beside it ('swmm.RPT.idx'), keyed by the RPT size
+    and modification time. Time series of an object are read from its own block only.
+    """
+
+    version = 1
+    _cache = {}
+
+    def __init__(self, rpt_file):
+        self.rpt_file = rpt_file
+        self.index_file = rpt_file + ".idx"
+        stat = os.stat(rpt_file)
+        self.key = [stat.st_size, stat.st_mtime_ns]
+        self.units = None
+        self.blocks = {"Node": {}, "Link": {}}
+        if not self.load():
+            self.build()
+            self.save()
+
+    @classmethod
+    def open(cls, rpt_file):
+        """
+        Return index of the RPT file, reusing the one already read while the file is unchanged.
+        """
+        path = os.path.abspath(rpt_file)
+        stat = os.stat(path)
+        key = (path, stat.st_size, stat.st_mtime_ns)
+        index = cls._cache.get(key)
+        if index is None:
+            index = cls(path)
+            cls._cache = {key: index}
+        return index
+
+    def load(self):
+        try:
+            with open(self.index_file, "r") as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if saved.get("version") != self.version or saved.get("key") != self.key:
+            return False
+        self.units = saved["units"]
+        self.blocks = {kind: {name: tuple(span) for name, span in saved["blocks"][kind]} for kind in self.blocks}
+        return True
+
+    def save(self):
+        saved = {
+            "version": self.version,
+            "key": self.key,
+            "units": self.units,
+            "blocks": {kind: list(blocks.items()) for kind, blocks in self.blocks.items()},
+        }
+        try:
+            with open(self.index_file, "w") as f:
+                json.dump(saved, f)
+        except OSError:
+            # Read only project folder, the index is kept in memory
+            pass
+
+    def build(self):
+        """
+        Record (start, end) byte offsets of every node and link block.
+        """
+        self.blocks = {"Node": {}, "Link": {}}
+        current = None  # (kind, name, start) of the block being read
+        offset = 0
+        with open(self.rpt_file, "rb") as f:
+            for line in f:
+                start = offset
+                offset += len(line)
+                if b"<<<" in line:
+                    match = HEADER_PATTERN.match(line)
+                    if match:
+                        if current is not None:
+                            self.blocks[current[0]][current[1]] = (current[2], start)
+                        current = (match.group(1).decode(), match.group(2).decode(errors="replace"), offset)
+                        continue
+                if self.units is None and b"Flow Units" in line:
+                    match = UNITS_PATTERN.search(line)
+                    if match:
+                        self.units = match.group(1).decode()
+                if current is not None and b"Analysis begun" in line and END_PATTERN.match(line):
+                    self.blocks[current[0]][current[1]] = (current[2], start)
+                    current = None
+        if current is not None:
+            self.blocks[current[0]][current[1]] = (current[2], offset)
+
+    def names(self, kind):
+        """
+        Return names of indexed objects of kind 'Node' or 'Link' in file order.
+        """
+        return list(self.blocks[kind])
+
+    def has(self, kind, name):
+        return name in self.blocks[kind]
+
+    @staticmethod
+    def read_rows(f, span):
+        start, end = span
+        f.seek(start)
+        text = f.read(end - start).decode(errors="replace")
+        rows = []
+        for line in text.splitlines():
+            row = line.split()
+            if not row:
+                continue
+            if len(row) == 6 and row[0] != "Date":
+                rows.append(row)
+            elif rows:
+                break
+        return rows
+
+    @staticmethod
+    def rows_to_series(rows):
+        if not rows:
+            return [], [], np.empty((0, 4), dtype=np.float64)
+        dates = [row[0] for row in rows]
+        times = [row[1] for row in rows]
+        values = np.array([row[2:] for row in rows], dtype=np.float64)
+        return dates, times, values
+
+    def rows(self, kind, name):
+        """
+        Return data rows [date, time, value1, value2, value3, value4] of the object block.
+        """
+        span = self.blocks[kind].get(name)
+        if span is None:
+            return []
+        with open(self.rpt_file, "rb") as f:
+            return self.read_rows(f, span)
+
+    def series(self, kind, name):
+        """
+        Return (dates, times, values) of the object with values as float array of shape (steps, 4).
+        """
+        return self.rows_to_series(self.rows(kind, name))
+
+    def iter_series(self, kind, names=None):
+        """
+        Yield (name, dates, times, values) for objects 'names' (all objects by default) reading the file once.
+        """
+        if names is None:
+            names = self.names(kind)
+        with open(self.rpt_file, "rb") as f:
+            for name in names:
+                span = self.blocks[kind].get(name)
+                rows = self.read_rows(f, span) if span is not None else []
+                yield (name,) + self.rows_to_series(rows)
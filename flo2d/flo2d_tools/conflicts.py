@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+
+# FLO-2D Preprocessor tools for QGIS
+
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version
+import numpy as np
+
+
+class Conflicts(object):
+    """
+    Grid cells shared by two model components or repeated within one component.
+
+    Cells of every (table, column, condition) are read once into a sorted NumPy array. Repeated cells come
+    from comparing neighbours of the sorted array and shared cells from 'np.intersect1d'.
+    """
+
+    def __init__(self, gutils):
+        self.gutils = gutils
+        self._cells = {}
+
+    def cells(self, table, column, where=None):
+        """
+        Return sorted int64 array of not NULL cells in table column, optionally filtered by SQL condition.
+        """
+        key = (table, column, where)
+        if key not in self._cells:
+            qry = """SELECT CAST("{1}" AS INTEGER) FROM "{0}" WHERE "{1}" IS NOT NULL""".format(table, column)
+            if where:
+                qry += " AND ({0})".format(where)
+            rows = self.gutils.execute(qry).fetchall()
+            cells = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+            cells.sort()
+            self._cells[key] = cells
+        return self._cells[key]
+
+    def repeated(self, table, column, where=None):
+        """
+        Return sorted unique cells present more than once in table column.
+        """
+        cells = self.cells(table, column, where)
+        return np.unique(cells[1:][cells[1:] == cells[:-1]])
+
+    def shared(self, table1, column1, table2, column2, where1=None, where2=None):
+        """
+        Return sorted unique cells present in both table columns (repeated cells for the same table column).
+        """
+        if (table1, column1, where1) == (table2, column2, where2):
+            return self.repeated(table1, column1, where1)
+        return np.intersect1d(self.cells(table1, column1, where1), self.cells(table2, column2, where2))
+
+    def iter_conflicts(self, comp1, table1, cell_1, comp2, table2, cell_2, description, where1=None, where2=None):
+        """
+        Yield conflicts [cell, component 1, component 2, description] between two components.
+        """
+        for cell in self.shared(table1, cell_1, table2, cell_2, where1, where2).tolist():
+            yield [str(cell), comp1, comp2, description]
@@ -13,7 +13,6 @@ import os
 import sys
 import uuid
 from collections import defaultdict
-from operator import itemgetter
 from subprocess import PIPE, STDOUT, Popen
 
 from qgis.utils import iface
@@ -30,8 +29,6 @@ from qgis.core import (
     QgsGraduatedSymbolRenderer,
     QgsPointXY,
     QgsProject,
-    QgsRaster,
-    QgsRasterLayer,
     QgsRectangle,
     QgsRendererRange,
     QgsSpatialIndex,
@@ -43,8 +40,9 @@ from qgis.PyQt.QtWidgets import QApplication, QMessageBox, QProgressDialog
 # from scipy.stats._discrete_distns import geom
 
 from ..errors import Flo2dError, GeometryValidityErrors
+from ..misc.gpkg_binary import encode_squares
 from ..gui.ui_utils import center_canvas, zoom_show_n_cells
-from ..utils import get_file_path, is_number, qt_cursor_shape, qt_window_modality, qt_pen_style, qmeta_type, mb_icon
+from ..utils import get_file_path, qt_cursor_shape, qt_window_modality, qt_pen_style, qmeta_type, mb_icon
 
 cellIDNumpyArray = None
 xvalsNumpyArray = None
@@ -244,10 +242,7 @@ class ZonalStatistics(object):
         Setting elevation values inside 'grid' table.
         """
         set_qry = "UPDATE grid SET elevation = ? WHERE fid = ?;"
-        cur = self.gutils.con.cursor()
-        for el, fid in elev_fid:
-            cur.execute(set_qry, (el, fid))
-        self.gutils.con.commit()
+        self.gutils.execute_many(set_qry, elev_fid)
 
 
 class ZonalStatisticsOther(object):
@@ -428,10 +423,7 @@ class ZonalStatisticsOther(object):
         elif self.grid_field == "flow_depth":
             set_qry = "UPDATE grid SET flow_depth = ? WHERE fid = ?;"
 
-        cur = self.gutils.con.cursor()
-        for el, fid in elev_fid:
-            cur.execute(set_qry, (el, fid))
-        self.gutils.con.commit()
+        self.gutils.execute_many(set_qry, elev_fid)
 
 
 def debugMsg(msg_string):
@@ -1141,40 +1133,53 @@ def calculate_gutter_variable_from_lines(grid, lines):
                 pass
 
 
-def raster2grid(grid, out_raster, iface, request=None):
+def layer_centroids(vlayer, request=None):
     """
-    Generator for probing raster data within 'grid' features.
+    Return (fids, x, y) arrays with centroids of the layer features ordered by fid.
     """
-    probe_raster = QgsRasterLayer(out_raster)
-    if not probe_raster.isValid():
-        return
-
-    features = grid.getFeatures() if request is None else grid.getFeatures(request)
+    if request is None:
+        request = QgsFeatureRequest().setNoAttributes()
+    features = vlayer.getFeatures(request)
+    centroids = []
+    for feat in features:
+        center = feat.geometry().centroid().asPoint()
+        centroids.append((feat.id(), center.x(), center.y()))
+    centroids.sort()
+    if not centroids:
+        return np.empty(0, dtype=np.int64), np.empty(0), np.empty(0)
+    fids, xs, ys = zip(*centroids)
+    return np.array(fids, dtype=np.int64), np.array(xs), np.array(ys)
 
-    parent = iface.mainWindow() if iface and iface.mainWindow() else None
 
-    pd = QProgressDialog("Probing raster...", None, 0, grid.featureCount(), parent)
-    pd.setModal(True)
-    pd.setValue(0)
-    pd.forceShow()
+def grid_raster_values(grid, raster_path, request=None, gutils=None):
+    """
+    Return (fids, values) arrays with raster values at centroids of 'grid' features in fid order, NaN where the raster
+    has no value, or None if the raster can't be opened. Centroids of the whole grid are read from 'gutils' if given.
+    """
+    from ..misc.gdal_utils import sample_raster
 
-    i = 0
+    if gutils is not None and request is None:
+        fids, xs, ys = gutils.grid_centroids_array()
+    else:
+        fids, xs, ys = layer_centroids(grid, request)
+    try:
+        values = sample_raster(raster_path, xs, ys)
+    except RuntimeError:
+        return None
+    return fids, values
 
-    for feat in features:
-        center = feat.geometry().centroid().asPoint()
-        ident = probe_raster.dataProvider().identify(center, QgsRaster.IdentifyFormatValue)
-        # ident is the value of the query provided by the identify method of the dataProvider.
-        if ident.isValid():
-            if is_number(ident.results()[1]):
-                val = round(ident.results()[1], 4)
-            else:
-                val = None
-            yield val, feat.id()
-        i += 1
-        pd.setValue(i)
 
-    pd.close()
-    pd.deleteLater()
+def raster2grid(grid, out_raster, iface, request=None, gutils=None):
+    """
+    Generator for probing raster data within 'grid' features. Yields (value, fid) in fid order, value rounded to
+    4 decimals or None where the raster has no value.
+    """
+    sampled = grid_raster_values(grid, out_raster, request, gutils)
+    if sampled is None:
+        return
+    fids, values = sampled
+    for fid, val in zip(fids.tolist(), values.tolist()):
+        yield (None if math.isnan(val) else round(val, 4)), fid
 
 
 def rasters2centroids(vlayer, request, *raster_paths):
@@ -1187,42 +1192,95 @@ def rasters2centroids(vlayer, request, *raster_paths):
         request:
         *raster_pathts: list of ASCII files (with path).
 
+    Yields list of (value, fid) for every raster that can be opened.
     """
-    features = vlayer.getFeatures() if request is None else vlayer.getFeatures(request)
-    centroids = []
-    for feat in features:
-        fid = feat.id()
-        center_point = feat.geometry().centroid().asPoint()
-        centroids.append((fid, center_point))
+    from ..misc.gdal_utils import sample_raster
 
-    # 'centroids' has the coordinates (x,y) of the centroids of all features of vlayer (ususlly the grid layer)
+    # Coordinates (x,y) of the centroids of all features of vlayer (ususlly the grid layer)
+    fids, xs, ys = layer_centroids(vlayer, request)
+    fids = fids.tolist()
     for pth in raster_paths:
-        raster_values = []
-        rlayer = QgsRasterLayer(
-            pth
-        )  # rlayer is an instance of the layer constructed from file pth (from list raster_paths).
-        # Loads (or assigns a raster style), populates its bands, calculates its extend,
-        # determines if the layers is gray, paletted, or multiband, assign sensible
-        # defaults for the red, green, blue and gray bands.
-        if not rlayer.isValid():
+        try:
+            values = sample_raster(pth, xs, ys)
+        except RuntimeError:
             continue
-        raster_provider = rlayer.dataProvider()
-        for fid, point in centroids:
-            ident = raster_provider.identify(point, QgsRaster.IdentifyFormatValue)
-            # ident is the value of the query provided by the identify method of the dataProvider.
-            if ident.isValid():
-                if is_number(ident.results()[1]):
-                    val = round(ident.results()[1], 4)
-                else:
-                    val = None
-                raster_values.append((val, fid))
+        raster_values = [(None if math.isnan(val) else round(val, 4), fid) for val, fid in zip(values.tolist(), fids)]
         yield raster_values
 
 
+def polygon_edges(geom):
+    """
+    Return (x0, y0, x1, y1) arrays with all ring edges (exterior and interior) of a (multi)polygon geometry.
+    """
+    polygons = geom.asMultiPolygon() if geom.isMultipart() else [geom.asPolygon()]
+    segments = []
+    for polygon in polygons:
+        for ring in polygon:
+            xy = np.array([(pnt.x(), pnt.y()) for pnt in ring], dtype=np.float64)
+            if len(xy) > 1:
+                segments.append(np.hstack((xy[:-1], xy[1:])))
+    if not segments:
+        return tuple(np.empty(0) for _ in range(4))
+    edges = np.vstack(segments)
+    return edges[:, 0], edges[:, 1], edges[:, 2], edges[:, 3]
+
+
+def centres_in_polygon_row(xc, yc, edges):
+    """
+    Scanline point in polygon test of cell centres 'xc' (ascending) lying on the horizontal line 'yc'.
+    Points on the polygon boundary are treated as inside, matching the GEOS 'intersects' predicate.
+    """
+    x0, y0, x1, y1 = edges
+    inside = np.zeros(xc.size, dtype=bool)
+    # Even-odd rule with half-open edges, so vertices lying on the scanline are counted once.
+    crossing = (y0 <= yc) != (y1 <= yc)
+    if crossing.any():
+        cx0, cy0, cx1, cy1 = x0[crossing], y0[crossing], x1[crossing], y1[crossing]
+        xs = np.sort(cx0 + (yc - cy0) * (cx1 - cx0) / (cy1 - cy0))
+        inside = np.searchsorted(xs, xc, side="right") % 2 == 1
+        inside |= np.isin(xc, xs)
+    # Boundary parts touching the scanline (horizontal edges and vertices).
+    touching = (y0 == yc) | (y1 == yc)
+    for tx0, ty0, tx1, ty1 in zip(x0[touching], y0[touching], x1[touching], y1[touching]):
+        if ty0 == ty1:
+            lo, hi = min(tx0, tx1), max(tx0, tx1)
+        else:
+            lo = hi = tx0 if ty0 == yc else tx1
+        inside[np.searchsorted(xc, lo, side="left") : np.searchsorted(xc, hi, side="right")] = True
+    return inside
+
+
+def dangling_cells(mask):
+    """
+    Flag cells of a (cols, rows) boolean lattice having at least 3 of their 4 cardinal neighbours missing.
+    """
+    padded = np.pad(~mask, 1, constant_values=True)
+    missing = (
+        padded[1:-1, :-2].astype(np.int8)  # N
+        + padded[2:, 1:-1]  # E
+        + padded[1:-1, 2:]  # S
+        + padded[:-2, 1:-1]  # W
+    )
+    return mask & (missing >= 3)
+
+
+def lattice_axis(start, step, count):
+    """
+    Coordinates start, start + step, ... accumulated sequentially (as 'x += step' in a loop would do).
+    """
+    if count < 1:
+        return np.empty(0)
+    steps = np.full(count, step, dtype=np.float64)
+    steps[0] = start
+    return np.cumsum(steps)
+
+
 # Tools which use GeoPackageUtils instance
 def square_grid(gutils, boundary, iface, upper_left_coords=None):
     """
     Function for calculating and writing square grid into 'grid' table.
+    Candidate cells are tested against the boundary row by row on NumPy arrays and the cell polygons are encoded
+    directly into GeoPackage binaries, so no per cell SQL is needed.
     """
     cellsize = float(gutils.get_cont_par("CELLSIZE"))
     update_cellsize = "UPDATE user_model_boundary SET cell_size = ?;"
@@ -1245,130 +1303,64 @@ def square_grid(gutils, boundary, iface, upper_left_coords=None):
     rows = int(math.ceil(abs(ymax - ymin) / cellsize))
     x = xmin + half_size
     y = ymax - half_size
-    geos_geom_engine = QgsGeometry.createGeometryEngine(geom.constGet())
-    geos_geom_engine.prepareGeometry()
-
-    total_candidates = cols * rows
+    xc = lattice_axis(x, cellsize, cols)
+    yc = lattice_axis(y, -cellsize, rows)
+    edges = polygon_edges(geom)
 
-    prog = QProgressDialog("Creating grid (1/3)...", "Cancel", 0, 100, iface.mainWindow())
+    prog = QProgressDialog("Creating grid (1/2)...", "Cancel", 0, 100, iface.mainWindow())
     prog.setModal(True)
     prog.setValue(0)
     prog.forceShow()
 
-    # Update UI about ~200 times max
-    update_every = max(1, total_candidates // 200)
+    # Update UI about ~100 times max
+    update_every = max(1, rows // 100)
 
-    sql = ["""INSERT INTO grid (geom) VALUES""", 1]
-
-    step = 0
-
-    for col in range(cols):
-        y_tmp = y
-        for row in range(rows):
-            step += 1
-            if step % update_every == 0 or step == total_candidates:
-                pct = int(step * 100 / total_candidates)
-                prog.setValue(pct)
+    # Lattice of candidate cells indexed as [col, row], rows counted from the top.
+    mask = np.zeros((cols, rows), dtype=bool)
+    for row in range(rows):
+        mask[:, row] = centres_in_polygon_row(xc, yc[row], edges)
+        if row % update_every == 0:
+            prog.setValue(int(row * 100 / rows))
+            QApplication.processEvents()
+            if prog.wasCanceled():
+                prog.close()
                 QApplication.processEvents()
-                if prog.wasCanceled():
-                    prog.close()
-                    QApplication.processEvents()
-                    prog.deleteLater()
-                    return
-
-            pnt = QgsGeometry.fromPointXY(QgsPointXY(x, y_tmp))
-            if geos_geom_engine.intersects(pnt.constGet()):
-                poly = (
-                    x - half_size,
-                    y_tmp - half_size,
-                    x + half_size,
-                    y_tmp - half_size,
-                    x + half_size,
-                    y_tmp + half_size,
-                    x - half_size,
-                    y_tmp + half_size,
-                    x - half_size,
-                    y_tmp - half_size,
-                )
-                sql.append((gutils.build_square_from_polygon(poly),))
-            else:
-                pass
-            y_tmp -= cellsize
-        x += cellsize
-    prog.setValue(100)
-
-    # Reuse the SAME progress dialog, just change message
-    prog.setLabelText("Writing grid elements (2/3)...")
-    prog.setValue(50)
-    QApplication.processEvents()
-
-    if len(sql) > 2:
-        gutils.batch_execute(sql)
+                prog.deleteLater()
+                return
 
+    # Remove dangling grid elements
+    mask &= ~dangling_cells(mask)
     prog.setValue(100)
 
-    prog.setLabelText("Cleaning dangling grid elements (3/3)...")
+    prog.setLabelText("Writing grid elements (2/2)...")
     prog.setValue(0)
     QApplication.processEvents()
 
-    total_grid = gutils.execute("SELECT COUNT(*) FROM grid;").fetchone()[0]
-    update_every = max(1, total_grid // 200)
-
-    # Check for dangling grid elements
-    dangling = False
-    for idx, row in enumerate(grid_compas_neighbors(gutils), start=1):
-
-        if idx % update_every == 0 or idx == total_grid:
-            pct = int(idx * 100 / total_grid) if total_grid else 100
-            prog.setValue(pct)
+    # Column major order, the same order the cells were inserted in before
+    col_idx, row_idx = np.nonzero(mask)
+    total_grid = col_idx.size
+    chunk_size = 100000
+    qry = """INSERT INTO grid (geom) VALUES (?);"""
+    # Spatial index is filled once after all cells are inserted instead of row by row through triggers
+    rtree_triggers = gutils.drop_rtree_triggers("grid")
+    cur = gutils.con.cursor()
+    try:
+        for start in range(0, total_grid, chunk_size):
+            stop = start + chunk_size
+            blobs = encode_squares(xc[col_idx[start:stop]], yc[row_idx[start:stop]], cellsize)
+            cur.executemany(qry, ((blob,) for blob in blobs))
+            prog.setValue(int(min(stop, total_grid) * 100 / total_grid))
             QApplication.processEvents()
-            if prog.wasCanceled():
-                prog.close()
-                QApplication.processEvents()
-                prog.deleteLater()
-                return
-
-        n = row[0]
-        e = row[1]
-        s = row[2]
-        w = row[3]
-        ne = row[4]
-        se = row[5]
-        sw = row[6]
-        nw = row[7]
-
-        cardinal_directions = sum(1 for var in [n, e, s, w] if var == 0)
-        ordinal_directions = sum(1 for var in [ne, se, sw, nw] if var == 0)
-
-        # Check if at least 3 directions are zero -> dangling grid element
-        if cardinal_directions >= 3 or (ordinal_directions >= 3 and cardinal_directions == 4):
-            dangling = True
-            delete_grid_elem_query = f"DELETE FROM grid WHERE fid = {idx};"
-            gutils.execute(delete_grid_elem_query)
-
-    if dangling:
-        create_temp_table_query = """
-                    CREATE TABLE temp_table AS
-                    SELECT *, ROW_NUMBER() OVER () AS new_fid
-                    FROM grid;
-                    """
-        gutils.execute(create_temp_table_query)
-
-        # Delete data from the original table
-        delete_data_query = "DELETE FROM grid;"
-        gutils.execute(delete_data_query)
-
-        # Copy data from the temporary table back to the original table
-        copy_data_query = "INSERT INTO grid SELECT new_fid, col, row, n_value, elevation, water_elevation, " \
-                          "flow_depth, geom FROM temp_table;"
-        gutils.execute(copy_data_query)
-
-        # Drop the temporary table
-        drop_temp_table_query = "DROP TABLE temp_table;"
-        gutils.execute(drop_temp_table_query)
-
-        prog.setValue(100)
+        gutils.restore_rtree_triggers(rtree_triggers)
+        gutils.con.commit()
+    except Exception:
+        gutils.con.rollback()
+        gutils.restore_rtree_triggers(rtree_triggers)
+        prog.close()
+        prog.deleteLater()
+        raise
 
+    prog.setValue(100)
     prog.close()
     QApplication.processEvents()
     prog.deleteLater()
@@ -1740,49 +1732,47 @@ def evaluate_arfwrf(gutils, grid, areas):
         return False
 
 
+# Neighbour offsets (column, row) in FLO-2D order: N, E, S, W, NE, SE, SW, NW
+COMPAS_OFFSETS = ((0, 1), (1, 0), (0, -1), (-1, 0), (1, 1), (1, -1), (-1, -1), (-1, 1))
+
+
+def grid_neighbors_array(fids, xs, ys, cell_size):
+    """
+    Return N x 8 int32 array with neighbour fids (N, E, S, W, NE, SE, SW, NW) of cells given by centroid arrays.
+    Centroids are snapped to integer (column, row) lattice indices and looked up by sorted cell keys.
+    Missing neighbours are 0.
+    """
+    fids = np.asarray(fids, dtype=np.int32)
+    xs = np.asarray(xs, dtype=np.float64)
+    ys = np.asarray(ys, dtype=np.float64)
+    neighbors = np.zeros((fids.size, len(COMPAS_OFFSETS)), dtype=np.int32)
+    if not fids.size:
+        return neighbors
+    # Lattice indices shifted by one so that neighbours of border cells never wrap into another row
+    cols = np.rint((xs - xs.min()) / cell_size).astype(np.int64) + 1
+    rows = np.rint((ys - ys.min()) / cell_size).astype(np.int64) + 1
+    width = int(cols.max()) + 2
+    keys = rows * width + cols
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    sorted_fids = fids[order]
+    last = sorted_keys.size - 1
+    for i, (dc, dr) in enumerate(COMPAS_OFFSETS):
+        neighbor_keys = keys + dr * width + dc
+        idx = np.minimum(np.searchsorted(sorted_keys, neighbor_keys), last)
+        found = sorted_keys[idx] == neighbor_keys
+        neighbors[:, i] = np.where(found, sorted_fids[idx], 0)
+    return neighbors
+
+
 def grid_compas_neighbors(gutils):
     """
     Generator which calculates grid cells neighbors.
     """
     cell_size = float(gutils.get_cont_par("CELLSIZE"))
-
-    def n(x, y):
-        return x, y + cell_size
-
-    def e(x, y):
-        return x + cell_size, y
-
-    def s(x, y):
-        return x, y - cell_size
-
-    def w(x, y):
-        return x - cell_size, y
-
-    def ne(x, y):
-        return x + cell_size, y + cell_size
-
-    def se(x, y):
-        return x + cell_size, y - cell_size
-
-    def sw(x, y):
-        return x - cell_size, y - cell_size
-
-    def nw(x, y):
-        return x - cell_size, y + cell_size
-
-    grid_centroids_map = {QgsPointXY(*point): fid for fid, point in gutils.grid_centroids_all()}
-    compas_functions = [n, e, s, w, ne, se, sw, nw]
-    for point, fid in sorted(grid_centroids_map.items(), key=itemgetter(1)):
-        neighbors = []
-        centroid_x, centroid_y = point.x(), point.y()
-        for compas_fn in compas_functions:
-            neighbor_point = QgsPointXY(*compas_fn(centroid_x, centroid_y))
-            try:
-                neighbour_fid = grid_centroids_map[neighbor_point]
-            except KeyError:
-                neighbour_fid = 0
-            neighbors.append(neighbour_fid)
-        yield neighbors
+    fids, xs, ys = gutils.grid_centroids_array()
+    for row in grid_neighbors_array(fids, xs, ys, cell_size).tolist():
+        yield row
 
 
 def calculate_arfwrf(grid, areas):
@@ -2185,39 +2175,31 @@ def highlight_selected_xsection_b(layer, xs_id):
 
 def buildCellIDNPArray(gutils):
     # construct numpy arrays of key grid parameters such as cellid and elevation
+    # rows go from north to south, columns from west to east, 0 where there is no cell
     starttime = datetime.datetime.now()
     incTime = datetime.datetime.now()
 
-    centroids = gutils.grid_centroids_all()
+    fids, xs, ys = gutils.grid_centroids_array()
     print("Centroids pull time: %s sec" % (datetime.datetime.now() - incTime).total_seconds())
     incTime = datetime.datetime.now()
-    # list in format [gid, [x, y]]
-    xVals = sorted(list(set([item[1][0] for item in centroids])))
-    yVals = sorted(list(set([item[1][1] for item in centroids])))
-
-    centroids = sorted(centroids, key=lambda student: student[0])
+    if not fids.size:
+        return np.zeros((0, 0), dtype=int), np.empty(0), np.empty(0)
 
-    centroids = [(item[1][0], item[1][1], item[0]) for item in centroids]  # flatten list
-
-    centroids = np.array(centroids, dtype=float)
-
-    # yVals = yVals.sort(reverse=True) # place in reverse order per raster orientation
-    xVals = np.array(xVals, dtype=float)
-    yVals = np.array(yVals, dtype=float)
-
-    centroidsXInd = np.searchsorted(xVals, centroids[:, 0], side="right") - 1
-    centroidsYInd = np.searchsorted(yVals, centroids[:, 1], side="right")
+    # Centroids are snapped to the lattice of the cell size, so rows or columns without cells keep their place
+    cell_size = float(gutils.get_cont_par("CELLSIZE"))
+    x_min = xs.min()
+    y_max = ys.max()
+    centroidsXInd = np.rint((xs - x_min) / cell_size).astype(int)
+    centroidsYInd = np.rint((y_max - ys) / cell_size).astype(int)
 
-    centroidsYInd = yVals.shape[0] - centroidsYInd  # for reverse ordering
-    yVals = np.flip(yVals)  # reverse order
+    xVals = x_min + np.arange(centroidsXInd.max() + 1) * cell_size
+    yVals = y_max - np.arange(centroidsYInd.max() + 1) * cell_size
 
     cellIDs = np.zeros((yVals.shape[0], xVals.shape[0]), dtype=int)
     # populate cellIDs array
-    cellIDs[centroidsYInd, centroidsXInd] = centroids[:, 2]
-    # for n in range(centroids.shape[0]):
-    #    cellIDs[centroidsYInd[n], centroidsXInd[n]] = n + 1
+    cellIDs[centroidsYInd, centroidsXInd] = fids
 
-    del centroidsXInd, centroidsYInd, centroids
+    del centroidsXInd, centroidsYInd
     print("Array creation time: %s sec" % (datetime.datetime.now() - incTime).total_seconds())
     print("Total CellID time: %s sec" % (datetime.datetime.now() - starttime).total_seconds())
     return cellIDs, xVals, yVals
@@ -2225,22 +2207,199 @@ def buildCellIDNPArray(gutils):
 
 def buildCellElevNPArray(gutils, cellIDArray):
     starttime = datetime.datetime.now()
-    qry_elevs = """SELECT elevation FROM grid ORDER BY fid"""
+    qry_elevs = """SELECT fid, elevation FROM grid"""
     elevs = gutils.execute(qry_elevs).fetchall()
     print("Elevs pull time: %s sec" % (datetime.datetime.now() - starttime).total_seconds())
     incTime = datetime.datetime.now()
 
-    elevs = np.array(elevs, dtype=float)
-    elevs = elevs[:, 0]
     elevArray = np.zeros(cellIDArray.shape, dtype=float)
-
-    elevArray[cellIDArray != 0] = elevs[cellIDArray[cellIDArray != 0] - 1]
+    if elevs:
+        # NULL elevations are NaN
+        elevs = np.array(elevs, dtype=float)
+        fids = elevs[:, 0].astype(int)
+        elevs_by_fid = np.full(fids.max() + 1, np.nan)
+        elevs_by_fid[fids] = elevs[:, 1]
+        elevArray[cellIDArray != 0] = elevs_by_fid[cellIDArray[cellIDArray != 0]]
     print("Elevs Array assignment time: %s sec" % (datetime.datetime.now() - incTime).total_seconds())
     incTime = datetime.datetime.now()
     print("Total Elev Array Gen time: %s sec" % (datetime.datetime.now() - starttime).total_seconds())
     return elevArray
 
 
+# Levee directions codes of compass directions, the index of COMPAS_OFFSETS is the code - 1
+COMPAS_DIRECTIONS = {"N": 1, "E": 2, "S": 3, "W": 4, "NE": 5, "SE": 6, "SW": 7, "NW": 8}
+
+# Directions clockwise from north, the order of adjacent cells elevations
+CLOCKWISE_DIRECTIONS = (1, 5, 2, 6, 3, 7, 4, 8)
+
+
+class GridLattice(object):
+    """
+    Grid cells on the arrays of buildCellIDNPArray and buildCellElevNPArray, answering point to cell, cell to
+    (row, column), neighbours and elevations queries without SQL. Use 'grid_lattice' to get the cached one.
+    """
+
+    def __init__(self, cell_ids, elevations, x_min, y_max, cell_size):
+        self.cell_ids = cell_ids
+        self.x_min = x_min
+        self.y_max = y_max
+        self.cell_size = cell_size
+        rows, cols = np.nonzero(cell_ids)
+        fids = cell_ids[rows, cols]
+        size = int(fids.max()) + 1 if fids.size else 1
+        self.fid_rows = np.full(size, -1, dtype=int)
+        self.fid_cols = np.full(size, -1, dtype=int)
+        self.fid_rows[fids] = rows
+        self.fid_cols[fids] = cols
+        self.elevations = np.full(size, np.nan)
+        self.set_elevations(elevations)
+        self.changes = None
+
+    @classmethod
+    def from_gutils(cls, gutils):
+        cell_ids, xVals, yVals = buildCellIDNPArray(gutils)
+        elevations = buildCellElevNPArray(gutils, cell_ids)
+        cell_size = float(gutils.get_cont_par("CELLSIZE")) if cell_ids.size else 0.0
+        x_min = xVals[0] if xVals.size else 0.0
+        y_max = yVals[0] if yVals.size else 0.0
+        lattice = cls(cell_ids, elevations, x_min, y_max, cell_size)
+        lattice.changes = gutils.con.total_changes
+        return lattice
+
+    def set_elevations(self, elevations):
+        """
+        Set elevations of cells from array with the layout of the cell ids array.
+        """
+        rows, cols = self.fid_rows, self.fid_cols
+        valid = rows >= 0
+        self.elevations[valid] = elevations[rows[valid], cols[valid]]
+
+    def refresh_elevations(self, gutils):
+        """
+        Reload elevations if the connection changed anything since they were loaded.
+        """
+        changes = gutils.con.total_changes
+        if changes != self.changes:
+            self.set_elevations(buildCellElevNPArray(gutils, self.cell_ids))
+            self.changes = changes
+
+    def row_col(self, fids):
+        """
+        Return (rows, columns) arrays of cells, -1 for fids not in the grid.
+        """
+        fids = np.asarray(fids, dtype=int)
+        known = (fids > 0) & (fids < self.fid_rows.size)
+        rows = np.full(fids.shape, -1, dtype=int)
+        cols = np.full(fids.shape, -1, dtype=int)
+        rows[known] = self.fid_rows[fids[known]]
+        cols[known] = self.fid_cols[fids[known]]
+        return rows, cols
+
+    def cells_at(self, rows, cols):
+        """
+        Return fids of cells at (rows, columns), 0 outside of the grid.
+        """
+        n_rows, n_cols = self.cell_ids.shape
+        inside = (rows >= 0) & (rows < n_rows) & (cols >= 0) & (cols < n_cols)
+        fids = np.zeros(np.shape(rows), dtype=int)
+        fids[inside] = self.cell_ids[rows[inside], cols[inside]]
+        return fids
+
+    def cells_on_points(self, xs, ys):
+        """
+        Return fids of cells containing points, 0 for points outside of the grid.
+        """
+        half = self.cell_size * 0.5
+        xs = np.asarray(xs, dtype=float)
+        ys = np.asarray(ys, dtype=float)
+        if not self.cell_ids.size:
+            return np.zeros(xs.shape, dtype=int)
+        fcols = (xs - (self.x_min - half)) / self.cell_size
+        frows = ((self.y_max + half) - ys) / self.cell_size
+        cols = np.floor(fcols).astype(int)
+        rows = np.floor(frows).astype(int)
+        fids = self.cells_at(rows, cols)
+        # Points on the west or north side of a missing cell are on the cell across that side
+        on_col_side = fcols == cols
+        on_row_side = frows == rows
+        for dr, dc, on_side in ((0, -1, on_col_side), (-1, 0, on_row_side), (-1, -1, on_col_side & on_row_side)):
+            retry = (fids == 0) & on_side
+            if retry.any():
+                fids[retry] = self.cells_at(rows[retry] + dr, cols[retry] + dc)
+        return fids
+
+    def cell_on_point(self, x, y):
+        """
+        Return fid of cell containing point or None, as 'GeoPackageUtils.grid_on_point'.
+        """
+        fid = int(self.cells_on_points([x], [y])[0])
+        return fid if fid else None
+
+    def neighbours(self, fids, directions=CLOCKWISE_DIRECTIONS):
+        """
+        Return array (fids x directions) of neighbour fids in directions given by codes, 0 where there is none.
+        """
+        rows, cols = self.row_col(fids)
+        known = rows >= 0
+        neighbours = np.zeros((rows.size, len(directions)), dtype=int)
+        for i, direction in enumerate(directions):
+            dc, dr = COMPAS_OFFSETS[direction - 1]
+            neighbours[known, i] = self.cells_at(rows[known] - dr, cols[known] + dc)
+        return neighbours
+
+    def neighbour(self, fid, direction):
+        """
+        Return fid of neighbour in direction (code or compass name) or None.
+        """
+        direction = COMPAS_DIRECTIONS.get(direction, direction)
+        neighbour = int(self.neighbours([fid], (direction,))[0, 0])
+        return neighbour if neighbour else None
+
+    def elevations_of(self, fids):
+        """
+        Return elevations array of cells, NaN for NULL elevations and fids not in the grid.
+        """
+        fids = np.asarray(fids, dtype=int)
+        known = (fids > 0) & (fids < self.elevations.size)
+        elevations = np.full(fids.shape, np.nan)
+        elevations[known] = self.elevations[fids[known]]
+        return elevations
+
+    def elevation(self, fid):
+        """
+        Return elevation of cell or None, as 'GeoPackageUtils.grid_value(fid, "elevation")'.
+        """
+        elevation = float(self.elevations_of([fid])[0])
+        return None if np.isnan(elevation) else elevation
+
+    def adjacent_elevations(self, fid, missing=-999):
+        """
+        Return elevations of the 8 adjacent cells clockwise from north, missing value where there is no cell.
+        """
+        neighbours = self.neighbours([fid])[0].tolist()
+        return [self.elevation(n) if n else missing for n in neighbours]
+
+
+# Lattice of the last connection: {id(con): (con, grid version, lattice)}
+_grid_lattices = {}
+
+
+def grid_lattice(gutils):
+    """
+    Return GridLattice of the grid, built once and kept until the grid changes.
+    """
+    version = gutils.grid_version()
+    cached = _grid_lattices.get(id(gutils.con))
+    if cached is not None and cached[0] is gutils.con and cached[1] == version:
+        lattice = cached[2]
+        lattice.refresh_elevations(gutils)
+    else:
+        _grid_lattices.clear()
+        lattice = GridLattice.from_gutils(gutils)
+        _grid_lattices[id(gutils.con)] = (gutils.con, version, lattice)
+    return lattice
+
+
 def adjacent_grid_elevations_np(cell, cellNPArray, elevNPArray):
     # order is N, NE, E, SE, S, SW, W, NW
     row, col = np.nonzero(cellNPArray == cell)
@@ -2280,98 +2439,13 @@ def adjacent_grid_elevations_np(cell, cellNPArray, elevNPArray):
 
 
 def adjacent_grid_elevations(gutils, grid_lyr, cell, cell_size):
-    sel_elev_qry = """SELECT elevation FROM grid WHERE fid = ?;"""
     if grid_lyr is not None:
         if cell != "":
             cell = int(cell)
             grid_count = gutils.count("grid", field="fid")
             # grid_count = len(list(grid_lyr.getFeatures()))
             if grid_count >= cell and cell > 0:
-                currentCell = next(grid_lyr.getFeatures(QgsFeatureRequest(cell)))
-                xx, yy = currentCell.geometry().centroid().asPoint()
-
-                elevs = []
-                # North cell:
-                y = yy + cell_size
-                x = xx
-                grid = gutils.grid_on_point(x, y)
-                if grid is not None:
-                    N_elev = gutils.execute(sel_elev_qry, (grid,)).fetchone()[0]
-                else:
-                    N_elev = -999
-                elevs.append(N_elev)
-
-                # NorthEast cell
-                y = yy + cell_size
-                x = xx + cell_size
-                grid = gutils.grid_on_point(x, y)
-                if grid is not None:
-                    NE_elev = gutils.execute(sel_elev_qry, (grid,)).fetchone()[0]
-                else:
-                    NE_elev = -999
-                elevs.append(NE_elev)
-
-                # East cell:
-                x = xx + cell_size
-                y = yy
-                grid = gutils.grid_on_point(x, y)
-                if grid is not None:
-                    E_elev = gutils.execute(sel_elev_qry, (grid,)).fetchone()[0]
-                else:
-                    E_elev = -999
-                elevs.append(E_elev)
-
-                # SouthEast cell:
-                y = yy - cell_size
-                x = xx + cell_size
-                grid = gutils.grid_on_point(x, y)
-                if grid is not None:
-                    SE_elev = gutils.execute(sel_elev_qry, (grid,)).fetchone()[0]
-                else:
-                    SE_elev = -999
-                elevs.append(SE_elev)
-
-                # South cell:
-                y = yy - cell_size
-                x = xx
-                grid = gutils.grid_on_point(x, y)
-                if grid is not None:
-                    S_elev = gutils.execute(sel_elev_qry, (grid,)).fetchone()[0]
-                else:
-                    S_elev = -999
-                elevs.append(S_elev)
-
-                # SouthWest cell:
-                y = yy - cell_size
-                x = xx - cell_size
-                grid = gutils.grid_on_point(x, y)
-                if grid is not None:
-                    SW_elev = gutils.execute(sel_elev_qry, (grid,)).fetchone()[0]
-                else:
-                    SW_elev = -999
-                elevs.append(SW_elev)
-
-                # West cell:
-                y = yy
-                x = xx - cell_size
-                grid = gutils.grid_on_point(x, y)
-                if grid is not None:
-                    W_elev = gutils.execute(sel_elev_qry, (grid,)).fetchone()[0]
-                else:
-                    W_elev = -999
-                elevs.append(W_elev)
-
-                # NorthWest cell:
-                y = yy + cell_size
-                x = xx - cell_size
-                grid = gutils.grid_on_point(x, y)
-                if grid is not None:
-                    NW_elev = gutils.execute(sel_elev_qry, (grid,)).fetchone()[0]
-                else:
-                    NW_elev = -999
-                elevs.append(NW_elev)
-
-                return elevs
+                return grid_lattice(gutils).adjacent_elevations(cell)
 
 
 def adjacent_average_elevation(gutils, grid_lyr, xx, yy, cell_size):
@@ -2694,190 +2768,35 @@ def three_adjacent_grid_elevations(gutils, grid_lyr, cell, direction, cell_size)
         show_error("ERROR 040420.1715: could not evaluate adjacent cell elevation!")
 
 
-def get_adjacent_cell_elevation(gutils, grid_lyr, cell, dir, cell_size):
+def get_adjacent_cell_elevation(gutils, grid_lyr, cell, dir, cell_size, lattice=None):
     try:
-        sel_elev_qry = """SELECT elevation FROM grid WHERE fid = ?;"""
-        currentCell = next(grid_lyr.getFeatures(QgsFeatureRequest(cell)))
-        xx, yy = currentCell.geometry().centroid().asPoint()
-
-        elev = -999
-        if dir == 1:  # "N"
-            # North cell:
-            y = yy + cell_size
-            x = xx
-            grid = gutils.grid_on_point(x, y)
-            if grid is not None:
-                elev = gutils.execute(sel_elev_qry, (grid,)).fetchone()[0]
-
-        elif dir == 5:  # "NE"
-            # NorthEast cell:
-            y = yy + cell_size
-            x = xx + cell_size
-            grid = gutils.grid_on_point(x, y)
-            if grid is not None:
-                elev = gutils.execute(sel_elev_qry, (grid,)).fetchone()[0]
-
-        elif dir == 2:  # "E"
-            # East cell:
-            x = xx + cell_size
-            y = yy
-            grid = gutils.grid_on_point(x, y)
-            if grid is not None:
-                elev = gutils.execute(sel_elev_qry, (grid,)).fetchone()[0]
-
-        elif dir == 6:  # "SE"
-            # SouthEast cell:
-            y = yy - cell_size
-            x = xx + cell_size
-            grid = gutils.grid_on_point(x, y)
-            if grid is not None:
-                elev = gutils.execute(sel_elev_qry, (grid,)).fetchone()[0]
-
-        elif dir == 3:  # "S"
-            # South cell:
-            y = yy - cell_size
-            x = xx
-            grid = gutils.grid_on_point(x, y)
-            if grid is not None:
-                elev = gutils.execute(sel_elev_qry, (grid,)).fetchone()[0]
-
-        elif dir == 7:  # "SW"
-            # SouthWest cell:
-            y = yy - cell_size
-            x = xx - cell_size
-            grid = gutils.grid_on_point(x, y)
-            if grid is not None:
-                elev = gutils.execute(sel_elev_qry, (grid,)).fetchone()[0]
-
-        elif dir == 4:  # "W"
-            # West cell:
-            y = yy
-            x = xx - cell_size
-            grid = gutils.grid_on_point(x, y)
-            if grid is not None:
-                elev = gutils.execute(sel_elev_qry, (grid,)).fetchone()[0]
-
-        elif dir == 8:  # "NW"
-            # NorthWest cell:
-            y = yy + cell_size
-            x = xx - cell_size
-            grid = gutils.grid_on_point(x, y)
-            if grid is not None:
-                elev = gutils.execute(sel_elev_qry, (grid,)).fetchone()[0]
-
-        else:
+        if dir not in CLOCKWISE_DIRECTIONS:
             show_error("ERROR 160520.1650: Invalid direction!")
-
+            return None
+        if lattice is None:
+            lattice = grid_lattice(gutils)
+        grid = lattice.neighbour(cell, dir)
+        elev = lattice.elevation(grid) if grid is not None else -999
         return grid, elev
     except:
         show_error("ERROR 160520.1644: could not evaluate adjacent cell elevation!")
 
 
-def get_adjacent_cell(gutils, grid_lyr, cell, dir, cell_size):
+def get_adjacent_cell(gutils, grid_lyr, cell, dir, cell_size, lattice=None):
     try:
-        currentCell = next(grid_lyr.getFeatures(QgsFeatureRequest(cell)))
-        xx, yy = currentCell.geometry().centroid().asPoint()
-
-        elev = -999
-        if dir == "N":
-            # North cell:
-            y = yy + cell_size
-            x = xx
-            grid = gutils.grid_on_point(x, y)
-
-        elif dir == "NE":
-            # NorthEast cell:
-            y = yy + cell_size
-            x = xx + cell_size
-            grid = gutils.grid_on_point(x, y)
-
-        elif dir == "E":
-            # East cell:
-            x = xx + cell_size
-            y = yy
-            grid = gutils.grid_on_point(x, y)
-
-        elif dir == "SE":
-            # SouthEast cell:
-            y = yy - cell_size
-            x = xx + cell_size
-            grid = gutils.grid_on_point(x, y)
-
-        elif dir == "S":
-            # South cell:
-            y = yy - cell_size
-            x = xx
-            grid = gutils.grid_on_point(x, y)
-
-        elif dir == "SW":
-            # SouthWest cell:
-            y = yy - cell_size
-            x = xx - cell_size
-            grid = gutils.grid_on_point(x, y)
-
-        elif dir == "W":
-            # West cell:
-            y = yy
-            x = xx - cell_size
-            grid = gutils.grid_on_point(x, y)
-
-        elif dir == "NW":
-            # NorthWest cell:
-            y = yy + cell_size
-            x = xx - cell_size
-            grid = gutils.grid_on_point(x, y)
-
-        else:
+        if dir not in COMPAS_DIRECTIONS:
             show_error("ERROR 090321.1623: Invalid direction!")
-
-        return grid
+            return None
+        if lattice is None:
+            lattice = grid_lattice(gutils)
+        return lattice.neighbour(cell, dir)
     except:
         show_error("ERROR 090321.1624: could not evaluate adjacent cell!")
 
 
 def adjacent_grids(gutils, currentCell, cell_size):
-    xx, yy = currentCell.geometry().centroid().asPoint()
-
-    # North cell:
-    y = yy + cell_size
-    x = xx
-    n_grid = gutils.grid_on_point(x, y)
-
-    # NorthEast cell
-    y = yy + cell_size
-    x = xx + cell_size
-    ne_grid = gutils.grid_on_point(x, y)
-
-    # East cell:
-    x = xx + cell_size
-    y = yy
-    e_grid = gutils.grid_on_point(x, y)
-
-    # SouthEast cell:
-    y = yy - cell_size
-    x = xx + cell_size
-    se_grid = gutils.grid_on_point(x, y)
-
-    # South cell:
-    y = yy - cell_size
-    x = xx
-    s_grid = gutils.grid_on_point(x, y)
-
-    # SouthWest cell:
-    y = yy - cell_size
-    x = xx - cell_size
-    sw_grid = gutils.grid_on_point(x, y)
-
-    # West cell:
-    y = yy
-    x = xx - cell_size
-    w_grid = gutils.grid_on_point(x, y)
-
-    # NorthWest cell:
-    y = yy + cell_size
-    x = xx - cell_size
-    nw_grid = gutils.grid_on_point(x, y)
-
+    neighbours = grid_lattice(gutils).neighbours([currentCell.id()])[0].tolist()
+    n_grid, ne_grid, e_grid, se_grid, s_grid, sw_grid, w_grid, nw_grid = [n if n else None for n in neighbours]
     return n_grid, ne_grid, e_grid, se_grid, s_grid, sw_grid, w_grid, nw_grid
 
 def domain_tendency(gutils, grid_lyr, cell, cell_size):
@@ -493,7 +493,7 @@ class InfiltrationCalculator(object):
             self.fill_nodata()
         else:
             pass
-        sampler = raster2grid(self.grid_lyr, temp_file_path, iface)
+        sampler = raster2grid(self.grid_lyr, temp_file_path, iface, gutils=self.gutils)
 
         grid_params = {}
         default_count = 0
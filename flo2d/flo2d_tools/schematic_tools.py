@@ -27,15 +27,19 @@ from qgis.core import (
 from qgis.PyQt.QtWidgets import QApplication
 
 from ..geopackage_utils import GeoPackageUtils
+from ..misc import gpkg_binary
 from .grid_tools import (
     buildCellIDNPArray,
     fid_from_grid,
-    fid_from_grid_features,
-    get_adjacent_cell_elevation,
+    grid_lattice,
     spatial_index,
 )
 
 
+# Levee direction opposite to each levee direction
+OPPOSITE_DIRECTIONS = {1: 3, 2: 4, 3: 1, 4: 2, 5: 7, 6: 8, 7: 5, 8: 6}
+
+
 # Levees tools
 def get_intervals(line_feature, point_features, col_value, buffer_size):
     """
@@ -211,7 +215,162 @@ def levee_grid_isect_pts(levee_fid, grid_fid, levee_lyr, grid_lyr, with_centroid
         return pts, None
 
 
+def user_levee_segments(gutils):
+    """
+    Return segments of user levee lines as (line fids, part numbers, x1, y1, x2, y2) arrays in drawing order and
+    {line fid: (failElev, failDepth, failDuration, failBaseElev, failMaxWidth, failVRate, failHRate, elev, correction)}.
+    """
+    qry = """SELECT fid, geom, failElev, failDepth, failDuration, failBaseElev, failMaxWidth, failVRate, failHRate,
+                    elev, correction
+             FROM user_levee_lines ORDER BY fid;"""
+    lids, parts, segments = [], [], []
+    attributes = {}
+    for row in gutils.execute(qry):
+        lid, geom = row[0], row[1]
+        attributes[lid] = row[2:]
+        if not geom:
+            continue
+        for coords in gpkg_binary.decode(geom)[1]:
+            if len(coords) < 2:
+                continue
+            lids.append(np.full(len(coords) - 1, lid, dtype=int))
+            parts.append(np.full(len(coords) - 1, len(parts), dtype=int))
+            segments.append(np.hstack((coords[:-1], coords[1:])))
+    if not segments:
+        return np.empty(0, dtype=int), np.empty(0, dtype=int), *np.empty((4, 0)), attributes
+    segments = np.vstack(segments)
+    return np.concatenate(lids), np.concatenate(parts), *segments.T, attributes
+
+
+def segment_cells(x1, y1, x2, y2, lattice):
+    """
+    Return (segment indexes, cell fids, entry, exit) of segments crossing grid cells of the lattice. Entry and exit
+    are positions along segments (0 at start, 1 at end) where they enter and leave cell squares. Segments only
+    touching a cell are left out, as their intersection is a point.
+    """
+    cell_size = lattice.cell_size
+    half = cell_size * 0.5
+    left, top = lattice.x_min - half, lattice.y_max + half
+    dx, dy = x2 - x1, y2 - y1
+
+    # Candidate cells from pieces not longer than a cell, so each piece touches at most 3 x 3 cells
+    pieces = np.maximum(np.ceil(np.hypot(dx, dy) / cell_size), 1).astype(int)
+    seg = np.repeat(np.arange(x1.size), pieces)
+    k = np.arange(seg.size) - np.repeat(np.cumsum(pieces) - pieces, pieces)
+    ta, tb = k / pieces[seg], (k + 1) / pieces[seg]
+    xa, xb = x1[seg] + dx[seg] * ta, x1[seg] + dx[seg] * tb
+    ya, yb = y1[seg] + dy[seg] * ta, y1[seg] + dy[seg] * tb
+    eps = 1e-9
+    col_lo = np.ceil((np.minimum(xa, xb) - left) / cell_size - eps).astype(int) - 1
+    col_hi = np.floor((np.maximum(xa, xb) - left) / cell_size + eps).astype(int)
+    row_lo = np.ceil((top - np.maximum(ya, yb)) / cell_size - eps).astype(int) - 1
+    row_hi = np.floor((top - np.minimum(ya, yb)) / cell_size + eps).astype(int)
+    stride = lattice.fid_rows.size
+    keys = []
+    for dr in range(4):
+        for dc in range(4):
+            rows, cols = row_lo + dr, col_lo + dc
+            near = (rows <= row_hi) & (cols <= col_hi)
+            fids = lattice.cells_at(rows[near], cols[near])
+            keys.append(seg[near][fids > 0] * stride + fids[fids > 0])
+    keys = np.unique(np.concatenate(keys))
+    seg, fids = keys // stride, keys % stride
+
+    # Liang-Barsky clipping of the segments to the cell squares
+    rows, cols = lattice.row_col(fids)
+    cx = lattice.x_min + cols * cell_size
+    cy = lattice.y_max - rows * cell_size
+    sx, sy, sdx, sdy = x1[seg], y1[seg], dx[seg], dy[seg]
+    t_in = np.zeros(seg.size)
+    t_out = np.ones(seg.size)
+    crossing = np.ones(seg.size, dtype=bool)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for p, q in ((-sdx, sx - (cx - half)), (sdx, cx + half - sx), (-sdy, sy - (cy - half)), (sdy, cy + half - sy)):
+            t = q / p
+            crossing &= (p != 0) | (q >= 0)
+            t_in = np.where(p < 0, np.maximum(t_in, t), t_in)
+            t_out = np.where(p > 0, np.minimum(t_out, t), t_out)
+    crossing &= t_in < t_out
+    return seg[crossing], fids[crossing], t_in[crossing], t_out[crossing]
+
+
+def octagon_side_masks(x1, y1, x2, y2, cx, cy):
+    """
+    Return bit masks of octagon sides (bit 0 for north, then clockwise) of lines entering cells at (x1, y1) and
+    leaving at (x2, y2), with the angles of 'levee_schematic'. Lines entering and leaving by the same octagon node
+    have no sides.
+    """
+
+    def angle(x, y):
+        a = np.arctan2(y, x)
+        return np.where(a < 0, a + 2 * pi, a)
+
+    a1, a2 = angle(x1 - cx, y1 - cy), angle(x2 - cx, y2 - cy)
+    a = a2 - a1
+    clockwise = np.where(a < 0, a + 2 * pi, a) >= pi
+    # Nearest octagon nodes from azimuths of entry and leaving points
+    nodes = []
+    for ai in (a1, a2):
+        azimuth = pi / 2 - ai
+        azimuth = np.where(azimuth < 0, azimuth + 2 * pi, azimuth)
+        nodes.append(np.floor(azimuth / (pi / 4)).astype(int) % 8)
+    n1, n2 = nodes
+    first = np.where(clockwise, n1 + 1, n2 + 1) % 8
+    last = np.where(clockwise, n2, n1)
+    count = np.where(n1 == n2, 0, (last - first) % 8 + 1)
+    masks = np.zeros(x1.size, dtype=int)
+    for side in range(8):
+        masks |= (((side - first) % 8) < count).astype(int) << side
+    return masks
+
+
+def levee_cell_sides(lids, parts, x1, y1, x2, y2, lattice):
+    """
+    Return (cell fids, line fids, octagon sides masks) of levee lines crossing grid cells, sorted by cell and line.
+    Crossings are split where lines touch cell boundaries, as the parts of a line and cell square intersection.
+    """
+    seg, fids, t_in, t_out = segment_cells(x1, y1, x2, y2, lattice)
+    order = np.lexsort((seg, parts[seg], fids))
+    seg, fids, t_in, t_out = seg[order], fids[order], t_in[order], t_out[order]
+    rows, cols = lattice.row_col(fids)
+    cx = lattice.x_min + cols * lattice.cell_size
+    cy = lattice.y_max - rows * lattice.cell_size
+
+    # Crossings of consecutive segments continue through segment vertices inside the cell
+    half = lattice.cell_size * 0.5
+    inside = (np.abs(x1[seg] - cx) < half) & (np.abs(y1[seg] - cy) < half)
+    continued = np.zeros(seg.size, dtype=bool)
+    continued[1:] = (
+        (fids[1:] == fids[:-1])
+        & (parts[seg[1:]] == parts[seg[:-1]])
+        & (seg[1:] == seg[:-1] + 1)
+        & (t_out[:-1] == 1)
+        & (t_in[1:] == 0)
+        & inside[1:]
+    )
+    starts = np.flatnonzero(~continued)
+    ends = np.append(starts[1:], seg.size) - 1
+    dx, dy = x2 - x1, y2 - y1
+    px1 = x1[seg[starts]] + dx[seg[starts]] * t_in[starts]
+    py1 = y1[seg[starts]] + dy[seg[starts]] * t_in[starts]
+    px2 = x1[seg[ends]] + dx[seg[ends]] * t_out[ends]
+    py2 = y1[seg[ends]] + dy[seg[ends]] * t_out[ends]
+    masks = octagon_side_masks(px1, py1, px2, py2, cx[starts], cy[starts])
+
+    # Sides of all crossings of a line in a cell
+    stride = int(lids.max()) + 1 if lids.size else 1
+    keys, inverse = np.unique(fids[starts] * stride + lids[seg[starts]], return_inverse=True)
+    cell_masks = np.zeros(keys.size, dtype=int)
+    np.bitwise_or.at(cell_masks, inverse, masks)
+    return keys // stride, keys % stride, cell_masks
+
+
 def generate_schematic_levees(gutils, levee_lyr, grid_lyr):
+    """
+    Schematize user levee lines into levee directions of the grid cells octagons. Sides crossed by the lines are
+    found for all cells at once and levee data written with single inserts. Yields (number of cells, number of
+    levee directions, number of levee failures, None) once.
+    """
     try:
         # octagon nodes to sides map
         octagon_levee_dirs = {0: 1, 1: 5, 2: 2, 3: 6, 4: 3, 5: 7, 6: 4, 7: 8}
@@ -282,128 +441,86 @@ def generate_schematic_levees(gutils, levee_lyr, grid_lyr):
             ),
         }
 
-        # lid_gid_elev = fid_from_grid(gutils, "user_levee_lines", None, False, False, "elevation")
-        # print (lid_gid_elev[0])
-        # get user levee lines features
         print("Deleting existing schematized levee and levee failure elements")
         del_levees_sql = """DELETE FROM levee_data  WHERE user_line_fid IS NOT NULL;"""
         del_levee_failures_sql = """DELETE FROM levee_failure;"""
         gutils.con.execute(del_levees_sql)
         gutils.con.execute(del_levee_failures_sql)
         gutils.con.commit()
-        print("Intersecting levee elements with grid")
-
-        for lid_gid_elev, regionReq in fid_from_grid_features(
-            gutils, grid_lyr, levee_lyr
-        ):  # "user_levee_lines", None, False, False, "elevation")
-            # print (lid_gid_elev[0])
-            cell_size = float(gutils.get_cont_par("CELLSIZE"))
-            scale = 0.9
-            # square half
-            sh = cell_size * 0.5 * scale
-            # octagon half
-            oh = sh / 2.414
-            schem_lines = levee_schematic(lid_gid_elev, levee_lyr, grid_lyr)
-
-            ins_levees_sql = """INSERT INTO levee_data (grid_fid, ldir, levcrest, user_line_fid, geom)
-                         VALUES (?,?,?,?, AsGPB(ST_GeomFromText(?)));"""
-
-            ins_levees_failure_sql = """INSERT INTO levee_failure (grid_fid, lfaildir, failevel, failtime,
-                                                              levbase, failwidthmax, failrate, failwidrate)
-                                         VALUES (?,?,?,?,?,?,?,?);"""
-
-            select_user_levees_qry = """SELECT failElev, failDepth, failDuration, failBaseElev, failMaxWidth, 
-                                                            failVRate, failHRate, elev, correction
-                                FROM user_levee_lines 
-                                WHERE fid = ?"""
-
-            # Create levee segments for distinct levee directions in each grid element
-            grid_levee_seg = {}
-            data = []
-            fail_data = []
-            for gid, gdata in schem_lines.items():
-                elev = gdata["elev"]
-                grid_levee_seg[gid] = {}
-                grid_levee_seg[gid]["sides"] = {}
-                grid_levee_seg[gid]["centroid"] = gdata["centroid"]
-                for lid, sides in gdata["lines"].items():
-                    if sides:
-                        for side in sides:
-                            if side not in list(grid_levee_seg[gid]["sides"].keys()):
-                                side_elev = elev
-                                grid_levee_seg[gid]["sides"][side] = lid
-                                ldir = octagon_levee_dirs[side]
-                                c = gdata["centroid"]
-
-                                user_levees_data = gutils.con.execute(select_user_levees_qry, (lid,)).fetchone()
-                                if user_levees_data:
-                                    if not all(v in (0, NULL) for v in user_levees_data): # Treat both 0 and NULL as unset user levee values.
-                                        if user_levees_data[0] not in (NULL, 0):
-                                            # failElev selected, use it.
-                                            fail_data.append(
-                                                (
-                                                    gid,
-                                                    ldir,
-                                                    user_levees_data[0],
-                                                    user_levees_data[2],
-                                                    user_levees_data[3],
-                                                    user_levees_data[4],
-                                                    user_levees_data[5],
-                                                    user_levees_data[6],
-                                                )
-                                            )
-                                        elif user_levees_data[1] not in (NULL, 0):
-                                            # failDepth selected, use adjacent cell elevations to calculate fail elevation.
-
-                                            (
-                                                adj_cell,
-                                                adj_elev,
-                                            ) = get_adjacent_cell_elevation(gutils, grid_lyr, gid, ldir, cell_size)
-                                            grid_elev = gutils.grid_value(gid, "elevation")
-                                            max_elev = max(adj_elev, grid_elev)
-
-                                            fail_data.append(
-                                                (
-                                                    gid,
-                                                    ldir,
-                                                    max_elev + user_levees_data[1],
-                                                    user_levees_data[2],
-                                                    user_levees_data[3],
-                                                    user_levees_data[4],
-                                                    user_levees_data[5],
-                                                    user_levees_data[6],
-                                                )
-                                            )
-                                        else:  # do not set failure data for this direction.
-                                            pass
-
-                                        if user_levees_data[7] is NULL:  # crest elevation in user levees not defined
-                                            (
-                                                adj_cell,
-                                                adj_elev,
-                                            ) = get_adjacent_cell_elevation(gutils, grid_lyr, gid, ldir, cell_size)
-                                            side_elev = max(adj_elev, elev)
-
-                                data.append(
-                                    (
-                                        gid,
-                                        ldir,
-                                        side_elev,
-                                        lid,
-                                        "LINESTRING({0} {1}, {2} {3})".format(
-                                            *levee_dir_pts[ldir](c.x(), c.y(), sh, oh)
-                                        ),
-                                    )
-                                )
 
-            gutils.con.executemany(ins_levees_sql, data)
+        print("Intersecting levee elements with grid")
+        lattice = grid_lattice(gutils)
+        lids, parts, x1, y1, x2, y2, user_levees = user_levee_segments(gutils)
+        gids, lids, masks = levee_cell_sides(lids, parts, x1, y1, x2, y2, lattice)
+
+        # Each side of a cell goes to the first levee line (by fid) crossing it
+        sides = np.tile(np.arange(8), gids.size)
+        cell_gids, cell_lids, cell_masks = np.repeat(gids, 8), np.repeat(lids, 8), np.repeat(masks, 8)
+        crossed = (cell_masks >> sides) & 1 == 1
+        cell_gids, cell_lids, sides = cell_gids[crossed], cell_lids[crossed], sides[crossed]
+        order = np.lexsort((cell_lids, sides, cell_gids))
+        first = order[np.unique(cell_gids[order] * 8 + sides[order], return_index=True)[1]]
+        first = first[np.lexsort((sides[first], cell_lids[first], cell_gids[first]))]
+        cell_gids, cell_lids, sides = cell_gids[first], cell_lids[first], sides[first]
+
+        # Elevations of cells and of adjacent cells across the sides
+        elevs = lattice.elevations_of(cell_gids)
+        adj_gids = lattice.neighbours(cell_gids)[np.arange(sides.size), sides]
+        adj_elevs = np.where(adj_gids > 0, lattice.elevations_of(adj_gids), -999)
+        max_elevs = np.fmax(adj_elevs, elevs)
+        rows, cols = lattice.row_col(cell_gids)
+        xs = lattice.x_min + cols * lattice.cell_size
+        ys = lattice.y_max - rows * lattice.cell_size
+
+        cell_size = lattice.cell_size
+        scale = 0.9
+        # square half
+        sh = cell_size * 0.5 * scale
+        # octagon half
+        oh = sh / 2.414
+
+        ins_levees_sql = """INSERT INTO levee_data (grid_fid, ldir, levcrest, user_line_fid, geom)
+                     VALUES (?,?,?,?,?);"""
+
+        ins_levees_failure_sql = """INSERT INTO levee_failure (grid_fid, lfaildir, failevel, failtime,
+                                                          levbase, failwidthmax, failrate, failwidrate)
+                                     VALUES (?,?,?,?,?,?,?,?);"""
+
+        data = []
+        fail_data = []
+        for gid, lid, side, elev, max_elev, x, y in zip(
+            cell_gids.tolist(),
+            cell_lids.tolist(),
+            sides.tolist(),
+            elevs.tolist(),
+            max_elevs.tolist(),
+            xs.tolist(),
+            ys.tolist(),
+        ):
+            elev = None if math.isnan(elev) else elev
+            side_elev = elev
+            ldir = octagon_levee_dirs[side]
+            user_levees_data = user_levees[lid]
+            if not all(v in (0, NULL) for v in user_levees_data):  # Treat both 0 and NULL as unset user levee values.
+                if user_levees_data[0] not in (NULL, 0):
+                    # failElev selected, use it.
+                    fail_data.append((gid, ldir, user_levees_data[0]) + tuple(user_levees_data[2:7]))
+                elif user_levees_data[1] not in (NULL, 0):
+                    # failDepth selected, use adjacent cell elevations to calculate fail elevation.
+                    fail_data.append((gid, ldir, max_elev + user_levees_data[1]) + tuple(user_levees_data[2:7]))
+                else:  # do not set failure data for this direction.
+                    pass
 
-            gutils.con.executemany(ins_levees_failure_sql, fail_data)
+                if user_levees_data[7] is NULL:  # crest elevation in user levees not defined
+                    side_elev = max_elev
 
-            gutils.con.commit()
-            yield (len(schem_lines), len(data), len(fail_data), regionReq)
+            seg = levee_dir_pts[ldir](x, y, sh, oh)
+            data.append((gid, ldir, side_elev, lid, gpkg_binary.encode_linestring((seg[:2], seg[2:]))))
 
-        # return len(schem_lines), len(data), len(fail_data)
+        gutils.con.executemany(ins_levees_sql, data)
+        gutils.con.executemany(ins_levees_failure_sql, fail_data)
+        gutils.con.commit()
+        yield (len(np.unique(cell_gids)), len(data), len(fail_data), None)
     except Exception as e:
         raise e
         # self.uc.show_error("ERROR 291219.0428: Error while creating schematic levees octagons!.\n", e)
@@ -536,13 +653,13 @@ def delete_levee_directions_duplicates(gutils, levees, grid_lyr):
     Eliminate levee opposite directions. Select the one with highest crest elevation.
     """
     try:
-        cell_size = float(gutils.get_cont_par("CELLSIZE"))
         levees_qry = "SELECT grid_fid, ldir, levcrest FROM levee_data ORDER BY grid_fid"
         sel_levee_qry = "SELECT levcrest FROM levee_data WHERE grid_fid = ? AND ldir = ?"
         delete_qry = "DELETE FROM levee_data WHERE grid_fid = ? AND ldir = ?"
         delete_failure_qry = "DELETE FROM levee_failure WHERE grid_fid = ? and lfaildir = ?;"
 
         levees = gutils.execute(levees_qry).fetchall()
+        lattice = grid_lattice(gutils)
         toDelete = []
         for nextLevee in levees:
             #         for nextLevee in levees.getFeatures():
@@ -556,61 +673,11 @@ def delete_levee_directions_duplicates(gutils, levees, grid_lyr):
             crest = nextLevee[2]
 
             oppositeCrest = None
-            cellFeat = next(grid_lyr.getFeatures(QgsFeatureRequest(cell)))
-            xx, yy = cellFeat.geometry().centroid().asPoint()
-            if dir == 1:  # "N"
-                # North cell:
-                y = yy + cell_size
-                x = xx
-                dirOpp = 3
-
-            elif dir == 5:  # "NE"
-                # NorthEast cell:
-                y = yy + cell_size
-                x = xx + cell_size
-                dirOpp = 7
-
-            elif dir == 2:  # "E"
-                # East cell:
-                y = yy
-                x = xx + cell_size
-                dirOpp = 4
-
-            elif dir == 6:  # "SE"
-                # SouthEast cell:
-                y = yy - cell_size
-                x = xx + cell_size
-                dirOpp = 8
-
-            elif dir == 3:  # "S"
-                # South cell:
-                y = yy - cell_size
-                x = xx
-                dirOpp = 1
-
-            elif dir == 7:  # "SW"
-                # SouthWest cell:
-                y = yy - cell_size
-                x = xx - cell_size
-                dirOpp = 5
-
-            elif dir == 4:  # "W"
-                # West cell:
-                y = yy
-                x = xx - cell_size
-                dirOpp = 2
-
-            elif dir == 8:  # "NW"
-                # NorthWest cell:
-                y = yy + cell_size
-                x = xx - cell_size
-                dirOpp = 6
-
-            else:
-                X = -99
-                y = -99
+            dirOpp = OPPOSITE_DIRECTIONS.get(dir)
+            if dirOpp is None:
+                continue
 
-            oppositeCell = gutils.grid_on_point(x, y)
+            oppositeCell = lattice.neighbour(cell, dir)
             if oppositeCell is not None:
                 oppositeCrest = gutils.execute(sel_levee_qry, (oppositeCell, dirOpp)).fetchone()
                 if oppositeCrest:
@@ -13,6 +13,7 @@ import shutil
 import zipfile
 import traceback
 from collections import defaultdict
+from contextlib import contextmanager
 from functools import wraps
 
 from qgis.PyQt.QtWidgets import QProgressDialog, QApplication
@@ -20,10 +21,12 @@ from osgeo import ogr, gdal
 from qgis.PyQt.QtCore import NULL
 from qgis._core import QgsVectorLayer, QgsProject, QgsRasterLayer
 from qgis.core import QgsGeometry, QgsVectorFileWriter
+from .misc import gpkg_binary
 from .user_communication import UserCommunication
 
 import sqlite3
 
+import numpy as np
 import processing
 
 def connection_required(fn):
@@ -77,6 +80,135 @@ def spatialite_connect(*args, **kwargs):
     return dbapi2.connect(*args, **kwargs)
 
 
+# Candidate cells bounding box filter through the grid R-tree. While the index is rebuilt in bulk (empty)
+# every grid cell stays a candidate.
+GRID_RTREE_FILTER = """g.fid IN (
+            SELECT id FROM rtree_grid_geom
+            WHERE minx <= ST_MaxX(NEW.geom) AND maxx >= ST_MinX(NEW.geom)
+            AND miny <= ST_MaxY(NEW.geom) AND maxy >= ST_MinY(NEW.geom)
+            UNION ALL
+            SELECT fid FROM grid WHERE NOT EXISTS (SELECT 1 FROM rtree_grid_geom))
+        AND """
+CELL_LOOKUP_PATTERN = re.compile(r"WHERE(\s+)(ST_(?:Intersects|Crosses)\(CastAutomagic\(g\.geom\),\s*CastAutomagic\(NEW\.geom\)\))")
+
+
+def rtree_prefiltered_trigger_sql(sql):
+    """
+    Return trigger SQL with grid cell lookups ('FROM grid as g WHERE ST_Intersects(...)') prefiltered by grid R-tree.
+    """
+    if "rtree_grid_geom" in sql:
+        return sql
+    return CELL_LOOKUP_PATTERN.sub(lambda m: "WHERE" + m.group(1) + GRID_RTREE_FILTER + m.group(2), sql)
+
+
+# Foreign key columns indexed in every table having them.
+INDEXED_COLUMNS = (
+    "grid_fid",
+    "area_fid",
+    "line_fid",
+    "seg_fid",
+    "elem_fid",
+    "series_fid",
+    "struct_fid",
+    "user_xs_fid",
+    "chan_n_nxsecnum",
+    "swmm_rt_fid",
+    "params_fid",
+    "table_fid",
+)
+
+# Additional indexes on join and filter columns (table, columns).
+TABLE_INDEXES = (
+    ("schema_md_cells", ("domain_fid", "grid_fid")),
+    ("schema_md_cells", ("domain_cell",)),
+    ("raincell_data", ("time_interval", "rrgrid")),
+    ("raincellraw", ("nxrdgd", "r_time")),
+    ("flo2d_raincell", ("iraindum",)),
+    ("chan_elems", ("fid",)),
+    ("chan_elems", ("rbankgrid",)),
+    ("struct", ("inflonod",)),
+    ("struct", ("outflonod",)),
+)
+
+# Version of the managed indexes stored as 'INDEXES_V' in metadata table, bump it when the lists above change.
+MANAGED_INDEXES_VERSION = 1
+
+# Lookups used by the plugin checked by 'GeoPackageUtils.audit_query_plans'.
+AUDIT_QUERIES = (
+    """UPDATE schema_md_cells SET domain_cell = ? WHERE grid_fid = ?;""",
+    """SELECT grid_fid, domain_cell FROM schema_md_cells WHERE domain_fid = ?;""",
+    """SELECT fid FROM chan_elems WHERE rbankgrid = ?;""",
+    """SELECT fid FROM chan_elems WHERE fid = ?;""",
+    """SELECT fid FROM struct WHERE inflonod = ?;""",
+    """SELECT fid FROM struct WHERE outflonod = ?;""",
+    """SELECT rrgrid, iraindum FROM raincell_data WHERE time_interval = ? ORDER BY rrgrid;""",
+    """SELECT grid_fid FROM inflow_cells WHERE grid_fid = ?;""",
+    """SELECT grid_fid FROM outflow_cells WHERE grid_fid = ?;""",
+    """SELECT grid_fid FROM blocked_cells WHERE grid_fid = ?;""",
+    """SELECT grid_fid FROM reservoirs WHERE grid_fid = ?;""",
+    """SELECT grid_fid FROM levee_data WHERE grid_fid = ?;""",
+    """SELECT grid_fid FROM sed_supply_cells WHERE area_fid = ?;""",
+    """SELECT wselstart FROM chan_wsel WHERE seg_fid = ?;""",
+    """SELECT elem_fid, nxsecnum FROM chan_n WHERE elem_fid = ?;""",
+    """SELECT xi, yi FROM xsec_n_data WHERE chan_n_nxsecnum = ?;""",
+    """SELECT time, value FROM rain_time_series_data WHERE series_fid = ?;""",
+    """SELECT xup, yup, yb FROM bridge_xs WHERE struct_fid = ?;""",
+)
+
+
+# Grid edits bumping 'GeoPackageUtils.grid_version' counter (trigger name suffix, trigger event).
+GRID_VERSION_EVENTS = {
+    "insert": "INSERT",
+    "delete": "DELETE",
+    "update": "UPDATE OF geom",
+}
+
+
+def index_name(table, columns):
+    return "idx_{0}_{1}".format(table, "_".join(columns))
+
+
+def managed_indexes(con):
+    """
+    Return list of (index name, table, columns) of managed indexes applicable to the database tables.
+    """
+    cur = con.cursor()
+    tables = [
+        row[0]
+        for row in cur.execute("""SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'rtree_%';""")
+    ]
+    table_columns = {}
+    for table in tables:
+        table_columns[table] = {row[1] for row in cur.execute('PRAGMA table_info("{0}");'.format(table))}
+    indexes = []
+    for table in tables:
+        for column in INDEXED_COLUMNS:
+            if column in table_columns[table]:
+                indexes.append((index_name(table, (column,)), table, (column,)))
+    for table, columns in TABLE_INDEXES:
+        if table in table_columns and all(column in table_columns[table] for column in columns):
+            indexes.append((index_name(table, columns), table, columns))
+    cur.close()
+    return indexes
+
+
+def create_managed_indexes(con):
+    """
+    Create missing managed indexes. Returns number of created indexes.
+    """
+    cur = con.cursor()
+    existing = {row[0] for row in cur.execute("""SELECT name FROM sqlite_master WHERE type = 'index';""")}
+    created = 0
+    for name, table, columns in managed_indexes(con):
+        if name in existing:
+            continue
+        cols = ", ".join('"{0}"'.format(column) for column in columns)
+        cur.execute('CREATE INDEX IF NOT EXISTS "{0}" ON "{1}" ({2});'.format(name, table, cols))
+        created += 1
+    cur.close()
+    return created
+
+
 def database_create(path):
     """
     Create geopackage with SpatiaLite functions.
@@ -97,6 +229,11 @@ def database_create(path):
         qry = file.read()
     c = con.cursor()
     c.executescript(qry)
+    create_managed_indexes(con)
+    c.execute(
+        """INSERT INTO metadata (name, value, note) VALUES (?,?,?);""",
+        ("INDEXES_V", MANAGED_INDEXES_VERSION, GeoPackageUtils.METADATA_DESCRIPTION["INDEXES_V"]),
+    )
     con.commit()
     c.close()
     return con
@@ -170,6 +307,7 @@ class GeoPackageUtils(object):
         ["QGIS_V", "QGIS Version"],
         ["FLO-2D_V", "FLO-2D Build Version"],
         ["CRS", "Coordinate Reference System"],
+        ["INDEXES_V", "Managed Indexes Version"],
     ]
 
     _descriptions = [
@@ -280,11 +418,214 @@ class GeoPackageUtils(object):
         'user_building_collapse', 'building_collapse_cells', 'flo2d_raincell', 'raincellraw'
     ]
 
+    # Active bulk sessions keyed by connection id -> nesting depth. Shared by all instances using the same connection.
+    _bulk_sessions = {}
+
     def __init__(self, con, iface):
         self.iface = iface
         self.uc = UserCommunication(iface, "FLO-2D")
         self.con = con
 
+    @property
+    def in_bulk_session(self):
+        return id(self.con) in self._bulk_sessions
+
+    def commit(self):
+        """
+        Commit current transaction unless a bulk session is grouping the writes.
+        """
+        if not self.in_bulk_session:
+            self.con.commit()
+
+    def spatial_index_tables(self, *tables):
+        """
+        Return [(table, geometry column)] of the given tables (all when none given) having GeoPackage R-tree index.
+        """
+        qry = """SELECT table_name, column_name FROM gpkg_extensions WHERE extension_name = 'gpkg_rtree_index';"""
+        indexed = self.execute(qry).fetchall()
+        if tables:
+            indexed = [(tab, col) for tab, col in indexed if tab in tables]
+        return indexed
+
+    def drop_rtree_triggers(self, *tables):
+        """
+        Drop R-tree maintenance triggers of the given tables (all indexed tables when none given).
+        Returns {(table, column): [(trigger name, trigger sql)]} to be passed to 'restore_rtree_triggers'.
+        """
+        saved = {}
+        for table, column in self.spatial_index_tables(*tables):
+            prefix = "rtree_{0}_{1}_".format(table, column)
+            qry = """SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = ?;"""
+            triggers = [(name, sql) for name, sql in self.execute(qry, (table,)) if name.startswith(prefix)]
+            for name, sql in triggers:
+                self.execute('DROP TRIGGER IF EXISTS "{0}";'.format(name))
+            saved[(table, column)] = triggers
+        return saved
+
+    def rebuild_rtree(self, table, column="geom"):
+        """
+        Repopulate R-tree index of the table with a single bulk insert.
+        """
+        rtree = "rtree_{0}_{1}".format(table, column)
+        self.execute('DELETE FROM "{0}";'.format(rtree))
+        qry = """
+        INSERT INTO "{0}"
+        SELECT ROWID, ST_MinX("{2}"), ST_MaxX("{2}"), ST_MinY("{2}"), ST_MaxY("{2}")
+        FROM "{1}"
+        WHERE "{2}" NOT NULL AND NOT ST_IsEmpty("{2}");"""
+        self.execute(qry.format(rtree, table, column))
+
+    def restore_rtree_triggers(self, saved):
+        """
+        Rebuild R-tree indexes and recreate the triggers dropped by 'drop_rtree_triggers'.
+        Tables whose triggers are still present (e.g. after a rollback) are left untouched.
+        """
+        qry = """SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = ?;"""
+        for (table, column), triggers in saved.items():
+            existing = {row[0] for row in self.execute(qry, (table,))}
+            missing = [sql for name, sql in triggers if name not in existing]
+            if not missing:
+                continue
+            self.rebuild_rtree(table, column)
+            for sql in missing:
+                self.execute(sql)
+
+    def update_cell_lookup_triggers(self):
+        """
+        Recreate grid cell lookup triggers of older GeoPackages with R-tree prefiltered queries.
+        Returns number of updated triggers.
+        """
+        qry = """SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'rtree_grid_geom';"""
+        if self.execute(qry).fetchone() is None:
+            return 0
+        qry = """SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND sql LIKE '%FROM grid as g%';"""
+        updated = 0
+        for name, sql in self.execute(qry).fetchall():
+            new_sql = rtree_prefiltered_trigger_sql(sql)
+            if new_sql == sql:
+                continue
+            self.execute('DROP TRIGGER IF EXISTS "{0}";'.format(name))
+            self.execute(new_sql)
+            updated += 1
+        return updated
+
+    def ensure_indexes(self):
+        """
+        Create managed secondary indexes missing in older projects. Migration runs once per
+        MANAGED_INDEXES_VERSION recorded in metadata table. Returns number of created indexes.
+        """
+        if self.get_metadata_par("INDEXES_V") == str(MANAGED_INDEXES_VERSION):
+            return 0
+        created = create_managed_indexes(self.con)
+        self.set_metadata_par("INDEXES_V", MANAGED_INDEXES_VERSION)
+        self.commit()
+        return created
+
+    def audit_query_plans(self, queries=AUDIT_QUERIES):
+        """
+        Run EXPLAIN QUERY PLAN on queries and return list of (query, plan detail) of full table scans.
+        """
+        unindexed = []
+        for qry in queries:
+            inputs = (None,) * qry.count("?")
+            try:
+                plan = self.execute("EXPLAIN QUERY PLAN " + qry, inputs).fetchall()
+            except sqlite3.Error as e:
+                unindexed.append((qry, str(e)))
+                continue
+            for row in plan:
+                detail = row[-1]
+                if detail.startswith("SCAN") and "INDEX" not in detail:
+                    unindexed.append((qry, detail))
+        return unindexed
+
+    @contextmanager
+    def bulk_session(
+        self, defer_triggers=True, defer_spatial_index=False, fast_pragmas=True, wal=False, cache_size=-262144
+    ):
+        """
+        Context manager running all writes made through this connection as a single transaction.
+
+        Inside the session 'execute', 'execute_many' and 'batch_execute' do not commit. Optionally the plugin
+        geometry triggers are disabled, and durability is traded for speed with PRAGMA synchronous=OFF,
+        temp_store=MEMORY and a bigger page cache (in KiB when negative). 'wal' switches to WAL journal for the
+        session. Previous settings and trigger states are restored on exit. The transaction is committed when the
+        block finishes and rolled back if it raises. Nested sessions join the outer one.
+
+        'defer_spatial_index' (True for all indexed tables or a sequence of table names) drops the R-tree
+        maintenance triggers for the session; each index is rebuilt in one statement before the commit.
+        """
+        key = id(self.con)
+        if key in self._bulk_sessions:
+            self._bulk_sessions[key] += 1
+            try:
+                yield self
+            finally:
+                self._bulk_sessions[key] -= 1
+            return
+
+        self.con.commit()
+        pragmas = []
+        if fast_pragmas:
+            pragmas += [("synchronous", "OFF"), ("temp_store", "MEMORY"), ("cache_size", cache_size)]
+        if wal:
+            pragmas.append(("journal_mode", "WAL"))
+        previous_pragmas = []
+        for pragma, value in pragmas:
+            previous_pragmas.append((pragma, self.con.execute("PRAGMA {0};".format(pragma)).fetchone()[0]))
+            self.con.execute("PRAGMA {0} = {1};".format(pragma, value)).fetchall()
+
+        triggers = []
+        if defer_triggers:
+            triggers = self.con.execute("SELECT fid, enabled FROM trigger_control;").fetchall()
+            self.con.execute("UPDATE trigger_control SET enabled = 0;")
+
+        self._bulk_sessions[key] = 1
+        rtree_triggers = {}
+        try:
+            if defer_spatial_index is True:
+                rtree_triggers = self.drop_rtree_triggers()
+            elif defer_spatial_index:
+                rtree_triggers = self.drop_rtree_triggers(*defer_spatial_index)
+            yield self
+            self.restore_rtree_triggers(rtree_triggers)
+            self.con.commit()
+        except Exception:
+            self.con.rollback()
+            raise
+        finally:
+            del self._bulk_sessions[key]
+            if triggers:
+                self.con.executemany("UPDATE trigger_control SET enabled = ? WHERE fid = ?;", [(e, f) for f, e in triggers])
+            # Indexes whose trigger drop was committed before a failure still need to be rebuilt
+            self.restore_rtree_triggers(rtree_triggers)
+            self.con.commit()
+            for pragma, value in reversed(previous_pragmas):
+                try:
+                    self.con.execute("PRAGMA {0} = {1};".format(pragma, value)).fetchall()
+                except sqlite3.OperationalError:
+                    # Journal mode can't be switched back while other connections use the database
+                    self.uc.log_info(traceback.format_exc())
+
+    @contextmanager
+    def _statement_savepoint(self, cursor, name):
+        """
+        Inside bulk session, make a multi row statement atomic without ending the session transaction.
+        """
+        if not self.in_bulk_session:
+            yield
+            return
+        if not self.con.in_transaction:
+            cursor.execute("BEGIN;")
+        cursor.execute("SAVEPOINT {0};".format(name))
+        try:
+            yield
+        except Exception:
+            cursor.execute("ROLLBACK TO {0};".format(name))
+            cursor.execute("RELEASE {0};".format(name))
+            raise
+        cursor.execute("RELEASE {0};".format(name))
+
     def update_qgis_project(self, current_gpkg_path, new_gpkg_path):
         """
         Function to update the qgis project in a gpkg. This is used when creating backups and updating geopackages.
@@ -890,26 +1231,30 @@ class GeoPackageUtils(object):
             else:
                 result_cursor = cursor.execute(statement)
             rowid = cursor.lastrowid
-            self.con.commit()
+            self.commit()
             if get_rowid:
                 return rowid
             else:
                 return result_cursor
 
         except Exception as e:
-            self.con.rollback()
+            # A failed statement leaves no changes behind, so a bulk session transaction can go on
+            if not self.in_bulk_session:
+                self.con.rollback()
             raise
 
     def execute_many(self, sql, data):
         try:
             cursor = self.con.cursor()
             if sql is not None:
-                cursor.executemany(sql, data)
+                with self._statement_savepoint(cursor, "execute_many"):
+                    cursor.executemany(sql, data)
             else:
                 return
-            self.con.commit()
+            self.commit()
         except Exception as e:
-            self.con.rollback()
+            if not self.in_bulk_session:
+                self.con.rollback()
             raise
 
     def batch_execute(self, *sqls):
@@ -925,12 +1270,14 @@ class GeoPackageUtils(object):
                 qry_part = " (" + ",".join(["?"] * row_len) + ")"
                 qry_all = qry + qry_part
                 cur = self.con.cursor()
-                cur.executemany(qry_all, sql)
-                self.con.commit()
+                with self._statement_savepoint(cur, "batch_execute"):
+                    cur.executemany(qry_all, sql)
+                self.commit()
                 del sql[:]
                 sql += [qry, row_len]
             except Exception as e:
-                self.con.rollback()
+                if not self.in_bulk_session:
+                    self.con.rollback()
                 self.uc.log_info(qry)
                 self.uc.log_info(traceback.format_exc())
 
@@ -1054,8 +1401,11 @@ class GeoPackageUtils(object):
         return res
 
     def wkt_to_gpb(self, wkt_geom):
-        gpb = """SELECT AsGPB(ST_GeomFromText('{}'))""".format(wkt_geom)
-        gpb_buff = self.execute(gpb).fetchone()[0]
+        gpb_buff = gpkg_binary.wkt_to_gpb(wkt_geom)
+        if gpb_buff is None:
+            # Geometry types not handled by the native encoder are converted by SpatiaLite
+            gpb = """SELECT AsGPB(ST_GeomFromText('{}'))""".format(wkt_geom)
+            gpb_buff = self.execute(gpb).fetchone()[0]
         return gpb_buff
 
     def grid_geom(self, gid, table="grid", field="fid"):
@@ -1081,8 +1431,41 @@ class GeoPackageUtils(object):
         else:
             return None
 
+    def grid_centroids_xy(self, gids):
+        """
+        Return {fid: (x, y)} with centroids of the given grid cells, decoded from their GeoPackage binaries.
+        """
+        fids = list(dict.fromkeys(int(gid) for gid in gids))
+        centroids = {}
+        qry = """SELECT fid, geom FROM grid WHERE fid IN ({0});"""
+        chunk_size = 900  # Stay below SQLite host parameters limit
+        for i in range(0, len(fids), chunk_size):
+            chunk = fids[i : i + chunk_size]
+            rows = self.execute(qry.format(",".join(["?"] * len(chunk))), chunk).fetchall()
+            xy = gpkg_binary.decode_centroids([row[1] for row in rows]).tolist()
+            centroids.update(zip((row[0] for row in rows), map(tuple, xy)))
+        missing = [fid for fid in fids if fid not in centroids]
+        if missing:
+            raise KeyError("Grid elements {0} not found.".format(missing[:10]))
+        return centroids
+
+    def grid_centroids_array(self):
+        """
+        Return (fids, x, y) arrays with centroids of all grid cells ordered by fid.
+        """
+        rows = self.execute("""SELECT fid, geom FROM grid ORDER BY fid;""").fetchall()
+        fids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        xy = gpkg_binary.decode_centroids([row[1] for row in rows])
+        return fids, xy[:, 0], xy[:, 1]
+
     def grid_centroids(self, gids, table="grid", field="fid", buffers=False):
         cells = {}
+        if table == "grid" and field == "fid":
+            centroids = self.grid_centroids_xy(gids)
+            for g in gids:
+                x, y = centroids[int(g)]
+                cells[g] = gpkg_binary.encode_point(x, y) if buffers else "POINT({0} {1})".format(x, y)
+            return cells
         if buffers is False:
             sql = """SELECT ST_AsText(ST_Centroid(GeomFromGPB(geom))) FROM "{0}" WHERE "{1}" = ?;"""
         else:
@@ -1094,6 +1477,11 @@ class GeoPackageUtils(object):
 
     def grid_centroids_all(self, table="grid", buffers=False):
         cells = []
+        if table == "grid":
+            fids, xs, ys = self.grid_centroids_array()
+            if buffers is False:
+                return list(zip(fids.tolist(), map(list, zip(xs.tolist(), ys.tolist()))))
+            return list(zip(fids.tolist(), gpkg_binary.encode_points(xs, ys)))
         if buffers is False:
             sql = """SELECT fid, ST_AsText(ST_Centroid(GeomFromGPB(geom))) FROM "{0}";"""
         else:
@@ -1109,6 +1497,8 @@ class GeoPackageUtils(object):
         return cells
 
     def single_centroid(self, gid, table="grid", field="fid", buffers=False):
+        if table == "grid" and field == "fid":
+            return self.grid_centroids([gid], buffers=buffers)[gid]
         if buffers is False:
             sql = """SELECT ST_AsText(ST_Centroid(GeomFromGPB(geom))) FROM "{0}" WHERE "{1}" = ?;"""
         else:
@@ -1117,6 +1507,9 @@ class GeoPackageUtils(object):
         return geom
 
     def build_linestring(self, gids, table="grid", field="fid"):
+        if table == "grid" and field == "fid":
+            centroids = self.grid_centroids_xy(gids)
+            return gpkg_binary.encode_linestring([centroids[int(g)] for g in gids])
         gpb = """SELECT AsGPB(ST_GeomFromText('LINESTRING("""
         points = []
         for g in gids:
@@ -1140,10 +1533,7 @@ class GeoPackageUtils(object):
             "7": (lambda x, y, shift: (x - shift, y - shift)),
             "8": (lambda x, y, shift: (x - shift, y + shift)),
         }
-        gpb = """SELECT AsGPB(ST_GeomFromText('MULTILINESTRING("""
-        gpb_part = """({0} {1}, {2} {3})"""
-        qry = """SELECT ST_AsText(ST_Centroid(GeomFromGPB(geom))) FROM "{0}" WHERE "{1}" = ?;""".format(table, field)
-        wkt_geom = self.execute(qry, (gid,)).fetchone()[0]  # "wkt_geom" is POINT. Centroid of cell "gid"
+        wkt_geom = self.single_centroid(gid, table, field)  # "wkt_geom" is POINT. Centroid of cell "gid"
         x1, y1 = [float(i) for i in wkt_geom.strip("POINT()").split()]  # Coordinates x1, y1 of centriod of cell "gid".
         half_cell = cellsize * 0.5
         parts = []
@@ -1151,9 +1541,8 @@ class GeoPackageUtils(object):
             x2, y2 = functions[d](
                 x1, y1, half_cell
             )  # Coords x2,y2 of end point of subline,  half_cell apart from x1,y1, in direction.
-            parts.append(gpb_part.format(x1, y1, x2, y2))
-        gpb = gpb + ",".join(parts) + ")'))"
-        gpb_buff = self.execute(gpb).fetchone()[0]
+            parts.append(((x1, y1), (x2, y2)))
+        gpb_buff = gpkg_binary.encode_multilinestring(parts)
         return gpb_buff
 
     def build_levee(self, gid, direction, cellsize, table="grid", field="fid"):
@@ -1171,20 +1560,14 @@ class GeoPackageUtils(object):
             "8": (lambda x, y, s: (x - s, y + s / 2.414, x - s / 2.414, y + s)),
         }
 
-        qry = """SELECT ST_AsText(ST_Centroid(GeomFromGPB(geom))) FROM "{0}" WHERE "{1}" = ?;""".format(table, field)
-        # "qry" ends up as '''SELECT ST_AsText(ST_Centroid(GeomFromGPB(geom))) FROM "grid" WHERE "fid" = ?;'''
-
-        wkt_geom = self.execute(qry, (gid,)).fetchone()[0]  # Centriod POINT (x,y) of cell "gid".
+        wkt_geom = self.single_centroid(gid, table, field)  # Centriod POINT (x,y) of cell "gid".
 
         xc, yc = [float(i) for i in wkt_geom.strip("POINT()").split()]
         x1, y1, x2, y2 = functions[direction](
             xc, yc, cellsize * 0.45
         )  # Get 2 points of a line from "functions" dictionary.
 
-        gpb = """SELECT AsGPB(ST_GeomFromText('LINESTRING({0} {1}, {2} {3})'))""".format(x1, y1, x2, y2)
-        # "gpb" gets a value with actual points, e.g.
-        # SELECT AsGPB(ST_GeomFromText('LINESTRING(366961.647995 1185707.0, 366981.532005 1185707.0)'))
-        gpb_buff = self.execute(gpb).fetchone()[0]
+        gpb_buff = gpkg_binary.encode_linestring(((x1, y1), (x2, y2)))
         return gpb_buff
 
     def build_buffer(self, wkt_geom, distance, quadrantsegments=3):
@@ -1194,58 +1577,24 @@ class GeoPackageUtils(object):
         return gpb_buff
 
     def build_square_xy(self, x, y, size):
-        half_size = size * 0.5
-        gpb = """SELECT AsGPB(ST_GeomFromText('POLYGON(({} {}, {} {}, {} {}, {} {}, {} {}))'))""".format(
-            x - half_size,
-            y - half_size,
-            x + half_size,
-            y - half_size,
-            x + half_size,
-            y + half_size,
-            x - half_size,
-            y + half_size,
-            x - half_size,
-            y - half_size,
-        )
-        gpb_buff = self.execute(gpb).fetchone()[0]
+        gpb_buff = gpkg_binary.encode_square(float(x), float(y), size)
         return gpb_buff
 
     def build_point_xy(self, x, y):
-        gpb = """SELECT AsGPB(ST_GeomFromText('POINT({} {})'))""".format(
-            x,
-            y
-        )
-        gpb_buff = self.execute(gpb).fetchone()[0]
+        gpb_buff = gpkg_binary.encode_point(float(x), float(y))
         return gpb_buff
 
     def build_square(self, wkt_geom, size):
         x, y = [float(x) for x in wkt_geom.strip("POINT()").split()]
-        half_size = float(size) * 0.5
-        gpb = """SELECT AsGPB(ST_GeomFromText('POLYGON(({} {}, {} {}, {} {}, {} {}, {} {}))'))""".format(
-            x - half_size,
-            y - half_size,
-            x + half_size,
-            y - half_size,
-            x + half_size,
-            y + half_size,
-            x - half_size,
-            y + half_size,
-            x - half_size,
-            y - half_size,
-        )
-        gpb_buff = self.execute(gpb).fetchone()[0]
+        gpb_buff = gpkg_binary.encode_square(x, y, float(size))
         return gpb_buff
 
     def build_square_from_polygon(self, polygon_coordinates):
-        gpb = """SELECT AsGPB(ST_GeomFromText('POLYGON(({} {}, {} {}, {} {}, {} {}, {} {}))'))""".format(
-            *polygon_coordinates
-        )
-        gpb_buff = self.execute(gpb).fetchone()[0]
+        gpb_buff = gpkg_binary.encode_polygon(polygon_coordinates)
         return gpb_buff
 
     def build_square_from_polygon2(self, polyColRow):
-        gpb = """SELECT AsGPB(ST_GeomFromText('POLYGON(({} {}, {} {}, {} {}, {} {}, {} {}))'))""".format(*polyColRow[0])
-        gpb_buff = self.execute(gpb).fetchone()[0]
+        gpb_buff = gpkg_binary.encode_polygon(polyColRow[0])
         return (gpb_buff, polyColRow[1], polyColRow[2])
 
     def get_max(self, table, field="fid"):
@@ -1421,12 +1770,42 @@ class GeoPackageUtils(object):
         Finding offset of grid squares centers which is formed after switching from float to integers.
         Rounding to integers is needed for Bresenham's Line Algorithm.
         """
-        geom = self.single_centroid("1").strip("POINT()").split()
-        x, y = float(geom[0]), float(geom[1])
+        x, y = self.grid_centroids_xy([1])[1]
         x_offset = round(x / cell_size) * cell_size - x
         y_offset = round(y / cell_size) * cell_size - y
         return x_offset, y_offset
 
+    def grid_version(self):
+        """
+        Return (grid edits counter, data version) of the connection. The counter is bumped by temporary triggers on
+        inserts, deletes and geometry updates of the grid, the data version changes on commits of other connections.
+        """
+        triggers = self.con.execute(
+            """SELECT COUNT(*) FROM sqlite_temp_master WHERE type = 'trigger' AND name LIKE 'grid_version_%';"""
+        ).fetchone()[0]
+        if triggers < len(GRID_VERSION_EVENTS):
+            # Triggers are dropped together with the grid table, so the grid may have been replaced.
+            # Savepoint keeps a pending transaction of the caller open, otherwise it commits the temp objects only.
+            self.con.execute("""SAVEPOINT grid_version;""")
+            try:
+                self.con.execute("""CREATE TEMP TABLE IF NOT EXISTS grid_version (version INTEGER NOT NULL);""")
+                if self.con.execute("""SELECT COUNT(*) FROM temp.grid_version;""").fetchone()[0] == 0:
+                    self.con.execute("""INSERT INTO temp.grid_version (version) VALUES (0);""")
+                self.con.execute("""UPDATE temp.grid_version SET version = version + 1;""")
+                for name, event in GRID_VERSION_EVENTS.items():
+                    self.con.execute(
+                        """CREATE TEMP TRIGGER IF NOT EXISTS "grid_version_{0}" AFTER {1} ON main.grid
+                           BEGIN UPDATE grid_version SET version = version + 1; END;""".format(name, event)
+                    )
+            except Exception:
+                self.con.execute("""ROLLBACK TO grid_version;""")
+                self.con.execute("""RELEASE grid_version;""")
+                raise
+            self.con.execute("""RELEASE grid_version;""")
+        version = self.con.execute("""SELECT version FROM temp.grid_version;""").fetchone()[0]
+        data_version = self.con.execute("""PRAGMA data_version;""").fetchone()[0]
+        return version, data_version
+
     def grid_on_point(self, x, y):
         """
         Getting fid of grid which contains given point.
@@ -9,6 +9,8 @@
 
 import os
 
+import numpy as np
+
 from qgis.utils import iface
 from qgis.PyQt.QtWidgets import QDockWidget
 from qgis.core import *
@@ -32,8 +34,10 @@ from qgis.PyQt.QtWidgets import (
     QTableWidgetItem,
 )
 
+from ..flo2d_tools.conflicts import Conflicts
 from ..flo2d_tools.grid_tools import (
     get_adjacent_cell_elevation,
+    grid_lattice,
     number_of_elements,
 )
 from ..geopackage_utils import GeoPackageUtils
@@ -43,9 +47,6 @@ from .ui_utils import center_canvas, load_ui, set_icon, zoom, zoom_show_n_cells
 
 # from qgis.core import QgsFeature, QgsGeometry, QgsPointXY
 
-
-# from ..flo2d_tools.conflicts import Conflicts
-
 uiDialog, qtBaseClass = load_ui("errors_2")
 
 
@@ -1384,6 +1385,7 @@ class CurrentConflictsDialog(qtBaseClass, uiDialog):
         self.uc = UserCommunication(iface, "FLO-2D")
         self.con = None
         self.gutils = None
+        self.conflicts = None
         self.errors = []
         self.ext = self.iface.mapCanvas().extent()
         self.currentCell = None
@@ -1436,6 +1438,7 @@ class CurrentConflictsDialog(qtBaseClass, uiDialog):
         else:
             self.con = con
             self.gutils = GeoPackageUtils(self.con, self.iface)
+            self.conflicts = Conflicts(self.gutils)
 
     def populate_issues(self):
         # Inflow conflicts:
@@ -2147,11 +2150,11 @@ class CurrentConflictsDialog(qtBaseClass, uiDialog):
         lastDir = s.value("FLO-2D/lastGdsDir", "")
         QApplication.processEvents()
         features = []
-        for e in self.errors:
-            if int(e[0]) > 1:
-                pnt = self.gutils.single_centroid(e[0])
-                pt = QgsGeometry().fromWkt(pnt).asPoint()
-                features.append([pt.x(), pt.y(), e[0], e[3]])
+        errors = [e for e in self.errors if int(e[0]) > 1]
+        centroids = self.gutils.grid_centroids_xy([e[0] for e in errors])
+        for e in errors:
+            x, y = centroids[int(e[0])]
+            features.append([x, y, e[0], e[3]])
 
         shapefile = os.path.join(lastDir, "Current Conflicts.shp")
         name = "Current Conflicts"
@@ -2218,20 +2221,15 @@ class CurrentConflictsDialog(qtBaseClass, uiDialog):
     def populate_elements_cbo(self):
         self.elements_cbo.clear()
         self.elements_cbo.addItem(" ")
-        for x in self.errors:
-            if self.elements_cbo.findText(x[0].strip()) == -1:
-                self.elements_cbo.addItem(x[0].strip())
+        self.elements_cbo.addItems(list(dict.fromkeys(x[0].strip() for x in self.errors)))
         self.elements_cbo.model().sort(0)
 
     def populate_errors_cbo(self):
         self.errors_cbo.clear()
         self.errors_cbo.addItem(" ")
         self.errors_cbo.addItem("All")
-        for x in self.errors:
-            if self.errors_cbo.findText(x[1].strip()) == -1:
-                self.errors_cbo.addItem(x[1].strip())
-            if self.errors_cbo.findText(x[2].strip()) == -1:
-                self.errors_cbo.addItem(x[2].strip())
+        components = dict.fromkeys(x[i].strip() for x in self.errors for i in (1, 2))
+        self.errors_cbo.addItems([c for c in components if c not in (" ", "All", "")])
         self.errors_cbo.model().sort(0)
 
     def component1_cbo_activated(self):
@@ -2386,365 +2384,76 @@ class CurrentConflictsDialog(qtBaseClass, uiDialog):
         copy_tablewidget_selection(self.description_tblw)
 
     def conflict(self, comp1, table1, cell_1, comp2, table2, cell_2, description):
-        cells1 = []
-        cells2 = []
-        repeated = []
-        sqr1 = "SELECT {0} FROM {1}".format(cell_1, table1)
-        sqr2 = "SELECT {0} FROM {1}".format(cell_2, table2)
-        rows1 = self.gutils.execute(sqr1).fetchall()
-        rows2 = self.gutils.execute(sqr2).fetchall()
-        if not rows1 or not rows2:
-            pass
-        else:
-            for row in rows1:
-                cells1.append(row)
-            for row in rows2:
-                cells2.append(row)
-            size1 = len(cells1)
-            size2 = len(cells2)
-
-            if comp1 == comp2:
-                for i in range(size1):
-                    k = i + 1
-                    for j in range(k, size1):
-                        if cells1[i][0] == cells1[j][0] and cells1[i][0] not in repeated:
-                            repeated.append(cells1[i][0])
-                            break
-            else:
-                for i in range(size1):
-                    for j in range(size2):
-                        if cells1[i][0] == cells2[j][0] and cells1[i][0] not in repeated:
-                            repeated.append(cells1[i][0])
-                            break
-        if repeated:
-            for r in repeated:
-                self.errors.append([str(r), comp1, comp2, description])
+        self.errors.extend(self.conflicts.iter_conflicts(comp1, table1, cell_1, comp2, table2, cell_2, description))
 
     def conflict2(self, comp1, table1, cell_1, comp2, table2, cell_2, description):
-        repeated = []
-        rows1 = []
-        rows2 = []
-
-        sqr1 = "SELECT {0} FROM {1} ORDER BY {0} LIMIT {2}".format(cell_1, table1, self.numErrors.text())
-        sqr2 = "SELECT {0} FROM {1} ORDER BY {0} LIMIT {2}".format(cell_2, table2, self.numErrors.text())
-
-        rows1 = self.gutils.execute(sqr1).fetchall()
-        rows2 = self.gutils.execute(sqr2).fetchall()
-
-        size1 = len(rows1)
-        size2 = len(rows2)
-
-        if not rows1 or not rows2:
-            pass
+        n = int(self.numErrors)
+        cells1 = self.conflicts.cells(table1, cell_1)[:n]
+        cells2 = self.conflicts.cells(table2, cell_2)[:n]
+        if comp1 == comp2:
+            repeated = np.unique(cells1[1:][cells1[1:] == cells1[:-1]])
         else:
-            if comp1 == comp2:
-                for i in range(size1 - 2):
-                    if rows1[i][0] == rows1[i + 1][0]:
-                        if rows1[i][0] not in repeated:
-                            repeated.append(rows1[i][0])
-            else:
-                try:
-                    k = 0
-                    for i in range(size1):
-                        while True:
-                            if rows2[k][0] < rows1[i][0]:
-                                if k < size2 - 1:
-                                    k += 1
-                                    continue
-                                else:
-                                    k = 0
-                                    break
-                            elif rows2[k][0] > rows1[i][0]:
-                                break
-                            elif rows1[i][0] not in repeated:
-                                repeated.append(rows1[i][0])
-                            if k < size2 - 1:
-                                k += 1
-                            else:
-                                k = 0
-                                break
-
-                except ValueError:
-                    pass
-
-        if repeated:
-            for r in repeated:
-                self.errors.append([str(r), comp1, comp2, description])
+            repeated = np.intersect1d(cells1, cells2)
+        for r in repeated.tolist():
+            self.errors.append([str(r), comp1, comp2, description])
 
     def conflict3(self, comp1, rows1, comp2, rows2, description):
-        repeated = []
-
-        size1 = len(rows1)
-        size2 = len(rows2)
-
         if not rows1 or not rows2:
             return 0
+        cells1 = np.sort(np.array([row[0] for row in rows1]))
+        cells2 = np.array([row[0] for row in rows2])
+        if comp1 == comp2:
+            repeated = np.unique(cells1[1:][cells1[1:] == cells1[:-1]])
         else:
-            if comp1 == comp2:
-                for i in range(size1 - 2):
-                    if rows1[i][0] == rows1[i + 1][0]:
-                        if rows1[i][0] not in repeated:
-                            repeated.append(rows1[i][0])
-            else:
-                try:
-                    k = 0
-                    for i in range(size1):
-                        while True:
-                            if rows2[k][0] < rows1[i][0]:
-                                if k < size2 - 1:
-                                    k += 1
-                                    continue
-                                else:
-                                    k = 0
-                                    break
-                            elif rows2[k][0] > rows1[i][0]:
-                                break
-                            elif rows1[i][0] not in repeated:
-                                repeated.append(rows1[i][0])
-                            if k < size2 - 1:
-                                k += 1
-                            else:
-                                k = 0
-                                break
-
-                except ValueError:
-                    pass
-
-        if repeated:
-            for r in repeated:
-                self.errors.append([str(r), comp1, comp2, description])
+            repeated = np.intersect1d(cells1, cells2)
+        for r in repeated.tolist():
+            self.errors.append([str(r), comp1, comp2, description])
         return len(repeated)
 
-    def conflict4(self, comp1, table1, cell_1, comp2, table2, cell_2, description):
+    def selected_pair(self, comp1, comp2):
         cond1 = self.issue1 == "All" and self.issue2 == "All"
         cond2 = self.issue1 == "All" and self.issue2 == ""
         cond3 = self.issue1 == "" and self.issue2 == "All"
         cond4 = self.issue1 == "All" and (comp1 == self.issue2 or comp2 == self.issue2)
         cond5 = self.issue2 == "All" and (comp1 == self.issue1 or comp2 == self.issue1)
         cond6 = (comp1 == self.issue1 and comp2 in self.issue2) or (comp2 == self.issue1 and comp1 in self.issue2)
+        return cond1 or cond2 or cond3 or cond4 or cond5 or cond6
 
-        if cond1 or cond2 or cond3 or cond4 or cond5 or cond6:
-            repeated = []
-
-            if table1 == table2 and cell_1 == cell_2:
-                sql = """SELECT {0}, COUNT(*) 
-                        FROM {1} 
-                        GROUP BY {0}
-                        HAVING COUNT(*) > 1 ORDER BY {0}
-                    """.format(
-                    cell_1, table1
-                )
-
-            else:
-                sql = """SELECT {0} FROM {1} 
-                WHERE {0} IN 
-                (
-                    SELECT {0}
-                    FROM {1}
-                    INTERSECT
-                    SELECT {2}
-                    FROM {3}
-                ) ORDER BY {0}""".format(
-                    cell_1, table1, cell_2, table2
-                )
-
-            rows = self.gutils.execute(sql).fetchall()
-
-            if not rows:
-                pass
-            else:
-                size = len(rows)
-                for i in range(size):
-                    if rows[i][0] not in repeated:
-                        repeated.append(rows[i][0])
-            if repeated:
-                for r in repeated:
-                    self.errors.append([str(r), comp1, comp2, description])
+    def conflict4(self, comp1, table1, cell_1, comp2, table2, cell_2, description):
+        if self.selected_pair(comp1, comp2):
+            self.errors.extend(self.conflicts.iter_conflicts(comp1, table1, cell_1, comp2, table2, cell_2, description))
 
     def InletsConflicts(self):
-        cond1 = self.issue1 == "All" and self.issue2 == "All"
-        cond2 = self.issue1 == "All" and self.issue2 == ""
-        cond3 = self.issue1 == "" and self.issue2 == "All"
-        cond4 = self.issue1 == "All" and ("Storm Drain Inlets" == self.issue2 or "Storm Drain Inlets" == self.issue2)
-        cond5 = self.issue2 == "All" and ("Storm Drain Inlets" == self.issue1 or "Storm Drain Inlets" == self.issue1)
-        cond6 = ("Storm Drain Inlets" == self.issue1 and "Storm Drain Inlets" in self.issue2) or (
-            "Storm Drain Inlets" == self.issue1 and "Storm Drain Inlets" in self.issue2
-        )
-
-        if cond1 or cond2 or cond3 or cond4 or cond5 or cond6:
-            repeated = []
-
-            sql = """SELECT swmm_jt, COUNT(*) 
-                    FROM  swmmflo WHERE SUBSTRING(swmm_iden, 1, 1) LIKE "I%"
-                    GROUP BY swmm_jt
-                    HAVING COUNT(*) > 1 ORDER BY swmm_jt
-                """
-
-            # sql = """SELECT {0}, COUNT(*)
-            #         FROM {1}
-            #         GROUP BY {0}
-            #         HAVING COUNT(*) > 1 ORDER BY {0}
-            #     """.format("swmm_jt", "swmmflo")
-
-            rows = self.gutils.execute(sql).fetchall()
-
-            if not rows:
-                pass
-            else:
-                size = len(rows)
-                for i in range(size):
-                    if rows[i][0] not in repeated:
-                        repeated.append(rows[i][0])
-            if repeated:
-                for r in repeated:
-                    self.errors.append(
-                        [
-                            str(r),
-                            "Storm Drain Inlets",
-                            "Storm Drain Inlets",
-                            "2 or more Storm Drain Inlets in same cell",
-                        ]
-                    )
+        if self.selected_pair("Storm Drain Inlets", "Storm Drain Inlets"):
+            inlets = "swmm_iden LIKE 'I%'"
+            self.errors.extend(
+                self.conflicts.iter_conflicts(
+                    "Storm Drain Inlets",
+                    "swmmflo",
+                    "swmm_jt",
+                    "Storm Drain Inlets",
+                    "swmmflo",
+                    "swmm_jt",
+                    "2 or more Storm Drain Inlets in same cell",
+                    inlets,
+                    inlets,
+                )
+            )
 
     def conflict_inflow_partialARF(self):
-        in_cells = []
-        ARF_cells = []
-        repeated = []
-        inf = "SELECT grid_fid FROM inflow_cells"
-        ARF = "SELECT grid_fid, arf FROM blocked_cells"
-        in_rows = self.gutils.execute(inf).fetchall()
-        ARF_rows = self.gutils.execute(ARF).fetchall()
-        if not in_rows or not ARF_rows:
-            return repeated
-        else:
-            for row in in_rows:
-                in_cells.append(row)
-            for row in ARF_rows:
-                ARF_cells.append(row)
-            in_size = len(in_cells)
-            ARF_size = len(ARF_cells)
-            for i in range(in_size):
-                for j in range(ARF_size):
-                    if (
-                        in_cells[i][0] == ARF_cells[j][0]
-                        and float(ARF_cells[j][1]) < 1.0
-                        and in_cells[i][0] not in repeated
-                    ):
-                        repeated.append(in_cells[i][0])
-                        break
-            return repeated
+        return self.conflicts.shared("inflow_cells", "grid_fid", "blocked_cells", "grid_fid", None, "arf < 1.0").tolist()
 
     def conflict_outflow_partialARF(self):
-        out_cells = []
-        ARF_cells = []
-        repeated = []
-        outf = "SELECT grid_fid FROM outflow_cells"
-        ARF = "SELECT grid_fid, arf FROM blocked_cells"
-        out_rows = self.gutils.execute(outf).fetchall()
-        ARF_rows = self.gutils.execute(ARF).fetchall()
-        if not out_rows or not ARF_rows:
-            return repeated
-        else:
-            for row in out_rows:
-                out_cells.append(row)
-            for row in ARF_rows:
-                ARF_cells.append(row)
-            in_size = len(out_cells)
-            ARF_size = len(ARF_cells)
-            for i in range(in_size):
-                for j in range(ARF_size):
-                    if (
-                        out_cells[i][0] == ARF_cells[j][0]
-                        and float(ARF_cells[j][1]) < 1.0
-                        and out_cells[i][0] not in repeated
-                    ):
-                        repeated.append(out_cells[i][0])
-                        break
-            return repeated
+        return self.conflicts.shared("outflow_cells", "grid_fid", "blocked_cells", "grid_fid", None, "arf < 1.0").tolist()
 
     def conflict_outfall_partialARF(self):
-        out_cells = []
-        ARF_cells = []
-        repeated = []
-        outf = "SELECT grid_fid FROM swmmoutf"
-        ARF = "SELECT grid_fid, arf FROM blocked_cells"
-        out_rows = self.gutils.execute(outf).fetchall()
-        ARF_rows = self.gutils.execute(ARF).fetchall()
-        if not out_rows or not ARF_rows:
-            return repeated
-        else:
-            for row in out_rows:
-                out_cells.append(row)
-            for row in ARF_rows:
-                ARF_cells.append(row)
-            in_size = len(out_cells)
-            ARF_size = len(ARF_cells)
-            for i in range(in_size):
-                for j in range(ARF_size):
-                    if (
-                        out_cells[i][0] == ARF_cells[j][0]
-                        and float(ARF_cells[j][1]) < 1.0
-                        and out_cells[i][0] not in repeated
-                    ):
-                        repeated.append(out_cells[i][0])
-                        break
-            return repeated
+        return self.conflicts.shared("swmmoutf", "grid_fid", "blocked_cells", "grid_fid", None, "arf < 1.0").tolist()
 
     def conflict_inlet_partialARF(self):
-        out_cells = []
-        ARF_cells = []
-        repeated = []
-        outf = "SELECT swmm_jt FROM swmmflo"
-        ARF = "SELECT grid_fid, arf FROM blocked_cells"
-        out_rows = self.gutils.execute(outf).fetchall()
-        ARF_rows = self.gutils.execute(ARF).fetchall()
-        if not out_rows or not ARF_rows:
-            return repeated
-        else:
-            for row in out_rows:
-                out_cells.append(row)
-            for row in ARF_rows:
-                ARF_cells.append(row)
-            in_size = len(out_cells)
-            ARF_size = len(ARF_cells)
-            for i in range(in_size):
-                for j in range(ARF_size):
-                    if (
-                        out_cells[i][0] == ARF_cells[j][0]
-                        and float(ARF_cells[j][1]) < 1.0
-                        and out_cells[i][0] not in repeated
-                    ):
-                        repeated.append(out_cells[i][0])
-                        break
-            return repeated
+        return self.conflicts.shared("swmmflo", "swmm_jt", "blocked_cells", "grid_fid", None, "arf < 1.0").tolist()
 
     def conflict_outflow_fullARF(self):
-        out_cells = []
-        ARF_cells = []
-        repeated = []
-        outf = "SELECT grid_fid FROM outflow_cells"
-        ARF = "SELECT grid_fid, arf FROM blocked_cells"
-        out_rows = self.gutils.execute(outf).fetchall()
-        ARF_rows = self.gutils.execute(ARF).fetchall()
-        if not out_rows or not ARF_rows:
-            return repeated
-        else:
-            for row in out_rows:
-                out_cells.append(row)
-            for row in ARF_rows:
-                ARF_cells.append(row)
-            in_size = len(out_cells)
-            ARF_size = len(ARF_cells)
-            for i in range(in_size):
-                for j in range(ARF_size):
-                    if (
-                        out_cells[i][0] == ARF_cells[j][0]
-                        and float(ARF_cells[j][1]) == 1.0
-                        and out_cells[i][0] not in repeated
-                    ):
-                        repeated.append(out_cells[i][0])
-                        break
-            return repeated
+        return self.conflicts.shared("outflow_cells", "grid_fid", "blocked_cells", "grid_fid", None, "arf = 1.0").tolist()
 
 
 uiDialog, qtBaseClass = load_ui("levee_crests")
@@ -2825,14 +2534,17 @@ class LeveeCrestsDialog(qtBaseClass, uiDialog):
             i = 0
 
             try:
+                lattice = grid_lattice(self.gutils)
                 for i in range(n_levees):
                     cell = levees[i][0]
                     dir = levees[i][1]
                     crest = levees[i][2]
 
-                    elev = self.gutils.grid_value(cell, "elevation")
+                    elev = lattice.elevation(cell)
 
-                    adj_cell, adj_elev = get_adjacent_cell_elevation(self.gutils, grid_lyr, cell, dir, cellsize)
+                    adj_cell, adj_elev = get_adjacent_cell_elevation(
+                        self.gutils, grid_lyr, cell, dir, cellsize, lattice
+                    )
                     if adj_cell is not None and adj_elev != -999:
                         if crest < elev or crest < adj_cell:
                             self.levee_crests.append([str(i), cell, dir, crest, elev, adj_cell, adj_elev])
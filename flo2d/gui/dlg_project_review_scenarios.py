@@ -1,7 +1,8 @@
 # -*- coding: utf-8 -*-
 import os.path
-import re
-from collections import OrderedDict
+import pickle
+from concurrent.futures import as_completed
+from concurrent.futures.process import BrokenProcessPool
 
 from qgis._core import QgsApplication
 
@@ -19,7 +20,9 @@ from qgis.PyQt.QtWidgets import QFileDialog, QProgressDialog
 # of the License, or (at your option) any later version
 
 from .ui_utils import load_ui
-from ..flo2d_ie.flo2d_parser import ParseDAT
+from ..flo2d_ie.flo2d_parser import HDF5_PROFILES, ParseDAT
+from ..flo2d_ie.scenario_results import EMPTY_GROUPS, RESULT_FILES, ingest_scenario_output, scenario_process_pool
+from ..misc.project_review_utils import copy_dataset_by_columns
 from ..user_communication import UserCommunication, is_file_locked
 import numpy as np
 
@@ -267,283 +270,90 @@ class ProjectReviewScenariosDialog(qtBaseClass, uiDialog):
             self.uc.log_info("No scenarios selected")
             return False
 
-        QgsApplication.setOverrideCursor(qt_cursor_shape("WaitCursor"))
-
+        outputs = []
         if self.stormdrain_chbox.isChecked():
-            self.process_swmmrpt(scenarios, processed_results_file)
-            self.process_SWMMQIN(scenarios, processed_results_file)
-            self.process_SWMMOUTFIN(scenarios, processed_results_file)
-
-        if self.timdep_chbox.isChecked():
-            self.process_timdep(scenarios, processed_results_file)
-
+            outputs += ["swmm.RPT", "SWMMQIN", "SWMMOUTFIN"]
         if self.hydrostruct_chbox.isChecked():
-            self.process_hydrostruct(scenarios, processed_results_file)
-
+            outputs.append("HYDROSTRUCT")
         if self.fpxs_chbox.isChecked():
-            self.process_fpxs(scenarios, processed_results_file)
-            self.process_fpxs_cells(scenarios, processed_results_file)
-
+            outputs += ["HYCROSS", "CROSSQ"]
         if self.channels_chbox.isChecked():
-            self.process_channels(scenarios, processed_results_file)
+            outputs.append("HYCHAN")
+
+        QgsApplication.setOverrideCursor(qt_cursor_shape("WaitCursor"))
+
+        # Output files are parsed in parallel, this process is the only one writing the processed results file
+        with h5py.File(processed_results_file, "w") as hdf:
+            if outputs:
+                self.ingest_outputs(scenarios, outputs, hdf)
+            if self.timdep_chbox.isChecked():
+                self.process_timdep(scenarios, hdf)
 
         self.uc.bar_info("The selected data was process successfully!")
         self.uc.log_info("The selected data was process successfully!")
         QgsApplication.restoreOverrideCursor()
 
-    def process_channels(self, scenarios, processed_results_file):
-        """
-        Function to process HYCHAN.OUT file into the hdf5 file
-        """
-
-        progDialog = QProgressDialog("Processing HYCHAN.OUT...", None, 0, self.n_scenarios)
-        progDialog.setModal(True)
-        progDialog.setValue(0)
-        progDialog.forceShow()
-
-        for i, scenario in enumerate(scenarios, start=0):
-            progDialog.setValue(i)
-            QgsApplication.processEvents()
-            if scenario:
-                if os.path.exists(processed_results_file):
-                    read_type = "a"
-                else:
-                    read_type = "w"
-                with h5py.File(processed_results_file, read_type) as hdf:
-                    hychan_profile_group = hdf.create_group(f"Scenario {i + 1}/Channels/Profiles")
-                    hychan_xs_group= hdf.create_group(f"Scenario {i + 1}/Channels/Cross Sections")
-                    HYCHAN_file = os.path.join(scenario, r"HYCHAN.OUT")
-
-                    if not os.path.exists(HYCHAN_file):
-                        self.uc.bar_warn(f"HYCHAN.OUT not found in: {scenario}")
-                        self.uc.log_info(f"Missing file: {HYCHAN_file}, \n thus this scenario will not be included.")
-                        continue
-
-                    peaks_dict, _ = self.parser.parse_hychan(HYCHAN_file, mode="peaks")
-                    ts_dict, _ = self.parser.parse_hychan(HYCHAN_file, mode="time_series")
-
-                    for key, values in peaks_dict.items():
-                        arr = np.array(values)
-                        hychan_profile_group.create_dataset(key,
-                                                   data=arr.T,
-                                                   compression="gzip",
-                                                   compression_opts=9)
-
-                    for key, values in ts_dict.items():
-                        arr = np.array(values)
-                        hychan_xs_group.create_dataset(key,
-                                                   data=arr.T,
-                                                   compression="gzip",
-                                                   compression_opts=9)
-
-        progDialog.close()
-
-    def process_fpxs(self, scenarios, processed_results_file):
-        """
-        Function to process the HYCROSS file into the hdf5 file
-        """
-
-        progDialog = QProgressDialog("Processing HYCROSS.OUT...", None, 0, self.n_scenarios)
-        progDialog.setModal(True)
-        progDialog.setValue(0)
-        progDialog.forceShow()
-
-        for i, scenario in enumerate(scenarios, start=0):
-            progDialog.setValue(i)
-            QgsApplication.processEvents()
-            if scenario:
-                if os.path.exists(processed_results_file):
-                    read_type = "a"
-                else:
-                    read_type = "w"
-                ts_created = False
-                with h5py.File(processed_results_file, read_type) as hdf:
-                    fpxs_group = hdf.create_group(f"Scenario {i + 1}/Floodplain Cross Sections")
-                    HYCROSS_file = os.path.join(scenario, r"HYCROSS.OUT")
-
-                    if not os.path.exists(HYCROSS_file):
-                        self.uc.bar_warn(f"HYCROSS.OUT not found in: {scenario}")
-                        self.uc.log_info(f"Missing file: {HYCROSS_file}, \n thus this scenario will not be included.")
-                        continue
-
-                    with open(HYCROSS_file, "r") as myfile:
-                        while True:
-                            try:
-                                line = next(myfile)
-                            except StopIteration:
-                                break
-                            if "THE MAXIMUM DISCHARGE FROM CROSS SECTION" in line:
-                                fpxs_name = f'Floodplain XS {line.split()[6]}'
-                                for _ in range(9):
-                                    line = next(myfile)
-                                time_list = []
-                                data_list = []
-                                while True:
-                                    try:
-                                        line = next(myfile)
-                                    except StopIteration:
-                                        break
-                                    if not line.strip():
-                                        break
-                                    line = line.split()
-                                    if line[0] == "VELOCITY":
-                                        for _ in range(5):
-                                            line = next(myfile)
-                                            line = line.split()
-                                    time_list.append(float(line[0]))
-                                    data_list.append((float(line[1]), float(line[2]), float(line[3]), float(line[4]),
-                                                      float(line[5])))
-                                if not ts_created:
-                                    fpxs_group.create_dataset("Time Series", data=time_list, compression="gzip",
-                                                              compression_opts=9)
-                                    ts_created = True
-                                fpxs_group.create_dataset(fpxs_name, data=data_list, compression="gzip",
-                                                          compression_opts=9)
-
-        progDialog.close()
-
-    def process_fpxs_cells(self, scenarios, processed_results_file):
+    def ingest_outputs(self, scenarios, outputs, hdf):
         """
-        Function to process the CROSSQ file into the hdf5 file
+        Function to parse the scenarios output files in a process pool and write them into the hdf5 file
         """
+        tasks = [(i, output, scenario) for output in outputs for i, scenario in enumerate(scenarios) if scenario]
 
-        progDialog = QProgressDialog("Processing CROSSQ.OUT...", None, 0, self.n_scenarios)
+        progDialog = QProgressDialog("Processing scenarios output files...", None, 0, len(tasks))
         progDialog.setModal(True)
         progDialog.setValue(0)
         progDialog.forceShow()
+        QgsApplication.processEvents()
 
-        for i, scenario in enumerate(scenarios, start=0):
-            progDialog.setValue(i)
+        try:
+            pool = scenario_process_pool(min(len(tasks), os.cpu_count() or 1))
+        except (OSError, ValueError) as e:
+            self.uc.log_info(f"Scenarios output files are parsed sequentially: {e}")
+            pool = None
+
+        if pool is not None:
+            futures = {
+                pool.submit(ingest_scenario_output, output, scenario): (i, output, scenario)
+                for i, output, scenario in tasks
+            }
+            done = ((futures[future], future) for future in as_completed(futures))
+        else:
+            done = ((task, None) for task in tasks)
+
+        for n, ((i, output, scenario), future) in enumerate(done, start=1):
+            try:
+                path, groups = self.scenario_output(future, output, scenario)
+            except Exception as e:
+                self.uc.show_error(f"Error while reading {RESULT_FILES[output]} file in\n\n " + scenario, e)
+                path, groups = None, []
+            if groups is None:
+                self.uc.bar_warn(f"{RESULT_FILES[output]} not found in: {scenario}")
+                self.uc.log_info(f"Missing file: {path}, \n thus this scenario will not be included.")
+                groups = [(name, {}) for name in EMPTY_GROUPS.get(output, [])]
+            for group_path, datasets in groups:
+                group = hdf.require_group(f"Scenario {i + 1}/{group_path}")
+                for name, data in datasets.items():
+                    group.create_dataset(name, data=data, compression="gzip", compression_opts=9)
+            progDialog.setValue(n)
             QgsApplication.processEvents()
-            if not scenario:
-                continue
-
-            read_type = "a" if os.path.exists(processed_results_file) else "w"
-            with h5py.File(processed_results_file, read_type) as hdf:
-                # require_group avoids errors if the group already exists
-                fpxs_group = hdf.require_group(f"Scenario {i + 1}/Floodplain Cross Sections/Cells")
-
-                CROSSQ_file = os.path.join(scenario, "CROSSQ.OUT")
-
-                if not os.path.exists(CROSSQ_file):
-                    self.uc.bar_warn(f"CROSSQ.OUT not found in: {scenario}")
-                    self.uc.log_info(f"Missing file: {CROSSQ_file}, \n thus this scenario will not be included.")
-                    continue
-
-                with open(CROSSQ_file, "r", encoding="utf-8", errors="replace") as myfile:
-                    pushback = None  # holds a header line for the next iteration
-
-                    while True:
-                        try:
-                            # read either the saved header or the next line
-                            line = pushback if pushback is not None else next(myfile)
-                            pushback = None
-                        except StopIteration:
-                            break
-
-                        parts = line.split()
-                        if len(parts) == 3 and parts[0].isdigit():
-                            grid = str(int(parts[0]))
-                            discharge_list = [float(parts[2])]
-
-                            # gather rows until the next header or a blank line
-                            while True:
-                                try:
-                                    line = next(myfile)
-                                except StopIteration:
-                                    line = ""
-                                if not line.strip():
-                                    break
-                                sp = line.split()
-                                if len(sp) == 3 and sp[0].isdigit():
-                                    # save this header for the outer loop
-                                    pushback = line
-                                    break
-                                discharge_list.append(float(sp[1]))
-
-                            # write dataset, overwrite if it already exists
-                            if grid in fpxs_group:
-                                del fpxs_group[grid]
-                            fpxs_group.create_dataset(
-                                grid,
-                                data=discharge_list,
-                                compression="gzip",
-                                compression_opts=9,
-                            )
 
+        if pool is not None:
+            pool.shutdown()
         progDialog.close()
 
-    def process_hydrostruct(self, scenarios, processed_results_file):
+    @staticmethod
+    def scenario_output(future, output, scenario):
         """
-        Function to process the HYDROSTRUCT file into the hdf5 file
+        Function to get the parsed output file from the worker, parsing it here if the worker could not run
         """
+        if future is not None:
+            try:
+                return future.result()
+            except (BrokenProcessPool, ImportError, pickle.PicklingError):
+                pass
+        return ingest_scenario_output(output, scenario)
 
-        progDialog = QProgressDialog("Processing HYDROSTRUCT.OUT...", None, 0, self.n_scenarios)
-        progDialog.setModal(True)
-        progDialog.setValue(0)
-        progDialog.forceShow()
-
-        for i, scenario in enumerate(scenarios, start=0):
-            progDialog.setValue(i)
-            QgsApplication.processEvents()
-            if scenario:
-                if os.path.exists(processed_results_file):
-                    read_type = "a"
-                else:
-                    read_type = "w"
-                ts_created = False
-                with h5py.File(processed_results_file, read_type) as hdf:
-                    hydrostruct = hdf.create_group(f"Scenario {i + 1}/Hydraulic Structures")
-                    HYDROSTRUCT_file = os.path.join(scenario, r"HYDROSTRUCT.OUT")
-
-                    if not os.path.exists(HYDROSTRUCT_file):
-                        self.uc.bar_warn(f"HYDROSTRUCT.OUT not found in: {scenario}")
-                        self.uc.log_info(f"Missing file: {HYDROSTRUCT_file}, \n thus this scenario will not be included.")
-                        continue
-
-                    with open(HYDROSTRUCT_file, "r") as myfile:
-                        time_list = []
-                        discharge_list = []
-                        pattern = re.compile(
-                            r"THE\s+MAXIMUM\s+DISCHARGE\s+FOR:\s+(.+?)\s+STRUCTURE\s+NO\.\s+(\d+)\s+IS:",
-                            re.IGNORECASE
-                        )
-                        while True:
-                            try:
-                                line = next(myfile)
-                                match = re.search(pattern, line)
-                                if match:
-                                    matched_structure_name = match.group(1)
-                                    line = next(myfile)
-                                    while True:
-                                        try:
-                                            line = next(myfile)
-                                            line = line.split()
-                                            if line:
-                                                time_list.append(float(line[0]))
-                                                discharge_list.append((float(line[1]), float(line[2])))
-                                            else:
-                                                break
-                                        except StopIteration:
-                                            break
-                                    if not ts_created:
-                                        hydrostruct.create_dataset("Time Series",
-                                                                   data=time_list,
-                                                                   compression="gzip",
-                                                                   compression_opts=9)
-                                        ts_created = True
-                                    hydrostruct.create_dataset(matched_structure_name,
-                                                               data=discharge_list,
-                                                               compression="gzip",
-                                                               compression_opts=9)
-                                    time_list = []
-                                    discharge_list = []
-                            except StopIteration:
-                                break
-
-        progDialog.close()
-
-    def process_timdep(self, scenarios, processed_results_file):
+    def process_timdep(self, scenarios, hdf):
         """
         Function to process the TIMPDEP file into the hdf5 file
         """
@@ -557,10 +367,6 @@ class ProjectReviewScenariosDialog(qtBaseClass, uiDialog):
             progDialog.setValue(i)
             QgsApplication.processEvents()
             if scenario:
-                if os.path.exists(processed_results_file):
-                    read_type = "a"
-                else:
-                    read_type = "w"
                 timdep_file = os.path.join(scenario, r"TIMDEP.HDF5")
 
                 if not os.path.exists(timdep_file):
@@ -568,245 +374,36 @@ class ProjectReviewScenariosDialog(qtBaseClass, uiDialog):
                     self.uc.log_info(f"Missing file: {timdep_file}, \n thus this scenario will not be included.")
                     continue
 
-                with h5py.File(processed_results_file, read_type) as hdf:
-                    time_dependent = hdf.create_group(f"Scenario {i + 1}/Time Dependent")
-                    with h5py.File(timdep_file, "r") as timdep_hdf:
-
-                        if "/TIMDEP NETCDF OUTPUT RESULTS" in timdep_hdf:
-                            base = "/TIMDEP NETCDF OUTPUT RESULTS"
-                        elif "/TIMDEP OUTPUT RESULTS" in timdep_hdf:
-                            base = "/TIMDEP OUTPUT RESULTS"
-                        else:
-                            self.uc.log_info("No recognized TIMDEP output group found in HDF5 file.")
-                            self.uc.bar_warn("No recognized TIMDEP output group found in HDF5 file.")
-                            return None
-
-                        time_series = np.array(timdep_hdf[f'{base}/FLOW DEPTH/Times'])
-                        time_series = time_series.flatten()
-                        time_dependent.create_dataset("Time Series",
-                                data=time_series,
-                                compression="gzip",
-                                compression_opts=9)
-
-                        flow_depth = np.array(timdep_hdf[f'{base}/FLOW DEPTH/Values'])
-                        time_dependent.create_dataset("Depth",
-                                data=flow_depth,
-                                compression="gzip",
-                                compression_opts=9)
-
-                        wse = np.array(timdep_hdf[f'{base}/Floodplain Water Surface Elevation/Values'])
-                        time_dependent.create_dataset("WSE",
-                                                   data=wse,
-                                                   compression="gzip",
-                                                   compression_opts=9)
-
-                        velocity = np.array(timdep_hdf[f'{base}/Velocity MAG/Values'])
-                        time_dependent.create_dataset("Velocity",
-                                                   data=velocity,
-                                                   compression="gzip",
-                                                   compression_opts=9)
-                        #
-                        # channel_wse = np.array(timdep_hdf['/TIMDEP NETCDF OUTPUT RESULTS/Channel Water Surface Elevation/Values'])
-                        # channel_wse_group.create_dataset("Channel WSE",
-                        #                               data=channel_wse,
-                        #                               compression="gzip",
-                        #                               compression_opts=9)
-
-        progDialog.close()
-
-    def process_SWMMQIN(self, scenarios, hdf5_file):
-        """
-        Function to process the SWMMQIN.OUT file into the hdf5 file
-        """
-
-        progDialog = QProgressDialog("Processing SWMMQIN.OUT...", None, 0, self.n_scenarios)
-        progDialog.setModal(True)
-        progDialog.setValue(0)
-        progDialog.forceShow()
-
-        for i, scenario in enumerate(scenarios, start=0):
-            progDialog.setValue(i)
-            QgsApplication.processEvents()
-            if scenario:
-                SWMMQIN = scenario + r"/SWMMQIN.OUT"
-
-                if not os.path.exists(SWMMQIN):
-                    self.uc.bar_warn(f"SWMMQIN.OUT not found in: {scenario}")
-                    self.uc.log_info(f"Missing file: {SWMMQIN}, \n thus this scenario will not be included.")
-                    continue
-
-                swmmqin_data = self.get_SWMMQIN(SWMMQIN)
-                if os.path.exists(hdf5_file):
-                    read_type = "a"
-                else:
-                    read_type = "w"
-                with h5py.File(hdf5_file, read_type) as hdf:
-                    group = hdf.create_group(f"Scenario {i + 1}/Storm Drain/SWMMQIN")
-                    for key, values in swmmqin_data.items():
-                        group.create_dataset(key,
-                                data=values,
-                                compression="gzip",
-                                compression_opts=9)
-        progDialog.close()
-
-    def process_SWMMOUTFIN(self, scenarios, hdf5_file):
-        """
-        Function to process the SWMMOUTFIN.OUT file into the hdf5 file
-        """
-
-        progDialog = QProgressDialog("Processing SWMMOUTFIN.OUT...", None, 0, self.n_scenarios)
-        progDialog.setModal(True)
-        progDialog.setValue(0)
-        progDialog.forceShow()
-
-        for i, scenario in enumerate(scenarios, start=0):
-            progDialog.setValue(i)
-            QgsApplication.processEvents()
-            if scenario:
-                SWMMOUTFIN = scenario + r"/SWMMOUTFIN.OUT"
-
-                if not os.path.exists(SWMMOUTFIN):
-                    self.uc.bar_warn(f"SWMMOUTFIN.OUT not found in: {scenario}")
-                    self.uc.log_info(f"Missing file: {SWMMOUTFIN}, \n thus this scenario will not be included.")
-                    continue
-
-                swmmoutfin_data = self.get_SWMMOUTFIN(SWMMOUTFIN)
-                if os.path.exists(hdf5_file):
-                    read_type = "a"
-                else:
-                    read_type = "w"
-                with h5py.File(hdf5_file, read_type) as hdf:
-                    group = hdf.create_group(f"Scenario {i + 1}/Storm Drain/SWMMOUTFIN")
-                    for key, values in swmmoutfin_data.items():
-                        group.create_dataset(key,
-                                             data=values,
-                                             compression="gzip",
-                                             compression_opts=9)
-        progDialog.close()
+                with h5py.File(timdep_file, "r") as timdep_hdf:
 
-    def process_swmmrpt(self, scenarios, hdf5_file):
-        """
-        Function to process the SWMM.rpt file into the hdf5 file
-        """
-
-        progDialog = QProgressDialog("Processing SWMM.RPT...", None, 0, self.n_scenarios)
-        progDialog.setModal(True)
-        progDialog.setValue(0)
-        progDialog.forceShow()
-
-        for i, scenario in enumerate(scenarios, start=0):
-            progDialog.setValue(i)
-            QgsApplication.processEvents()
-            if scenario:
-                swmm_rpt = scenario + r"/swmm.RPT"
+                    if "/TIMDEP NETCDF OUTPUT RESULTS" in timdep_hdf:
+                        base = "/TIMDEP NETCDF OUTPUT RESULTS"
+                    elif "/TIMDEP OUTPUT RESULTS" in timdep_hdf:
+                        base = "/TIMDEP OUTPUT RESULTS"
+                    else:
+                        self.uc.log_info("No recognized TIMDEP output group found in HDF5 file.")
+                        self.uc.bar_warn("No recognized TIMDEP output group found in HDF5 file.")
+                        continue
 
-                if not os.path.exists(swmm_rpt):
-                    self.uc.bar_warn(f"SWMM.RPT not found in: {scenario}")
-                    self.uc.log_info(f"Missing file:  {swmm_rpt}, \n thus this scenario is not included.")
-                    continue
+                    time_dependent = hdf.require_group(f"Scenario {i + 1}/Time Dependent")
+                    time_series = np.array(timdep_hdf[f'{base}/FLOW DEPTH/Times'])
+                    time_series = time_series.flatten()
+                    time_dependent.create_dataset("Time Series",
+                            data=time_series,
+                            compression="gzip",
+                            compression_opts=9)
+
+                    # Streamed in blocks of cells into chunks holding whole cell time series
+                    profile = HDF5_PROFILES["fast"]
+                    results = [
+                        ("Depth", "FLOW DEPTH"),
+                        ("WSE", "Floodplain Water Surface Elevation"),
+                        ("Velocity", "Velocity MAG"),
+                    ]
+                    for name, source in results:
+                        values = timdep_hdf[f'{base}/{source}/Values']
+                        copy_dataset_by_columns(values, time_dependent, name, profile)
 
-                # Start with nodes and time data
-                nodes = {}
-                current_node = None
-                links = {}
-                current_link = None
-                time_series = False
-                data = []  # Dates
-                time = []  # Times
-
-                with open(swmm_rpt, 'r') as file:
-                    for line in file:
-                        # Detect end of relevant section
-                        if re.match(r'  Analysis begun', line):
-                            break
-
-                        # Detect node name
-                        node_match = re.match(r'  <<< Node (.*?) >>>', line)
-                        if node_match:
-                            if data and time:
-                                time_series = True
-                            current_node = node_match.group(1)
-                            nodes[current_node] = []
-                            continue
-
-                        # Detect link name
-                        link_match = re.match(r'  <<< Link (.*?) >>>', line)
-                        if link_match:
-                            current_link = link_match.group(1)
-                            links[current_link] = []
-                            continue
-
-                        # Skip headers and separators
-                        if re.match(r'[-]+', line) or not line.strip() or "Inflow" in line:
-                            continue
-
-                        # Parse node data lines
-                        if current_node:
-                            parts = re.split(r'\s+', line.strip())
-                            if len(parts) >= 6 and parts[0] != "Date":  # Ensure it's a data row
-                                # Populate time series data only once
-                                if not time_series:
-                                    data.append(parts[0])  # Date
-                                    time.append(parts[1])  # Time
-                                # Append node-specific data
-                                nodes[current_node].append(parts[2:6])  # Extract Inflow, Flooding, Depth, Head
-
-                        # Parse link data lines
-                        if current_link:
-                            parts = re.split(r'\s+', line.strip())
-                            if len(parts) >= 6 and parts[0] != "Date":  # Ensure it's a data row
-                                # Append node-specific data
-                                links[current_link].append(parts[2:6])  # Extract flow, velocity, depth, percent
-
-                # Convert node data to numpy arrays for HDF5 compatibility
-                for node_name in nodes:
-                    nodes[node_name] = np.array(nodes[node_name], dtype=float)
-
-                # Convert link data to numpy arrays for HDF5 compatibility
-                for link_name in links:
-                    links[link_name] = np.array(links[link_name], dtype=float)
-
-                if os.path.exists(hdf5_file):
-                    read_type = "a"
-                else:
-                    read_type = "w"
-
-                # Write to HDF5
-                with h5py.File(hdf5_file, read_type) as hdf:
-                    # Create the time dataset
-                    time_group = hdf.create_group(f"Scenario {i + 1}/Storm Drain")
-                    time_group.create_dataset(
-                        "Time Series",
-                        data=np.array(list(zip(data, time)), dtype="S"),  # Convert to fixed-width strings
-                        compression="gzip",
-                        compression_opts=9
-                    )
-
-                    # Create the group structure for nodes
-                    nodes_group = hdf.create_group(f"Scenario {i + 1}/Storm Drain/Nodes")
-
-                    # Create a dataset for each node
-                    for node_name, node_data in nodes.items():
-                        if len(node_data) > 0:  # Only write datasets with data
-                            nodes_group.create_dataset(
-                                node_name,
-                                data=node_data,
-                                compression="gzip",
-                                compression_opts=9
-                            )
-
-                    # Create the group structure for links
-                    links_group = hdf.create_group(f"Scenario {i + 1}/Storm Drain/Links")
-
-                    # Create a dataset for each node
-                    for link_name, link_data in links.items():
-                        if len(link_data) > 0:  # Only write datasets with data
-                            links_group.create_dataset(
-                                link_name,
-                                data=link_data,
-                                compression="gzip",
-                                compression_opts=9
-                            )
         progDialog.close()
 
     def close_dlg(self):
@@ -815,59 +412,6 @@ class ProjectReviewScenariosDialog(qtBaseClass, uiDialog):
         """
         self.close()
 
-    def get_SWMMQIN(self, SWMMQIN_file):
-        data = OrderedDict()
-        try:  # Read SWMMQIN_file.
-            pd = ParseDAT()
-            par = pd.single_parser(SWMMQIN_file)
-            for row in par:
-                if "INLET" in row:
-                    cell = row[7]
-                    inlet = row[11]
-                    next(par)
-                    data[inlet] = []
-                    for row2 in par:
-                        if len(row2) == 3:
-                            time = row2[0]
-                            discharge = row2[1]
-                            return_flow = row2[2]
-                            data[inlet].append(row2)
-                        elif "INLET" in row2:
-                            cell = row2[7]
-                            inlet = row2[11]
-                            next(par)
-                            data[inlet] = []
-        except Exception as e:
-            self.uc.show_error("Error while reading file\n\n " + SWMMQIN_file, e)
-        finally:
-            return data
-
-    def get_SWMMOUTFIN(self, SWMMOUTFIN_file):
-        data = OrderedDict()
-        try:  # Read SWMMOUTFIN_file.
-            pd = ParseDAT()
-            par = pd.single_parser(SWMMOUTFIN_file)
-            for row in par:
-                if "GRID" in row:
-                    cell = row[2]
-                    # channel_element=  row[5]
-                    next(par)
-                    data[cell] = []
-                    for row2 in par:
-                        if len(row2) == 2:
-                            time = row2[0]
-                            discharge = row2[1]
-                            data[cell].append(row2)
-                        elif "GRID" in row2:
-                            cell = row2[2]
-                            # channel_element=  row2[5]
-                            next(par)
-                            data[cell] = []
-        except Exception as e:
-            self.uc.show_error("Error while reading file\n\n " + SWMMOUTFIN_file, e)
-        finally:
-            return data
-
     def select_all_datasets(self):
         """
         Function to select all datasets
@@ -236,7 +236,7 @@ class SamplingElevDialog(qtBaseClass, uiDialog):
             self.fill_nodata()
         else:
             pass
-        sampler = raster2grid(self.grid, temp_file_path, self.iface)
+        sampler = raster2grid(self.grid, temp_file_path, self.iface, gutils=self.gutils)
 
         qry = "UPDATE grid SET elevation=? WHERE fid=?;"
         self.con.executemany(qry, sampler)
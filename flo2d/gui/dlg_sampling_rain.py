@@ -173,7 +173,7 @@ class SamplingRainDialog(qtBaseClass, uiDialog):
             self.fill_nodata()
         else:
             pass
-        sampler = raster2grid(self.grid, temp_file_path, self.iface)
+        sampler = raster2grid(self.grid, temp_file_path, self.iface, gutils=self.gutils)
 
         qry = """INSERT INTO rain_arf_cells (arf, grid_fid) VALUES (?,?);"""
         self.con.executemany(qry, sampler)
@@ -194,7 +194,7 @@ class SamplingRoughnessDialog(qtBaseClass, uiDialog):
             self.fill_nodata()
         else:
             pass
-        sampler = raster2grid(self.grid, temp_file_path, self.iface)
+        sampler = raster2grid(self.grid, temp_file_path, self.iface, gutils=self.gutils)
 
         qry = "UPDATE grid SET n_value=? WHERE fid=?;"
         self.con.executemany(qry, sampler)
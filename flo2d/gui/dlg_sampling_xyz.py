@@ -11,6 +11,7 @@
 import os
 import time
 import traceback
+from concurrent.futures.process import BrokenProcessPool
 
 from qgis.core import (
     QgsFeature,
@@ -34,6 +35,8 @@ from ..flo2d_tools.grid_tools import (
     render_grid_elevations2,
 )
 from ..geopackage_utils import GeoPackageUtils
+from ..misc.lidar_binning import LidarBinner, bin_lidar_files, chunk_ranges
+from ..misc.process_pool import spawn_process_pool
 from ..user_communication import UserCommunication
 from ..utils import (
     second_smallest,
@@ -120,14 +123,11 @@ class SamplingXYZDialog(qtBaseClass, uiDialog):
 
         try:
             QApplication.setOverrideCursor(qt_cursor_shape("WaitCursor"))
-            elevs = {}
             read_error = "Error reading files:\n\n"
-            outside_grid, inside_grid = 0, 0
 
-            gid_indx = {}
             cells = self.gutils.execute("SELECT fid, col, row FROM grid").fetchall()
-            for cell in cells:
-                gid_indx[cell[1], cell[2]] = [cell[0], 0.0, 0]
+            fids, cols, rows = zip(*cells) if cells else ((), (), ())
+            binner = LidarBinner(fids, cols, rows)
 
             start_time = time.time()
 
@@ -141,7 +141,7 @@ class SamplingXYZDialog(qtBaseClass, uiDialog):
             statBar.addWidget(advanceBar, 2)
 
             size = 0
-            lines = 0
+            n_chunks = 0
             for file in lidar_files:
                 file_size = os.path.getsize(file)
                 with open(file, "r") as f:
@@ -149,89 +149,38 @@ class SamplingXYZDialog(qtBaseClass, uiDialog):
 
                     line_size = len(line) + 1
                 size += file_size / line_size
+                n_chunks += len(chunk_ranges(file))
 
-            progress = self.uc.progress_bar2(
+            self.uc.progress_bar2(
                 "Reading " + "{:,}".format(int(size)) + " lines from " + str(len(lidar_files)) + " files...",
                 0,
                 len(lidar_files),
                 0,
             )
-            step = 50000
-            for i, file in enumerate(lidar_files, 1):
-                progress.setValue(i)
-                n_commas = 0
-                n_spaces = 0
-
-                # See if comma or space delimited:
-                with open(file, "r") as f:
-                    while True:
-                        line = f.readline()
-                        line = line.replace("\t", "")
-                        if line.strip() != "":
-                            n_commas = line.count(",")
-                            if n_commas == 0:
-                                n_spaces = len(line.split())
-                            break
-
-                if n_commas != 0 or n_spaces != 0:
-                    # Read file:
-                    with open(file, "r") as f1:
-                        try:
-                            lines = f1.readlines()
-                            n_lines = len(lines)
-                            statusLabel.setText(
-                                "Reading  "
-                                + "{:,}".format(n_lines)
-                                + "  lines from "
-                                + "<FONT COLOR=blue>"
-                                + os.path.basename(file)
-                                + "</FONT>"
-                            )
-                            advanceBar.setMaximum(n_lines)
-
-                            step = int(n_lines / 20)
-
-                            if n_lines > step:
-                                advanceBar.setValue(int(step / 2))
-                                # self.iface.mainWindow().repaint()
-
-                            for i, line in enumerate(lines, 1):
-                                if int(i % step) == 0:
-                                    advanceBar.setValue(i)
-                                    QApplication.processEvents()
-
-                                line = line.replace("\t", "")
-                                if n_commas == 0:  # No commas, values separated by spaces.
-                                    values = line.split()
-                                    n_values = len(values)
-                                    if n_values == 3:
-                                        xpp, ypp, zpp = values
-                                    elif n_values == 4:
-                                        xpp, ypp, zpp, dummy = values
-                                    elif n_values == 5:
-                                        dummy1, xpp, ypp, zpp, dummy2 = values
-                                    else:
-                                        break
-                                elif n_commas == 2:  # 3 columns.
-                                    xpp, ypp, zpp = line.split(",")
-                                elif n_commas == 3:  # 4 columns.
-                                    xpp, ypp, zpp, dummy = line.split(",")
-                                elif n_commas == 4:  # 5 columns.
-                                    dummy1, xpp, ypp, zpp, dummy2 = line.split(",")
-                                else:
-                                    break
-
-                                col = int((float(xpp) - self.xMinimum) / self.cell_size) + 2
-                                row = int((float(ypp) - self.yMinimum) / self.cell_size) + 2
-                                if (col, row) in gid_indx:
-                                    gid_indx[col, row][1] += float(zpp)
-                                    gid_indx[col, row][2] += 1
-                                    inside_grid += 1
-                                else:
-                                    outside_grid += 1
-
-                        except ValueError:
-                            read_error += os.path.basename(file) + " at line " + str(i) + "\n\n"
+            statusLabel.setText("Reading  " + "{:,}".format(int(size)) + "  lines")
+
+            def chunk_read(n, total):
+                advanceBar.setMaximum(total)
+                advanceBar.setValue(n)
+                QApplication.processEvents()
+
+            # Chunks are parsed in worker processes and added to the cells in reading order.
+            pool = spawn_process_pool() if n_chunks > 1 else None
+            try:
+                errors = bin_lidar_files(
+                    lidar_files, binner, self.xMinimum, self.yMinimum, self.cell_size, pool, callback=chunk_read
+                )
+            except (BrokenProcessPool, OSError):
+                binner = LidarBinner(fids, cols, rows)
+                errors = bin_lidar_files(
+                    lidar_files, binner, self.xMinimum, self.yMinimum, self.cell_size, callback=chunk_read
+                )
+            finally:
+                if pool is not None:
+                    pool.shutdown()
+            for file, line_number in errors:
+                read_error += os.path.basename(file) + " at line " + str(line_number) + "\n\n"
+            inside_grid, outside_grid = binner.inside, binner.outside
 
             self.uc.clear_bar_messages()
             statBar.removeWidget(statusLabel)
@@ -249,12 +198,9 @@ class SamplingXYZDialog(qtBaseClass, uiDialog):
 
             if inside_grid > 0:
                 qry = "UPDATE grid SET elevation = ? WHERE fid = ?;"
-                for gi in gid_indx.items():
-                    if gi[1][2] != 0:
-                        elevation = round(gi[1][1] / gi[1][2], 4)
-                        cell_elev.append((elevation, gi[1][0]))
-                    else:
-                        nope.append((gi[1][0], gi[0][0], gi[0][1]))  # element, col, row
+                cell_elev, empty = binner.elevations()
+                col_row = {cell[0]: (cell[1], cell[2]) for cell in cells}
+                nope = [(fid,) + col_row[fid] for fid in empty]  # element, col, row
                 self.gutils.execute_many(qry, cell_elev)
 
             self.uc.clear_bar_messages()
@@ -7,6 +7,8 @@ from qgis._core import QgsTemporalController, QgsTemporalNavigationObject, QgsMe
 from qgis.core import QgsProject, QgsDateTimeRange
 from qgis.PyQt.QtCore import QDateTime, Qt
 
+from ..flo2d_ie.swmm_rpt import SwmmRptIndex
+
 
 class SDAnimator(QDockWidget):
     def __init__(self, iface, existing_nodes_dict, rpt_file, units, manhole_diameter, mh_pop=None, parent=None):
@@ -46,31 +48,17 @@ class SDAnimator(QDockWidget):
         nodes_data = []
         self.nodes_ts = []
         self.nodes_qdatetime = []
-        NodeTSSummary = False
-        i = 0
-        for node in self.existing_nodes_dict.keys():
-            node_data = []
-            with open(self.rpt_file, "r") as f:
-                for line in f:
-                    if (f"<<< Node {node} >>>") in line:
-                        NodeTSSummary = True
-                        for _ in range(4):
-                            next(f)
-                        continue
-                    if NodeTSSummary:
-                        if len(line.split()) != 6:
-                            NodeTSSummary = False
-                        else:
-                            NodeTSData = line.split()
-                            node_data.append(float(NodeTSData[5]))
-                            if i == 0:
-                                ts_str = NodeTSData[0] + " " + NodeTSData[1]
-                                self.nodes_ts.append(ts_str)
-                                dt = QDateTime.fromString(ts_str, "MMM-dd-yyyy HH:mm:ss")
-                                dt.setTimeSpec(Qt.UTC)
-                                self.nodes_qdatetime.append(dt)
-            i += 1
-            nodes_data.append(node_data)
+        rpt_index = SwmmRptIndex.open(self.rpt_file)
+        for i, (node, dates, times, values) in enumerate(rpt_index.iter_series("Node", self.existing_nodes_dict.keys())):
+            # Head is the last value of node time series
+            nodes_data.append(values[:, 3].tolist())
+            if i == 0:
+                for date, time in zip(dates, times):
+                    ts_str = date + " " + time
+                    self.nodes_ts.append(ts_str)
+                    dt = QDateTime.fromString(ts_str, "MMM-dd-yyyy HH:mm:ss")
+                    dt.setTimeSpec(Qt.UTC)
+                    self.nodes_qdatetime.append(dt)
         self.nodes_array = np.array(nodes_data)
 
     def setup_temporal_controller(self):
@@ -66,7 +66,8 @@ from .dlg_sd_animator import SDAnimator
 from .dlg_storm_drain_attributes import InletAttributes, ConduitAttributes, OrificeAttributes, OutletAttributes, \
     PumpAttributes, StorageUnitAttributes, WeirAttributes
 from ..flo2d_ie.swmm_io import StormDrainProject
-from ..flo2d_tools.grid_tools import spatial_index
+from ..flo2d_ie.swmm_rpt import SwmmRptIndex
+from ..flo2d_tools.grid_tools import grid_lattice, spatial_index
 from ..flo2d_tools.schema2user_tools import remove_features
 from ..flo2dobjects import InletRatingTable, PumpCurves
 from ..geopackage_utils import GeoPackageUtils
@@ -2058,6 +2059,7 @@ class StormDrainEditorWidget(qtBaseClass, uiDialog):
         
                 fields = self.user_swmm_conduits_lyr.fields()
                 inlets_outlets_inside = []
+                lattice = grid_lattice(self.gutils)
                 for name, values in list(storm_drain.INP_conduits.items()):
         
                     conduit_inlet = values["conduit_inlet"] if "conduit_inlet" in values else None
@@ -2126,12 +2128,12 @@ class StormDrainEditorWidget(qtBaseClass, uiDialog):
                     x2, y2 = float(outlet_coords["x"]), float(outlet_coords["y"])
 
                     # Both ends of the conduit is outside the grid
-                    if self.gutils.grid_on_point(x1, y1) is None and self.gutils.grid_on_point(x2, y2) is None:
+                    if lattice.cell_on_point(x1, y1) is None and lattice.cell_on_point(x2, y2) is None:
                         outside_conduits += f"{n_spaces}{name}\n"
                         continue
 
                     # Conduit inlet is outside the grid, and it is an Inlet
-                    if self.gutils.grid_on_point(x1, y1) is None and conduit_inlet.lower().startswith("i"):
+                    if lattice.cell_on_point(x1, y1) is None and conduit_inlet.lower().startswith("i"):
                         outside_conduits += f"{n_spaces}{name}\n"
                         continue
 
@@ -2289,6 +2291,7 @@ class StormDrainEditorWidget(qtBaseClass, uiDialog):
                                  WHERE pump_name = ?;"""
 
                 fields = self.user_swmm_pumps_lyr.fields()
+                lattice = grid_lattice(self.gutils)
                 for name, values in list(storm_drain.INP_pumps.items()):
                     
                     if values["pump_shutoff_depth"] == None:
@@ -2331,12 +2334,12 @@ class StormDrainEditorWidget(qtBaseClass, uiDialog):
                     x2, y2 = float(outlet_coords["x"]), float(outlet_coords["y"])
 
                     # Both ends of the pump is outside the grid
-                    if self.gutils.grid_on_point(x1, y1) is None and self.gutils.grid_on_point(x2, y2) is None:
+                    if lattice.cell_on_point(x1, y1) is None and lattice.cell_on_point(x2, y2) is None:
                         outside_pumps += f"{n_spaces}{name}\n"
                         continue
 
                     # Pump inlet is outside the grid, and it is an Inlet
-                    if self.gutils.grid_on_point(x1, y1) is None and pump_inlet.lower().startswith("i"):
+                    if lattice.cell_on_point(x1, y1) is None and pump_inlet.lower().startswith("i"):
                         outside_pumps += f"{n_spaces}{name}\n"
                         continue
 
@@ -2456,6 +2459,7 @@ class StormDrainEditorWidget(qtBaseClass, uiDialog):
                                  WHERE orifice_name = ?;"""
                                  
                 fields = self.user_swmm_orifices_lyr.fields()
+                lattice = grid_lattice(self.gutils)
                 for name, values in list(storm_drain.INP_orifices.items()):
                     orifice_inlet = values["ori_inlet"] if "ori_inlet" in values else None
                     orifice_outlet = values["ori_outlet"] if "ori_outlet" in values else None
@@ -2499,12 +2503,12 @@ class StormDrainEditorWidget(qtBaseClass, uiDialog):
                     x2, y2 = float(outlet_coords["x"]), float(outlet_coords["y"])
 
                     # Both ends of the orifice is outside the grid
-                    if self.gutils.grid_on_point(x1, y1) is None and self.gutils.grid_on_point(x2, y2) is None:
+                    if lattice.cell_on_point(x1, y1) is None and lattice.cell_on_point(x2, y2) is None:
                         outside_orifices += f"{n_spaces}{name}\n"
                         continue
 
                     # Orifice inlet is outside the grid, and it is an Inlet
-                    if self.gutils.grid_on_point(x1, y1) is None and orifice_inlet.lower().startswith("i"):
+                    if lattice.cell_on_point(x1, y1) is None and orifice_inlet.lower().startswith("i"):
                         outside_orifices += f"{n_spaces}{name}\n"
                         continue
 
@@ -2637,6 +2641,7 @@ class StormDrainEditorWidget(qtBaseClass, uiDialog):
                                  WHERE weir_name = ?;"""
 
                 fields = self.user_swmm_weirs_lyr.fields()
+                lattice = grid_lattice(self.gutils)
                 for name, values in list(storm_drain.INP_weirs.items()):
 
                     weir_inlet = values["weir_inlet"] if "weir_inlet" in values else None
@@ -2681,12 +2686,12 @@ class StormDrainEditorWidget(qtBaseClass, uiDialog):
                     x2, y2 = float(outlet_coords["x"]), float(outlet_coords["y"])
 
                     # Both ends of the weir is outside the grid
-                    if self.gutils.grid_on_point(x1, y1) is None and self.gutils.grid_on_point(x2, y2) is None:
+                    if lattice.cell_on_point(x1, y1) is None and lattice.cell_on_point(x2, y2) is None:
                         outside_weirs += f"{n_spaces}{name}\n"
                         continue
 
                     # Weir inlet is outside the grid, and it is an Inlet
-                    if self.gutils.grid_on_point(x1, y1) is None and weir_inlet.lower().startswith("i"):
+                    if lattice.cell_on_point(x1, y1) is None and weir_inlet.lower().startswith("i"):
                         outside_weirs += f"{n_spaces}{name}\n"
                         continue
 
@@ -4856,52 +4861,27 @@ class StormDrainEditorWidget(qtBaseClass, uiDialog):
                                      "Select a valid .RPT file.")
                     return
 
+                QApplication.setOverrideCursor(qt_cursor_shape("WaitCursor"))
+                rpt_index = SwmmRptIndex.open(RPT_file)
+                QApplication.restoreOverrideCursor()
                 if intersection:
-                    with open(RPT_file) as f:
-                        if not intersection in f.read():
-                            self.uc.bar_error("Link " + intersection + " not found in file " + RPT_file)
-                            self.uc.log_info("WARNING 111123.1742: Link " + intersection + " not found in file\n\n" + RPT_file +
-                                             "\n\nSelect a valid .RPT file.")
-                            return
+                    if not rpt_index.has("Link", intersection):
+                        self.uc.bar_error("Link " + intersection + " not found in file " + RPT_file)
+                        self.uc.log_info("WARNING 111123.1742: Link " + intersection + " not found in file\n\n" + RPT_file +
+                                         "\n\nSelect a valid .RPT file.")
+                        return
 
-                data = OrderedDict()
                 # Read RPT file.
                 try:
                     QApplication.setOverrideCursor(qt_cursor_shape("WaitCursor"))
 
-                    pd = ParseDAT()
-                    par = pd.single_parser(RPT_file)
-
-                    previous = []
-                    units = "CMS"
-                    for row in par:
-                        if "Flow" in row and "Units" in row:
-                            units = "CMS" if "CMS" in row else "CFS" if "CFS" in row else "CMS"
-                        if previous:
-                            cell = previous[2]
-                            for _ in range(3):
-                                next(par)
-                        if "<<<" in row and "Link" in row:
-                            cell = row[2]
-                            for _ in range(4):
-                                next(par)
-                        if previous or ("<<<" in row and "Link" in row):
-                            previous = []
-                            data[cell] = []
-                            for row2 in par:
-                                if "<<<" in row2 and "Link" in row2:
-                                    previous = row2
-                                    break
-                                if row2:
-                                    if len(row2) == 6:
-                                        data[cell].append(list(row2))
-                                    else:
-                                        break
+                    units = "CFS" if rpt_index.units == "CFS" else "CMS"
+                    links = rpt_index.names("Link")
 
-                    if data:
+                    if links:
                         if intersection is False:
-                            intersection = next(iter(data.items()))[0]
-                        if not intersection in data:
+                            intersection = links[0]
+                        if not rpt_index.has("Link", intersection):
                             QApplication.restoreOverrideCursor()
                             self.plot.clear()
                             self.tview.model().setRowCount(0)
@@ -4912,7 +4892,7 @@ class StormDrainEditorWidget(qtBaseClass, uiDialog):
                                              "\n\nSelect a valid .RPT file.")
                             return
 
-                        node_series = data[intersection]
+                        node_series = rpt_index.rows("Link", intersection)
                         I = 1
                         day = 0
                         previousHour = -1
@@ -5141,16 +5121,17 @@ class StormDrainEditorWidget(qtBaseClass, uiDialog):
 
             results_file = RPT_file
 
+            QApplication.setOverrideCursor(qt_cursor_shape("WaitCursor"))
+            rpt_index = SwmmRptIndex.open(RPT_file)
+            QApplication.restoreOverrideCursor()
             if intersection:
-                with open(RPT_file) as f:
-                    if not intersection in f.read():
-                        self.uc.bar_error("Node " + intersection + " not found in file " + RPT_file)
-                        # QApplication.restoreOverrideCursor()
-                        self.uc.log_info("WARNING 111123.1742: Node " + intersection + " not found in file\n\n" + RPT_file +
-                                            "\n\nSelect a valid .RPT file.")
-                        return
+                if not rpt_index.has("Node", intersection):
+                    self.uc.bar_error("Node " + intersection + " not found in file " + RPT_file)
+                    # QApplication.restoreOverrideCursor()
+                    self.uc.log_info("WARNING 111123.1742: Node " + intersection + " not found in file\n\n" + RPT_file +
+                                        "\n\nSelect a valid .RPT file.")
+                    return
 
-            data = OrderedDict()
             # Read RPT file.
             try:
 
@@ -5159,39 +5140,13 @@ class StormDrainEditorWidget(qtBaseClass, uiDialog):
 
                 QApplication.setOverrideCursor(qt_cursor_shape("WaitCursor"))
 
-                pd = ParseDAT()
-                par = pd.single_parser(RPT_file)
-
-                previous = []
-                units = "CMS"
-                for row in par:
-                    if "Flow" in row and "Units" in row:
-                        units = "CMS" if "CMS" in row else "CFS" if "CFS" in row else "CMS"
-                    if previous:
-                        cell = previous[2]
-                        for _ in range(3):
-                            next(par)
-                    if "<<<" in row and "Node" in row:
-                        cell = row[2]
-                        for _ in range(4):
-                            next(par)
-                    if previous or ("<<<" in row and "Node" in row):
-                        previous = []
-                        data[cell] = []
-                        for row2 in par:
-                            if "<<<" in row2 and "Node" in row2:
-                                previous = row2
-                                break
-                            if row2:
-                                if len(row2) == 6:
-                                    data[cell].append(list(row2))
-                                else:
-                                    break
+                units = "CFS" if rpt_index.units == "CFS" else "CMS"
+                nodes = rpt_index.names("Node")
 
-                if data:
+                if nodes:
                     if intersection is False:
-                        intersection = next(iter(data.items()))[0]
-                    if not intersection in data:
+                        intersection = nodes[0]
+                    if not rpt_index.has("Node", intersection):
                         QApplication.restoreOverrideCursor()
                         self.plot.clear()
                         self.tview.model().setRowCount(0)
@@ -5209,7 +5164,7 @@ class StormDrainEditorWidget(qtBaseClass, uiDialog):
                 self.uc.log_info("Reading .RPT file failed!")
                 return False
 
-            node_series = data[intersection]
+            node_series = rpt_index.rows("Node", intersection)
             day = 0
             previousHour = -1
             RPTtimeSeries = []
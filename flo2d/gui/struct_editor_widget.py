@@ -26,6 +26,7 @@ from qgis.PyQt.QtWidgets import QApplication, QFileDialog, QInputDialog
 from qgis.PyQt.QtCore import QUrl
 
 from .dlg_check_report import GenericCheckReportDialog
+from ..flo2d_tools.grid_tools import grid_lattice
 from ..flo2dobjects import Structure
 from ..geopackage_utils import GeoPackageUtils
 from ..gui.dlg_bridges import BridgesDialog
@@ -274,13 +275,14 @@ class StructEditorWidget(qtBaseClass, uiDialog):
             self.gutils.execute(del_qry)
 
             batch_updates = []
+            lattice = grid_lattice(self.gutils)
             for feat in self.user_struct_lyr.getFeatures():
                 line_geom = feat.geometry().asPolyline()
                 fid = feat["fid"]
                 start = line_geom[0]
                 end = line_geom[-1]
-                inflonod = self.gutils.grid_on_point(start.x(), start.y())
-                outflonod = self.gutils.grid_on_point(end.x(), end.y())
+                inflonod = lattice.cell_on_point(start.x(), start.y())
+                outflonod = lattice.cell_on_point(end.x(), end.y())
                 batch_updates.append((inflonod, outflonod, fid))
 
             self.gutils.execute_many("UPDATE struct SET inflonod = ?, outflonod = ? WHERE fid = ?;", batch_updates)
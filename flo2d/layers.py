@@ -1985,10 +1985,19 @@ class Layers(object):
         readonly=False,
         advanced=False,
         provider="ogr",
+        known_layers=None,
     ):
+        """
+        Load table layer into the group. The style is not applied here (see 'configure_layer'), it only skips
+        reading the default style of the layer. 'known_layers' maps the normalized uri of layers already in the
+        group to their ids.
+        """
         # try:
         # check if the layer is already loaded
-        lyr_exists = self.layer_exists_in_group(uri, group)
+        if known_layers is not None:
+            lyr_exists = known_layers.get(normpath(uri))
+        else:
+            lyr_exists = self.layer_exists_in_group(uri, group)
 
         if subgroup:
             grp = self.get_subgroup(group, subgroup)
@@ -2004,7 +2013,9 @@ class Layers(object):
 
         if not lyr_exists:
             start_time = time.time()
-            vlayer = QgsVectorLayer(uri, name, provider)
+            options = QgsVectorLayer.LayerOptions(QgsProject.instance().transformContext())
+            options.loadDefaultStyle = not style
+            vlayer = QgsVectorLayer(uri, name, provider, options)
             self.uc.log_info(
                 "\t{0:.3f} seconds => loading {1} - create QgsVectorLayer".format(time.time() - start_time, name)
             )
@@ -2059,21 +2070,6 @@ class Layers(object):
             tree_lyr.setExpanded(False)
         # preserve layer visibility for existing layers
 
-        # set style
-        if style:
-            start_time = time.time()
-            style_path = get_file_path("styles", style)
-            if os.path.isfile(style_path):
-                err_msg, res = self.data[table]["qlyr"].loadNamedStyle(style_path)
-                if not res:
-                    QApplication.restoreOverrideCursor()
-                    msg = "Unable to load style for layer {}.\n{}".format(name, err_msg)
-                    raise Flo2dError(msg)
-            else:
-                QApplication.restoreOverrideCursor()
-                raise Flo2dError("Unable to load style file {}".format(style_path))
-            self.uc.log_info("\t{0:.3f} seconds => loading {1} - set style".format(time.time() - start_time, name))
-
         # check if the layer should be 'readonly'
 
         if readonly:
@@ -2103,6 +2099,75 @@ class Layers(object):
         #     msg = "ERROR 270123.1142 Unable to load  layer {}.".format(table)
         #     self.uc.bar_error(msg)
 
+    def set_layer_style(self, table, style):
+        name = self.data[table]["name"]
+        start_time = time.time()
+        style_path = get_file_path("styles", style)
+        if os.path.isfile(style_path):
+            err_msg, res = self.data[table]["qlyr"].loadNamedStyle(style_path)
+            if not res:
+                QApplication.restoreOverrideCursor()
+                msg = "Unable to load style for layer {}.\n{}".format(name, err_msg)
+                raise Flo2dError(msg)
+        else:
+            QApplication.restoreOverrideCursor()
+            raise Flo2dError("Unable to load style file {}".format(style_path))
+        self.uc.log_info("\t{0:.3f} seconds => loading {1} - set style".format(time.time() - start_time, name))
+
+    def configure_layer(self, table):
+        """
+        Apply style, attributes edit widgets and default values of the loaded table layer, once.
+        """
+        data = self.data[table]
+        self.disconnect_deferred(table)
+        if data.get("configured", True):
+            return
+        data["configured"] = True
+        l = data["qlyr"]
+        if data["styles"]:
+            self.set_layer_style(table, data["styles"][0])
+        if table == "blocked_cells":
+            self.update_style_blocked(l.id())
+        if data["attrs_edit_widgets"]:
+            for attr, widget_data in data["attrs_edit_widgets"].items():
+                attr_idx = l.fields().lookupField(attr)
+                l.setEditorWidgetSetup(
+                    attr_idx,
+                    QgsEditorWidgetSetup(widget_data["name"], widget_data["config"]),
+                )
+        # set attributes default value, if any
+        dvs = data.get("attrs_defaults")
+        if dvs:
+            for attr, val in dvs.items():
+                field = l.fields().field(attr)
+                field.setDefaultValueDefinition(QgsDefaultValue(val))
+
+    def defer_configuration(self, table, tree_lyr):
+        """
+        Configure unchecked table layer when it is first checked or edited.
+        """
+        data = self.data[table]
+        # Layers reloaded before being configured keep a single pair of connections
+        self.disconnect_deferred(table)
+        data["configured"] = False
+        visibility_signal = tree_lyr.visibilityChanged
+        editing_signal = data["qlyr"].beforeEditingStarted
+        data["deferred"] = [
+            (visibility_signal, visibility_signal.connect(lambda node, t=table: self.configure_layer(t))),
+            (editing_signal, editing_signal.connect(lambda t=table: self.configure_layer(t))),
+        ]
+
+    def disconnect_deferred(self, table):
+        """
+        Disconnect signals connected by 'defer_configuration' of the table layer.
+        """
+        for signal, connection in self.data[table].pop("deferred", []):
+            try:
+                signal.disconnect(connection)
+            except (TypeError, RuntimeError):
+                # Already disconnected or the layer was removed
+                pass
+
     def warn_readonly(self):
         # self.uc.bar_warn("All changes to this layer can be overwritten by changes in the User Layer.")
         pass
@@ -2362,6 +2427,17 @@ class Layers(object):
         if sel_lyrs:
             self.iface.layerTreeView().setCurrentLayer(sel_lyrs[0])
 
+    def group_layers_uris(self, group=None):
+        """
+        Return {normalized data source uri: layer id} of the layers in the group.
+        """
+        grp = self.root.findGroup(group) if group is not None else self.root
+        uris = {}
+        if grp:
+            for lyr in grp.findLayers():
+                uris.setdefault(normpath(lyr.layer().dataProvider().dataSourceUri()), lyr.layer().id())
+        return uris
+
     def layer_exists_in_group(self, uri, group=None):
         grp = self.root.findGroup(group) if group is not None else self.root
         if grp:
@@ -2432,6 +2508,9 @@ class Layers(object):
         pd.setValue(0)
         i = 0
 
+        # Layers already in the group, looked up once instead of scanning the group for every table
+        known_layers = self.group_layers_uris(group)
+
         for lyr in self.data:
             pd.setLabelText(f"Loading {lyr}...")
         # try:
@@ -2460,31 +2539,16 @@ class Layers(object):
                 subsubgroup=subsubgroup,
                 visible=lyr_is_on,
                 readonly=data["readonly"],
-                advanced=data["advanced"]
+                advanced=data["advanced"],
+                known_layers=known_layers,
             )
-            l = self.get_layer_by_id(lyr_id)
-            if lyr == "blocked_cells":
-                self.update_style_blocked(lyr_id)
-            if data["attrs_edit_widgets"]:
-                for attr, widget_data in data["attrs_edit_widgets"].items():
-                    attr_idx = l.fields().lookupField(attr)
-                    l.setEditorWidgetSetup(
-                        attr_idx,
-                        QgsEditorWidgetSetup(widget_data["name"], widget_data["config"]),
-                    )
+            # Unchecked layers are styled and get their edit widgets when first checked or edited
+            tree_lyr = self.root.findLayer(lyr_id)
+            if tree_lyr is not None and not tree_lyr.itemVisibilityChecked():
+                self.defer_configuration(lyr, tree_lyr)
             else:
-                pass  # no attributes edit widgets config
-            # set attributes default value, if any
-            try:
-                dvs = data["attrs_defaults"]
-            except Exception as e:
-                dvs = None
-            if dvs:
-                for attr, val in dvs.items():
-                    field = l.fields().field(attr)
-                    field.setDefaultValueDefinition(QgsDefaultValue(val))
-            else:
-                pass
+                data["configured"] = False
+                self.configure_layer(lyr)
             self.uc.log_info("{0:.3f} seconds => total loading {1} ".format(time.time() - start_time, data["name"]))
 
             # except Exception as e:
@@ -6,6 +6,7 @@ import warnings
 from ..deps import safe_dask as dask
 import dask.dataframe as dd
 import numpy as np
+import pandas as pd
 from dask.distributed import Client
 
 with warnings.catch_warnings():
@@ -18,7 +19,7 @@ with warnings.catch_warnings():
 sys.path.append(os.path.dirname(__file__))
 
 from affine import Affine
-from transform import rowcol
+from pixel_average import pixel_averages, pixel_sums
 
 if __name__ == "__main__":
     args = sys.argv
@@ -72,35 +73,20 @@ if __name__ == "__main__":
         if open_dashboard:
             os.startfile(client.dashboard_link)
 
-        def pixel_coord_from_xy(row, trans, rows, cols):
-            # TODO: Check if this operation on dataframe can be vectorized using
-            # numba jit
-            r, c = rowcol(trans, row.X, row.Y)
-            result = grid_nodata
-            if r < rows and r >= 0 and c < cols and c >= 0:
-                result = "{}_{}".format(r, c)
-            return result
+        def partition_pixel_sums(part):
+            keys, sums, counts = pixel_sums(part.X.values, part.Y.values, part.Z.values, transform, *shape)
+            return pd.DataFrame({"key": keys, "sum": sums, "count": counts})
 
         # find raster position for each data point and
         # compute average elevation for each pixel
         df = dd.read_csv(csv_file, dtype={"X": float, "Y": float, "Z": float})
         if not nodata in ["None", "none"]:
             df = df[df.Z > (float(nodata) + 0.1)]  # assuming elevation smaller than nodata is nodata too
-        df["gridno"] = str(grid_nodata)
-        df["gridno"] = df.apply(
-            pixel_coord_from_xy,
-            axis=1,
-            args=(transform, shape[0], shape[1]),
-            meta=("str"),
-        )
+        # Sums and counts by pixel of every partition, points outside of the raster are dropped
+        partial = df.map_partitions(partition_pixel_sums, meta={"key": "i8", "sum": "f8", "count": "i8"})
         print("Long computation ...\n")
-        series = df.groupby("gridno").Z.mean().compute()
-
-        # remove out of bound data
-        try:
-            series.pop(grid_nodata)
-        except:
-            pass
+        partial = partial.compute()
+        pixels, averages = pixel_averages(partial.key.values, partial["sum"].values, partial["count"].values)
 
     except:
         print(traceback.format_exc())
@@ -119,9 +105,7 @@ if __name__ == "__main__":
         if os.path.exists(raster_outpath):
             os.unlink(raster_outpath)
         raster_array = np.full(shape, int(grid_nodata), dtype=np.float32)
-        for key, avg_elev in series.items():
-            r, c = [int(x) for x in key.split("_")]
-            raster_array[r, c] = avg_elev
+        raster_array.flat[pixels] = averages
 
         driver = gdal.GetDriverByName("GTiff")
         ds = driver.Create(raster_outpath, shape[1], shape[0], 1, gdal.GDT_Float32)
@@ -11,8 +11,11 @@ import os
 import sys
 import warnings
 
+import numpy as np
+
 sys.path.append(os.path.dirname(__file__))
 from affine import Affine
+from pixel_average import pixel_index
 from transform import TransformMethodsMixin
 
 with warnings.catch_warnings():
@@ -21,6 +24,9 @@ with warnings.catch_warnings():
 
     gdal.UseExceptions()
 
+# Pixels of a raster window read at once by 'sample_raster'
+WINDOW_PIXELS = 16 << 20
+
 
 class GDALRasterLayer(TransformMethodsMixin):
     def __init__(self, raster_file):
@@ -31,3 +37,63 @@ class GDALRasterLayer(TransformMethodsMixin):
     def transform(self):
         geotransform = self.ds.GetGeoTransform()
         return Affine.from_gdal(*geotransform)
+
+
+def nodata_pixels(window, nodata):
+    """
+    Return mask of window pixels equal to the nodata value, compared in the data type of the band.
+    """
+    if nodata is None:
+        return np.zeros(window.shape, dtype=bool)
+    if np.isnan(nodata):
+        return np.isnan(window)
+    if window.dtype.kind in "iu":
+        info = np.iinfo(window.dtype)
+        if nodata != int(nodata) or not info.min <= nodata <= info.max:
+            return np.zeros(window.shape, dtype=bool)
+    return window == np.array(nodata).astype(window.dtype)
+
+
+def sample_raster(raster_file, xs, ys, band=1, window_pixels=WINDOW_PIXELS):
+    """
+    Return float64 array of band values at points (xs, ys), NaN for points outside of the raster and on nodata or
+    masked pixels. Pixels are found with the inverse geotransform. The band is read with 'ReadAsArray' in strips of
+    whole block rows of at most 'window_pixels' pixels (at least one row), only strips with points and only over the
+    columns with points. Blocks taller than a strip (e.g. rasters stored as a single strip) are read in parts.
+    """
+    ds = gdal.Open(raster_file)
+    rband = ds.GetRasterBand(band)
+    rows, cols = ds.RasterYSize, ds.RasterXSize
+    index = pixel_index(xs, ys, Affine.from_gdal(*ds.GetGeoTransform()), rows, cols)
+    values = np.full(index.size, np.nan)
+    inside = np.flatnonzero(index >= 0)
+    if not inside.size:
+        return values
+
+    pixel_rows, pixel_cols = np.divmod(index[inside], cols)
+    block_rows = rband.GetBlockSize()[1]
+    window_rows = max(window_pixels // cols, 1)
+    strip_rows = window_rows // block_rows * block_rows if block_rows <= window_rows else window_rows
+    strips = pixel_rows // strip_rows
+    order = np.argsort(strips, kind="stable")
+    nodata = rband.GetNoDataValue()
+    mask_flags = rband.GetMaskFlags()
+    # Masks other than nodata (alpha band, per dataset masks) are read from the mask band
+    mask_band = None if mask_flags & (gdal.GMF_ALL_VALID | gdal.GMF_NODATA) else rband.GetMaskBand()
+    for points in np.split(order, np.flatnonzero(np.diff(strips[order])) + 1):
+        row_off = int(strips[points[0]]) * strip_rows
+        n_rows = min(strip_rows, rows - row_off)
+        col_off = int(pixel_cols[points].min())
+        n_cols = int(pixel_cols[points].max()) + 1 - col_off
+        window = rband.ReadAsArray(col_off, row_off, n_cols, n_rows)
+        missing = nodata_pixels(window, nodata)
+        if mask_band is not None:
+            missing |= mask_band.ReadAsArray(col_off, row_off, n_cols, n_rows) == 0
+        window = window.astype(np.float64)
+        window[missing] = np.nan
+        values[inside[points]] = window[pixel_rows[points] - row_off, pixel_cols[points] - col_off]
+
+    scale, offset = rband.GetScale(), rband.GetOffset()
+    if scale not in (None, 1) or offset not in (None, 0):
+        values = values * (1 if scale is None else scale) + (0 if offset is None else offset)
+    return values
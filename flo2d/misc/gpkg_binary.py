@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+
+# FLO-2D Preprocessor tools for QGIS
+
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version
+"""
+Encoding and decoding of GeoPackage binary geometries (GPB) with NumPy.
+
+Encoded blobs are byte for byte the same as the ones returned by SpatiaLite 'AsGPB(ST_GeomFromText(...))':
+little endian header with a 2D envelope (flags 0x03) followed by little endian WKB.
+Decoding accepts any 2D, 3D or measured GPB written by SpatiaLite, OGR or QGIS.
+"""
+import re
+import struct
+
+import numpy as np
+
+GPB_MAGIC = b"GP"
+GPB_VERSION = 0
+GPB_FLAGS_2D_LE = 0x03  # Little endian, envelope [minx, maxx, miny, maxy]
+GPB_HEADER_SIZE = 8
+GPB_ENVELOPE_SIZES = {0: 0, 1: 32, 2: 48, 3: 48, 4: 64}
+
+WKB_LE = 1
+WKB_POINT = 1
+WKB_LINESTRING = 2
+WKB_POLYGON = 3
+WKB_MULTIPOINT = 4
+WKB_MULTILINESTRING = 5
+WKB_MULTIPOLYGON = 6
+
+_HEADER_FIELDS = [
+    ("magic", "S2"),
+    ("version", "u1"),
+    ("flags", "u1"),
+    ("srs_id", "<i4"),
+    ("envelope", "<f8", (4,)),
+    ("byte_order", "u1"),
+    ("wkb_type", "<u4"),
+]
+
+POINT_DTYPE = np.dtype(_HEADER_FIELDS + [("coords", "<f8", (2,))])
+SQUARE_DTYPE = np.dtype(_HEADER_FIELDS + [("num_rings", "<u4"), ("num_points", "<u4"), ("coords", "<f8", (5, 2))])
+
+_WKT_NUMBERS = re.compile(r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+_WKT_SIMPLE = re.compile(r"^\s*(POINT|LINESTRING|POLYGON|MULTILINESTRING)\s*(\(.*\))\s*$", re.IGNORECASE | re.DOTALL)
+
+
+def _as_blobs(records):
+    """
+    Convert packed structured array into a list of bytes objects (one per record).
+    """
+    return records.view(np.dtype((np.void, records.dtype.itemsize))).tolist()
+
+
+def _fill_header(records, wkb_type, srs_id):
+    records["magic"] = GPB_MAGIC
+    records["version"] = GPB_VERSION
+    records["flags"] = GPB_FLAGS_2D_LE
+    records["srs_id"] = srs_id
+    records["byte_order"] = WKB_LE
+    records["wkb_type"] = wkb_type
+
+
+def _header(coords, srs_id):
+    """
+    GPB header with 2D envelope for (N, 2) coordinates array.
+    """
+    xmin, ymin = coords.min(axis=0)
+    xmax, ymax = coords.max(axis=0)
+    return struct.pack("<2sBBi4d", GPB_MAGIC, GPB_VERSION, GPB_FLAGS_2D_LE, srs_id, xmin, xmax, ymin, ymax)
+
+
+def _as_coords(coords):
+    return np.ascontiguousarray(coords, dtype="<f8").reshape(-1, 2)
+
+
+def encode_points(xs, ys, srs_id=0):
+    """
+    Encode points (xs, ys) into a list of GPB point blobs.
+    """
+    xs = np.asarray(xs, dtype=np.float64).ravel()
+    ys = np.asarray(ys, dtype=np.float64).ravel()
+    records = np.zeros(xs.size, dtype=POINT_DTYPE)
+    _fill_header(records, WKB_POINT, srs_id)
+    records["envelope"] = np.column_stack((xs, xs, ys, ys))
+    records["coords"] = np.column_stack((xs, ys))
+    return _as_blobs(records)
+
+
+def encode_point(x, y, srs_id=0):
+    return encode_points([x], [y], srs_id)[0]
+
+
+def encode_squares(xs, ys, size, srs_id=0):
+    """
+    Encode axis-aligned squares centered at (xs, ys) into a list of GPB polygon blobs.
+    Ring vertices follow the order used by GeoPackageUtils.build_square_xy (lower left, counterclockwise).
+    """
+    xs = np.asarray(xs, dtype=np.float64).ravel()
+    ys = np.asarray(ys, dtype=np.float64).ravel()
+    half_size = float(size) * 0.5
+    xmin, xmax = xs - half_size, xs + half_size
+    ymin, ymax = ys - half_size, ys + half_size
+
+    records = np.zeros(xs.size, dtype=SQUARE_DTYPE)
+    _fill_header(records, WKB_POLYGON, srs_id)
+    records["envelope"] = np.column_stack((xmin, xmax, ymin, ymax))
+    records["num_rings"] = 1
+    records["num_points"] = 5
+    coords = records["coords"]
+    coords[:, 0, 0], coords[:, 0, 1] = xmin, ymin
+    coords[:, 1, 0], coords[:, 1, 1] = xmax, ymin
+    coords[:, 2, 0], coords[:, 2, 1] = xmax, ymax
+    coords[:, 3, 0], coords[:, 3, 1] = xmin, ymax
+    coords[:, 4, 0], coords[:, 4, 1] = xmin, ymin
+    return _as_blobs(records)
+
+
+def encode_square(x, y, size, srs_id=0):
+    return encode_squares([x], [y], size, srs_id)[0]
+
+
+def encode_polygon(*rings, srs_id=0):
+    """
+    Encode polygon given as (N, 2) coordinate arrays of its rings (exterior first) into GPB blob.
+    """
+    rings = [_as_coords(ring) for ring in rings]
+    parts = [struct.pack("<BII", WKB_LE, WKB_POLYGON, len(rings))]
+    for ring in rings:
+        parts.append(struct.pack("<I", len(ring)))
+        parts.append(ring.tobytes())
+    return _header(rings[0], srs_id) + b"".join(parts)
+
+
+def encode_linestring(coords, srs_id=0):
+    """
+    Encode linestring given as (N, 2) coordinates array into GPB blob.
+    """
+    coords = _as_coords(coords)
+    return _header(coords, srs_id) + struct.pack("<BII", WKB_LE, WKB_LINESTRING, len(coords)) + coords.tobytes()
+
+
+def encode_linestrings(lines, srs_id=0):
+    """
+    Encode a sequence of (N, 2) coordinates arrays into a list of GPB linestring blobs.
+    """
+    return [encode_linestring(coords, srs_id) for coords in lines]
+
+
+def encode_multilinestring(lines, srs_id=0):
+    """
+    Encode a sequence of (N, 2) coordinates arrays into GPB multilinestring blob.
+    """
+    lines = [_as_coords(coords) for coords in lines]
+    parts = [struct.pack("<BII", WKB_LE, WKB_MULTILINESTRING, len(lines))]
+    for coords in lines:
+        parts.append(struct.pack("<BII", WKB_LE, WKB_LINESTRING, len(coords)))
+        parts.append(coords.tobytes())
+    return _header(np.vstack(lines), srs_id) + b"".join(parts)
+
+
+def wkt_to_gpb(wkt, srs_id=0):
+    """
+    Encode simple 2D WKT (POINT, LINESTRING, POLYGON, MULTILINESTRING) into GPB blob.
+    Returns None for any other WKT, so the caller can fall back to SpatiaLite.
+    """
+    match = _WKT_SIMPLE.match(wkt)
+    if match is None:
+        return None
+    geom_type, body = match.group(1).upper(), match.group(2)
+    try:
+        parts = []
+        for part in re.findall(r"\(([^()]*)\)", body):
+            vertices = [_WKT_NUMBERS.findall(vertex) for vertex in part.split(",")]
+            if any(len(vertex) != 2 for vertex in vertices):
+                return None
+            parts.append(np.array(vertices, dtype=np.float64))
+    except ValueError:
+        return None
+    if not parts:
+        return None
+    if geom_type == "POINT":
+        return encode_point(*parts[0][0], srs_id=srs_id) if len(parts) == 1 and len(parts[0]) == 1 else None
+    elif geom_type == "LINESTRING":
+        return encode_linestring(parts[0], srs_id) if len(parts) == 1 else None
+    elif geom_type == "POLYGON":
+        return encode_polygon(*parts, srs_id=srs_id)
+    else:
+        return encode_multilinestring(parts, srs_id)
+
+
+def header_size(blob):
+    """
+    Size of GPB header (including envelope) preceding WKB part of the blob.
+    """
+    if blob[:2] != GPB_MAGIC:
+        raise ValueError("Not a GeoPackage binary geometry.")
+    envelope_indicator = (blob[3] >> 1) & 0x07
+    return GPB_HEADER_SIZE + GPB_ENVELOPE_SIZES[envelope_indicator]
+
+
+def _read_wkb(wkb, offset, parts):
+    """
+    Recursively collect (N, 2) coordinate arrays of WKB geometry starting at 'offset'. Returns WKB type and end offset.
+    """
+    endian = "<" if wkb[offset] == WKB_LE else ">"
+    (wkb_type,) = struct.unpack_from(endian + "I", wkb, offset + 1)
+    offset += 5
+    # ISO (1000, 2000, 3000) and EWKB style (high bits) Z/M flags
+    iso_type = wkb_type & 0x0FFFFFFF
+    has_z = bool(wkb_type & 0x80000000) or iso_type // 1000 in (1, 3)
+    has_m = bool(wkb_type & 0x40000000) or iso_type // 1000 in (2, 3)
+    base_type = iso_type % 1000
+    dims = 2 + has_z + has_m
+    dtype = np.dtype(endian + "f8")
+
+    def read_coords(count, pos):
+        coords = np.frombuffer(wkb, dtype=dtype, count=count * dims, offset=pos).reshape(count, dims)[:, :2]
+        return coords.astype(np.float64), pos + count * dims * 8
+
+    if base_type == WKB_POINT:
+        coords, offset = read_coords(1, offset)
+        parts.append(coords)
+    elif base_type == WKB_LINESTRING:
+        (count,) = struct.unpack_from(endian + "I", wkb, offset)
+        coords, offset = read_coords(count, offset + 4)
+        parts.append(coords)
+    elif base_type == WKB_POLYGON:
+        (rings,) = struct.unpack_from(endian + "I", wkb, offset)
+        offset += 4
+        for _ in range(rings):
+            (count,) = struct.unpack_from(endian + "I", wkb, offset)
+            coords, offset = read_coords(count, offset + 4)
+            parts.append(coords)
+    elif base_type in (WKB_MULTIPOINT, WKB_MULTILINESTRING, WKB_MULTIPOLYGON, 7):
+        (members,) = struct.unpack_from(endian + "I", wkb, offset)
+        offset += 4
+        for _ in range(members):
+            _, offset = _read_wkb(wkb, offset, parts)
+    else:
+        raise ValueError("Unsupported WKB geometry type {}.".format(wkb_type))
+    return base_type, offset
+
+
+def decode(blob):
+    """
+    Decode GPB blob into (WKB base type, list of (N, 2) coordinate arrays).
+    Polygons give one array per ring, multi geometries one array per member (or ring).
+    """
+    blob = bytes(blob)
+    parts = []
+    base_type, _ = _read_wkb(blob, header_size(blob), parts)
+    return base_type, parts
+
+
+def decode_envelope(blob):
+    """
+    Return 2D envelope (minx, maxx, miny, maxy) of GPB blob, computed from coordinates if the header has none.
+    """
+    blob = bytes(blob)
+    if (blob[3] >> 1) & 0x07:
+        endian = "<" if blob[3] & 0x01 else ">"
+        return struct.unpack_from(endian + "4d", blob, GPB_HEADER_SIZE)
+    coords = np.vstack(decode(blob)[1])
+    return coords[:, 0].min(), coords[:, 0].max(), coords[:, 1].min(), coords[:, 1].max()
+
+
+def decode_envelopes(blobs):
+    """
+    Return (N, 4) array with 2D envelopes (minx, maxx, miny, maxy) of GPB blobs.
+    Blobs sharing the SpatiaLite/OGR little endian layout are decoded in one NumPy pass.
+    """
+    blobs = [bytes(blob) for blob in blobs]
+    envelopes = np.empty((len(blobs), 4), dtype=np.float64)
+    if not blobs:
+        return envelopes
+    size = len(blobs[0])
+    if size >= GPB_HEADER_SIZE + 32 and all(len(blob) == size for blob in blobs):
+        raw = np.frombuffer(b"".join(blobs), dtype=np.uint8).reshape(-1, size)
+        flags = raw[:, 3]
+        # Little endian header with any envelope type, which always starts with minx, maxx, miny, maxy
+        if np.all((flags & 0x01 == 1) & ((flags >> 1) & 0x07 > 0)):
+            envelopes[:] = np.ascontiguousarray(raw[:, GPB_HEADER_SIZE : GPB_HEADER_SIZE + 32]).view("<f8")
+            return envelopes
+    for i, blob in enumerate(blobs):
+        envelopes[i] = decode_envelope(blob)
+    return envelopes
+
+
+def decode_centroids(blobs):
+    """
+    Return (N, 2) array with centres of GPB blobs envelopes. For grid cells (axis-aligned squares) and points
+    this is the centroid of the geometry.
+    """
+    envelopes = decode_envelopes(blobs)
+    return np.column_stack(((envelopes[:, 0] + envelopes[:, 1]) * 0.5, (envelopes[:, 2] + envelopes[:, 3]) * 0.5))
+
+
+def decode_points(blobs):
+    """
+    Return (N, 2) array with coordinates of GPB point blobs.
+    """
+    blobs = [bytes(blob) for blob in blobs]
+    if blobs and all(len(blob) == POINT_DTYPE.itemsize and blob[3] == GPB_FLAGS_2D_LE for blob in blobs):
+        records = np.frombuffer(b"".join(blobs), dtype=POINT_DTYPE)
+        return records["coords"].astype(np.float64)
+    points = np.empty((len(blobs), 2), dtype=np.float64)
+    for i, blob in enumerate(blobs):
+        points[i] = decode(blob)[1][0][0]
+    return points
@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+
+# FLO-2D Preprocessor tools for QGIS
+
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version
+import locale
+import os
+from collections import namedtuple
+
+import numpy as np
+
+# Bytes of a LIDAR file parsed at once
+CHUNK_BYTES = 32 << 20
+
+# Columns of x, y, z by number of values of space delimited lines and by number of commas of comma delimited lines
+SPACE_COLUMNS = {3: (0, 1, 2), 4: (0, 1, 2), 5: (1, 2, 3)}
+COMMA_COLUMNS = {2: (0, 1, 2), 3: (0, 1, 2), 4: (1, 2, 3)}
+
+# Points of a chunk: cell columns, rows and elevations, number of lines, (line, error) where reading of the file
+# stops or None, and (point, line) of elevations that are not numbers.
+LidarChunk = namedtuple("LidarChunk", ["cols", "rows", "z", "n_lines", "stop", "bad_z"])
+
+
+def lidar_format(path):
+    """
+    Return (number of commas, number of space separated values) of the first not empty line, tabs removed.
+    """
+    with open(path, "r") as f:
+        for line in f:
+            line = line.replace("\t", "")
+            if line.strip() != "":
+                n_commas = line.count(",")
+                return n_commas, len(line.split()) if n_commas == 0 else 0
+    return 0, 0
+
+
+def chunk_ranges(path, chunk_bytes=CHUNK_BYTES):
+    """
+    Return (start, end) byte offsets of file chunks ending at line ends.
+    """
+    size = os.path.getsize(path)
+    ranges = []
+    start = 0
+    with open(path, "rb") as f:
+        while start < size:
+            end = start + chunk_bytes
+            if end < size:
+                f.seek(end)
+                f.readline()
+                end = f.tell()
+            end = min(end, size)
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def read_lines(path, start, end):
+    """
+    Return lines of file chunk without line ends and tabs.
+    """
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    text = data.decode(locale.getpreferredencoding(False), errors="replace")
+    # Tabs are removed, not taken as separators
+    text = text.replace("\t", "")
+    lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    if lines and lines[-1] == "":
+        lines.pop()
+    return lines
+
+
+def parse_points_fast(lines, n_commas, n_spaces, xmin, ymin, cell_size):
+    """
+    Parse chunk of lines with the same number of values in one call. Returns None if any line needs the line by
+    line reader.
+    """
+    columns = COMMA_COLUMNS.get(n_commas) if n_commas else SPACE_COLUMNS.get(n_spaces)
+    if columns is None:
+        # Unsupported layout, the line by line reader skips the file
+        return None
+    n_values = n_commas + 1 if n_commas else n_spaces
+    try:
+        values = np.loadtxt(
+            lines,
+            delimiter="," if n_commas else None,
+            comments=None,
+            ndmin=2,
+            dtype=np.float64,
+        )
+    except ValueError:
+        return None
+    if values.shape != (len(lines), n_values):
+        return None
+    x, y, z = (values[:, c] for c in columns)
+    cols = (x - xmin) / cell_size
+    rows = (y - ymin) / cell_size
+    if not (np.isfinite(cols).all() and np.isfinite(rows).all()):
+        return None
+    cols = np.trunc(cols).astype(np.int64) + 2
+    rows = np.trunc(rows).astype(np.int64) + 2
+    return LidarChunk(cols, rows, z, len(lines), None, [])
+
+
+def parse_points(lines, n_commas, xmin, ymin, cell_size):
+    """
+    Parse chunk of lines one by one, stopping where the first line with an unexpected number of values is.
+    """
+    cols, rows, z, bad_z = [], [], [], []
+    stop = None
+    for k, line in enumerate(lines):
+        if n_commas == 0:
+            values = line.split()
+            columns = SPACE_COLUMNS.get(len(values))
+            if columns is None:
+                stop = (k, False)
+                break
+        elif n_commas in COMMA_COLUMNS:
+            values = line.split(",")
+            columns = COMMA_COLUMNS[n_commas]
+            if len(values) != n_commas + 1:
+                stop = (k, True)
+                break
+        else:
+            stop = (k, False)
+            break
+        xpp, ypp, zpp = (values[c] for c in columns)
+        try:
+            col = int((float(xpp) - xmin) / cell_size) + 2
+            row = int((float(ypp) - ymin) / cell_size) + 2
+        except (ValueError, OverflowError):
+            stop = (k, True)
+            break
+        try:
+            elevation = float(zpp)
+        except ValueError:
+            # An error only if the point is inside the grid
+            elevation = np.nan
+            bad_z.append((len(z), k))
+        cols.append(col)
+        rows.append(row)
+        z.append(elevation)
+    return LidarChunk(
+        np.array(cols, dtype=np.int64), np.array(rows, dtype=np.int64), np.array(z, dtype=np.float64), len(lines),
+        stop, bad_z
+    )
+
+
+def read_lidar_chunk(path, start, end, n_commas, n_spaces, xmin, ymin, cell_size):
+    """
+    Read points of file chunk into cell columns and rows as 'int((coordinate - minimum) / cell_size) + 2'.
+    """
+    lines = read_lines(path, start, end)
+    if not lines:
+        return LidarChunk(np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0), 0, None, [])
+    chunk = parse_points_fast(lines, n_commas, n_spaces, xmin, ymin, cell_size)
+    if chunk is None:
+        chunk = parse_points(lines, n_commas, xmin, ymin, cell_size)
+    return chunk
+
+
+class LidarBinner(object):
+    """
+    Sums and counts of LIDAR points elevations by grid cell. Sums are accumulated point by point in reading order,
+    so averages are the same as adding the points one at a time.
+    """
+
+    def __init__(self, fids, cols, rows):
+        self.fids = np.asarray(fids, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        rows = np.asarray(rows, dtype=np.int64)
+        self.col_min, self.col_max = (int(cols.min()), int(cols.max())) if cols.size else (0, -1)
+        self.row_min, self.row_max = (int(rows.min()), int(rows.max())) if rows.size else (0, -1)
+        keys = self.keys(cols, rows)
+        self.order = np.argsort(keys, kind="stable")
+        self.sorted_keys = keys[self.order]
+        self.sums = np.zeros(self.fids.size, dtype=np.float64)
+        self.counts = np.zeros(self.fids.size, dtype=np.int64)
+        self.inside = 0
+        self.outside = 0
+
+    def keys(self, cols, rows):
+        return (cols - self.col_min) * (self.row_max - self.row_min + 1) + (rows - self.row_min)
+
+    def cells(self, cols, rows):
+        """
+        Return index of the grid cell of every point, -1 for points outside the grid.
+        """
+        index = np.full(cols.size, -1, dtype=np.int64)
+        in_box = (cols >= self.col_min) & (cols <= self.col_max) & (rows >= self.row_min) & (rows <= self.row_max)
+        if not in_box.any() or not self.sorted_keys.size:
+            return index
+        keys = self.keys(cols[in_box], rows[in_box])
+        pos = np.minimum(np.searchsorted(self.sorted_keys, keys), self.sorted_keys.size - 1)
+        found = self.sorted_keys[pos] == keys
+        box_index = np.full(keys.size, -1, dtype=np.int64)
+        box_index[found] = self.order[pos[found]]
+        index[in_box] = box_index
+        return index
+
+    def add(self, chunk):
+        """
+        Add chunk points. Returns line of the chunk where reading stops on an elevation that is not a number of a
+        point inside the grid, None otherwise.
+        """
+        index = self.cells(chunk.cols, chunk.rows)
+        stop_line = None
+        n = index.size
+        for point, line in chunk.bad_z:
+            if index[point] >= 0:
+                n, stop_line = point, line
+                break
+        index = index[:n]
+        inside = index[index >= 0]
+        np.add.at(self.sums, inside, chunk.z[:n][index >= 0])
+        self.counts += np.bincount(inside, minlength=self.fids.size)
+        self.inside += inside.size
+        self.outside += n - inside.size
+        return stop_line
+
+    def elevations(self):
+        """
+        Return [(elevation, fid)] of cells with points and [fid] of cells without, in grid order.
+        """
+        assigned = []
+        empty = []
+        for fid, total, count in zip(self.fids.tolist(), self.sums.tolist(), self.counts.tolist()):
+            if count != 0:
+                assigned.append((round(total / count, 4), fid))
+            else:
+                empty.append(fid)
+        return assigned, empty
+
+
+def bin_lidar_files(files, binner, xmin, ymin, cell_size, pool=None, chunk_bytes=CHUNK_BYTES, callback=None):
+    """
+    Add points of the LIDAR files to the binner. Chunks are parsed in the pool (if any) and added in reading order.
+    Reading of a file stops at the first line with an unexpected number of values or a value that is not a number.
+    Returns [(file, line number)] of files where reading stopped on an error.
+    """
+    tasks = []
+    for path in files:
+        n_commas, n_spaces = lidar_format(path)
+        if n_commas == 0 and n_spaces == 0:
+            continue
+        for start, end in chunk_ranges(path, chunk_bytes):
+            tasks.append((path, start, end, n_commas, n_spaces, xmin, ymin, cell_size))
+    if not tasks:
+        return []
+
+    args = list(zip(*tasks))
+    chunks = pool.map(read_lidar_chunk, *args) if pool is not None else map(read_lidar_chunk, *args)
+
+    errors = []
+    stopped = None
+    line_offset = 0
+    current = None
+    for n, (task, chunk) in enumerate(zip(tasks, chunks), start=1):
+        path = task[0]
+        if path != current:
+            current = path
+            line_offset = 0
+        if path != stopped:
+            stop_line = binner.add(chunk)
+            if stop_line is not None:
+                errors.append((path, line_offset + stop_line + 1))
+                stopped = path
+            elif chunk.stop is not None:
+                line, error = chunk.stop
+                if error:
+                    errors.append((path, line_offset + line + 1))
+                stopped = path
+            line_offset += chunk.n_lines
+        if callback is not None:
+            callback(n, len(tasks))
+    return errors
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+
+# FLO-2D Preprocessor tools for QGIS
+
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version
+
+# Numpy only, imported by calc_average_elev.py when it runs as a script.
+import numpy as np
+
+
+def pixel_index(xs, ys, transform, rows, cols):
+    """
+    Return flat raster index 'row * cols + col' of the pixel of every point, -1 for points outside the raster.
+    Pixels are found with the inverse transform and floor, as 'transform.rowcol' does point by point.
+    """
+    ra, rb, rc, rd, re, rf = tuple(~transform)[:6]
+    xs = np.asarray(xs, dtype=np.float64)
+    ys = np.asarray(ys, dtype=np.float64)
+    with np.errstate(invalid="ignore"):
+        fcol = np.floor(xs * ra + ys * rb + rc)
+        frow = np.floor(xs * rd + ys * re + rf)
+        inside = (frow >= 0) & (frow < rows) & (fcol >= 0) & (fcol < cols)
+    index = np.full(xs.size, -1, dtype=np.int64)
+    index[inside] = frow[inside].astype(np.int64) * cols + fcol[inside].astype(np.int64)
+    return index
+
+
+def pixel_sums(xs, ys, zs, transform, rows, cols):
+    """
+    Return (flat pixel indexes, sums of elevations, counts of points) of the pixels with points.
+    """
+    index = pixel_index(xs, ys, transform, rows, cols)
+    inside = index >= 0
+    return group_sums(index[inside], np.asarray(zs, dtype=np.float64)[inside], np.ones(int(inside.sum()), np.int64))
+
+
+def group_sums(keys, sums, counts):
+    """
+    Add up sums and counts of the same keys. Returns (unique keys, sums, counts).
+    """
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    total_sums = np.bincount(inverse, weights=sums, minlength=unique_keys.size)
+    total_counts = np.bincount(inverse, weights=counts, minlength=unique_keys.size).astype(np.int64)
+    return unique_keys, total_sums, total_counts
+
+
+def pixel_averages(keys, sums, counts):
+    """
+    Merge partial sums of partitions. Returns (flat pixel indexes, average elevations).
+    """
+    unique_keys, total_sums, total_counts = group_sums(keys, sums, counts)
+    return unique_keys, total_sums / total_counts
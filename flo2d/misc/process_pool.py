@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+
+# FLO-2D Preprocessor tools for QGIS
+
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+
+def spawn_process_pool(max_workers=None):
+    """
+    Return spawn process pool. Inside QGIS 'sys.executable' may be the QGIS binary, then workers are started with
+    the Python interpreter of the QGIS installation. Functions run in the pool must be importable without QGIS.
+    """
+    context = multiprocessing.get_context("spawn")
+    if "python" not in os.path.basename(sys.executable).lower():
+        name = "pythonw.exe" if os.name == "nt" else os.path.join("bin", "python3")
+        interpreter = os.path.join(sys.exec_prefix, name)
+        if os.path.isfile(interpreter):
+            context.set_executable(interpreter)
+    if max_workers is None:
+        max_workers = max(1, (os.cpu_count() or 2) - 1)
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=context)
@@ -23,6 +23,29 @@ SCENARIO_STYLES = [
     qt_pen_style("DashDotDotLine"),
 ]
 
+# Memory used by a block of columns copied at once
+COPY_BLOCK_BYTES = 256 << 20
+
+
+def copy_dataset_by_columns(source, group, name, profile, block_bytes=COPY_BLOCK_BYTES):
+    """
+    Copy 2D dataset (times x cells) into group in blocks of whole columns. Chunks of the copy span all rows, so
+    the series of one cell is read from a single chunk.
+    """
+    if source.ndim != 2:
+        data = source[()]
+        return group.create_dataset(name, data=data, **profile.dataset_kwargs(data.shape, data.dtype))
+    rows, columns = source.shape
+    kwargs = profile.dataset_kwargs(source.shape, source.dtype, layout="columns")
+    dts = group.create_dataset(name, source.shape, dtype=source.dtype, **kwargs)
+    chunk_columns = kwargs["chunks"][1] if "chunks" in kwargs else 1
+    column_bytes = max(rows * source.dtype.itemsize, 1)
+    block = max(block_bytes // (column_bytes * chunk_columns), 1) * chunk_columns
+    for start in range(0, columns, block):
+        end = min(start + block, columns)
+        dts[:, start:end] = source[:, start:end]
+    return dts
+
 
 def timdep_dataframe_from_hdf5_scenarios(hdf5_file, grid_element):
     """
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+
+# FLO-2D Preprocessor tools for QGIS
+
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version
+
+"""
+Benchmark of grid cell lookup triggers against grid size.
+
+Times inserts into 'sed_rigid_areas' (trigger 'find_sed_rigid_cells_insert') with the R-tree prefiltered
+trigger and with the previous full grid scan. Run with: python -m test.benchmark_cell_lookup_triggers
+"""
+
+import time
+
+from .utilities import get_qgis_app
+
+QGIS_APP = get_qgis_app()
+
+import numpy as np
+
+from flo2d.geopackage_utils import GeoPackageUtils, database_create
+from flo2d.misc.gpkg_binary import encode_square, encode_squares
+
+GRID_SIDES = (100, 200, 400, 800)
+INSERTS = 20
+CELL_SIZE = 10.0
+
+
+def create_grid(gutils, side):
+    gutils.clear_tables("grid")
+    xs, ys = np.meshgrid(np.arange(side) * CELL_SIZE, np.arange(side) * CELL_SIZE)
+    squares = encode_squares(xs.ravel(), ys.ravel(), CELL_SIZE)
+    with gutils.bulk_session(defer_spatial_index=["grid"]):
+        gutils.execute_many("""INSERT INTO grid (geom) VALUES (?);""", ((square,) for square in squares))
+
+
+def full_scan_trigger(gutils):
+    """
+    Replace the trigger with the previous version scanning all grid cells.
+    """
+    name = "find_sed_rigid_cells_insert"
+    sql = gutils.execute("""SELECT sql FROM sqlite_master WHERE name = ?;""", (name,)).fetchone()[0]
+    start = sql.index("WHERE g.fid IN")
+    end = sql.index("AND ST_Intersects")
+    gutils.execute('DROP TRIGGER "{0}";'.format(name))
+    gutils.execute(sql[:start] + "WHERE " + sql[end + len("AND "):])
+
+
+def time_inserts(gutils, side):
+    rng = np.random.default_rng(0)
+    extent = side * CELL_SIZE
+    areas = [encode_square(x, y, CELL_SIZE * 3) for x, y in rng.uniform(0, extent, (INSERTS, 2))]
+    gutils.clear_tables("sed_rigid_areas", "sed_rigid_cells")
+    start = time.perf_counter()
+    for area in areas:
+        gutils.execute("""INSERT INTO sed_rigid_areas (geom) VALUES (?);""", (area,))
+    elapsed = time.perf_counter() - start
+    return elapsed / INSERTS * 1000
+
+
+def run():
+    results = []
+    for label, prepare in (("R-tree", None), ("full scan", full_scan_trigger)):
+        con = database_create(":memory:")
+        gutils = GeoPackageUtils(con, None)
+        if prepare is not None:
+            prepare(gutils)
+        for side in GRID_SIDES:
+            create_grid(gutils, side)
+            results.append((label, side * side, time_inserts(gutils, side)))
+        con.close()
+    print("{0:<10} {1:>10} {2:>14}".format("trigger", "cells", "ms per insert"))
+    for label, cells, ms in results:
+        print("{0:<10} {1:>10} {2:>14.3f}".format(label, cells, ms))
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+
+# FLO-2D Preprocessor tools for QGIS
+
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version
+
+"""
+Benchmark of raster sampling on grid centroids of 'grid_tools.raster2grid' and 'grid_tools.rasters2centroids'.
+
+Writes a synthetic GeoTIFF with nodata pixels and samples it on the centroids of a square grid with
+'gdal_utils.sample_raster' and with a read of the pixel of every centroid, as 'identify' does point by point, then
+checks both give the same values. The point by point read is timed on the first centroids only.
+Run with: python -m test.benchmark_raster_sampling [cells]
+"""
+
+import math
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), "flo2d", "misc"))
+
+from gdal_utils import gdal, sample_raster
+
+CELLS = 2000000
+POINT_CELLS = 50000
+CELL_SIZE = 10.0
+PIXEL_SIZE = 5.0
+NODATA = -9999.0
+XMIN, YMAX = 500000.0, 4000000.0
+
+
+def write_raster(path, rows, cols):
+    rng = np.random.default_rng(0)
+    ds = gdal.GetDriverByName("GTiff").Create(path, cols, rows, 1, gdal.GDT_Float32, ["TILED=YES"])
+    ds.SetGeoTransform((XMIN, PIXEL_SIZE, 0.0, YMAX, 0.0, -PIXEL_SIZE))
+    band = ds.GetRasterBand(1)
+    band.SetNoDataValue(NODATA)
+    for row in range(0, rows, 512):
+        values = rng.uniform(100.0, 200.0, (min(512, rows - row), cols)).astype(np.float32)
+        values[rng.random(values.shape) < 0.05] = NODATA
+        band.WriteArray(values, 0, row)
+    ds = None
+
+
+def grid_centroids(cells):
+    side = int(math.ceil(math.sqrt(cells)))
+    rows, cols = np.divmod(np.arange(cells), side)
+    xs = XMIN + (cols + 0.5) * CELL_SIZE
+    ys = YMAX - (rows + 0.5) * CELL_SIZE
+    return xs, ys
+
+
+def point_values(path, xs, ys):
+    ds = gdal.Open(path)
+    band = ds.GetRasterBand(1)
+    x0, dx, _, y0, _, dy = ds.GetGeoTransform()
+    values = []
+    for x, y in zip(xs.tolist(), ys.tolist()):
+        col = int(math.floor((x - x0) / dx))
+        row = int(math.floor((y - y0) / dy))
+        if 0 <= row < ds.RasterYSize and 0 <= col < ds.RasterXSize:
+            val = float(band.ReadAsArray(col, row, 1, 1)[0, 0])
+            values.append(math.nan if val == NODATA else val)
+        else:
+            values.append(math.nan)
+    return np.array(values)
+
+
+def run(cells=CELLS):
+    xs, ys = grid_centroids(cells)
+    side = int(math.ceil(math.sqrt(cells)))
+    scale = int(CELL_SIZE / PIXEL_SIZE)
+    folder = tempfile.mkdtemp()
+    path = os.path.join(folder, "raster.tif")
+    try:
+        start = time.perf_counter()
+        write_raster(path, side * scale, side * scale)
+        print("{0:<28} {1:>10.2f} s".format("write raster", time.perf_counter() - start))
+
+        start = time.perf_counter()
+        values = sample_raster(path, xs, ys)
+        elapsed = time.perf_counter() - start
+        print("{0:<28} {1:>10.2f} s {2:>10.3f} us/cell".format("array sampling", elapsed, elapsed / cells * 1e6))
+
+        n = min(cells, POINT_CELLS)
+        start = time.perf_counter()
+        expected = point_values(path, xs[:n], ys[:n])
+        elapsed = time.perf_counter() - start
+        print("{0:<28} {1:>10.2f} s {2:>10.3f} us/cell".format("point by point", elapsed, elapsed / n * 1e6))
+        identical = np.array_equal(values[:n], expected, equal_nan=True)
+        print("identical values:", identical)
+        if not identical:
+            raise SystemExit("Array sampling differs from point by point read.")
+    finally:
+        if os.path.exists(path):
+            os.unlink(path)
+        os.rmdir(folder)
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else CELLS)
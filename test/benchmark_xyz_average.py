@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+
+# FLO-2D Preprocessor tools for QGIS
+
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version
+
+"""
+Benchmark of the XYZ to raster averaging of 'misc/calc_average_elev.py'.
+
+Writes a synthetic XYZ file and averages it by pixel, partition by partition, with the vectorized pixel sums and
+with the previous 'rowcol' lookup of every point, then checks both rasters are identical and fails otherwise. The
+previous lookup is timed on the first partitions only. Run with: python -m test.benchmark_xyz_average [points]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), "flo2d", "misc"))
+
+from affine import Affine
+from pixel_average import pixel_averages, pixel_sums
+from transform import rowcol
+
+POINTS = 50000000
+PARTITION = 1000000
+ROWCOL_PARTITIONS = 2
+SHAPE = (2000, 3000)
+CELL_SIZE = 10.0
+XMIN, YMAX = 500000.0, 4000000.0
+
+
+def write_xyz(path, points):
+    rng = np.random.default_rng(0)
+    rows, cols = SHAPE
+    with open(path, "w") as f:
+        f.write("X,Y,Z\n")
+        for start in range(0, points, PARTITION):
+            n = min(PARTITION, points - start)
+            # Some points fall outside of the raster
+            xs = rng.uniform(XMIN - CELL_SIZE * 5, XMIN + cols * CELL_SIZE + CELL_SIZE * 5, n)
+            ys = rng.uniform(YMAX - rows * CELL_SIZE - CELL_SIZE * 5, YMAX + CELL_SIZE * 5, n)
+            zs = rng.uniform(100.0, 200.0, n)
+            np.savetxt(f, np.column_stack([xs, ys, zs]), fmt="%.3f", delimiter=",")
+
+
+def read_partitions(path, count):
+    with open(path, "r") as f:
+        f.readline()
+        for n in range(count):
+            values = np.loadtxt(f, delimiter=",", max_rows=PARTITION, ndmin=2)
+            yield values[:, 0], values[:, 1], values[:, 2]
+
+
+def vectorized_raster(partitions, transform):
+    parts = [pixel_sums(xs, ys, zs, transform, *SHAPE) for xs, ys, zs in partitions]
+    keys, sums, counts = (np.concatenate(columns) for columns in zip(*parts))
+    pixels, averages = pixel_averages(keys, sums, counts)
+    raster = np.full(SHAPE, -9999, dtype=np.float32)
+    raster.flat[pixels] = averages
+    return raster
+
+
+def rowcol_raster(partitions, transform):
+    rows, cols = SHAPE
+    totals = {}
+    for xs, ys, zs in partitions:
+        for x, y, z in zip(xs.tolist(), ys.tolist(), zs.tolist()):
+            r, c = rowcol(transform, x, y)
+            if r < rows and r >= 0 and c < cols and c >= 0:
+                total = totals.setdefault((r, c), [0.0, 0])
+                total[0] += z
+                total[1] += 1
+    raster = np.full(SHAPE, -9999, dtype=np.float32)
+    for (r, c), (total, count) in totals.items():
+        raster[r, c] = total / count
+    return raster
+
+
+def run(points=POINTS):
+    transform = Affine(CELL_SIZE, 0, XMIN, 0, -CELL_SIZE, YMAX)
+    folder = tempfile.mkdtemp()
+    path = os.path.join(folder, "points.csv")
+    try:
+        start = time.perf_counter()
+        write_xyz(path, points)
+        print("{0:<28} {1:>10.2f} s".format("write {0:,} points".format(points), time.perf_counter() - start))
+
+        start = time.perf_counter()
+        count = -(-points // PARTITION)
+        partitions = list(read_partitions(path, min(count, ROWCOL_PARTITIONS)))
+        print("{0:<28} {1:>10.2f} s".format("read partitions", time.perf_counter() - start))
+        n_points = sum(xs.size for xs, ys, zs in partitions)
+        for label, function in (("vectorized", vectorized_raster), ("rowcol", rowcol_raster)):
+            start = time.perf_counter()
+            raster = function(partitions, transform)
+            elapsed = time.perf_counter() - start
+            print("{0:<28} {1:>10.2f} s {2:>10.3f} us/point".format(label, elapsed, elapsed / n_points * 1e6))
+            if label == "vectorized":
+                expected = raster
+            else:
+                identical = np.array_equal(raster, expected)
+                print("identical rasters:", identical)
+                if not identical:
+                    raise SystemExit("Vectorized raster differs from rowcol lookup.")
+
+        start = time.perf_counter()
+        vectorized_raster(read_partitions(path, count), transform)
+        print("{0:<28} {1:>10.2f} s".format("vectorized, whole file", time.perf_counter() - start))
+    finally:
+        if os.path.exists(path):
+            os.unlink(path)
+        os.rmdir(folder)
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else POINTS)
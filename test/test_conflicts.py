@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+
+# FLO-2D Preprocessor tools for QGIS
+
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version
+
+import unittest
+
+from .utilities import get_qgis_app
+
+QGIS_APP = get_qgis_app()
+
+from flo2d.flo2d_tools.conflicts import Conflicts
+from flo2d.geopackage_utils import GeoPackageUtils, database_create
+
+
+class TestConflicts(unittest.TestCase):
+    con = database_create(":memory:")
+
+    @classmethod
+    def setUpClass(cls):
+        cls.gutils = GeoPackageUtils(cls.con, None)
+        inflows = [(1, 5), (1, 3), (2, 5), (3, 8)]
+        outflows = [(1, 8), (2, 3), (3, None), (4, 8)]
+        cls.gutils.execute_many("""INSERT INTO inflow_cells (inflow_fid, grid_fid) VALUES (?,?);""", inflows)
+        cls.gutils.execute_many("""INSERT INTO outflow_cells (outflow_fid, grid_fid) VALUES (?,?);""", outflows)
+
+    def test_repeated(self):
+        conflicts = Conflicts(self.gutils)
+        self.assertEqual(conflicts.repeated("inflow_cells", "grid_fid").tolist(), [5])
+        self.assertEqual(conflicts.shared("outflow_cells", "grid_fid", "outflow_cells", "grid_fid").tolist(), [8])
+
+    def test_shared(self):
+        conflicts = Conflicts(self.gutils)
+        self.assertEqual(conflicts.shared("inflow_cells", "grid_fid", "outflow_cells", "grid_fid").tolist(), [3, 8])
+        self.assertEqual(
+            conflicts.shared("inflow_cells", "grid_fid", "outflow_cells", "grid_fid", "inflow_fid = 1").tolist(), [3]
+        )
+        errors = conflicts.iter_conflicts(
+            "Inflows", "inflow_cells", "grid_fid", "Outflows", "outflow_cells", "grid_fid", "d"
+        )
+        errors = list(errors)
+        self.assertEqual(errors, [["3", "Inflows", "Outflows", "d"], ["8", "Inflows", "Outflows", "d"]])
+
+
+# Running tests:
+if __name__ == "__main__":
+    cases = [TestConflicts]
+    suite = unittest.TestSuite()
+    for t in cases:
+        tests = unittest.TestLoader().loadTestsFromTestCase(t)
+        suite.addTest(tests)
+    unittest.TextTestRunner(verbosity=2).run(suite)
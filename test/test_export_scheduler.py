@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+
+# FLO-2D Preprocessor tools for QGIS
+
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version
+
+import filecmp
+import inspect
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from .utilities import get_qgis_app
+
+QGIS_APP = get_qgis_app()
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+CONT_1 = os.path.join(THIS_DIR, "data", "import_dat_1", "CONT.DAT")
+
+from flo2d.flo2d_ie.export_scheduler import PARALLEL_EXPORTS, WRITING_EXPORTS, ExportScheduler, RecordedMessages
+from flo2d.flo2d_ie.flo2dgeopackage import Flo2dGeoPackage
+from flo2d.geopackage_utils import database_create, database_disconnect
+
+IMPORT_CALLS = [
+    "import_cont_toler",
+    "import_mannings_n_topo",
+    "import_inflow",
+    "import_outflow",
+    "import_rain",
+    "import_infil",
+    "import_evapor",
+    "import_chan",
+    "import_xsec",
+    "import_hystruc",
+    "import_street",
+    "import_arf",
+    "import_mult",
+    "import_sed",
+    "import_levee",
+    "import_fpxsec",
+    "import_breach",
+    "import_fpfroude",
+    "import_swmmflo",
+    "import_swmmflort",
+    "import_swmmoutf",
+    "import_tolspatial",
+    "import_wsurf",
+    "import_wstime",
+]
+
+
+class Exporter(object):
+    def __init__(self):
+        self.con = sqlite3.connect(":memory:", check_same_thread=False)
+
+
+class TestExportScheduler(unittest.TestCase):
+    def test_parallel_exporters_without_gui_calls(self):
+        for call in PARALLEL_EXPORTS:
+            method = getattr(Flo2dGeoPackage, call + "_dat", getattr(Flo2dGeoPackage, call))
+            self.assertNotIn("QApplication.", inspect.getsource(method), call)
+
+    def test_results_canceled(self):
+        scheduler = ExportScheduler(None, None)
+        scheduler.pool = ThreadPoolExecutor(max_workers=1)
+        release = threading.Event()
+        first, second = Exporter(), Exporter()
+        scheduler.futures[scheduler.pool.submit(release.wait)] = ("export_first", RecordedMessages(), first)
+        scheduler.futures[scheduler.pool.submit(release.wait)] = ("export_second", RecordedMessages(), second)
+
+        def canceled():
+            # First exporter finishes once the pool is shutting down
+            threading.Timer(0.05, release.set).start()
+            return True
+
+        self.assertEqual(list(scheduler.results(canceled, interval=0.01)), [])
+        cancelled = [future.cancelled() for future in scheduler.futures]
+        self.assertEqual(cancelled, [False, True])
+        # Connection of the exporter which never started is closed
+        self.assertRaises(sqlite3.ProgrammingError, second.con.execute, "SELECT 1;")
+        first.con.close()
+
+
+class TestParallelExport(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.folder = tempfile.mkdtemp()
+        cls.gpkg = os.path.join(cls.folder, "project.gpkg")
+        cls.con = database_create(cls.gpkg)
+        cls.f2g = Flo2dGeoPackage(cls.con, None)
+        cls.f2g.disable_geom_triggers()
+        cls.f2g.set_parser(CONT_1)
+        for call in IMPORT_CALLS:
+            getattr(cls.f2g, call)()
+        # MULT.DAT is exported with the default globals
+        cls.f2g.clear_tables("mult")
+        cls.con.commit()
+
+    @classmethod
+    def tearDownClass(cls):
+        database_disconnect(cls.con)
+        shutil.rmtree(cls.folder)
+
+    def export_dir(self, name):
+        outdir = os.path.join(self.folder, name)
+        os.mkdir(outdir)
+        return outdir
+
+    def test_parallel_export_same_files(self):
+        calls = sorted(PARALLEL_EXPORTS | {"export_mult"})
+
+        sequential = self.export_dir("sequential")
+        for call in calls:
+            getattr(self.f2g, call)(sequential)
+        self.f2g.clear_tables("mult")
+        self.con.commit()
+
+        parallel = self.export_dir("parallel")
+        scheduler = ExportScheduler(self.gpkg, self.f2g, max_workers=4)
+        main_calls = scheduler.order(calls)
+        self.assertEqual(main_calls, ["export_mult"])
+        self.assertTrue(set(main_calls) <= WRITING_EXPORTS)
+        for call in main_calls:
+            getattr(self.f2g, call)(parallel)
+        scheduler.start(parallel)
+        for call, result, seconds, messages, error in scheduler.results():
+            self.assertIsNone(error, call)
+
+        files = sorted(os.listdir(sequential))
+        self.assertIn("MULT.DAT", files)
+        self.assertGreater(len(files), 10)
+        self.assertEqual(sorted(os.listdir(parallel)), files)
+        match, mismatch, errors = filecmp.cmpfiles(sequential, parallel, files, shallow=False)
+        self.assertEqual(mismatch + errors, [])
+
+
+# Running tests:
+if __name__ == "__main__":
+    cases = [TestExportScheduler, TestParallelExport]
+    suite = unittest.TestSuite()
+    for t in cases:
+        tests = unittest.TestLoader().loadTestsFromTestCase(t)
+        suite.addTest(tests)
+    unittest.TextTestRunner(verbosity=2).run(suite)
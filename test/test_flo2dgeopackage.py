@@ -31,8 +31,10 @@ CONT_2 = os.path.join(IMPORT_DATA_DIR_2, "CONT.DAT")
 HDF5_1 = os.path.join(IMPORT_HDF5_DIR_1, "project_1.hdf5")
 HDF5_2 = os.path.join(IMPORT_HDF5_DIR_2, "project_2.hdf5")
 
-from flo2d.flo2d_ie.flo2dgeopackage import Flo2dGeoPackage
+from flo2d.flo2d_ie.flo2dgeopackage import Flo2dGeoPackage, format_raincell_block, raincell_steps
+from flo2d.flo2d_ie.flo2d_parser import HDF5_PROFILES, HDF5Dataset, HDF5Group, HDF5WriterProfile, ParseHDF5
 from flo2d.geopackage_utils import database_create
+from flo2d.misc.project_review_utils import copy_dataset_by_columns
 
 
 def file_len(fname):
@@ -130,6 +132,38 @@ class TestFlo2dGeoPackageDat(unittest.TestCase):
         controls = self.f2g_2.execute("""SELECT name, value FROM cont;""").fetchall()
         self.assertEqual(len(controls), 47)
 
+    def test_parse_mannings_n_topo_arrays(self):
+        rows = list(self.f2g.parser.parse_mannings_n_topo())
+        chunks = list(self.f2g.parser.parse_mannings_n_topo_arrays(chunksize=1000))
+        self.assertEqual(len(chunks), 10)
+        fid, n, x, y, elev = [np.concatenate(col) for col in zip(*chunks)]
+        self.assertEqual(fid.size, len(rows))
+        for i in (0, 999, 1000, len(rows) - 1):
+            self.assertEqual([fid[i], n[i], x[i], y[i], elev[i]], [float(v) for v in rows[i]])
+
+    def test_calculate_cellsize_cached(self):
+        parser = self.f2g.parser
+        self.assertEqual(parser.calculate_cellsize(), 100)
+        topo = parser.dat_files["TOPO.DAT"]
+        stat = os.stat(topo)
+        self.assertIn((os.path.abspath(topo), stat.st_mtime_ns, stat.st_size), parser._cellsize_cache)
+
+    def test_format_raincell_block(self):
+        cells = np.array([1, 2, 3, 4])
+        values = np.array([0.123456, np.nan, 0, 12.5])
+        text = format_raincell_block(cells, values)
+        self.assertEqual(text, "1 0.1235\n2 0\n3 0.0000\n4 12.5000\n")
+        self.assertEqual(format_raincell_block(cells[:0], values[:0]), "")
+
+    def test_raincell_steps(self):
+        # Full step, step with (ngrid, 0) sentinel, step ending early split across chunks, missing last step
+        cells = np.array([1, 2, 3, 2, 3, 1, 3])
+        values = np.array([0.1, 0.2, 0.3, 0.5, 0.0, 0.7, 0.8])
+        chunks = [(cells[:4], values[:4]), (cells[4:6], values[4:6]), (cells[6:], values[6:])]
+        steps = [(c.tolist(), v.tolist()) for c, v in raincell_steps(chunks, 3, 4)]
+        self.assertEqual(steps, [([1, 2, 3], [0.1, 0.2, 0.3]), ([2, 3], [0.5, 0.0]), ([1, 3], [0.7, 0.8]), ([], [])])
+        self.assertEqual(len(list(raincell_steps(chunks, 3, 2))), 2)
+
     def test_import_mannings_n_topo(self):
         cellsize = self.f2g.execute("""SELECT value FROM cont WHERE name = 'CELLSIZE';""").fetchone()[0]
         self.assertEqual(float(cellsize), 100)
@@ -609,6 +643,49 @@ class TestFlo2dGeoPackageHDF5(unittest.TestCase):
         outflows = self.f2g.execute("""SELECT COUNT(fid) FROM outflow;""").fetchone()[0]
         self.assertEqual(float(outflows), 1)
 
+    def test_hdf5_dataset_from_query(self):
+        dataset = HDF5Dataset("GRID_TEST")
+        dataset.from_query(self.f2g.execute("""SELECT fid, n_value FROM grid ORDER BY fid;"""), fetch_size=10000)
+        self.assertEqual(dataset.data.shape, (54315, 2))
+        self.assertEqual(dataset.data[-1, 0], 54315)
+        dataset.from_query(self.f2g.execute("""SELECT fid FROM grid ORDER BY fid;"""), dtype=np.int32)
+        self.assertEqual(dataset.data.dtype, np.int32)
+        np.testing.assert_array_equal(dataset.data, np.arange(1, 54316))
+        dataset.extend([54316, 54317])
+        self.assertEqual(dataset.data.shape, (54317,))
+
+    def test_hdf5_stream_dataset(self):
+        parser = ParseHDF5()
+        parser.hdf5_filepath = os.path.join(EXPORT_DATA_DIR, "stream_test.hdf5")
+        parser.dataset_profiles["STREAMED"] = HDF5_PROFILES["fast"]
+        group = HDF5Group("Input/Test")
+        group.create_dataset("WRITTEN", [1, 2, 3])
+        parser.write_groups(group)
+        with parser.stream_dataset("Input/Test", "STREAMED", columns=3) as append:
+            for i in range(4):
+                append(np.full((1000, 3), i, dtype=np.float64))
+        with h5py.File(parser.hdf5_filepath, "r") as f:
+            ds = f["Input/Test/STREAMED"]
+            self.assertEqual(ds.shape, (4000, 3))
+            self.assertEqual(ds.maxshape, (None, 3))
+            self.assertEqual(ds.compression, "lzf")
+            self.assertEqual(f["Input/Test/WRITTEN"].shape, (3,))
+        rows = parser.read("STREAMED", "Input/Test", np.s_[2999:3001]).data
+        np.testing.assert_array_equal(rows[:, 0], [2, 3])
+        os.remove(parser.hdf5_filepath)
+
+    def test_copy_dataset_by_columns(self):
+        path = os.path.join(EXPORT_DATA_DIR, "columns_test.hdf5")
+        values = np.arange(50 * 1000, dtype=np.float32).reshape(50, 1000)
+        with h5py.File(path, "w") as f:
+            source = f.create_dataset("source", data=values)
+            profile = HDF5WriterProfile(compression="lzf", chunk_bytes=50 * 4 * 64)
+            copy = copy_dataset_by_columns(source, f, "copy", profile, block_bytes=50 * 4 * 200)
+            self.assertEqual(copy.chunks, (50, 64))
+            np.testing.assert_array_equal(copy[:, 999], values[:, 999])
+            np.testing.assert_array_equal(copy[()], values)
+        os.remove(path)
+
     def test_import_rain(self):
         self.f2g.import_rain()
         tot = self.f2g.execute("""SELECT tot_rainfall FROM rain;""").fetchone()[0]
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+
+# FLO-2D Preprocessor tools for QGIS
+
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version
+
+import unittest
+
+from .utilities import get_qgis_app
+
+QGIS_APP = get_qgis_app()
+
+from flo2d.geopackage_utils import (
+    MANAGED_INDEXES_VERSION,
+    GeoPackageUtils,
+    database_create,
+    index_name,
+    rtree_prefiltered_trigger_sql,
+)
+
+
+class TestGeoPackageUtils(unittest.TestCase):
+    con = database_create(":memory:")
+
+    @classmethod
+    def setUpClass(cls):
+        cls.gutils = GeoPackageUtils(cls.con, None)
+        cls.gutils.execute("""INSERT INTO trigger_control (name, enabled) VALUES ('test_trigger', 1);""")
+
+    def setUp(self):
+        self.gutils.clear_tables("cont")
+
+    def test_bulk_session_single_transaction(self):
+        with self.gutils.bulk_session():
+            self.assertTrue(self.gutils.in_bulk_session)
+            self.gutils.execute("""INSERT INTO cont (name, value) VALUES ('A', '1');""")
+            self.gutils.execute_many("""INSERT INTO cont (name, value) VALUES (?, ?);""", [("B", "2"), ("C", "3")])
+            self.gutils.batch_execute(["""INSERT INTO cont (name, value) VALUES""", 2, ("D", "4")])
+            self.assertTrue(self.con.in_transaction)
+            enabled = self.gutils.execute("""SELECT SUM(enabled) FROM trigger_control;""").fetchone()[0]
+            self.assertEqual(enabled, 0)
+        self.assertFalse(self.gutils.in_bulk_session)
+        self.assertFalse(self.con.in_transaction)
+        self.assertEqual(self.gutils.count("cont"), 4)
+        enabled = self.gutils.execute("""SELECT enabled FROM trigger_control WHERE name = 'test_trigger';""")
+        self.assertEqual(enabled.fetchone()[0], 1)
+
+    def test_bulk_session_rollback(self):
+        with self.assertRaises(ValueError):
+            with self.gutils.bulk_session():
+                self.gutils.execute("""INSERT INTO cont (name, value) VALUES ('A', '1');""")
+                raise ValueError
+        self.assertEqual(self.gutils.count("cont"), 0)
+
+    def test_bulk_session_failed_batch(self):
+        with self.gutils.bulk_session():
+            self.gutils.execute("""INSERT INTO cont (name, value) VALUES ('A', '1');""")
+            # Wrong row length makes the whole batch fail, without losing the earlier insert
+            self.gutils.batch_execute(["""INSERT INTO cont (name, value) VALUES""", 2, ("B", "2"), ("C",)])
+        self.assertEqual(self.gutils.count("cont"), 1)
+
+    def test_bulk_session_deferred_spatial_index(self):
+        self.gutils.clear_tables("grid")
+        qry = """SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'rtree_grid_geom%';"""
+        trigger_count = self.gutils.execute(qry).fetchone()[0]
+        self.assertGreater(trigger_count, 0)
+        squares = [(self.gutils.build_square_xy(x * 10.0, 0.0, 10.0),) for x in range(5)]
+        with self.gutils.bulk_session(defer_spatial_index=["grid"]):
+            self.assertEqual(self.gutils.execute(qry).fetchone()[0], 0)
+            self.gutils.execute_many("""INSERT INTO grid (geom) VALUES (?);""", squares)
+            self.assertEqual(self.gutils.count("rtree_grid_geom", "id"), 0)
+        self.assertEqual(self.gutils.execute(qry).fetchone()[0], trigger_count)
+        self.assertEqual(self.gutils.count("rtree_grid_geom", "id"), 5)
+        bbox = self.gutils.execute("""SELECT minx, maxx FROM rtree_grid_geom WHERE id = 1;""").fetchone()
+        self.assertEqual(bbox, (-5.0, 5.0))
+        self.gutils.clear_tables("grid")
+
+    def test_cell_lookup_triggers_rtree(self):
+        self.gutils.clear_tables("grid", "sed_rigid_areas", "sed_rigid_cells")
+        squares = [(self.gutils.build_square_xy(x * 10.0, y * 10.0, 10.0),) for x in range(20) for y in range(20)]
+        self.gutils.execute_many("""INSERT INTO grid (geom) VALUES (?);""", squares)
+        self.assertEqual(self.gutils.update_cell_lookup_triggers(), 0)
+        area = self.gutils.build_square_xy(55.0, 55.0, 12.0)
+        self.gutils.execute("""INSERT INTO sed_rigid_areas (geom) VALUES (?);""", (area,))
+        cells = self.gutils.execute("""SELECT grid_fid FROM sed_rigid_cells ORDER BY grid_fid;""").fetchall()
+        self.assertEqual(len(cells), 4)
+        self.gutils.clear_tables("grid", "sed_rigid_areas", "sed_rigid_cells")
+
+    def test_rtree_prefiltered_trigger_sql(self):
+        sql = """CREATE TRIGGER "t" AFTER INSERT ON "a" BEGIN
+        INSERT INTO "c" (area_fid, grid_fid) SELECT NEW.fid, g.fid FROM grid as g
+        WHERE ST_Intersects(CastAutomagic(g.geom), CastAutomagic(NEW.geom));
+    END;"""
+        new_sql = rtree_prefiltered_trigger_sql(sql)
+        self.assertIn("rtree_grid_geom", new_sql)
+        self.assertEqual(rtree_prefiltered_trigger_sql(new_sql), new_sql)
+
+    def test_managed_indexes(self):
+        self.assertEqual(self.gutils.get_metadata_par("INDEXES_V"), str(MANAGED_INDEXES_VERSION))
+        self.assertEqual(self.gutils.ensure_indexes(), 0)
+        self.assertEqual(self.gutils.audit_query_plans(), [])
+        dropped = [("schema_md_cells", ("domain_fid", "grid_fid")), ("raincell_data", ("time_interval", "rrgrid"))]
+        for table, columns in dropped:
+            self.gutils.execute('DROP INDEX "{0}";'.format(index_name(table, columns)))
+        unindexed = self.gutils.audit_query_plans()
+        self.assertEqual(len(unindexed), 2)
+        self.assertIn("domain_fid", unindexed[0][0])
+        self.assertIn("raincell_data", unindexed[1][0])
+        # Migration is recorded in metadata and not repeated on the next project load
+        self.assertEqual(self.gutils.ensure_indexes(), 0)
+        self.gutils.execute("""DELETE FROM metadata WHERE name = 'INDEXES_V';""")
+        self.assertEqual(self.gutils.ensure_indexes(), 2)
+        self.assertEqual(self.gutils.audit_query_plans(), [])
+
+
+# Running tests:
+if __name__ == "__main__":
+    cases = [TestGeoPackageUtils]
+    suite = unittest.TestSuite()
+    for t in cases:
+        tests = unittest.TestLoader().loadTestsFromTestCase(t)
+        suite.addTest(tests)
+    unittest.TextTestRunner(verbosity=2).run(suite)
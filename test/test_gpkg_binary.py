@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+
+# FLO-2D Preprocessor tools for QGIS
+
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version
+
+import unittest
+
+from .utilities import get_qgis_app
+
+QGIS_APP = get_qgis_app()
+
+import numpy as np
+
+from flo2d.geopackage_utils import GeoPackageUtils, database_create
+from flo2d.misc import gpkg_binary
+
+
+class TestGpkgBinary(unittest.TestCase):
+    con = database_create(":memory:")
+
+    @classmethod
+    def setUpClass(cls):
+        cls.gutils = GeoPackageUtils(cls.con, None)
+
+    def spatialite_gpb(self, wkt):
+        return bytes(self.gutils.execute("""SELECT AsGPB(ST_GeomFromText(?));""", (wkt,)).fetchone()[0])
+
+    def test_encode_square(self):
+        x, y, size = 368257.5, 1185586.25, 30.0
+        wkt = "POLYGON(({0} {1}, {2} {1}, {2} {3}, {0} {3}, {0} {1}))".format(
+            x - size * 0.5, y - size * 0.5, x + size * 0.5, y + size * 0.5
+        )
+        self.assertEqual(gpkg_binary.encode_square(x, y, size), self.spatialite_gpb(wkt))
+
+    def test_encode_point(self):
+        self.assertEqual(gpkg_binary.encode_point(1.5, -2.25), self.spatialite_gpb("POINT(1.5 -2.25)"))
+
+    def test_encode_linestring(self):
+        coords = [(0.0, 0.0), (10.5, 3.0), (-4.0, 8.0)]
+        wkt = "LINESTRING(0 0, 10.5 3, -4 8)"
+        self.assertEqual(gpkg_binary.encode_linestring(coords), self.spatialite_gpb(wkt))
+        self.assertEqual(gpkg_binary.wkt_to_gpb(wkt), self.spatialite_gpb(wkt))
+
+    def test_decode_centroids(self):
+        xs = np.array([100.0, 130.0, 160.0])
+        ys = np.array([50.0, 50.0, 20.0])
+        blobs = gpkg_binary.encode_squares(xs, ys, 30)
+        centroids = gpkg_binary.decode_centroids(blobs)
+        np.testing.assert_array_equal(centroids, np.column_stack((xs, ys)))
+        for blob, (x, y) in zip(blobs, centroids):
+            wkt = self.gutils.execute("""SELECT ST_AsText(ST_Centroid(GeomFromGPB(?)));""", (blob,)).fetchone()[0]
+            sx, sy = [float(v) for v in wkt.strip("POINT()").split()]
+            self.assertAlmostEqual(sx, x)
+            self.assertAlmostEqual(sy, y)
+
+    def test_decode_roundtrip(self):
+        blob = self.spatialite_gpb("POLYGON((0 0, 4 0, 4 4, 0 4, 0 0), (1 1, 2 1, 2 2, 1 1))")
+        geom_type, rings = gpkg_binary.decode(blob)
+        self.assertEqual(geom_type, gpkg_binary.WKB_POLYGON)
+        self.assertEqual(len(rings), 2)
+        self.assertEqual(gpkg_binary.decode_envelope(blob), (0.0, 4.0, 0.0, 4.0))
+
+
+# Running tests:
+if __name__ == "__main__":
+    cases = [TestGpkgBinary]
+    suite = unittest.TestSuite()
+    for t in cases:
+        tests = unittest.TestLoader().loadTestsFromTestCase(t)
+        suite.addTest(tests)
+    unittest.TextTestRunner(verbosity=2).run(suite)
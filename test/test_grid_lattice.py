@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+# FLO-2D Preprocessor tools for QGIS
+
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version
+
+import unittest
+
+from .utilities import get_qgis_app
+
+QGIS_APP = get_qgis_app()
+
+import numpy as np
+
+from flo2d.flo2d_tools.grid_tools import COMPAS_OFFSETS, grid_lattice
+from flo2d.geopackage_utils import GRID_VERSION_EVENTS, GeoPackageUtils, database_create
+from flo2d.misc.gpkg_binary import encode_squares
+
+CELL_SIZE = 10.0
+X_MIN, Y_MAX = 1000.0, 5000.0
+
+
+class TestGridLattice(unittest.TestCase):
+    con = database_create(":memory:")
+
+    @classmethod
+    def setUpClass(cls):
+        cls.gutils = GeoPackageUtils(cls.con, None)
+        cls.gutils.set_cont_par("CELLSIZE", CELL_SIZE)
+        rng = np.random.default_rng(0)
+        rows, cols = np.meshgrid(np.arange(20), np.arange(25), indexing="ij")
+        # Irregular grid with a column and some cells missing
+        keep = (rng.random(rows.shape) < 0.8) & (cols != 7)
+        xs = X_MIN + cols[keep] * CELL_SIZE
+        ys = Y_MAX - rows[keep] * CELL_SIZE
+        elevations = np.round(rng.uniform(0.0, 100.0, xs.size), 2)
+        squares = encode_squares(xs, ys, CELL_SIZE)
+        with cls.gutils.bulk_session(defer_spatial_index=["grid"]):
+            cls.gutils.execute_many(
+                """INSERT INTO grid (geom, elevation) VALUES (?, ?);""", zip(squares, elevations.tolist())
+            )
+        cls.centroids = cls.gutils.grid_centroids_xy(range(1, xs.size + 1))
+
+    def test_neighbours(self):
+        lattice = grid_lattice(self.gutils)
+        for fid, (x, y) in self.centroids.items():
+            for direction, (dc, dr) in enumerate(COMPAS_OFFSETS, 1):
+                expected = self.gutils.grid_on_point(x + dc * CELL_SIZE, y + dr * CELL_SIZE)
+                self.assertEqual(lattice.neighbour(fid, direction), expected)
+
+    def test_elevations(self):
+        lattice = grid_lattice(self.gutils)
+        for fid in self.centroids:
+            self.assertEqual(lattice.elevation(fid), self.gutils.grid_value(fid, "elevation"))
+
+    def test_cells_on_points(self):
+        lattice = grid_lattice(self.gutils)
+        rng = np.random.default_rng(1)
+        points = rng.uniform((X_MIN - 20, Y_MAX - 210), (X_MIN + 260, Y_MAX + 20), (500, 2))
+        fids = lattice.cells_on_points(points[:, 0], points[:, 1])
+        for (x, y), fid in zip(points.tolist(), fids.tolist()):
+            self.assertEqual(fid or None, self.gutils.grid_on_point(x, y))
+
+    def test_grid_edits(self):
+        lattice = grid_lattice(self.gutils)
+        self.assertIs(grid_lattice(self.gutils), lattice)
+        fid = next(iter(self.centroids))
+        elevation = self.gutils.grid_value(fid, "elevation")
+        self.gutils.execute("""UPDATE grid SET elevation = ? WHERE fid = ?;""", (elevation + 1, fid))
+        self.assertEqual(grid_lattice(self.gutils).elevation(fid), elevation + 1)
+        self.gutils.execute("""UPDATE grid SET elevation = ? WHERE fid = ?;""", (elevation, fid))
+        last = max(self.centroids)
+        x, y = self.centroids[last]
+        self.gutils.execute("""DELETE FROM grid WHERE fid = ?;""", (last,))
+        try:
+            self.assertIsNot(grid_lattice(self.gutils), lattice)
+            self.assertIsNone(grid_lattice(self.gutils).cell_on_point(x, y))
+        finally:
+            self.gutils.execute(
+                """INSERT INTO grid (fid, geom, elevation) VALUES (?, ?, ?);""",
+                (last, encode_squares([x], [y], CELL_SIZE)[0], 0.0),
+            )
+
+    def test_grid_version_pending_transaction(self):
+        for name in GRID_VERSION_EVENTS:
+            self.con.execute("""DROP TRIGGER IF EXISTS temp."grid_version_{0}";""".format(name))
+        self.con.commit()
+        fid = next(iter(self.centroids))
+        elevation = self.gutils.grid_value(fid, "elevation")
+        self.con.execute("""UPDATE grid SET elevation = ? WHERE fid = ?;""", (elevation + 1, fid))
+        # Triggers are created again without committing the pending update
+        self.gutils.grid_version()
+        self.assertTrue(self.con.in_transaction)
+        self.con.rollback()
+        self.assertEqual(self.gutils.grid_value(fid, "elevation"), elevation)
+        # Triggers rolled back with the transaction are created again
+        self.gutils.grid_version()
+        triggers = self.con.execute(
+            """SELECT COUNT(*) FROM sqlite_temp_master WHERE type = 'trigger' AND name LIKE 'grid_version_%';"""
+        ).fetchone()[0]
+        self.assertEqual(triggers, len(GRID_VERSION_EVENTS))
+
+
+# Running tests:
+if __name__ == "__main__":
+    cases = [TestGridLattice]
+    suite = unittest.TestSuite()
+    for t in cases:
+        tests = unittest.TestLoader().loadTestsFromTestCase(t)
+        suite.addTest(tests)
+    unittest.TextTestRunner(verbosity=2).run(suite)
@@ -9,6 +9,7 @@
 # of the License, or (at your option) any later version
 
 import os
+import tempfile
 import unittest
 
 from flo2d.flo2d_ie.flo2dgeopackage import Flo2dGeoPackage
@@ -19,11 +20,16 @@ THIS_DIR = os.path.dirname(os.path.abspath(__file__))
 VECTOR_PATH = os.path.join(THIS_DIR, "data", "vector")
 EXPORT_DATA_DIR = os.path.join(THIS_DIR, "data")
 
-from qgis.core import QgsVectorLayer
+from qgis.core import QgsRaster, QgsRasterLayer, QgsVectorLayer
+
+import numpy as np
 
 from flo2d.flo2d_tools.grid_tools import (build_grid, calculate_arfwrf,
-                                          poly2grid)
+                                          centres_in_polygon_row, grid_neighbors_array,
+                                          lattice_axis, poly2grid, polygon_edges,
+                                          raster2grid, rasters2centroids)
 from flo2d.geopackage_utils import database_create
+from flo2d.utils import is_number
 
 IMPORT_DATA_DIR_1 = os.path.join(THIS_DIR, "data", "import_dat_1")
 IMPORT_DATA_DIR_2 = os.path.join(THIS_DIR, "data", "import_dat_2")
@@ -60,6 +66,36 @@ class TestGridTools(unittest.TestCase):
         polygons = list(build_grid(vlayer, 500))
         self.assertEqual(len(polygons), 494)
 
+    def test_square_grid_lattice(self):
+        boundary = os.path.join(VECTOR_PATH, "boundary.geojson")
+        vlayer = QgsVectorLayer(boundary, "bl", "ogr")
+        cell_size = 500
+        half_size = cell_size * 0.5
+        expected = {(poly[0], poly[1]) for poly in build_grid(vlayer, cell_size)}
+        geom = next(vlayer.getFeatures()).geometry()
+        bbox = geom.boundingBox()
+        cols = int(np.ceil(bbox.width() / cell_size))
+        rows = int(np.ceil(bbox.height() / cell_size))
+        xc = lattice_axis(bbox.xMinimum() + half_size, cell_size, cols)
+        yc = lattice_axis(bbox.yMaximum() - half_size, -cell_size, rows)
+        edges = polygon_edges(geom)
+        centres = set()
+        for y in yc:
+            for x in xc[centres_in_polygon_row(xc, y, edges)]:
+                centres.add((x - half_size, y - half_size))
+        self.assertEqual(len(centres), 494)
+        self.assertSetEqual(centres, expected)
+
+    def test_grid_neighbors_array(self):
+        self.f2g.import_mannings_n_topo()
+        fids, xs, ys = self.f2g.grid_centroids_array()
+        neighbors = grid_neighbors_array(fids, xs, ys, 100)
+        self.assertEqual(neighbors.shape, (9205, 8))
+        self.assertEqual(neighbors.dtype, np.int32)
+        # Cardinal neighbours must match the ones written by FLO-2D into FPLAIN.DAT
+        fplain = [[int(n) for n in row[1:5]] for row in self.f2g.parser.single_parser(self.f2g.parser.dat_files["FPLAIN.DAT"])]
+        self.assertEqual(neighbors[:, :4].tolist(), fplain)
+
     def test_poly2grid(self):
         self.f2g.import_cont_toler()
         cellsize = self.f2g.execute("""SELECT value FROM cont WHERE name = 'CELLSIZE';""").fetchone()[0]
@@ -86,6 +122,38 @@ class TestGridTools(unittest.TestCase):
             self.assertTrue(all(awrf))
         self.assertTupleEqual(row[0][1:], (153, 4, 0.68, 1.0, 0.0, 0.27, 1.0, 0.56, 0.0, 1.0, 1.0))
 
+    def test_raster2grid(self):
+        from osgeo import gdal
+
+        grid = os.path.join(VECTOR_PATH, "grid.geojson")
+        glayer = QgsVectorLayer(grid, "grid", "ogr")
+        # Raster with nodata pixels, not aligned to the grid and not covering all of it
+        rng = np.random.default_rng(0)
+        values = rng.uniform(0.0, 500.0, (70, 90)).astype(np.float32)
+        values[rng.random(values.shape) < 0.2] = -9999
+        raster = os.path.join(tempfile.mkdtemp(), "sampled.tif")
+        ds = gdal.GetDriverByName("GTiff").Create(raster, 90, 70, 1, gdal.GDT_Float32)
+        ds.SetGeoTransform((2261000.5, 137.0, 0.0, 14851000.5, 0.0, -137.0))
+        band = ds.GetRasterBand(1)
+        band.SetNoDataValue(-9999)
+        band.WriteArray(values)
+        ds = None
+
+        # Values of 'identify' on every centroid, as sampled before
+        provider = QgsRasterLayer(raster).dataProvider()
+        expected = []
+        for feat in glayer.getFeatures():
+            center = feat.geometry().centroid().asPoint()
+            val = provider.identify(center, QgsRaster.IdentifyFormatValue).results()[1]
+            expected.append((round(val, 4) if is_number(val) else None, feat.id()))
+        expected.sort(key=lambda item: item[1])
+
+        sampled = list(raster2grid(glayer, raster, None))
+        self.assertEqual(sampled, expected)
+        self.assertIn(None, [val for val, fid in sampled])
+        self.assertEqual(list(rasters2centroids(glayer, None, raster)), [expected])
+        self.assertEqual(list(raster2grid(glayer, raster + ".missing", None)), [])
+
 
 # Running tests:
 if __name__ == "__main__":
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+
+# FLO-2D Preprocessor tools for QGIS
+
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from .utilities import get_qgis_app
+
+QGIS_APP = get_qgis_app()
+
+from flo2d.misc.lidar_binning import LidarBinner, bin_lidar_files
+from flo2d.misc.process_pool import spawn_process_pool
+
+# Cells of a 2 x 2 grid with cell size 10 and lower left corner at (0, 0): (fid, col, row)
+GRID = [(1, 2, 2), (2, 3, 2), (3, 2, 3), (4, 3, 3)]
+
+SPACE_POINTS = "1 1 10\t\n5 5 20\n15 5 30\n100 100 5\n15 15 7\n"
+
+COMMA_POINTS = "1,1,2\n15,15,3\na,b,c\n5,5,100\n"
+
+# Layouts without x, y, z columns, files are skipped
+UNSUPPORTED_POINTS = {
+    "two_values.txt": "1 1\n5 5\n",
+    "six_values.txt": "0 1 1 10 0 0\n0 5 5 20 0 0\n",
+    "one_comma.txt": "1,1\n5,5\n",
+    "five_commas.txt": "0,1,1,10,0,0\n0,5,5,20,0,0\n",
+}
+
+
+class TestLidarBinning(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.folder = tempfile.mkdtemp()
+        cls.space_file = os.path.join(cls.folder, "space.txt")
+        cls.comma_file = os.path.join(cls.folder, "comma.txt")
+        for path, text in [(cls.space_file, SPACE_POINTS), (cls.comma_file, COMMA_POINTS)]:
+            with open(path, "w") as f:
+                f.write(text)
+        cls.unsupported_files = []
+        for name, text in UNSUPPORTED_POINTS.items():
+            path = os.path.join(cls.folder, name)
+            with open(path, "w") as f:
+                f.write(text)
+            cls.unsupported_files.append(path)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.folder)
+
+    @staticmethod
+    def binner():
+        fids, cols, rows = zip(*GRID)
+        return LidarBinner(fids, cols, rows)
+
+    def test_space_delimited(self):
+        binner = self.binner()
+        errors = bin_lidar_files([self.space_file], binner, 0.0, 0.0, 10.0)
+        self.assertEqual(errors, [])
+        self.assertEqual((binner.inside, binner.outside), (4, 1))
+        self.assertEqual(binner.elevations(), ([(15.0, 1), (30.0, 2), (7.0, 4)], [3]))
+
+    def test_read_error(self):
+        binner = self.binner()
+        errors = bin_lidar_files([self.comma_file], binner, 0.0, 0.0, 10.0)
+        self.assertEqual(errors, [(self.comma_file, 3)])
+        self.assertEqual(binner.elevations(), ([(2.0, 1), (3.0, 4)], [2, 3]))
+
+    def test_chunks(self):
+        files = [self.space_file, self.comma_file]
+        whole = self.binner()
+        whole_errors = bin_lidar_files(files, whole, 0.0, 0.0, 10.0)
+        chunked = self.binner()
+        chunked_errors = bin_lidar_files(files, chunked, 0.0, 0.0, 10.0, chunk_bytes=8)
+        self.assertEqual(chunked_errors, whole_errors)
+        self.assertEqual(chunked.elevations(), whole.elevations())
+        self.assertEqual((chunked.inside, chunked.outside), (whole.inside, whole.outside))
+
+    def test_unsupported_layouts(self):
+        files = self.unsupported_files + [self.space_file]
+        binner = self.binner()
+        errors = bin_lidar_files(files, binner, 0.0, 0.0, 10.0)
+        self.assertEqual(errors, [])
+        self.assertEqual(binner.elevations(), ([(15.0, 1), (30.0, 2), (7.0, 4)], [3]))
+
+    def test_unsupported_layouts_pool(self):
+        files = self.unsupported_files + [self.space_file]
+        binner = self.binner()
+        with spawn_process_pool(2) as pool:
+            errors = bin_lidar_files(files, binner, 0.0, 0.0, 10.0, pool, chunk_bytes=8)
+        self.assertEqual(errors, [])
+        self.assertEqual(binner.elevations(), ([(15.0, 1), (30.0, 2), (7.0, 4)], [3]))
+
+
+# Running tests:
+if __name__ == "__main__":
+    cases = [TestLidarBinning]
+    suite = unittest.TestSuite()
+    for t in cases:
+        tests = unittest.TestLoader().loadTestsFromTestCase(t)
+        suite.addTest(tests)
+    unittest.TextTestRunner(verbosity=2).run(suite)
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+
+# FLO-2D Preprocessor tools for QGIS
+
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version
+
+import os
+import sys
+import unittest
+
+import numpy as np
+
+from .utilities import get_qgis_app
+
+QGIS_APP = get_qgis_app()
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(os.path.dirname(THIS_DIR), "flo2d", "misc"))
+
+from affine import Affine
+from transform import rowcol
+
+from flo2d.misc.pixel_average import pixel_averages, pixel_index, pixel_sums
+
+# 3 rows x 4 cols raster, cell size 2, upper left corner at (100, 200)
+SHAPE = (3, 4)
+TRANSFORM = Affine(2.0, 0, 100.0, 0, -2.0, 200.0)
+
+# (x, y, expected flat index), points on the left and top edges belong to the pixel, on the right and bottom edges
+# to the next pixel or outside
+EDGE_POINTS = [
+    (100.0, 200.0, 0),
+    (101.0, 199.0, 0),
+    (102.0, 200.0, 1),
+    (100.0, 198.0, 4),
+    (102.0, 198.0, 5),
+    (107.999, 194.001, 11),
+    (106.0, 194.0, -1),
+    (108.0, 199.0, -1),
+    (99.999, 199.0, -1),
+    (101.0, 200.001, -1),
+    (50.0, 150.0, -1),
+    (float("nan"), 199.0, -1),
+]
+
+
+def rowcol_index(xs, ys, transform, rows, cols):
+    index = []
+    for x, y in zip(xs, ys):
+        try:
+            r, c = rowcol(transform, x, y)
+        except ValueError:
+            # NaN coordinates
+            index.append(-1)
+            continue
+        index.append(r * cols + c if 0 <= r < rows and 0 <= c < cols else -1)
+    return index
+
+
+def reference_averages(xs, ys, zs, transform, rows, cols):
+    totals = {}
+    for i, x, y, z in zip(rowcol_index(xs, ys, transform, rows, cols), xs, ys, zs):
+        if i >= 0:
+            total = totals.setdefault(i, [0.0, 0])
+            total[0] += z
+            total[1] += 1
+    return {i: total / count for i, (total, count) in totals.items()}
+
+
+class TestPixelAverage(unittest.TestCase):
+    def test_pixel_index_edges(self):
+        xs, ys, expected = zip(*EDGE_POINTS)
+        self.assertEqual(pixel_index(xs, ys, TRANSFORM, *SHAPE).tolist(), list(expected))
+        self.assertEqual(rowcol_index(xs, ys, TRANSFORM, *SHAPE), list(expected))
+
+    def test_pixel_index_rowcol(self):
+        rng = np.random.default_rng(0)
+        transform = Affine(10.0, 0, 500000.0, 0, -10.0, 4000000.0)
+        rows, cols = 20, 30
+        # Random points, some of them outside, and points on pixel edges
+        xs = np.concatenate([rng.uniform(499950.0, 500350.0, 2000), 500000.0 + 10.0 * rng.integers(-2, 33, 500)])
+        ys = np.concatenate([rng.uniform(3999750.0, 4000050.0, 2000), 4000000.0 - 10.0 * rng.integers(-2, 23, 500)])
+        index = pixel_index(xs, ys, transform, rows, cols)
+        self.assertEqual(index.tolist(), rowcol_index(xs.tolist(), ys.tolist(), transform, rows, cols))
+        self.assertTrue((index == -1).any())
+        self.assertTrue((index >= 0).any())
+
+    def test_pixel_averages(self):
+        rng = np.random.default_rng(1)
+        xs = np.concatenate([rng.uniform(96.0, 112.0, 300), [x for x, y, i in EDGE_POINTS]])
+        ys = np.concatenate([rng.uniform(192.0, 204.0, 300), [y for x, y, i in EDGE_POINTS]])
+        zs = rng.uniform(100.0, 200.0, xs.size)
+        # Partial sums of two partitions merged
+        parts = [pixel_sums(xs[s], ys[s], zs[s], TRANSFORM, *SHAPE) for s in (slice(0, 150), slice(150, None))]
+        keys, sums, counts = (np.concatenate(columns) for columns in zip(*parts))
+        pixels, averages = pixel_averages(keys, sums, counts)
+        expected = reference_averages(xs.tolist(), ys.tolist(), zs.tolist(), TRANSFORM, *SHAPE)
+        self.assertEqual(pixels.tolist(), sorted(expected))
+        for pixel, average in zip(pixels.tolist(), averages.tolist()):
+            self.assertAlmostEqual(average, expected[pixel], places=9)
+
+
+# Running tests:
+if __name__ == "__main__":
+    cases = [TestPixelAverage]
+    suite = unittest.TestSuite()
+    for t in cases:
+        tests = unittest.TestLoader().loadTestsFromTestCase(t)
+        suite.addTest(tests)
+    unittest.TextTestRunner(verbosity=2).run(suite)
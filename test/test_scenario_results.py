@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+# FLO-2D Preprocessor tools for QGIS
+
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from .utilities import get_qgis_app
+
+QGIS_APP = get_qgis_app()
+
+from flo2d.flo2d_ie.scenario_results import ingest_scenario_output, scenario_process_pool
+
+HYDROSTRUCT = """
+  THE MAXIMUM DISCHARGE FOR: CULV1  STRUCTURE NO. 1 IS:   10.0
+    TIME   DISCHARGE   X
+    0.10   1.00   2.00
+    0.20   1.50   2.50
+
+  THE MAXIMUM DISCHARGE FOR: CULV2  STRUCTURE NO. 2 IS:   5.0
+    TIME   DISCHARGE   X
+    0.10   0.50   0.70
+"""
+
+CROSSQ = """  100  0.10  1.5
+  0.20  2.5
+  200  0.10  4.0
+  0.20  5.0
+
+  100  0.10  9.0
+"""
+
+HYCHAN = """
+  CHANNEL HYDROGRAPH FOR ELEMENT NO:       25
+    MAXIMUM DISCHARGE = 12.00 CFS AT TIME 0.20
+    MAXIMUM STAGE = 101.50 AT TIME 0.20
+    FLOW AREA AND HYDRAULIC RADIUS
+  TIME
+  HRS
+  ---
+  ---
+   0.10  101.00  1.00  2.00  8.00  0.50  4.00  6.00  0.70  5.00  5.00  0.01  0.20  40.00
+   0.20  101.50  1.50  2.50 12.00  0.60  5.00  7.00  0.80  5.50  3.60  0.02  0.30  44.00
+
+"""
+
+
+class TestScenarioResults(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.scenario = tempfile.mkdtemp()
+        for name, text in [("HYDROSTRUCT.OUT", HYDROSTRUCT), ("CROSSQ.OUT", CROSSQ), ("HYCHAN.OUT", HYCHAN)]:
+            with open(os.path.join(cls.scenario, name), "w") as f:
+                f.write(text)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.scenario)
+
+    def test_hydrostruct(self):
+        path, groups = ingest_scenario_output("HYDROSTRUCT", self.scenario)
+        group_path, datasets = groups[0]
+        self.assertEqual(group_path, "Hydraulic Structures")
+        self.assertEqual(list(datasets), ["Time Series", "CULV1", "CULV2"])
+        self.assertEqual(datasets["Time Series"], [0.1, 0.2])
+        self.assertEqual(datasets["CULV2"], [(0.5, 0.7)])
+
+    def test_crossq(self):
+        path, groups = ingest_scenario_output("CROSSQ", self.scenario)
+        datasets = groups[0][1]
+        self.assertEqual(datasets["200"], [4.0, 5.0])
+        self.assertEqual(datasets["100"], [9.0])
+
+    def test_missing_file(self):
+        path, groups = ingest_scenario_output("HYCROSS", self.scenario)
+        self.assertIsNone(groups)
+        self.assertTrue(path.endswith("HYCROSS.OUT"))
+
+    def test_process_pool(self):
+        with scenario_process_pool(1) as pool:
+            path, groups = pool.submit(ingest_scenario_output, "HYCHAN", self.scenario).result()
+            # Worker parsed the scenario without importing QGIS
+            self.assertFalse(pool.submit(eval, "'qgis' in __import__('sys').modules").result())
+        profiles = groups[0][1]
+        cross_sections = groups[1][1]
+        self.assertEqual(list(profiles["25"]), [101.5, 12.0, 2.5, 0.6, 5.0, 7.0, 0.8, 5.5, 5.0, 0.02, 0.3, 44.0])
+        self.assertEqual(cross_sections["25"].shape, (2, 14))
+        self.assertEqual(list(cross_sections["25"][:, 4]), [8.0, 12.0])
+
+
+# Running tests:
+if __name__ == "__main__":
+    cases = [TestScenarioResults]
+    suite = unittest.TestSuite()
+    for t in cases:
+        tests = unittest.TestLoader().loadTestsFromTestCase(t)
+        suite.addTest(tests)
+    unittest.TextTestRunner(verbosity=2).run(suite)
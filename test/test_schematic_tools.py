@@ -20,12 +20,19 @@ EXPORT_DATA_DIR = os.path.join(THIS_DIR, "data")
 
 from collections import defaultdict
 
-from qgis.core import QgsVectorLayer
+import numpy as np
+from qgis.core import QgsFeature, QgsFeatureRequest, QgsField, QgsGeometry, QgsRectangle, QgsVectorLayer
+from qgis.PyQt.QtCore import QVariant
 
-from flo2d.flo2d_tools.schematic_tools import (get_intervals,
+from flo2d.flo2d_tools.grid_tools import CLOCKWISE_DIRECTIONS
+from flo2d.flo2d_tools.schematic_tools import (generate_schematic_levees,
+                                               get_intervals,
                                                interpolate_along_line,
+                                               levee_schematic,
                                                populate_directions,
                                                schematize_lines)
+from flo2d.geopackage_utils import GeoPackageUtils, database_create
+from flo2d.misc import gpkg_binary
 
 
 class TestSchematicTools(unittest.TestCase):
@@ -95,6 +102,58 @@ class TestSchematicTools(unittest.TestCase):
             directions = (True if 0 < d < 9 else False for d in s)
             self.assertTrue(all(directions))
 
+    def test_generate_schematic_levees(self):
+        user_lines = os.path.join(VECTOR_PATH, "user_levee_lines.geojson")
+        line_layer = QgsVectorLayer(user_lines, "lines", "ogr")
+        cell_size, x_min, y_max = 100.0, 2291850.5, 14859450.5
+        rows, cols = np.meshgrid(np.arange(54), np.arange(122), indexing="ij")
+        xs, ys = (x_min + cols * cell_size).ravel(), (y_max - rows * cell_size).ravel()
+        elevations = np.round(np.random.default_rng(0).uniform(0.0, 100.0, xs.size), 2).tolist()
+
+        gutils = GeoPackageUtils(database_create(":memory:"), None)
+        gutils.set_cont_par("CELLSIZE", cell_size)
+        with gutils.bulk_session(defer_spatial_index=["grid"]):
+            gutils.execute_many(
+                """INSERT INTO grid (geom, elevation) VALUES (?, ?);""",
+                zip(gpkg_binary.encode_squares(xs, ys, cell_size), elevations),
+            )
+        for feat in line_layer.getFeatures():
+            coords = [(p.x(), p.y()) for p in feat.geometry().asPolyline()]
+            gutils.execute(
+                """INSERT INTO user_levee_lines (fid, geom) VALUES (?, ?);""",
+                (feat.id(), gpkg_binary.encode_linestring(coords)),
+            )
+        list(generate_schematic_levees(gutils, line_layer, None))
+        levees = gutils.execute("""SELECT grid_fid, ldir, levcrest FROM levee_data;""").fetchall()
+
+        # Sides of the QGIS geometries intersections of 'levee_schematic'
+        grid_layer = QgsVectorLayer("Polygon", "grid", "memory")
+        grid_layer.dataProvider().addAttributes([QgsField("elevation", QVariant.Double)])
+        grid_layer.updateFields()
+        cells = []
+        half = cell_size * 0.5
+        for x, y, elevation in zip(xs.tolist(), ys.tolist(), elevations):
+            cell = QgsFeature(grid_layer.fields())
+            cell.setGeometry(QgsGeometry.fromRect(QgsRectangle(x - half, y - half, x + half, y + half)))
+            cell.setAttribute("elevation", elevation)
+            cells.append(cell)
+        grid_layer.dataProvider().addFeatures(cells)
+        lid_gid_elev = []
+        for feat in line_layer.getFeatures():
+            request = QgsFeatureRequest(feat.geometry().boundingBox())
+            for cell in grid_layer.getFeatures(request):
+                if feat.geometry().intersects(cell.geometry()):
+                    lid_gid_elev.append((feat.id(), cell.id(), cell["elevation"]))
+        expected = set()
+        for gid, gdata in levee_schematic(lid_gid_elev, line_layer, grid_layer).items():
+            for sides in gdata["lines"].values():
+                expected.update((gid, CLOCKWISE_DIRECTIONS[side]) for side in sides)
+
+        self.assertSetEqual({(gid, ldir) for gid, ldir, crest in levees}, expected)
+        self.assertEqual(len(levees), len(expected))
+        for gid, ldir, crest in levees:
+            self.assertEqual(crest, elevations[gid - 1])
+
 
 # Running tests:
 if __name__ == "__main__":
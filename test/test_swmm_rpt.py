@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+
+# FLO-2D Preprocessor tools for QGIS
+
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from .utilities import get_qgis_app
+
+QGIS_APP = get_qgis_app()
+
+import numpy as np
+
+from flo2d.flo2d_ie.swmm_rpt import SwmmRptIndex
+
+RPT = """
+  EPA STORM WATER MANAGEMENT MODEL - VERSION 5.2
+
+  Flow Units ............... CFS
+
+  <<< Node I1 >>>
+  ----------------------------------------------------------------------
+                           Inflow  Flooding     Depth      Head
+  Date        Time            CFS       CFS      feet      feet
+  ----------------------------------------------------------------------
+  JAN-01-2000 00:05:00      0.100     0.000     0.010   100.010
+  JAN-01-2000 00:10:00      0.200     0.000     0.020   100.020
+
+  <<< Node O1 >>>
+  ----------------------------------------------------------------------
+                           Inflow  Flooding     Depth      Head
+  Date        Time            CFS       CFS      feet      feet
+  ----------------------------------------------------------------------
+  JAN-01-2000 00:05:00      0.050     0.000     0.005    90.005
+  JAN-01-2000 00:10:00      0.150     0.000     0.015    90.015
+
+  <<< Link C1 >>>
+  ----------------------------------------------------------------------
+                             Flow  Velocity     Depth   Capacity/
+  Date        Time            CFS    ft/sec      feet     Setting
+  ----------------------------------------------------------------------
+  JAN-01-2000 00:05:00      0.080     0.500     0.010     0.010
+  JAN-01-2000 00:10:00      0.180     0.700     0.020     0.020
+
+  Analysis begun on:  Mon Jan 01 00:00:00 2024
+  Analysis ended on:  Mon Jan 01 00:00:01 2024
+"""
+
+
+class TestSwmmRptIndex(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.mkdtemp()
+        cls.rpt_file = os.path.join(cls.tmp_dir, "swmm.RPT")
+        with open(cls.rpt_file, "w") as f:
+            f.write(RPT)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp_dir)
+
+    def test_index(self):
+        index = SwmmRptIndex(self.rpt_file)
+        self.assertEqual(index.units, "CFS")
+        self.assertEqual(index.names("Node"), ["I1", "O1"])
+        self.assertEqual(index.names("Link"), ["C1"])
+        self.assertTrue(index.has("Link", "C1"))
+        self.assertFalse(index.has("Node", "C1"))
+        self.assertTrue(os.path.isfile(self.rpt_file + ".idx"))
+
+    def test_series(self):
+        index = SwmmRptIndex(self.rpt_file)
+        dates, times, values = index.series("Node", "O1")
+        self.assertEqual(times, ["00:05:00", "00:10:00"])
+        self.assertTrue(np.array_equal(values[:, 3], [90.005, 90.015]))
+        self.assertEqual(index.rows("Link", "C1")[1], ["JAN-01-2000", "00:10:00", "0.180", "0.700", "0.020", "0.020"])
+        self.assertEqual(index.series("Node", "missing")[2].shape, (0, 4))
+        names = [name for name, dates, times, values in index.iter_series("Node")]
+        self.assertEqual(names, ["I1", "O1"])
+
+    def test_saved_index(self):
+        built = SwmmRptIndex(self.rpt_file)
+        loaded = SwmmRptIndex(self.rpt_file)
+        self.assertEqual(loaded.blocks, built.blocks)
+        self.assertIs(SwmmRptIndex.open(self.rpt_file), SwmmRptIndex.open(self.rpt_file))
+
+
+# Running tests:
+if __name__ == "__main__":
+    cases = [TestSwmmRptIndex]
+    suite = unittest.TestSuite()
+    for t in cases:
+        tests = unittest.TestLoader().loadTestsFromTestCase(t)
+        suite.addTest(tests)
+    unittest.TextTestRunner(verbosity=2).run(suite)